@@ -3,12 +3,12 @@ from telegram import Update, KeyboardButton, ReplyKeyboardMarkup, ReplyKeyboardR
 from telegram.ext import ContextTypes, ConversationHandler, CommandHandler, MessageHandler, filters, CallbackQueryHandler
 from app.bot.services import BotService
 from app.bot.log_service import BotLogService
-from app.utils.ocr_helper import read_blood_pressure_with_gemini
+from app.utils.ocr_helper import HEIF_SUPPORTED, read_blood_pressure_with_gemini_async
+from app.utils.password_pool import PasswordPoolBusy, password_pool
 from .locales import get_text
 from telegram.constants import ChatAction
 from datetime import datetime
 import logging
-import tempfile
 import os
 import re
 import asyncio
@@ -311,7 +311,14 @@ async def auth_password(update: Update, context: ContextTypes.DEFAULT_TYPE):
     except:
         pass
 
-    verification = BotService.verify_user_password(phone_number, password)
+    # DB + bcrypt off the event loop; bcrypt itself runs on the shared password pool
+    try:
+        verification = await asyncio.to_thread(
+            BotService.verify_user_password, phone_number, password, f"tg:{update.effective_chat.id}"
+        )
+    except PasswordPoolBusy:
+        await update.message.reply_text(get_text("password_busy", lang))
+        return AUTH_PASSWORD
     if verification.user:
         BotService.link_telegram_account(verification.user.id, update.effective_chat.id)
         # Save language choice to DB
@@ -476,7 +483,12 @@ async def reg_password(update: Update, context: ContextTypes.DEFAULT_TYPE):
         pass
 
     await update.message.reply_text(get_text("creating_account", lang))
-    new_user = await BotService.register_new_user(context.user_data, update.effective_chat.id)
+    try:
+        new_user = await BotService.register_new_user(context.user_data, update.effective_chat.id)
+    except PasswordPoolBusy:
+        await update.message.reply_text(get_text("password_busy", lang))
+        context.user_data['_auth_state'] = 'reg_password'  # Still expecting password
+        return REG_PASSWORD
     
     lang = context.user_data.get('register_lang', 'en')
     
@@ -577,44 +589,25 @@ async def handle_photo_entry(update: Update, context: ContextTypes.DEFAULT_TYPE)
 
     processing_msg = await update.message.reply_text(get_text("analyzing_image", lang))
 
-    with tempfile.NamedTemporaryFile(delete=False, suffix=file_ext) as temp_file:
-        await photo_file.download_to_drive(temp_file.name)
-        temp_path = temp_file.name
-
-    # Convert HEIC/HEIF to JPEG if needed (PIL doesn't support HEIC natively)
-    if file_ext.lower() in (".heic", ".heif"):
-        try:
-            import pillow_heif
-            pillow_heif.register_heif_opener()
-        except ImportError:
-            # If pillow-heif not installed, try converting with subprocess (sips on macOS)
-            try:
-                import subprocess
-                converted_path = temp_path.rsplit(".", 1)[0] + ".jpg"
-                subprocess.run(["sips", "-s", "format", "jpeg", temp_path, "--out", converted_path],
-                              capture_output=True, timeout=10)
-                if os.path.exists(converted_path):
-                    os.unlink(temp_path)
-                    temp_path = converted_path
-            except Exception:
-                os.unlink(temp_path)
-                await processing_msg.edit_text(get_text("heic_not_supported", lang))
-                return ConversationHandler.END
+    # HEIC/HEIF (iPhone) is decoded in memory by pillow-heif when installed
+    if file_ext.lower() in (".heic", ".heif") and not HEIF_SUPPORTED:
+        await processing_msg.edit_text(get_text("heic_not_supported", lang))
+        return ConversationHandler.END
 
     try:
         # Pass Telegram message timestamp as upload_time so ocr_helper's sanity check
         # and fallback use the moment the user sent the photo, not when Gemini responds.
         upload_time = update.message.date if update.message and update.message.date else None
 
-        # Run sync Gemini call in a worker thread so the bot's event loop stays
-        # responsive (other users' commands aren't blocked while one OCR is in flight).
-        ocr_result = await asyncio.to_thread(
-            read_blood_pressure_with_gemini, temp_path, upload_time=upload_time
+        # Native async Gemini call through the OCR queue shared with the API, so the
+        # bot's event loop stays responsive and a photo burst can't starve the thread pool.
+        image_data = bytes(await photo_file.download_as_bytearray())
+        ocr_result = await read_blood_pressure_with_gemini_async(
+            image_data, upload_time=upload_time, user_id=user.id
         )
-        os.unlink(temp_path)
 
         if ocr_result.error:
-            if ocr_result.error_code == "OCR_RATE_LIMITED":
+            if ocr_result.error_code in ("OCR_RATE_LIMITED", "OCR_QUEUE_FULL"):
                 await processing_msg.edit_text(get_text("ocr_rate_limited", lang))
             elif ocr_result.error_code == "OCR_UNSUPPORTED_FORMAT":
                 await processing_msg.edit_text(get_text("ocr_unsupported_format", lang))
@@ -1763,12 +1756,18 @@ async def password_current(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = context.user_data.get('pw_user_id')
     with SessionLocal() as db:
         db_user = db.query(User).filter(User.id == user_id).first()
-        if db_user and verify_password(password, db_user.password_hash):
-            await update.message.reply_text(get_text("password_enter_new", lang), parse_mode="Markdown")
-            return PW_NEW
-        else:
-            await update.message.reply_text(get_text("password_wrong_current", lang))
-            return PW_CURRENT
+    try:
+        verified = db_user is not None and await password_pool.run(
+            verify_password, password, db_user.password_hash, client_key=f"tg:{update.effective_chat.id}"
+        )
+    except PasswordPoolBusy:
+        await update.message.reply_text(get_text("password_busy", lang))
+        return PW_CURRENT
+    if verified:
+        await update.message.reply_text(get_text("password_enter_new", lang), parse_mode="Markdown")
+        return PW_NEW
+    await update.message.reply_text(get_text("password_wrong_current", lang))
+    return PW_CURRENT
 
 
 async def password_new(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -1810,7 +1809,11 @@ async def password_confirm(update: Update, context: ContextTypes.DEFAULT_TYPE):
     user_id = context.user_data.get('pw_user_id')
     # Use change_password with the verified current password path
     # Since we already verified, use reset_password_direct
-    success = BotService.reset_password_direct(user_id, new_pw)
+    try:
+        success = await asyncio.to_thread(BotService.reset_password_direct, user_id, new_pw)
+    except PasswordPoolBusy:
+        await update.message.reply_text(get_text("password_busy", lang))
+        return PW_CONFIRM
     if success:
         await update.message.reply_text(get_text("password_success", lang))
     else:
@@ -1878,7 +1881,11 @@ async def password_confirm_after_otp(update: Update, context: ContextTypes.DEFAU
         return PW_NEW_AFTER_OTP
 
     user_id = context.user_data.get('pw_user_id')
-    success = BotService.reset_password_direct(user_id, new_pw)
+    try:
+        success = await asyncio.to_thread(BotService.reset_password_direct, user_id, new_pw)
+    except PasswordPoolBusy:
+        await update.message.reply_text(get_text("password_busy", lang))
+        return PW_CONFIRM_AFTER_OTP
     if success:
         await update.message.reply_text(get_text("password_success", lang))
     else:
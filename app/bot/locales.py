@@ -151,6 +151,7 @@ LOCALES = {
         "password_confirm_new": "Enter your new password again to **confirm**:",
         "password_mismatch": "❌ Passwords don't match. Please enter your new password again:",
         "password_wrong_current": "❌ Current password is incorrect. Try again or /cancel:",
+        "password_busy": "⏳ The system is busy right now. Please wait a moment and send your password again.",
         "password_success": "✅ Password changed successfully! All other sessions have been logged out.",
         "password_too_short": "⚠️ Password must be at least 8 characters. Try again:",
         "password_otp_sent": "📩 OTP sent to your registered contact. Enter the code:",
@@ -339,6 +340,7 @@ LOCALES = {
         "password_confirm_new": "กรอกรหัสผ่านใหม่อีกครั้งเพื่อ **ยืนยัน**:",
         "password_mismatch": "❌ รหัสผ่านไม่ตรงกัน กรุณากรอกรหัสผ่านใหม่อีกครั้ง:",
         "password_wrong_current": "❌ รหัสผ่านปัจจุบันไม่ถูกต้อง ลองใหม่ หรือพิมพ์ /cancel:",
+        "password_busy": "⏳ ระบบกำลังมีผู้ใช้งานจำนวนมาก กรุณารอสักครู่แล้วส่งรหัสผ่านอีกครั้ง",
         "password_success": "✅ เปลี่ยนรหัสผ่านเรียบร้อย! เซสชันอื่นถูกล็อกเอาต์หมดแล้ว",
         "password_too_short": "⚠️ รหัสผ่านต้องมีอย่างน้อย 8 ตัวอักษร ลองใหม่:",
         "password_otp_sent": "📩 ส่ง OTP ไปที่ข้อมูลติดต่อแล้ว กรอกรหัส:",
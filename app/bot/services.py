@@ -12,9 +12,11 @@ from app.utils.security import (
     MAX_LOGIN_ATTEMPTS,
 )
 from app.utils.encryption import encrypt_value, decrypt_value, hash_value
+from app.utils.password_pool import PasswordPoolBusy, password_pool
 from app.utils.tmc_checker import verify_doctor_with_tmc_v3
 from app.utils.timezone import now_tz, TIMEZONE_CHOICES, is_valid_timezone, format_datetime
-from app.utils.subscription import get_subscription_info, normalize_subscription_state
+from app.utils.subscription import get_subscription_info
+from app.services.bp_stats_service import reset_user_aggregate
 from app.database import SessionLocal
 import logging
 import jwt
@@ -63,8 +65,13 @@ class BotService:
             return None
 
     @staticmethod
-    def verify_user_password(phone_number: str, password: str) -> PasswordVerificationResult:
-        """Verify password for a given phone number using the same account rules as web login."""
+    def verify_user_password(
+        phone_number: str, password: str, client_key: str | None = None
+    ) -> PasswordVerificationResult:
+        """Verify password for a given phone number using the same account rules as web login.
+
+        bcrypt runs on the shared password pool; raises PasswordPoolBusy when it is full.
+        """
         phone_h = hash_value(phone_number)
         if not phone_h:
             return PasswordVerificationResult(None, "not_found")
@@ -79,7 +86,7 @@ class BotService:
             if not user.is_active:
                 return PasswordVerificationResult(None, "inactive")
 
-            if verify_password(password, user.password_hash):
+            if password_pool.call(verify_password, password, user.password_hash, client_key=client_key):
                 user.failed_login_attempts = 0
                 user.account_locked_until = None
                 user.last_login = now_tz()
@@ -163,6 +170,7 @@ class BotService:
         """
         Register a new user from Telegram data.
         user_data expected keys: phone_number, full_name, role, date_of_birth (datetime), password, gender
+        Raises PasswordPoolBusy when the password pool is full; other failures return None.
         """
         with SessionLocal() as db:
             try:
@@ -211,7 +219,7 @@ class BotService:
                 new_user = User(
                     phone_number=user_data['phone_number'],
                     full_name=user_data['full_name'],
-                    password_hash=hash_password(user_data['password']),
+                    password_hash=await password_pool.run(hash_password, user_data["password"], client_key=f"tg:{telegram_id}"),
                     role=user_data['role'],
                     date_of_birth=user_data.get('date_of_birth'),
                     gender=user_data.get('gender'),
@@ -231,6 +239,10 @@ class BotService:
                 db.commit()
                 db.refresh(new_user)
                 return new_user
+            except PasswordPoolBusy:
+                # Transient: the handler asks the user to resend the password
+                db.rollback()
+                raise
             except Exception as e:
                 logger.error(f"Bot Registration Error: {e}")
                 db.rollback()
@@ -290,10 +302,7 @@ class BotService:
     def get_user_stats(user_id: int, days: int = 30):
         """Get recent stats for a user with clinical metrics."""
         from app.models import BloodPressureRecord
-        from app.routers.bp_records import classify_bp, compute_trend
-        from sqlalchemy import func
-        from datetime import timedelta
-        import statistics as stats_module
+        from app.services.bp_stats_service import summarize_readings
 
         with SessionLocal() as db:
             # Check premium status
@@ -319,34 +328,27 @@ class BotService:
                     "advanced": None
                 }
 
-            # Calculate averages
-            sys_vals = [r.systolic for r in recent]
-            dia_vals = [r.diastolic for r in recent]
-            pulse_vals = [r.pulse for r in recent]
-            n = len(recent)
-
-            avg_sys = round(sum(sys_vals) / n, 1)
-            avg_dia = round(sum(dia_vals) / n, 1)
-            avg_pulse = round(sum(pulse_vals) / n, 1)
+            # Same computation as /api/v1/stats/summary (rows are needed here anyway
+            # for the latest-readings list and the chart)
+            bp_stats = summarize_readings(recent, include_advanced=is_premium)
+            avg_sys = bp_stats["systolic"]["avg"]
+            avg_dia = bp_stats["diastolic"]["avg"]
+            avg_pulse = bp_stats["pulse"]["avg"]
 
             # Classification (free + premium)
-            classification = classify_bp(avg_sys, avg_dia)
+            classification = bp_stats["classification"]
 
             # Advanced stats (premium only)
             advanced = None
             if is_premium:
-                has_enough = n >= 2
-                sd_sys = round(stats_module.stdev(sys_vals), 1) if has_enough else 0
-                sd_dia = round(stats_module.stdev(dia_vals), 1) if has_enough else 0
                 pp_avg = round(avg_sys - avg_dia, 1)
                 map_avg = round((avg_sys + 2 * avg_dia) / 3, 1)
-                trend = compute_trend(recent)
                 advanced = {
-                    "sd_sys": sd_sys,
-                    "sd_dia": sd_dia,
+                    "sd_sys": bp_stats["systolic"]["sd"],
+                    "sd_dia": bp_stats["diastolic"]["sd"],
                     "pulse_pressure": pp_avg,
                     "map": map_avg,
-                    "trend": trend
+                    "trend": bp_stats["trend"]
                 }
 
             class AvgResult:
@@ -372,9 +374,6 @@ class BotService:
             if not user:
                 return None
 
-            # Self-heal: persist downgrade if expired premium
-            normalize_subscription_state(user, db=db)
-
             sub_info = get_subscription_info(user)
 
             return {
@@ -424,9 +423,6 @@ class BotService:
             if not user:
                 return None
 
-            # Self-heal: persist downgrade if expired premium
-            normalize_subscription_state(user, db=db)
-
             gender_map = {"male": "Male", "female": "Female", "other": "Other"}
             role_map = {"patient": "Patient", "doctor": "Doctor"}
 
@@ -576,9 +572,9 @@ class BotService:
             user = db.query(User).filter(User.id == user_id).first()
             if not user:
                 return False
-            if not verify_password(current_password, user.password_hash):
+            if not password_pool.call(verify_password, current_password, user.password_hash, client_key=f"user:{user_id}"):
                 return False
-            user.password_hash = hash_password(new_password)
+            user.password_hash = password_pool.call(hash_password, new_password, client_key=f"user:{user_id}")
             user.updated_at = now_tz()
             # Invalidate all sessions
             db.query(UserSession).filter(
@@ -595,7 +591,7 @@ class BotService:
             user = db.query(User).filter(User.id == user_id).first()
             if not user:
                 return False
-            user.password_hash = hash_password(new_password)
+            user.password_hash = password_pool.call(hash_password, new_password, client_key=f"user:{user_id}")
             user.failed_login_attempts = 0
             user.account_locked_until = None
             user.updated_at = now_tz()
@@ -631,6 +627,7 @@ class BotService:
                 User.telegram_id_hash.isnot(None),
                 User.is_active == True
             ).all()
+            User.prime_decrypted(users, "telegram_id_encrypted")
 
             result = []
             for user in users:
@@ -656,10 +653,11 @@ class BotService:
                 if not user:
                     return False
 
-                # 1. Delete BP records
+                # 1. Delete BP records (bulk delete skips ORM events → drop the rollup too)
                 db.query(BloodPressureRecord).filter(
                     BloodPressureRecord.user_id == user_id
                 ).delete()
+                reset_user_aggregate(db, user_id)
 
                 # 2. Delete sessions
                 db.query(UserSession).filter(
@@ -679,6 +677,7 @@ class BotService:
                 user.phone_number_hash = None
                 user.full_name_encrypted = None
                 user.full_name_hash = None
+                user.name_tokens = []
                 user.citizen_id_encrypted = None
                 user.citizen_id_hash = None
                 user.medical_license_encrypted = None
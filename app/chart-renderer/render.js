@@ -4,6 +4,13 @@
  *
  * Usage: echo '{"labels":[...],"systolic":[...],...}' | node render.js
  * Outputs: PNG image bytes to stdout
+ *
+ * Worker mode: node render.js --worker
+ *   Stays alive and serves length-prefixed frames on stdin/stdout so the
+ *   Python side (app/utils/chart_render_pool.py) pays module load once.
+ *   Request:  [uint32 BE length][JSON payload]   ({"type":"ping"} = health check)
+ *   Response: [uint8 status][uint32 BE length][body]
+ *             status 0 = PNG bytes (or "pong"), status 1 = UTF-8 error message
  */
 'use strict';
 
@@ -60,19 +67,63 @@ if (!thaiFontLoaded) {
 }
 
 // ── Read JSON from stdin ────────────────────────────────────────
-let input = '';
-process.stdin.setEncoding('utf8');
-process.stdin.on('data', chunk => { input += chunk; });
-process.stdin.on('end', async () => {
+if (process.argv.includes('--worker')) {
+    runWorker();
+} else {
+    let input = '';
+    process.stdin.setEncoding('utf8');
+    process.stdin.on('data', chunk => { input += chunk; });
+    process.stdin.on('end', async () => {
+        try {
+            const data = JSON.parse(input);
+            const buffer = await renderBPChart(data);
+            process.stdout.write(Buffer.from(buffer));
+        } catch (err) {
+            process.stderr.write(`Chart render error: ${err.message}\n`);
+            process.exit(1);
+        }
+    });
+}
+
+// ── Worker mode: framed requests, one at a time ─────────────────
+function runWorker() {
+    let pending = Buffer.alloc(0);
+    let queue = Promise.resolve();
+
+    process.stdin.on('data', chunk => {
+        pending = Buffer.concat([pending, chunk]);
+        while (pending.length >= 4) {
+            const length = pending.readUInt32BE(0);
+            if (pending.length < 4 + length) break;
+            const body = pending.subarray(4, 4 + length);
+            pending = pending.subarray(4 + length);
+            queue = queue.then(() => handleFrame(body));
+        }
+    });
+    // Parent closed stdin → finish in-flight work and exit cleanly
+    process.stdin.on('end', () => { queue.then(() => process.exit(0)); });
+}
+
+async function handleFrame(body) {
     try {
-        const data = JSON.parse(input);
+        const data = JSON.parse(body.toString('utf8'));
+        if (data.type === 'ping') {
+            writeFrame(0, Buffer.from('pong'));
+            return;
+        }
         const buffer = await renderBPChart(data);
-        process.stdout.write(Buffer.from(buffer));
+        writeFrame(0, Buffer.from(buffer));
     } catch (err) {
-        process.stderr.write(`Chart render error: ${err.message}\n`);
-        process.exit(1);
+        writeFrame(1, Buffer.from(`Chart render error: ${err.message}`, 'utf8'));
     }
-});
+}
+
+function writeFrame(status, payload) {
+    const header = Buffer.alloc(5);
+    header.writeUInt8(status, 0);
+    header.writeUInt32BE(payload.length, 1);
+    process.stdout.write(Buffer.concat([header, payload]));
+}
 
 // ── Main render function ────────────────────────────────────────
 async function renderBPChart(data) {
@@ -324,8 +375,11 @@ async function renderBPChart(data) {
     };
 
     // ── Create chart on canvas ──────────────────────────────────
-    new Chart(ctx, configuration);
+    const chart = new Chart(ctx, configuration);
 
     // ── Export to PNG buffer ─────────────────────────────────────
-    return canvas.toBuffer('image/png');
+    const png = canvas.toBuffer('image/png');
+    // Release chart state so long-lived workers don't accumulate instances
+    chart.destroy();
+    return png;
 }
@@ -1,8 +1,18 @@
-
+import logging
 import os
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
+import threading
+import time
+from collections import OrderedDict
+from itertools import chain
+from fastapi import Request
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker, declarative_base
+from sqlalchemy.sql import Select
 from dotenv import load_dotenv
+from .utils.pool_metrics import InstrumentedAsyncQueuePool, InstrumentedQueuePool, pool_metrics
+from .utils.sqlite_profile import install_sqlite_profile
 
 import os
 dotenv_path = os.path.join(os.path.dirname(__file__), '.env')
@@ -11,26 +21,64 @@ if os.path.exists(dotenv_path):
 else:
     load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 # Database setup
 # Default to SQLite for local development
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./blood_pressure.db")
 
+# Optional read replica for GET-only endpoints (get_read_db / get_async_read_db)
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL") or None
+# Replica lag above this (or an unreachable replica) routes reads to the primary
+DATABASE_READ_MAX_LAG_SECONDS = float(os.getenv("DATABASE_READ_MAX_LAG_SECONDS", "5"))
+DATABASE_READ_LAG_CHECK_SECONDS = float(os.getenv("DATABASE_READ_LAG_CHECK_SECONDS", "5"))
+# Read-your-writes: a user who wrote within this window reads from the primary
+DATABASE_READ_STICKY_SECONDS = float(os.getenv("DATABASE_READ_STICKY_SECONDS", "10"))
+
+# Pool sizing per process type: DB_POOL_SIZE etc., overridden by DB_POOL_SIZE_BOT
+# etc. when DB_PROCESS_TYPE=bot (API workers and the bot container size separately)
+DB_PROCESS_TYPE = os.getenv("DB_PROCESS_TYPE", "api").lower()
+
+
+def _pool_setting(name: str, default: int) -> int:
+    value = os.getenv(f"{name}_{DB_PROCESS_TYPE.upper()}") or os.getenv(name)
+    return int(value) if value else default
+
+
+DB_POOL_SIZE = _pool_setting("DB_POOL_SIZE", 5)
+DB_MAX_OVERFLOW = _pool_setting("DB_MAX_OVERFLOW", 10)
+DB_POOL_TIMEOUT = _pool_setting("DB_POOL_TIMEOUT", 30)
+DB_POOL_RECYCLE = _pool_setting("DB_POOL_RECYCLE", 1800)
+
 # Vercel/Postgres fix: Vercel might give "postgres://" but SQLAlchemy needs "postgresql://"
 if DATABASE_URL and DATABASE_URL.startswith("postgres://"):
     DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
+if DATABASE_READ_URL and DATABASE_READ_URL.startswith("postgres://"):
+    DATABASE_READ_URL = DATABASE_READ_URL.replace("postgres://", "postgresql://", 1)
 
-# Create engine with appropriate settings
-if DATABASE_URL.startswith("sqlite"):
-    engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
-else:
-    engine = create_engine(
-        DATABASE_URL,
-        pool_size=5,
-        max_overflow=10,
-        pool_timeout=30,
-        pool_recycle=1800,
-        pool_pre_ping=True
-    )
+
+# Create engine with appropriate settings (pool metrics: app/utils/pool_metrics.py)
+def _create_engine(url: str, name: str):
+    if url.startswith("sqlite"):
+        engine = create_engine(
+            url, connect_args={"check_same_thread": False}, poolclass=InstrumentedQueuePool
+        )
+        install_sqlite_profile(engine)  # WAL + pragmas (SQLITE_PROFILE)
+    else:
+        engine = create_engine(
+            url,
+            poolclass=InstrumentedQueuePool,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_pre_ping=True
+        )
+    pool_metrics.attach(name, engine)
+    return engine
+
+
+engine = _create_engine(DATABASE_URL, "primary")
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
@@ -41,3 +89,231 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# Async engine (asyncpg for Postgres, aiosqlite for SQLite) for routers on
+# get_async_db. Same database as `engine`; created on first use so processes
+# that never touch it (bot, CLI tools) don't need the async drivers.
+def to_async_url(url: str) -> str:
+    """Map a sync DATABASE_URL to its async-driver equivalent."""
+    parsed = make_url(url)
+    if parsed.drivername.startswith("sqlite"):
+        return parsed.set(drivername="sqlite+aiosqlite").render_as_string(hide_password=False)
+    if parsed.drivername.startswith("postgresql"):
+        query = dict(parsed.query)
+        # libpq-only parameters asyncpg rejects; sslmode maps to asyncpg's ssl
+        sslmode = query.pop("sslmode", None)
+        query.pop("channel_binding", None)
+        if sslmode and "ssl" not in query:
+            query["ssl"] = sslmode
+        return parsed.set(drivername="postgresql+asyncpg", query=query).render_as_string(hide_password=False)
+    return url
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or to_async_url(DATABASE_URL)
+
+
+def _create_async_engine(url: str, name: str):
+    if url.startswith("sqlite"):
+        engine = create_async_engine(url, poolclass=InstrumentedAsyncQueuePool)
+        install_sqlite_profile(engine.sync_engine)
+    else:
+        engine = create_async_engine(
+            url,
+            poolclass=InstrumentedAsyncQueuePool,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+            pool_recycle=DB_POOL_RECYCLE,
+            pool_pre_ping=True
+        )
+    pool_metrics.attach(name, engine.sync_engine)
+    return engine
+
+
+AsyncSessionLocal = async_sessionmaker(
+    class_=AsyncSession, autoflush=False, expire_on_commit=False
+)
+async_engine = None
+
+
+def get_async_engine():
+    global async_engine
+    if async_engine is None:
+        async_engine = _create_async_engine(ASYNC_DATABASE_URL, "async_primary")
+        AsyncSessionLocal.configure(bind=async_engine)
+    return async_engine
+
+
+async def get_async_db():
+    get_async_engine()
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# ==========================
+# Read replica routing
+# ==========================
+# A RoutingSession sends SELECTs to the replica and everything else (flushes,
+# UPDATE/DELETE, raw session.connection() work) to the primary. It falls back
+# to the primary for the rest of the session once it has written, while the
+# replica lags, and for users who wrote within DATABASE_READ_STICKY_SECONDS.
+
+class ReplicaLagMonitor:
+    """Cached replica lag. Re-measured in a background thread, never inline on a request."""
+
+    _LAG_SQL = text(
+        "SELECT CASE WHEN NOT pg_is_in_recovery() "
+        "OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+        "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+    )
+
+    def __init__(self, bind, max_lag: float, check_interval: float):
+        self.bind = bind
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.lag = None  # None = unknown or unreachable → primary
+        self.checked_at = 0.0
+        self._checking = False
+        self._lock = threading.Lock()
+
+    def check(self):
+        try:
+            if self.bind.dialect.name != "postgresql":
+                lag = 0.0
+            else:
+                with self.bind.connect() as conn:
+                    lag = float(conn.execute(self._LAG_SQL).scalar() or 0)
+        except Exception as e:
+            logger.warning(f"Read replica lag check failed: {e}")
+            lag = None
+        self.lag = lag
+        self.checked_at = time.monotonic()
+        self._checking = False
+        return lag
+
+    def is_usable(self) -> bool:
+        if time.monotonic() - self.checked_at > self.check_interval:
+            with self._lock:
+                start = not self._checking
+                self._checking = True
+            if start:
+                threading.Thread(target=self.check, daemon=True).start()
+        return self.lag is not None and self.lag <= self.max_lag
+
+
+_RECENT_WRITERS_MAX = 10000
+_recent_writers = OrderedDict()  # user_id -> monotonic time of last committed write
+_recent_writers_lock = threading.Lock()
+
+
+def note_user_write(user_id: int):
+    with _recent_writers_lock:
+        _recent_writers[user_id] = time.monotonic()
+        _recent_writers.move_to_end(user_id)
+        while len(_recent_writers) > _RECENT_WRITERS_MAX:
+            _recent_writers.popitem(last=False)
+
+
+def wrote_recently(user_id: int) -> bool:
+    written_at = _recent_writers.get(user_id)
+    return written_at is not None and time.monotonic() - written_at < DATABASE_READ_STICKY_SECONDS
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_written_users(session, flush_context):
+    session.info["wrote"] = True
+    if read_engine is None:
+        return
+    written = session.info.setdefault("written_user_ids", set())
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if getattr(obj, "__tablename__", None) == "users":
+            written.add(obj.id)
+        for attr in ("user_id", "patient_id", "doctor_id", "admin_user_id"):
+            written.add(getattr(obj, attr, None))
+
+
+@event.listens_for(Session, "after_commit")
+def _note_written_users(session):
+    for user_id in session.info.pop("written_user_ids", ()):
+        if user_id is not None:
+            note_user_write(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_written_users(session):
+    session.info.pop("written_user_ids", None)
+
+
+class RoutingSession(Session):
+    def __init__(self, *args, replica_bind=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.replica_bind = replica_bind
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self._use_replica(clause):
+            return self.replica_bind
+        return super().get_bind(mapper=mapper, clause=clause, **kwargs)
+
+    def _use_replica(self, clause) -> bool:
+        if self.replica_bind is None or self._flushing or self.info.get("wrote"):
+            return False
+        if not isinstance(clause, Select):
+            return False
+        # Set by get_current_user; read lazily so dependency order doesn't matter
+        request = self.info.get("request")
+        user_id = getattr(request.state, "user_id", None) if request is not None else None
+        if user_id is not None and wrote_recently(user_id):
+            return False
+        return replica_monitor is not None and replica_monitor.is_usable()
+
+
+read_engine = _create_engine(DATABASE_READ_URL, "replica") if DATABASE_READ_URL else None
+replica_monitor = (
+    ReplicaLagMonitor(read_engine, DATABASE_READ_MAX_LAG_SECONDS, DATABASE_READ_LAG_CHECK_SECONDS)
+    if read_engine is not None else None
+)
+ReadSessionLocal = sessionmaker(
+    class_=RoutingSession, autocommit=False, autoflush=False, bind=engine, replica_bind=read_engine
+)
+
+
+def get_read_db(request: Request):
+    """Session for read-only endpoints: replica when configured and fresh, else primary."""
+    if read_engine is None:
+        yield from get_db()
+        return
+    db = ReadSessionLocal(info={"request": request})
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+ASYNC_DATABASE_READ_URL = os.getenv("ASYNC_DATABASE_READ_URL") or (
+    to_async_url(DATABASE_READ_URL) if DATABASE_READ_URL else None
+)
+AsyncReadSessionLocal = async_sessionmaker(
+    class_=AsyncSession, sync_session_class=RoutingSession, autoflush=False, expire_on_commit=False
+)
+async_read_engine = None
+
+
+def get_async_read_engine():
+    global async_read_engine
+    if async_read_engine is None:
+        async_read_engine = _create_async_engine(ASYNC_DATABASE_READ_URL, "async_replica")
+        AsyncReadSessionLocal.configure(
+            bind=get_async_engine(), replica_bind=async_read_engine.sync_engine
+        )
+    return async_read_engine
+
+
+async def get_async_read_db(request: Request):
+    if read_engine is None:
+        async for db in get_async_db():
+            yield db
+        return
+    get_async_read_engine()
+    async with AsyncReadSessionLocal(info={"request": request}) as db:
+        yield db
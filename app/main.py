@@ -21,6 +21,11 @@ from .database import engine, Base
 
 # Import centralized rate limiter
 from .utils.rate_limiter import limiter
+from .utils.password_pool import PasswordPoolBusy
+
+# Background workers (started on app startup)
+from .services.subscription_sweeper import subscription_sweeper
+from .utils.staff_sync import staff_sync_worker
 
 # Import routers
 from .routers import auth, users, bp_records, ocr, doctor, export, payment, telegram_auth, admin, admin_system
@@ -100,6 +105,34 @@ if BOT_MODE == "webhook":
         logger.error(f"Failed to load bot webhook: {e}")
 
 
+# Staff allowlist sync runs in a background thread, not on the request path
+@app.on_event("startup")
+async def start_staff_sync():
+    staff_sync_worker.start()
+
+
+# Expired premium users are downgraded in bulk on a schedule, not per request
+@app.on_event("startup")
+async def start_subscription_sweeper():
+    subscription_sweeper.start()
+
+
+# Export jobs run on a process-local pool: fail the ones a previous process left behind
+@app.on_event("startup")
+async def cleanup_orphaned_exports():
+    export.schedule_export_cleanup(engine)
+
+
+@app.on_event("shutdown")
+async def stop_staff_sync():
+    staff_sync_worker.stop()
+
+
+@app.on_event("shutdown")
+async def stop_subscription_sweeper():
+    subscription_sweeper.stop()
+
+
 @app.get("/")
 async def root():
     return {
@@ -134,6 +167,20 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
         }
     )
 
+
+@app.exception_handler(PasswordPoolBusy)
+async def password_pool_busy_handler(request: Request, exc: PasswordPoolBusy):
+    """Password hashing pool (or this client's share of it) is full"""
+    logger.warning(f"Password request rejected ({exc.reason}): {exc}")
+    return JSONResponse(
+        status_code=429,
+        content={
+            "status": "error",
+            "message": "Too many password requests, please try again shortly"
+        },
+        headers={"Retry-After": "1"}
+    )
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
@@ -1,9 +1,11 @@
 
-from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, ForeignKey, Text, Enum
+from sqlalchemy import Column, Integer, BigInteger, String, Float, DateTime, Boolean, ForeignKey, Text, Enum, Index
 from sqlalchemy.orm import relationship, validates
 from datetime import datetime
 from .database import Base
-from .utils.encryption import encrypt_value, decrypt_value, hash_value
+from .utils.encryption import (
+    encrypt_value, decrypt_memoized, decrypt_many, hash_value, name_search_tokens
+)
 from .utils.timezone import now_tz, DEFAULT_TIMEZONE
 
 class User(Base):
@@ -37,7 +39,7 @@ class User(Base):
 
     @property
     def telegram_id(self):
-        val = decrypt_value(self.telegram_id_encrypted)
+        val = self._decrypt("telegram_id_encrypted")
         if val:
             try:
                 return int(val)
@@ -48,7 +50,7 @@ class User(Base):
     @telegram_id.setter
     def telegram_id(self, value):
         if value is not None:
-            self.telegram_id_encrypted = encrypt_value(str(value))
+            self._encrypt("telegram_id_encrypted", str(value))
             self.telegram_id_hash = hash_value(str(value))
         else:
             self.telegram_id_encrypted = None
@@ -88,60 +90,105 @@ class User(Base):
     patient_doctors = relationship(
         "DoctorPatient", foreign_keys="DoctorPatient.patient_id", back_populates="patient")
     # licenses = relationship("License", back_populates="main_user") # If we link license to user
+    name_tokens = relationship("UserNameToken", cascade="all, delete-orphan")
 
     # --- Transparent Encryption Properties ---
     # These allow code to access `user.email` / `user.full_name` normally.
     # The setter automatically encrypts and hashes.
     # The getter automatically decrypts.
+    # Decrypted values are memoized per instance against the current
+    # ciphertext, so repeated reads within a request decrypt once.
+
+    def _pii_memo(self) -> dict:
+        # Plain instance attribute (not a column); loaded instances skip __init__
+        memo = self.__dict__.get("_decrypted_memo")
+        if memo is None:
+            memo = self._decrypted_memo = {}
+        return memo
+
+    def _decrypt(self, column: str):
+        return decrypt_memoized(self._pii_memo(), column, getattr(self, column))
+
+    def _encrypt(self, column: str, value):
+        encrypted = encrypt_value(value)
+        setattr(self, column, encrypted)
+        memo = self._pii_memo()
+        # Setter knows the plaintext: seed the memo instead of just dropping it
+        if encrypted is not None:
+            memo[column] = (encrypted, value)
+        else:
+            memo.pop(column, None)
+
+    @classmethod
+    def prime_decrypted(cls, users, *columns: str) -> None:
+        """Decrypt `columns` for many users in one decrypt_many() call per column.
+
+        Seeds each instance's memo, so list endpoints keep reading
+        `user.full_name` etc. as usual without per-row decrypts.
+        """
+        users = [u for u in users if u is not None]
+        for column in columns:
+            ciphertexts = [getattr(u, column) for u in users]
+            for user, ciphertext, plaintext in zip(users, ciphertexts, decrypt_many(ciphertexts)):
+                user._pii_memo()[column] = (ciphertext, plaintext)
 
     @property
     def email(self):
-        return decrypt_value(self.email_encrypted)
+        return self._decrypt("email_encrypted")
 
     @email.setter
     def email(self, value):
-        self.email_encrypted = encrypt_value(value)
+        self._encrypt("email_encrypted", value)
         self.email_hash = hash_value(value)
 
     @property
     def phone_number(self):
-        return decrypt_value(self.phone_number_encrypted)
+        return self._decrypt("phone_number_encrypted")
 
     @phone_number.setter
     def phone_number(self, value):
-        self.phone_number_encrypted = encrypt_value(value)
+        self._encrypt("phone_number_encrypted", value)
         self.phone_number_hash = hash_value(value)
 
     @property
     def full_name(self):
-        return decrypt_value(self.full_name_encrypted)
+        return self._decrypt("full_name_encrypted")
     
     @full_name.setter
     def full_name(self, value):
-        self.full_name_encrypted = encrypt_value(value)
+        self._encrypt("full_name_encrypted", value)
         self.full_name_hash = hash_value(value)
+        self.set_name_tokens(value)
+
+    def set_name_tokens(self, name):
+        """Rewrite the blind n-gram index rows for `name`, keeping unchanged tokens."""
+        existing = {t.token: t for t in self.name_tokens}
+        self.name_tokens = [
+            existing.get(token) or UserNameToken(token=token)
+            for token in sorted(name_search_tokens(name))
+        ]
 
     @property
     def citizen_id(self):
-        return decrypt_value(self.citizen_id_encrypted)
+        return self._decrypt("citizen_id_encrypted")
 
     @citizen_id.setter
     def citizen_id(self, value):
-        self.citizen_id_encrypted = encrypt_value(value)
+        self._encrypt("citizen_id_encrypted", value)
         self.citizen_id_hash = hash_value(value)
         
     @property
     def medical_license(self):
-        return decrypt_value(self.medical_license_encrypted)
+        return self._decrypt("medical_license_encrypted")
 
     @medical_license.setter
     def medical_license(self, value):
-        self.medical_license_encrypted = encrypt_value(value)
+        self._encrypt("medical_license_encrypted", value)
         self.medical_license_hash = hash_value(value)
 
     @property
     def date_of_birth(self):
-        val = decrypt_value(self.date_of_birth_encrypted)
+        val = self._decrypt("date_of_birth_encrypted")
         if val:
             try:
                 # Store as ISO string, parse back to DateTime if possible? 
@@ -162,10 +209,24 @@ class User(Base):
                 str_val = value.isoformat()
             else:
                 str_val = str(value)
-            self.date_of_birth_encrypted = encrypt_value(str_val)
+            self._encrypt("date_of_birth_encrypted", str_val)
         else:
             self.date_of_birth_encrypted = None
 
+class UserNameToken(Base):
+    """Blind n-gram index of User.full_name for partial name search.
+
+    Tokens are keyed HMACs (app/utils/encryption.py: name_search_tokens), so
+    the table reveals nothing about names without SEARCH_INDEX_KEY. Maintained
+    by the `full_name` setter; rebuild with
+    `python -m app.services.name_search rebuild`.
+    """
+    __tablename__ = "user_name_tokens"
+
+    token = Column(String(16), primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True, index=True)
+
+
 class License(Base):
     """B2B License for Organizations"""
     __tablename__ = "licenses"
@@ -216,6 +277,42 @@ class BloodPressureRecord(Base):
 
     user = relationship("User", back_populates="bp_records")
 
+    # Backs keyset pagination on (measurement_date, id) — see migrations/add_bp_records_keyset_index.py
+    __table_args__ = (
+        Index("ix_blood_pressure_records_user_date_id", user_id, measurement_date.desc(), id),
+    )
+
+
+class BloodPressureAggregate(Base):
+    """Per-user rollup of all BP readings, maintained incrementally.
+
+    Kept in sync by ORM events in app/services/bp_stats_service.py; rebuild with
+    `python -m app.services.bp_stats_service rebuild`.
+    """
+    __tablename__ = "blood_pressure_aggregates"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    record_count = Column(Integer, nullable=False, default=0)
+
+    # Running sums / sums of squares (integers — exact)
+    sum_systolic = Column(BigInteger, nullable=False, default=0)
+    sumsq_systolic = Column(BigInteger, nullable=False, default=0)
+    sum_diastolic = Column(BigInteger, nullable=False, default=0)
+    sumsq_diastolic = Column(BigInteger, nullable=False, default=0)
+    sum_pulse = Column(BigInteger, nullable=False, default=0)
+    sumsq_pulse = Column(BigInteger, nullable=False, default=0)
+
+    # Regression accumulators; x = days since base_date
+    base_date = Column(DateTime, nullable=True)
+    sum_x = Column(Float, nullable=False, default=0.0)
+    sum_xx = Column(Float, nullable=False, default=0.0)
+    sum_x_systolic = Column(Float, nullable=False, default=0.0)
+    sum_x_diastolic = Column(Float, nullable=False, default=0.0)
+
+    # JSON value→count histograms per metric: min/max/median that survive deletes
+    histograms = Column(Text, nullable=False, default="{}")
+    updated_at = Column(DateTime, default=now_tz, onupdate=now_tz)
+
 
 class DoctorPatient(Base):
     __tablename__ = "doctor_patients"
@@ -275,7 +372,7 @@ class AdminAuditLog(Base):
     __tablename__ = "admin_audit_logs"
 
     id = Column(Integer, primary_key=True, index=True)
-    admin_user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    admin_user_id = Column(Integer, ForeignKey("users.id"), nullable=True)  # NULL = system action
     action = Column(String, nullable=False)
     target_user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
     details = Column(Text, nullable=True)
@@ -294,3 +391,25 @@ class StaffManagementState(Base):
     updated_at = Column(DateTime, default=now_tz, onupdate=now_tz)
 
     user = relationship("User")
+
+
+class ExportJob(Base):
+    """Background data export; the built file lives in app/utils/export_store.py."""
+    __tablename__ = "export_jobs"
+
+    id = Column(String(36), primary_key=True)  # uuid4 — also the download handle
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    scope = Column(String, nullable=False, default="my_data")  # my_data, patient_panel
+    export_format = Column(String, nullable=False, default="json")  # json, ndjson, csv
+    gzip = Column(Boolean, nullable=False, default=False)
+    status = Column(String, nullable=False, default="queued", index=True)  # queued, running, completed, failed, expired
+    record_count = Column(Integer, nullable=True)
+    artifact_key = Column(String, nullable=True)
+    artifact_size = Column(BigInteger, nullable=True)
+    error_message = Column(String, nullable=True)
+    created_at = Column(DateTime, default=now_tz)
+    started_at = Column(DateTime, nullable=True)
+    completed_at = Column(DateTime, nullable=True)
+    expires_at = Column(DateTime, nullable=True)
+
+    user = relationship("User")
@@ -1,46 +1,105 @@
 import os
 import time
+import heapq
 import base64
 import hashlib
 import logging
+import threading
 import pyotp
 
 logger = logging.getLogger(__name__)
 REDIS_URL = os.getenv("REDIS_URL")
+OTP_VERIFIED_TTL_SECONDS = int(os.getenv("OTP_VERIFIED_TTL_SECONDS", "600"))
+OTP_MEMORY_MAX_ENTRIES = int(os.getenv("OTP_MEMORY_MAX_ENTRIES", "200000"))
 
 
 class MemoryOTPBackend:
-    """In-memory OTP storage - for dev/local/non-serverless"""
-
-    def __init__(self):
-        self.storage = {}
-        self.verified = set()
-        import threading
-        threading.Thread(target=self._cleanup, daemon=True).start()
+    """In-memory OTP storage - for dev/local/non-serverless
+
+    OTPs and verified markers expire like their Redis keys (OTP: expiration
+    + 60 s, verified: OTP_VERIFIED_TTL_SECONDS). Expiry times sit in a
+    min-heap, so each write (and is_verified) pops only what has expired
+    instead of a periodic full scan; at OTP_MEMORY_MAX_ENTRIES the
+    soonest-expiring entry is dropped.
+    """
+
+    def __init__(self, max_entries=OTP_MEMORY_MAX_ENTRIES, verified_ttl=OTP_VERIFIED_TTL_SECONDS):
+        self.max_entries = max(1, max_entries)
+        self.verified_ttl = verified_ttl
+        self.storage = {}   # key -> (expires_at, otp_data)
+        self.verified = {}  # key -> expires_at
+        self._heap = []     # (expires_at, kind, key); stale once the key is re-stored or deleted
+        self._lock = threading.Lock()
+        self.expired = 0
+        self.evicted = 0
 
     def store(self, key, otp_data):
-        self.storage[key] = otp_data
+        expires_at = otp_data['created_at'] + otp_data.get('expiration', 300) + 60
+        with self._lock:
+            self._purge(time.time())
+            self.storage[key] = (expires_at, otp_data)
+            self._push(expires_at, "otp", key)
 
     def get(self, key):
-        return self.storage.get(key)
+        # No purge here: OTPService.confirm_otp checks created_at/expiration itself
+        entry = self.storage.get(key)
+        return entry[1] if entry else None
 
     def delete(self, key):
-        self.storage.pop(key, None)
+        with self._lock:
+            self.storage.pop(key, None)
 
     def mark_verified(self, key):
-        self.verified.add(key)
+        now = time.time()
+        with self._lock:
+            self._purge(now)
+            self.verified[key] = now + self.verified_ttl
+            self._push(now + self.verified_ttl, "verified", key)
 
     def is_verified(self, key):
-        return key in self.verified
-
-    def _cleanup(self):
-        while True:
-            now = time.time()
-            expired = [k for k, v in self.storage.items()
-                       if now - v['created_at'] > v['expiration']]
-            for k in expired:
-                del self.storage[k]
-            time.sleep(120)
+        with self._lock:
+            self._purge(time.time())
+            return key in self.verified
+
+    def stats(self):
+        with self._lock:
+            return {
+                "otps": len(self.storage),
+                "verified": len(self.verified),
+                "heap_size": len(self._heap),
+                "max_entries": self.max_entries,
+                "expired": self.expired,
+                "evicted": self.evicted,
+            }
+
+    # Callers hold self._lock
+
+    def _push(self, expires_at, kind, key):
+        heapq.heappush(self._heap, (expires_at, kind, key))
+        # Over the cap: drop whatever expires soonest
+        while self._heap and len(self.storage) + len(self.verified) > self.max_entries:
+            if self._drop(*heapq.heappop(self._heap)):
+                self.evicted += 1
+        # Re-stored keys leave stale heap items behind; rebuild when they dominate
+        if len(self._heap) > 2 * (len(self.storage) + len(self.verified)) + 1024:
+            live = [(exp, "otp", k) for k, (exp, _) in self.storage.items()]
+            live += [(exp, "verified", k) for k, exp in self.verified.items()]
+            heapq.heapify(live)
+            self._heap = live
+
+    def _purge(self, now):
+        while self._heap and self._heap[0][0] <= now:
+            if self._drop(*heapq.heappop(self._heap)):
+                self.expired += 1
+
+    def _drop(self, expires_at, kind, key):
+        """Remove key if this heap item is still its current entry (not re-stored/deleted since)."""
+        table = self.storage if kind == "otp" else self.verified
+        current = table.get(key)
+        if current is None or (current[0] if kind == "otp" else current) != expires_at:
+            return False
+        del table[key]
+        return True
 
 
 class RedisOTPBackend:
@@ -66,7 +125,7 @@ class RedisOTPBackend:
         self.client.delete(f"{self.prefix}{key}")
 
     def mark_verified(self, key):
-        self.client.setex(f"{self.verified_prefix}{key}", 600, "1")
+        self.client.setex(f"{self.verified_prefix}{key}", OTP_VERIFIED_TTL_SECONDS, "1")
 
     def is_verified(self, key):
         return self.client.exists(f"{self.verified_prefix}{key}") > 0
@@ -121,3 +180,72 @@ class OTPService:
 
 # Global Instance
 otp_service = OTPService()
+
+
+def run_benchmark(otps: int = 100_000) -> dict:
+    """Time the memory backend with `otps` pending OTPs against the old full-scan sweep."""
+    backend = MemoryOTPBackend(max_entries=otps * 2)
+    now = time.time()
+    keys = [f"user{i}@example.com" for i in range(otps)]
+    data = {'base32_key': "A" * 52, 'interval': 300, 'expiration': 300}
+
+    started = time.perf_counter()
+    for i, key in enumerate(keys):
+        # Creation spread over 10 minutes, so about half have expired at `later`
+        backend.store(key, {**data, 'created_at': now + (i % 600)})
+    store_s = time.perf_counter() - started
+    later = now + 300 + 60 + 300
+
+    started = time.perf_counter()
+    for key in keys:
+        backend.get(key)
+    get_s = time.perf_counter() - started
+
+    # What the removed _cleanup thread did every 120 s: scan every OTP under the GIL
+    started = time.perf_counter()
+    [k for k, (_, v) in backend.storage.items() if later - v['created_at'] > v['expiration'] + 60]
+    full_scan_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    with backend._lock:
+        backend._purge(later)
+    purge_s = time.perf_counter() - started
+    purged = backend.expired
+
+    # Steady state: a request arriving one second later pops only that second's expiries
+    started = time.perf_counter()
+    with backend._lock:
+        backend._purge(later + 1)
+    tick_s = time.perf_counter() - started
+
+    for key in keys:
+        backend.mark_verified(key)
+    verified = len(backend.verified)
+    with backend._lock:
+        backend._purge(time.time() + backend.verified_ttl + 1)
+
+    return {
+        "pending_otps": otps,
+        "store_us": round(store_s / otps * 1e6, 2),
+        "get_us": round(get_s / otps * 1e6, 2),
+        "full_scan_ms": round(full_scan_s * 1000, 1),
+        "heap_purge_ms": round(purge_s * 1000, 1),
+        "heap_purged": purged,
+        "heap_purge_us_per_expired": round(purge_s / max(1, purged) * 1e6, 2),
+        "heap_purge_1s_ms": round(tick_s * 1000, 3),
+        "verified_marked": verified,
+        "verified_after_ttl": len(backend.verified),
+        "heap_size_after": len(backend._heap),
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Memory OTP backend benchmark")
+    parser.add_argument("command", choices=["bench"])
+    parser.add_argument("--otps", type=int, default=100_000, help="pending OTPs to store")
+    args = parser.parse_args()
+
+    print(json.dumps(run_benchmark(otps=args.otps), indent=2))
@@ -2,7 +2,7 @@
 from fastapi import APIRouter, HTTPException, Depends, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import desc
-from ..database import get_db
+from ..database import get_db, get_read_db
 from ..models import User, AdminAuditLog
 from ..schemas import (
     StandardResponse, AdminVerifyDoctorInput, AdminActionReasonInput, AdminAuditLogResponse
@@ -127,7 +127,7 @@ async def list_users(
     per_page: int = Query(20, ge=1, le=100),
     current_user: User = Depends(require_staff),
     api_key: str = Depends(verify_api_key),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     """List users with filters. Masked PII. No health data."""
     request_id = generate_request_id()
@@ -142,6 +142,10 @@ async def list_users(
 
     total = query.count()
     users = query.order_by(desc(User.created_at)).offset((page - 1) * per_page).limit(per_page).all()
+    User.prime_decrypted(
+        users, "full_name_encrypted", "email_encrypted",
+        "phone_number_encrypted", "medical_license_encrypted", "telegram_id_encrypted",
+    )
 
     items = [user_to_admin_item(u) for u in users]
 
@@ -164,7 +168,7 @@ async def get_user_detail(
     user_id: int,
     current_user: User = Depends(require_staff),
     api_key: str = Depends(verify_api_key),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     """Get single user detail (masked). Includes sanitized verification_logs for doctors."""
     request_id = generate_request_id()
@@ -190,7 +194,7 @@ async def get_user_payments(
     user_id: int,
     current_user: User = Depends(require_staff),
     api_key: str = Depends(verify_api_key),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     """Get payment history for a user. Staff only."""
     from ..models import Payment
@@ -335,7 +339,7 @@ async def get_audit_log(
     per_page: int = Query(50, ge=1, le=200),
     current_user: User = Depends(require_staff),
     api_key: str = Depends(verify_api_key),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     """View admin audit log. Staff only."""
     request_id = generate_request_id()
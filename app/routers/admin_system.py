@@ -21,11 +21,21 @@ from pydantic import BaseModel, Field
 from sqlalchemy import desc
 from sqlalchemy.orm import Session
 
-from ..database import get_db
+from ..database import DB_PROCESS_TYPE, get_db, get_read_db
 from ..models import AdminAuditLog, User
 from ..schemas import StandardResponse
 from ..services import neon_service
+from ..services.subscription_sweeper import subscription_sweeper
+from ..utils.encryption import decrypt_cache
+from ..utils.ocr_cache import ocr_result_cache
+from ..utils.ocr_helper import get_preprocess_stats
+from ..utils.ocr_queue import ocr_queue
+from ..utils.password_pool import password_pool
+from ..utils.pool_metrics import pool_metrics
+from ..utils.principal_cache import principal_cache
 from ..utils.security import get_current_user, is_staff_access_allowed, verify_api_key
+from ..utils.slip_rate_limiter import slip_verify_limiter
+from ..utils.staff_sync import check_staff_sync_signature, staff_sync_metrics, staff_sync_worker
 
 router = APIRouter(prefix="/api/v1/admin/system", tags=["admin-system"])
 logger = logging.getLogger(__name__)
@@ -215,7 +225,7 @@ async def system_audit_log(
     per_page: int = Query(50, ge=1, le=200),
     current_user: User = Depends(require_superadmin),
     _api_key: str = Depends(verify_api_key),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     """Return audit entries for system_backup_* actions."""
     request_id = _request_id()
@@ -252,3 +262,147 @@ async def system_audit_log(
         },
         request_id=request_id,
     )
+
+
+# ─────────────────────────────────────────────────────────────
+# GET /api/v1/admin/system/ocr-queue
+# ─────────────────────────────────────────────────────────────
+@router.get("/ocr-queue", response_model=StandardResponse)
+async def ocr_queue_stats(
+    current_user: User = Depends(require_superadmin),
+    _api_key: str = Depends(verify_api_key),
+):
+    """Return this process's OCR metrics: admission queue, preprocessing sizes, result cache."""
+    return StandardResponse(
+        status="success",
+        message="OCR queue stats retrieved",
+        data={
+            "queue": ocr_queue.stats(),
+            "preprocess": get_preprocess_stats(),
+            "result_cache": ocr_result_cache.stats(),
+        },
+        request_id=_request_id(),
+    )
+
+
+# ─────────────────────────────────────────────────────────────
+# GET /api/v1/admin/system/decrypt-cache
+# ─────────────────────────────────────────────────────────────
+@router.get("/decrypt-cache", response_model=StandardResponse)
+async def decrypt_cache_stats(
+    current_user: User = Depends(require_superadmin),
+    _api_key: str = Depends(verify_api_key),
+):
+    """Return this process's decrypted-PII cache counters (no cached values)."""
+    return StandardResponse(
+        status="success",
+        message="Decrypt cache stats retrieved",
+        data=decrypt_cache.stats(),
+        request_id=_request_id(),
+    )
+
+
+# ─────────────────────────────────────────────────────────────
+# GET /api/v1/admin/system/db-pool
+# ─────────────────────────────────────────────────────────────
+@router.get("/db-pool", response_model=StandardResponse)
+async def db_pool_stats(
+    current_user: User = Depends(require_superadmin),
+    _api_key: str = Depends(verify_api_key),
+):
+    """Return this process's DB connection pool metrics per engine (checkout latency, in-use, overflow, timeouts)."""
+    return StandardResponse(
+        status="success",
+        message="DB pool stats retrieved",
+        data={"process_type": DB_PROCESS_TYPE, "engines": pool_metrics.stats()},
+        request_id=_request_id(),
+    )
+
+
+# ─────────────────────────────────────────────────────────────
+# GET /api/v1/admin/system/user-cache
+# ─────────────────────────────────────────────────────────────
+@router.get("/user-cache", response_model=StandardResponse)
+async def user_cache_stats(
+    current_user: User = Depends(require_superadmin),
+    _api_key: str = Depends(verify_api_key),
+):
+    """Return this process's authenticated-user (principal) cache counters."""
+    return StandardResponse(
+        status="success",
+        message="User cache stats retrieved",
+        data=principal_cache.stats(),
+        request_id=_request_id(),
+    )
+
+
+# ─────────────────────────────────────────────────────────────
+# GET /api/v1/admin/system/staff-sync
+# ─────────────────────────────────────────────────────────────
+@router.get("/staff-sync", response_model=StandardResponse)
+async def staff_sync_stats(
+    current_user: User = Depends(require_superadmin),
+    _api_key: str = Depends(verify_api_key),
+):
+    """Return this process's staff allowlist sync state and run durations."""
+    return StandardResponse(
+        status="success",
+        message="Staff sync stats retrieved",
+        data={
+            "worker_running": staff_sync_worker.running,
+            "config_synced": check_staff_sync_signature(),
+            **staff_sync_metrics.stats(),
+        },
+        request_id=_request_id(),
+    )
+
+
+# ─────────────────────────────────────────────────────────────
+# GET /api/v1/admin/system/password-pool
+# ─────────────────────────────────────────────────────────────
+@router.get("/password-pool", response_model=StandardResponse)
+async def password_pool_stats(
+    current_user: User = Depends(require_superadmin),
+    _api_key: str = Depends(verify_api_key),
+):
+    """Return this process's bcrypt worker pool counters (queue depth, rejections, timings)."""
+    return StandardResponse(
+        status="success",
+        message="Password pool stats retrieved",
+        data=password_pool.stats(),
+        request_id=_request_id(),
+    )
+
+
+# ─────────────────────────────────────────────────────────────
+# GET /api/v1/admin/system/subscription-sweeper
+# ─────────────────────────────────────────────────────────────
+@router.get("/subscription-sweeper", response_model=StandardResponse)
+async def subscription_sweeper_stats(
+    current_user: User = Depends(require_superadmin),
+    _api_key: str = Depends(verify_api_key),
+):
+    """Return this process's expired-subscription sweeper runs and downgrade counts."""
+    return StandardResponse(
+        status="success",
+        message="Subscription sweeper stats retrieved",
+        data=subscription_sweeper.stats(),
+        request_id=_request_id(),
+    )
+
+
+# ─────────────────────────────────────────────────────────────
+# GET /api/v1/admin/system/slip-rate-limit
+# ─────────────────────────────────────────────────────────────
+@router.get("/slip-rate-limit", response_model=StandardResponse)
+async def slip_rate_limit_stats(
+    current_user: User = Depends(require_superadmin),
+    _api_key: str = Depends(verify_api_key),
+):
+    """Return the slip-verify rate limiter's backend and this process's allow/reject counters."""
+    return StandardResponse(
+        status="success",
+        message="Slip rate limit stats retrieved",
+        data=slip_verify_limiter.stats(),
+        request_id=_request_id(),
+    )
@@ -1,20 +1,22 @@
 
 from fastapi import APIRouter, HTTPException, Depends, Request, status, BackgroundTasks
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from ..database import get_db
+from ..database import get_async_db, get_db
 from ..models import User, UserSession
 from ..schemas import (
     StandardResponse, UserRegister, OTPRequest, OTPVerification, 
     UserLogin, PasswordChange, PasswordReset, Token
 )
 from ..utils.security import (
-    hash_password, verify_password, create_access_token, create_refresh_token,
+    hash_password_async, verify_password_async, client_ip, create_access_token, create_refresh_token,
     verify_api_key, get_current_user, lock_account, is_account_locked,
     ACCESS_TOKEN_EXPIRE_MINUTES, MAX_LOGIN_ATTEMPTS
 )
 from ..utils.timezone import now_tz
 from ..utils.encryption import encrypt_value, hash_value
-from ..utils.subscription import get_subscription_info, normalize_subscription_state
+from ..utils.subscription import get_subscription_info
 
 import hashlib
 
@@ -49,7 +51,7 @@ async def request_otp(
     request: Request,
     otp_request: OTPRequest,
     api_key: str = Depends(verify_api_key),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     request_id = generate_request_id()
 
@@ -61,7 +63,7 @@ async def request_otp(
     if contact_method == "sms":
         # Find user by phone hash
         phone_h = hash_value(contact_target)
-        user = db.query(User).filter(User.phone_number_hash == phone_h).first()
+        user = await db.scalar(select(User).where(User.phone_number_hash == phone_h))
         
         # If user found and has telegram_id, switch to Telegram
         if user and user.telegram_id:
@@ -142,7 +144,7 @@ async def register_user(
     user_data: UserRegister,
     background_tasks: BackgroundTasks, 
     api_key: str = Depends(verify_api_key),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Register new user - requires prior OTP verification"""
     request_id = generate_request_id()
@@ -162,34 +164,37 @@ async def register_user(
     # Check for existing users using HASH lookup
     if user_data.email:
         email_h = hash_value(user_data.email)
-        if db.query(User).filter(User.email_hash == email_h).first():
+        if await db.scalar(select(User.id).where(User.email_hash == email_h)):
             raise HTTPException(
                 status_code=400, detail="This email is already registered. Please log in.")
 
     if user_data.phone_number:
         phone_h = hash_value(user_data.phone_number)
-        if db.query(User).filter(User.phone_number_hash == phone_h).first():
+        if await db.scalar(select(User.id).where(User.phone_number_hash == phone_h)):
             raise HTTPException(
                 status_code=400, detail="This phone number is already in use.")
 
     # Check for existing citizen_id (via hash)
     if user_data.citizen_id:
         c_hash = hash_value(user_data.citizen_id)
-        if db.query(User).filter(User.citizen_id_hash == c_hash).first():
+        if await db.scalar(select(User.id).where(User.citizen_id_hash == c_hash)):
             raise HTTPException(status_code=400, detail="This Citizen ID is already registered.")
 
     if user_data.role == "doctor" and user_data.medical_license:
         m_hash = hash_value(user_data.medical_license)
-        if db.query(User).filter(User.medical_license_hash == m_hash).first():
+        if await db.scalar(select(User.id).where(User.medical_license_hash == m_hash)):
             raise HTTPException(
                 status_code=400, detail="This Medical License is already registered.")
 
+    # Outside the try: a busy password pool is a 429, not a failed registration
+    password_hash = await hash_password_async(user_data.password, client_ip(request))
+
     try:
         # Note: We rely on the User model setters to handle encryption/hashing transparently!
         new_user = User(
             email=user_data.email, # Setter handles email_encrypted / email_hash
             phone_number=user_data.phone_number, # Setter handles phone_number_encrypted / phone_number_hash
-            password_hash=hash_password(user_data.password),
+            password_hash=password_hash,
             full_name=user_data.full_name, # Setter handles full_name_encrypted / full_name_hash
             role=user_data.role,
             verification_status="pending" if user_data.role == "doctor" else "verified", # Auto-verify patients, pending for doctors
@@ -215,8 +220,8 @@ async def register_user(
         )
 
         db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
+        await db.commit()
+        await db.refresh(new_user)
 
         if new_user.role == "doctor":
              from ..utils.background_tasks import verify_doctor_background
@@ -263,7 +268,7 @@ async def register_user(
         )
 
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(
             f"Registration failed: {str(e)} - Request ID: {request_id}")
         raise HTTPException(status_code=500, detail="Registration failed")
@@ -275,7 +280,7 @@ async def login(
     request: Request,
     user_credentials: UserLogin,
     api_key: str = Depends(verify_api_key),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """User login with email or phone number"""
     request_id = generate_request_id()
@@ -283,11 +288,11 @@ async def login(
     # Find user by email or phone via HASH
     if user_credentials.email:
         email_h = hash_value(user_credentials.email)
-        user = db.query(User).filter(
-            User.email_hash == email_h).first()
+        user = await db.scalar(select(User).where(
+            User.email_hash == email_h))
     else:
         phone_h = hash_value(user_credentials.phone_number)
-        user = db.query(User).filter(User.phone_number_hash == phone_h).first()
+        user = await db.scalar(select(User).where(User.phone_number_hash == phone_h))
 
     if not user:
         raise HTTPException(status_code=401, detail="Invalid credentials")
@@ -298,19 +303,19 @@ async def login(
             status_code=423, detail="Account temporarily locked due to multiple failed attempts")
 
     # Verify password
-    if not verify_password(user_credentials.password, user.password_hash):
+    if not await verify_password_async(user_credentials.password, user.password_hash, client_ip(request)):
         # Increment failed attempts
         user.failed_login_attempts += 1
 
         # Lock account after too many failed attempts
         if user.failed_login_attempts >= MAX_LOGIN_ATTEMPTS:
-            lock_account(user, db)
+            await db.run_sync(lambda session: lock_account(user, session))
             logger.warning(
                 f"Account locked due to failed attempts (ID: {user.id}) - Request ID: {request_id}")
             raise HTTPException(
                 status_code=423, detail="Account locked due to multiple failed attempts")
 
-        db.commit()
+        await db.commit()
         logger.warning(
             f"Failed login attempt (ID: {user.id}) - Attempts: {user.failed_login_attempts} - Request ID: {request_id}")
         raise HTTPException(status_code=401, detail="Invalid credentials")
@@ -322,7 +327,7 @@ async def login(
     user.failed_login_attempts = 0
     user.last_login = now_tz()
     user.account_locked_until = None
-    db.commit()
+    await db.commit()
 
     # Create tokens
     # Access properties to get decrypted email/phone for token payload (if needed) or just ID
@@ -348,14 +353,11 @@ async def login(
     )
 
     db.add(session)
-    db.commit()
+    await db.commit()
 
     logger.info(
         f"Successful login (ID: {user.id}) - Request ID: {request_id}")
 
-    # Self-heal: persist downgrade if expired premium
-    normalize_subscription_state(user, db=db)
-
     sub_info = get_subscription_info(user)
 
     return create_standard_response(
@@ -391,18 +393,18 @@ async def logout(
     request: Request,
     current_user: User = Depends(get_current_user),
     api_key: str = Depends(verify_api_key),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Logout user and invalidate session"""
     request_id = generate_request_id()
 
     # Invalidate all active sessions for this user
-    db.query(UserSession).filter(
+    await db.execute(update(UserSession).where(
         UserSession.user_id == current_user.id,
         UserSession.is_active == True
-    ).update({"is_active": False})
+    ).values(is_active=False))
 
-    db.commit()
+    await db.commit()
 
     logger.info(
         f"User logged out: {current_user.id} - Request ID: {request_id}")
@@ -420,19 +422,22 @@ async def change_password(
     password_data: PasswordChange,
     current_user: User = Depends(get_current_user),
     api_key: str = Depends(verify_api_key),
+    # Sync session: mutates current_user, which get_current_user loaded through get_db
     db: Session = Depends(get_db)
 ):
     """Change password for authenticated user"""
     request_id = generate_request_id()
 
     # Verify current password
-    if not verify_password(password_data.current_password, current_user.password_hash):
+    if not await verify_password_async(password_data.current_password, current_user.password_hash, client_ip(request)):
         raise HTTPException(
             status_code=400, detail="Current password is incorrect")
 
+    new_password_hash = await hash_password_async(password_data.new_password, client_ip(request))
+
     try:
         # Update password
-        current_user.password_hash = hash_password(password_data.new_password)
+        current_user.password_hash = new_password_hash
         current_user.updated_at = now_tz()
 
         # Invalidate all sessions except current one
@@ -466,7 +471,7 @@ async def reset_password(
     request: Request,
     reset_data: PasswordReset,
     api_key: str = Depends(verify_api_key),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Reset password via OTP verification"""
     request_id = generate_request_id()
@@ -474,10 +479,10 @@ async def reset_password(
     # Find user by email or phone via HASH
     if reset_data.email:
         email_h = hash_value(reset_data.email)
-        user = db.query(User).filter(User.email_hash == email_h).first()
+        user = await db.scalar(select(User).where(User.email_hash == email_h))
     else:
         phone_h = hash_value(reset_data.phone_number)
-        user = db.query(User).filter(User.phone_number_hash == phone_h).first()
+        user = await db.scalar(select(User).where(User.phone_number_hash == phone_h))
 
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
@@ -488,17 +493,19 @@ async def reset_password(
     if not otp_service.confirm_otp(contact_target, reset_data.otp_code):
         raise HTTPException(status_code=400, detail="Invalid or expired OTP")
 
+    new_password_hash = await hash_password_async(reset_data.new_password, client_ip(request))
+
     try:
         # Update password and unlock account
-        user.password_hash = hash_password(reset_data.new_password)
+        user.password_hash = new_password_hash
         user.updated_at = now_tz()
         user.failed_login_attempts = 0
         user.account_locked_until = None
 
         # Invalidate all user sessions
-        db.query(UserSession).filter(UserSession.user_id == user.id).delete()
+        await db.execute(delete(UserSession).where(UserSession.user_id == user.id))
 
-        db.commit()
+        await db.commit()
 
         logger.info(
             f"Password reset successful for user: {user.id} - Request ID: {request_id}"
@@ -511,7 +518,7 @@ async def reset_password(
         )
 
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(
             f"Password reset failed: {str(e)} - Request ID: {request_id}")
         raise HTTPException(status_code=500, detail="Password reset failed")
@@ -523,6 +530,7 @@ async def verify_contact_method(
     verification_data: OTPVerification,
     current_user: User = Depends(get_current_user),
     api_key: str = Depends(verify_api_key),
+    # Sync session: mutates current_user, which get_current_user loaded through get_db
     db: Session = Depends(get_db)
 ):
     """Verify email or phone number for existing user"""
@@ -577,7 +585,7 @@ async def verify_email_registration(
     request: Request,
     verification_data: OTPVerification,
     api_key: str = Depends(verify_api_key),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Verify email after registration (Public endpoint)"""
     request_id = generate_request_id()
@@ -593,7 +601,7 @@ async def verify_email_registration(
 
     # Find User
     email_h = hash_value(email)
-    user = db.query(User).filter(User.email_hash == email_h).first()
+    user = await db.scalar(select(User).where(User.email_hash == email_h))
 
     if not user:
          raise HTTPException(status_code=404, detail="User not found")
@@ -601,7 +609,7 @@ async def verify_email_registration(
     try:
         user.is_email_verified = True
         user.updated_at = now_tz()
-        db.commit()
+        await db.commit()
 
         logger.info(
             f"Email verified for user: {user.id} - Request ID: {request_id}"
@@ -615,7 +623,7 @@ async def verify_email_registration(
         )
 
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(
             f"Email verification failed: {str(e)} - Request ID: {request_id}")
         raise HTTPException(status_code=500, detail="Failed to verify email")
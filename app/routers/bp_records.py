@@ -1,20 +1,26 @@
 
 from fastapi import APIRouter, HTTPException, Depends, Request, status, Query
-from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
-from sqlalchemy import desc, func
-from ..database import get_db
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import desc, func, and_, or_, select
+from ..database import get_async_db, get_async_read_db
 from ..models import User, BloodPressureRecord
 from ..schemas import (
     StandardResponse, BloodPressureRecordCreate,
-    BloodPressureRecordResponse, BloodPressureRecordUpdate, PaginationMeta
+    BloodPressureRecordResponse, BloodPressureRecordUpdate, PaginationMeta,
+    CursorPaginationMeta
 )
 from ..utils.security import verify_api_key, get_current_user, check_premium
 from ..utils.timezone import now_th
-from ..utils.chart_generator import generate_bp_chart
+from ..utils.chart_generator import build_chart_payload, chart_cache_key, render_chart_png
+# classify_bp / compute_trend are re-exported for existing importers
+from ..services.bp_stats_service import classify_bp, compute_trend, summarize_latest_readings  # noqa: F401
+import base64
+import binascii
+import json
 import logging
 import uuid
-import statistics as stats_module
 from typing import Optional, List
 from datetime import datetime, timedelta
 
@@ -35,6 +41,63 @@ def create_standard_response(status, message, data=None, request_id=None, meta=N
     )
 
 
+def encode_records_cursor(record: BloodPressureRecord) -> str:
+    """Encode the (measurement_date, id) position of a record as an opaque cursor."""
+    payload = json.dumps(
+        {"d": record.measurement_date.isoformat(), "i": record.id},
+        separators=(",", ":")
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_records_cursor(cursor: str) -> tuple:
+    """Decode a cursor produced by encode_records_cursor into (measurement_date, id)."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        return datetime.fromisoformat(payload["d"]), int(payload["i"])
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+
+async def _get_bp_records_page_by_cursor(
+    db: AsyncSession, stmt, cursor: Optional[str], per_page: int, is_premium: bool
+):
+    """Keyset pagination on (measurement_date DESC, id DESC).
+
+    Seeks directly past the cursor position via the composite
+    (user_id, measurement_date, id) index, so no COUNT and no OFFSET scan.
+    Returns (records, next_cursor).
+    """
+    if not is_premium:
+        # Free tier sees only the latest 30 records; page within that window.
+        latest_ids = stmt.with_only_columns(BloodPressureRecord.id)\
+            .order_by(desc(BloodPressureRecord.measurement_date), desc(BloodPressureRecord.id))\
+            .limit(30)\
+            .subquery()
+        stmt = stmt.where(BloodPressureRecord.id.in_(latest_ids.select()))
+
+    if cursor:
+        cursor_date, cursor_id = decode_records_cursor(cursor)
+        stmt = stmt.where(or_(
+            BloodPressureRecord.measurement_date < cursor_date,
+            and_(
+                BloodPressureRecord.measurement_date == cursor_date,
+                BloodPressureRecord.id < cursor_id
+            )
+        ))
+
+    # Fetch one extra row to learn whether another page exists.
+    rows = (await db.scalars(
+        stmt.order_by(desc(BloodPressureRecord.measurement_date), desc(BloodPressureRecord.id))
+        .limit(per_page + 1)
+    )).all()
+
+    records = rows[:per_page]
+    next_cursor = encode_records_cursor(records[-1]) if len(rows) > per_page else None
+    return records, next_cursor
+
+
 @router.get("", response_model=StandardResponse)
 async def get_bp_records(
     request: Request,
@@ -42,23 +105,31 @@ async def get_bp_records(
     per_page: int = 20,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
+    pagination: str = Query(default="offset", pattern="^(offset|cursor)$",
+                            description="offset: page/total metadata; cursor: keyset pages via next_cursor"),
+    cursor: Optional[str] = Query(default=None, description="next_cursor from a previous cursor-mode response"),
     current_user: User = Depends(get_current_user),
     api_key: str = Depends(verify_api_key),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get blood pressure records with pagination and filtering"""
+    """Get blood pressure records with pagination and filtering.
+
+    Default offset mode returns page/total metadata. Cursor mode
+    (``pagination=cursor`` or any ``cursor`` value) skips the COUNT and
+    returns an opaque ``next_cursor`` for the following page.
+    """
     request_id = generate_request_id()
 
     # Base query
-    query = db.query(BloodPressureRecord).filter(
+    stmt = select(BloodPressureRecord).where(
         BloodPressureRecord.user_id == current_user.id
     )
 
     # Apply filters
     if start_date:
-        query = query.filter(BloodPressureRecord.measurement_date >= start_date)
+        stmt = stmt.where(BloodPressureRecord.measurement_date >= start_date)
     if end_date:
-        query = query.filter(BloodPressureRecord.measurement_date <= end_date)
+        stmt = stmt.where(BloodPressureRecord.measurement_date <= end_date)
 
     # --- Monetization Logic: Free Tier Limit (Last 30 Days) ---
     is_premium = check_premium(current_user)
@@ -76,8 +147,30 @@ async def get_bp_records(
         pass
     # ----------------------------------------------------------
 
+    if pagination == "cursor" or cursor:
+        if per_page < 1:
+            raise HTTPException(status_code=400, detail="per_page must be at least 1")
+
+        records, next_cursor = await _get_bp_records_page_by_cursor(db, stmt, cursor, per_page, is_premium)
+        data = [BloodPressureRecordResponse.model_validate(
+            record).dict() for record in records]
+
+        cursor_meta = CursorPaginationMeta(
+            per_page=per_page,
+            next_cursor=next_cursor,
+            has_more=next_cursor is not None
+        )
+
+        return create_standard_response(
+            status="success",
+            message="Records retrieved successfully",
+            data={"records": data},
+            meta={"pagination": cursor_meta.dict()},
+            request_id=request_id
+        )
+
     # Get total count for pagination
-    total = query.count()
+    total = await db.scalar(select(func.count()).select_from(stmt.subquery()))
 
     # Apply pagination
     total_pages = (total + per_page - 1) // per_page
@@ -86,10 +179,11 @@ async def get_bp_records(
     if page > total_pages and total > 0:
         page = total_pages
 
-    records = query.order_by(desc(BloodPressureRecord.measurement_date))\
-        .offset((page - 1) * per_page)\
-        .limit(per_page)\
-        .all()
+    records = (await db.scalars(
+        stmt.order_by(desc(BloodPressureRecord.measurement_date))
+        .offset((page - 1) * per_page)
+        .limit(per_page)
+    )).all()
         
     if not is_premium:
         # Strict Limit: 30 Records Max
@@ -107,7 +201,7 @@ async def get_bp_records(
     data = [BloodPressureRecordResponse.model_validate(
         record).dict() for record in records]
 
-    pagination = PaginationMeta(
+    pagination_meta = PaginationMeta(
         current_page=page,
         per_page=per_page,
         total=total if is_premium else min(total, 30), # Cap reported total
@@ -118,7 +212,7 @@ async def get_bp_records(
         status="success",
         message="Records retrieved successfully",
         data={"records": data},
-        meta={"pagination": pagination.dict()},
+        meta={"pagination": pagination_meta.dict()},
         request_id=request_id
     )
 
@@ -128,23 +222,22 @@ async def create_bp_record(
     record: BloodPressureRecordCreate,
     current_user: User = Depends(get_current_user),
     api_key: str = Depends(verify_api_key),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Create a new blood pressure record manually"""
     request_id = generate_request_id()
     
     # Duplicate Check
-    from sqlalchemy import func
     expected_date = record.measurement_date.date() if record.measurement_date else now_th().date()
     
-    existing = db.query(BloodPressureRecord).filter(
+    existing = await db.scalar(select(BloodPressureRecord).where(
         BloodPressureRecord.user_id == current_user.id,
         func.date(BloodPressureRecord.measurement_date) == expected_date,
         BloodPressureRecord.measurement_time == record.measurement_time,
         BloodPressureRecord.systolic == record.systolic,
         BloodPressureRecord.diastolic == record.diastolic,
         BloodPressureRecord.pulse == record.pulse
-    ).first()
+    ).limit(1))
     
     if existing:
         raise HTTPException(status_code=409, detail="Record already exists (Duplicate ignored)")
@@ -161,8 +254,8 @@ async def create_bp_record(
     )
 
     db.add(new_record)
-    db.commit()
-    db.refresh(new_record)
+    await db.commit()
+    await db.refresh(new_record)
 
     logger.info(
         f"BP record created for user: {current_user.id} - Request ID: {request_id}")
@@ -181,15 +274,15 @@ async def get_bp_record(
     record_id: int,
     current_user: User = Depends(get_current_user),
     api_key: str = Depends(verify_api_key),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get a specific blood pressure record"""
     request_id = generate_request_id()
 
-    record = db.query(BloodPressureRecord).filter(
+    record = await db.scalar(select(BloodPressureRecord).where(
         BloodPressureRecord.id == record_id,
         BloodPressureRecord.user_id == current_user.id
-    ).first()
+    ))
 
     if not record:
         raise HTTPException(status_code=404, detail="Record not found")
@@ -209,15 +302,15 @@ async def update_bp_record(
     record_update: BloodPressureRecordUpdate,
     current_user: User = Depends(get_current_user),
     api_key: str = Depends(verify_api_key),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update a blood pressure record"""
     request_id = generate_request_id()
 
-    record = db.query(BloodPressureRecord).filter(
+    record = await db.scalar(select(BloodPressureRecord).where(
         BloodPressureRecord.id == record_id,
         BloodPressureRecord.user_id == current_user.id
-    ).first()
+    ))
 
     if not record:
         raise HTTPException(status_code=404, detail="Record not found")
@@ -226,8 +319,8 @@ async def update_bp_record(
     for field, value in update_data.items():
         setattr(record, field, value)
 
-    db.commit()
-    db.refresh(record)
+    await db.commit()
+    await db.refresh(record)
 
     logger.info(
         f"BP record updated: {record_id} for user {current_user.id} - Request ID: {request_id}")
@@ -246,21 +339,21 @@ async def delete_bp_record(
     record_id: int,
     current_user: User = Depends(get_current_user),
     api_key: str = Depends(verify_api_key),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Delete a blood pressure record"""
     request_id = generate_request_id()
 
-    record = db.query(BloodPressureRecord).filter(
+    record = await db.scalar(select(BloodPressureRecord).where(
         BloodPressureRecord.id == record_id,
         BloodPressureRecord.user_id == current_user.id
-    ).first()
+    ))
 
     if not record:
         raise HTTPException(status_code=404, detail="Record not found")
 
-    db.delete(record)
-    db.commit()
+    await db.delete(record)
+    await db.commit()
 
     logger.info(
         f"BP record deleted: {record_id} for user {current_user.id} - Request ID: {request_id}")
@@ -271,105 +364,12 @@ async def delete_bp_record(
         request_id=request_id
     )
 
-def classify_bp(avg_sys: float, avg_dia: float) -> dict:
-    """Classify BP based on AHA/ACC 2017 guidelines using average values."""
-    if avg_sys > 180 or avg_dia > 120:
-        return {"level": "hypertensive_crisis", "label_en": "Hypertensive Crisis", "label_th": "วิกฤตความดันสูง"}
-    elif avg_sys >= 140 or avg_dia >= 90:
-        return {"level": "stage_2", "label_en": "Stage 2 Hypertension", "label_th": "ความดันสูงระยะที่ 2"}
-    elif (130 <= avg_sys <= 139) or (80 <= avg_dia <= 89):
-        return {"level": "stage_1", "label_en": "Stage 1 Hypertension", "label_th": "ความดันสูงระยะที่ 1"}
-    elif 120 <= avg_sys <= 129 and avg_dia < 80:
-        return {"level": "elevated", "label_en": "Elevated", "label_th": "ความดันสูงเล็กน้อย"}
-    else:
-        return {"level": "normal", "label_en": "Normal", "label_th": "ปกติ"}
-
-
-def compute_trend(records) -> dict:
-    """Compute linear regression slope with R-squared for systolic and diastolic over time.
-    
-    R² (coefficient of determination) indicates how well the linear model fits:
-      - R² >= 0.7: strong linear trend
-      - 0.3 <= R² < 0.7: moderate trend
-      - R² < 0.3: weak/no clear linear trend
-    """
-    if len(records) < 3:
-        return {
-            "systolic_slope": 0, "diastolic_slope": 0,
-            "systolic_r_squared": 0, "diastolic_r_squared": 0,
-            "direction": "stable", "confidence": "insufficient_data"
-        }
-
-    # Sort chronologically (oldest first)
-    sorted_records = sorted(records, key=lambda r: r.measurement_date)
-    base_date = sorted_records[0].measurement_date
-    x_days = [(r.measurement_date - base_date).total_seconds() / 86400 for r in sorted_records]
-
-    def linear_regression(x_vals, y_vals):
-        """Returns (slope, r_squared, has_sufficient_variation) using least-squares method."""
-        n = len(x_vals)
-        if n < 2:
-            return 0.0, 0.0, False
-        x_mean = sum(x_vals) / n
-        y_mean = sum(y_vals) / n
-        ss_xy = sum((x - x_mean) * (y - y_mean) for x, y in zip(x_vals, y_vals))
-        ss_xx = sum((x - x_mean) ** 2 for x in x_vals)
-        ss_yy = sum((y - y_mean) ** 2 for y in y_vals)
-
-        if ss_xx == 0:
-            return 0.0, 0.0, False
-
-        slope = ss_xy / ss_xx
-
-        # A perfectly flat series still fits the regression line exactly.
-        if ss_yy == 0:
-            return slope, 1.0, True
-
-        r_squared = (ss_xy ** 2) / (ss_xx * ss_yy)
-        return slope, r_squared, True
-
-    sys_slope, sys_r2, has_trend_data = linear_regression(x_days, [r.systolic for r in sorted_records])
-    dia_slope, dia_r2, _ = linear_regression(x_days, [r.diastolic for r in sorted_records])
-
-    sys_slope = round(sys_slope, 2)
-    dia_slope = round(dia_slope, 2)
-    sys_r2 = round(sys_r2, 3)
-    dia_r2 = round(dia_r2, 3)
-
-    # Direction based on systolic slope significance
-    if sys_slope > 0.5:
-        direction = "increasing"
-    elif sys_slope < -0.5:
-        direction = "decreasing"
-    else:
-        direction = "stable"
-
-    # Confidence based on systolic R² (primary clinical metric)
-    if not has_trend_data:
-        confidence = "insufficient_data"
-    elif sys_r2 >= 0.7:
-        confidence = "strong"
-    elif sys_r2 >= 0.3:
-        confidence = "moderate"
-    else:
-        confidence = "weak"
-
-    return {
-        "systolic_slope": sys_slope,
-        "diastolic_slope": dia_slope,
-        "systolic_r_squared": sys_r2,
-        "diastolic_r_squared": dia_r2,
-        "direction": direction,
-        "confidence": confidence
-    }
-
-
 @stats_router.get("/summary", response_model=StandardResponse)
 async def get_bp_stats(
     days: int = Query(default=30, ge=1, le=365),
     current_user: User = Depends(get_current_user),
     api_key: str = Depends(verify_api_key),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """Get blood pressure statistics with clinical metrics.
 
@@ -381,24 +381,15 @@ async def get_bp_stats(
     # --- Premium check ---
     is_premium = check_premium(current_user)
 
-    # --- Query records ---
-    # Both tiers: get latest N records (count-based, not date-based)
-    # Free: max 30 records, Premium: up to `days` records (no hard cap)
-    query = db.query(BloodPressureRecord).filter(
-        BloodPressureRecord.user_id == current_user.id
-    ).order_by(desc(BloodPressureRecord.measurement_date))
-
-    if is_premium:
-        records = query.limit(days).all()
-    else:
-        records = query.limit(30).all()
-
-    # Total all-time count
-    total_all_time = db.query(BloodPressureRecord).filter(
-        BloodPressureRecord.user_id == current_user.id
-    ).count()
+    # --- Summary over the latest N records (count-based, not date-based) ---
+    # Free: max 30 records, Premium: up to `days` records (no hard cap).
+    # Served from the per-user rollup when the window covers every record.
+    bp_stats, total_all_time = await db.run_sync(
+        summarize_latest_readings,
+        current_user.id, limit=days if is_premium else 30, include_advanced=is_premium
+    )
 
-    if not records:
+    if bp_stats is None:
         return create_standard_response(
             status="success",
             message="No records found",
@@ -417,71 +408,6 @@ async def get_bp_stats(
             request_id=request_id
         )
 
-    # --- Extract values ---
-    systolic_values = [r.systolic for r in records]
-    diastolic_values = [r.diastolic for r in records]
-    pulse_values = [r.pulse for r in records]
-    n = len(records)
-
-    # --- Basic stats (Free + Premium) ---
-    avg_sys = round(sum(systolic_values) / n, 1)
-    avg_dia = round(sum(diastolic_values) / n, 1)
-    avg_pulse = round(sum(pulse_values) / n, 1)
-
-    bp_stats = {
-        "systolic": {
-            "avg": avg_sys,
-            "min": min(systolic_values),
-            "max": max(systolic_values)
-        },
-        "diastolic": {
-            "avg": avg_dia,
-            "min": min(diastolic_values),
-            "max": max(diastolic_values)
-        },
-        "pulse": {
-            "avg": avg_pulse,
-            "min": min(pulse_values),
-            "max": max(pulse_values)
-        },
-        "classification": classify_bp(avg_sys, avg_dia),
-        "total_records_period": n,
-        "total_records_all_time": total_all_time
-    }
-
-    # --- Advanced stats (Premium only) ---
-    if is_premium:
-        has_enough = n >= 2
-
-        # SD, Median, CV for each metric
-        for key, values in [("systolic", systolic_values), ("diastolic", diastolic_values), ("pulse", pulse_values)]:
-            sd = round(stats_module.stdev(values), 1) if has_enough else 0
-            median = round(stats_module.median(values), 1)
-            avg_val = bp_stats[key]["avg"]
-            cv = round((sd / avg_val) * 100, 1) if avg_val > 0 and has_enough else 0
-            bp_stats[key]["sd"] = sd
-            bp_stats[key]["median"] = median
-            bp_stats[key]["cv"] = cv
-
-        # Pulse Pressure (SBP - DBP)
-        pp_values = [s - d for s, d in zip(systolic_values, diastolic_values)]
-        bp_stats["pulse_pressure"] = {
-            "avg": round(sum(pp_values) / n, 1),
-            "min": min(pp_values),
-            "max": max(pp_values)
-        }
-
-        # MAP = (SBP + 2*DBP) / 3
-        map_values = [(s + 2 * d) / 3 for s, d in zip(systolic_values, diastolic_values)]
-        bp_stats["map"] = {
-            "avg": round(sum(map_values) / n, 1),
-            "min": round(min(map_values), 1),
-            "max": round(max(map_values), 1)
-        }
-
-        # Trend Analysis
-        bp_stats["trend"] = compute_trend(records)
-
     return create_standard_response(
         status="success",
         message="Statistics calculated successfully",
@@ -494,13 +420,22 @@ async def get_bp_stats(
     )
 
 
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison of an If-None-Match header against a strong ETag."""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
 @stats_router.get("/chart")
 async def get_bp_chart(
+    request: Request,
     days: int = Query(default=30, ge=1, le=365, description="Number of recent records to include"),
     lang: str = Query(default="en", pattern="^(en|th)$", description="Language: en or th"),
     current_user: User = Depends(get_current_user),
     api_key: str = Depends(verify_api_key),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """
     Generate a BP trend chart as a PNG image.
@@ -508,17 +443,31 @@ async def get_bp_chart(
     Returns a PNG image showing Systolic, Diastolic, and Pulse trends
     with reference zones for High BP areas. Data labels show SYS/DIA
     values on the chart and Pulse values below.
+
+    The ETag is the content hash of the chart input, so a client sending
+    If-None-Match gets 304 Not Modified until a reading changes.
     """
     # Fetch recent records (most recent N records)
-    records = db.query(BloodPressureRecord).filter(
+    records = (await db.scalars(select(BloodPressureRecord).where(
         BloodPressureRecord.user_id == current_user.id
     ).order_by(
         desc(BloodPressureRecord.measurement_date)
-    ).limit(days).all()
+    ).limit(days))).all()
+
+    chart_payload = build_chart_payload(records, lang=lang)
+    etag = f'"{chart_cache_key(chart_payload)}"'
+    cache_headers = {
+        "ETag": etag,
+        # Health data: browser-only cache, always revalidated via ETag
+        "Cache-Control": "private, no-cache"
+    }
+
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers)
 
-    # Generate chart (handles empty records internally)
+    # Generate chart (handles empty records internally); rendering blocks, keep it off the event loop
     try:
-        chart_buffer = generate_bp_chart(records, lang=lang)
+        png = await run_in_threadpool(render_chart_png, chart_payload)
     except RuntimeError as e:
         logger.error(f"Chart generation failed: {e}")
         raise HTTPException(
@@ -526,11 +475,11 @@ async def get_bp_chart(
             detail=f"Chart generation unavailable: {e}"
         )
 
-    return StreamingResponse(
-        chart_buffer,
+    return Response(
+        content=png,
         media_type="image/png",
         headers={
             "Content-Disposition": "inline; filename=bp-chart.png",
-            "Cache-Control": "no-cache"
+            **cache_headers
         }
     )
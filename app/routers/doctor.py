@@ -1,13 +1,15 @@
 
 from fastapi import APIRouter, HTTPException, Depends, Request, status
-from sqlalchemy.orm import Session
-from sqlalchemy import desc
-from ..database import get_db
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from sqlalchemy import desc, select
+from ..database import get_async_db, get_async_read_db
 from ..models import User, DoctorPatient, AccessRequest, BloodPressureRecord
 from ..schemas import (
     StandardResponse, DoctorAuthorizationInput, AccessRequestInput,
     BloodPressureRecordResponse, PaginationMeta, DoctorSearchResult
 )
+from ..services.name_search import find_users_by_name
 from ..utils.encryption import hash_value
 from ..utils.security import verify_api_key, get_current_user, require_verified_doctor
 from ..utils.timezone import now_th
@@ -40,7 +42,7 @@ def create_standard_response(status, message, data=None, request_id=None):
 async def authorize_doctor(
     data: DoctorAuthorizationInput,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Patient directly authorizes a doctor"""
     request_id = generate_request_id()
@@ -49,10 +51,10 @@ async def authorize_doctor(
         raise HTTPException(
             status_code=403, detail="Only patients can authorize doctors")
 
-    doctor = db.query(User).filter(
+    doctor = await db.scalar(select(User).where(
         User.id == data.doctor_id,
         User.role == "doctor"
-    ).first()
+    ))
 
     if not doctor:
         raise HTTPException(status_code=404, detail="Doctor not found")
@@ -63,11 +65,11 @@ async def authorize_doctor(
             detail="This doctor's license has not been verified yet"
         )
 
-    existing = db.query(DoctorPatient).filter_by(
+    existing = await db.scalar(select(DoctorPatient).filter_by(
         doctor_id=doctor.id,
         patient_id=current_user.id,
         is_active=True
-    ).first()
+    ).limit(1))
 
     if existing:
         raise HTTPException(
@@ -81,8 +83,8 @@ async def authorize_doctor(
         )
 
         db.add(relation)
-        db.commit()
-        db.refresh(relation)
+        await db.commit()
+        await db.refresh(relation)
 
         return create_standard_response(
             status="success",
@@ -98,7 +100,7 @@ async def authorize_doctor(
         )
 
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         logger.error(f"Failed to authorize doctor: {e} - Request ID: {request_id}")
         raise HTTPException(status_code=500, detail="Failed to authorize doctor")
 
@@ -106,17 +108,20 @@ async def authorize_doctor(
 @router.get("/patient/authorized-doctors", response_model=StandardResponse, tags=["patient view"])
 async def get_authorized_doctors(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     request_id = generate_request_id()
     
     if current_user.role != "patient":
         raise HTTPException(status_code=403, detail="Only patients view")
 
-    relations = db.query(DoctorPatient).filter(
+    relations = (await db.scalars(select(DoctorPatient).options(
+        joinedload(DoctorPatient.doctor)
+    ).where(
         DoctorPatient.patient_id == current_user.id,
         DoctorPatient.is_active == True
-    ).all()
+    ))).all()
+    User.prime_decrypted([r.doctor for r in relations], "full_name_encrypted")
 
     doctors = []
     for r in relations:
@@ -139,22 +144,22 @@ async def get_authorized_doctors(
 async def remove_authorized_doctor(
     doctor_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     request_id = generate_request_id()
 
-    relation = db.query(DoctorPatient).filter(
+    relation = await db.scalar(select(DoctorPatient).where(
         DoctorPatient.patient_id == current_user.id,
         DoctorPatient.doctor_id == doctor_id,
         DoctorPatient.is_active == True
-    ).first()
+    ).limit(1))
 
     if not relation:
         raise HTTPException(status_code=404, detail="Authorization not found")
 
     try:
-        db.delete(relation) # Or set is_active=False
-        db.commit()
+        await db.delete(relation) # Or set is_active=False
+        await db.commit()
 
         return create_standard_response(
             status="success",
@@ -162,21 +167,24 @@ async def remove_authorized_doctor(
             request_id=request_id
         )
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail="Failed to remove authorization")
 
 
 @router.get("/patient/access-requests", response_model=StandardResponse, tags=["patient view"])
 async def get_patient_access_requests(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     request_id = generate_request_id()
     
-    requests = db.query(AccessRequest).filter(
+    requests = (await db.scalars(select(AccessRequest).options(
+        joinedload(AccessRequest.doctor)
+    ).where(
         AccessRequest.patient_id == current_user.id,
         AccessRequest.status == "pending"
-    ).all()
+    ))).all()
+    User.prime_decrypted([req.doctor for req in requests], "full_name_encrypted")
 
     data = []
     for req in requests:
@@ -198,15 +206,15 @@ async def get_patient_access_requests(
 async def approve_access_request(
     request_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     req_uuid = generate_request_id()
 
-    request_obj = db.query(AccessRequest).filter(
+    request_obj = await db.scalar(select(AccessRequest).where(
         AccessRequest.id == request_id,
         AccessRequest.patient_id == current_user.id,
         AccessRequest.status == "pending"
-    ).first()
+    ))
 
     if not request_obj:
         raise HTTPException(status_code=404, detail="Request not found")
@@ -220,7 +228,7 @@ async def approve_access_request(
             patient_id=current_user.id
         )
         db.add(relation)
-        db.commit()
+        await db.commit()
 
         return create_standard_response(
             status="success",
@@ -228,7 +236,7 @@ async def approve_access_request(
             request_id=req_uuid
         )
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail="Failed to approve request")
 
 
@@ -236,22 +244,22 @@ async def approve_access_request(
 async def reject_access_request(
     request_id: int,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     req_uuid = generate_request_id()
 
-    request_obj = db.query(AccessRequest).filter(
+    request_obj = await db.scalar(select(AccessRequest).where(
         AccessRequest.id == request_id,
         AccessRequest.patient_id == current_user.id,
         AccessRequest.status == "pending"
-    ).first()
+    ))
 
     if not request_obj:
         raise HTTPException(status_code=404, detail="Request not found")
 
     try:
         request_obj.status = "rejected"
-        db.commit()
+        await db.commit()
 
         return create_standard_response(
             status="success",
@@ -259,7 +267,7 @@ async def reject_access_request(
             request_id=req_uuid
         )
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail="Failed to reject request")
 
 
@@ -271,33 +279,33 @@ async def reject_access_request(
 async def request_patient_access(
     data: AccessRequestInput,
     current_user: User = Depends(require_verified_doctor),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     request_id = generate_request_id()
 
-    patient = db.query(User).filter(
-        User.id == data.patient_id, User.role == "patient").first()
+    patient = await db.scalar(select(User).where(
+        User.id == data.patient_id, User.role == "patient"))
 
     if not patient:
         raise HTTPException(status_code=404, detail="Patient not found")
 
     # Check if already have access
-    existing_relation = db.query(DoctorPatient).filter_by(
+    existing_relation = await db.scalar(select(DoctorPatient).filter_by(
         doctor_id=current_user.id,
         patient_id=patient.id,
         is_active=True
-    ).first()
+    ).limit(1))
 
     if existing_relation:
         raise HTTPException(
             status_code=400, detail="Already have access to this patient")
 
     # Check for pending request
-    existing_request = db.query(AccessRequest).filter_by(
+    existing_request = await db.scalar(select(AccessRequest).filter_by(
         doctor_id=current_user.id,
         patient_id=patient.id,
         status="pending"
-    ).first()
+    ).limit(1))
 
     if existing_request:
         raise HTTPException(
@@ -309,7 +317,7 @@ async def request_patient_access(
             patient_id=patient.id
         )
         db.add(request_obj)
-        db.commit()
+        await db.commit()
 
         return create_standard_response(
             status="success",
@@ -317,20 +325,23 @@ async def request_patient_access(
             request_id=request_id
         )
     except Exception as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail="Failed to send request")
 
 
 @router.get("/doctor/access-requests", response_model=StandardResponse, tags=["doctor view"])
 async def get_doctor_access_requests(
     current_user: User = Depends(require_verified_doctor),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     request_id = generate_request_id()
 
-    requests = db.query(AccessRequest).filter(
+    requests = (await db.scalars(select(AccessRequest).options(
+        joinedload(AccessRequest.patient)
+    ).where(
         AccessRequest.doctor_id == current_user.id
-    ).order_by(desc(AccessRequest.created_at)).all()
+    ).order_by(desc(AccessRequest.created_at)))).all()
+    User.prime_decrypted([req.patient for req in requests], "full_name_encrypted")
     
     data = []
     for req in requests:
@@ -352,14 +363,21 @@ async def get_doctor_access_requests(
 @router.get("/doctor/patients", response_model=StandardResponse, tags=["doctor view"])
 async def get_my_patients(
     current_user: User = Depends(require_verified_doctor),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
+    # The active relations ARE the access grants: read them from the primary so a
+    # revoked patient never shows up from a lagging replica
     request_id = generate_request_id()
 
-    relations = db.query(DoctorPatient).filter(
+    relations = (await db.scalars(select(DoctorPatient).options(
+        joinedload(DoctorPatient.patient)
+    ).where(
         DoctorPatient.doctor_id == current_user.id,
         DoctorPatient.is_active == True
-    ).all()
+    ))).all()
+    User.prime_decrypted(
+        [r.patient for r in relations], "full_name_encrypted", "date_of_birth_encrypted"
+    )
     
     patients = []
     for r in relations:
@@ -382,23 +400,25 @@ async def get_my_patients(
 async def get_patient_bp_records(
     patient_id: int,
     current_user: User = Depends(require_verified_doctor),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db),
+    read_db: AsyncSession = Depends(get_async_read_db)
 ):
     request_id = generate_request_id()
 
-    # Check authorization
-    relation = db.query(DoctorPatient).filter(
+    # Check authorization on the primary: a revocation must take effect immediately,
+    # not once the replica catches up. Only the record listing goes to the replica.
+    relation = await db.scalar(select(DoctorPatient.id).where(
         DoctorPatient.doctor_id == current_user.id,
         DoctorPatient.patient_id == patient_id,
         DoctorPatient.is_active == True
-    ).first()
+    ).limit(1))
     
     if not relation:
         raise HTTPException(status_code=403, detail="Not authorized to view this patient")
         
-    records = db.query(BloodPressureRecord).filter(
+    records = (await read_db.scalars(select(BloodPressureRecord).where(
         BloodPressureRecord.user_id == patient_id
-    ).order_by(desc(BloodPressureRecord.measurement_date)).limit(50).all()
+    ).order_by(desc(BloodPressureRecord.measurement_date)).limit(50))).all()
     
     data = [BloodPressureRecordResponse.model_validate(r).dict() for r in records]
     
@@ -414,21 +434,21 @@ async def get_patient_bp_records(
 async def cancel_access_request(
     request_id: int,
     current_user: User = Depends(require_verified_doctor),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     req_uuid = generate_request_id()
 
-    req = db.query(AccessRequest).filter(
+    req = await db.scalar(select(AccessRequest).where(
         AccessRequest.id == request_id,
         AccessRequest.doctor_id == current_user.id,
         AccessRequest.status == "pending"
-    ).first()
+    ))
     
     if not req:
         raise HTTPException(status_code=404, detail="Request not found")
         
-    db.delete(req) # or update status = cancelled
-    db.commit()
+    await db.delete(req) # or update status = cancelled
+    await db.commit()
 
     return create_standard_response(
         status="success",
@@ -459,7 +479,7 @@ async def search_doctors(
     q: str,
     search_by: str = "name",
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Search for verified doctors in the system.
 
@@ -488,10 +508,10 @@ async def search_doctors(
     if search_by == "license":
         q_hash = hash_value(q)
         if q_hash:
-            doctor = db.query(User).filter(
+            doctor = await db.scalar(select(User).where(
                 *base_filter,
                 User.medical_license_hash == q_hash,
-            ).first()
+            ).limit(1))
             if doctor:
                 doctors = [doctor]
 
@@ -513,34 +533,18 @@ async def search_doctors(
             q_hash = hash_value(q)
 
         if q_hash:
-            doctor = db.query(User).filter(
+            doctor = await db.scalar(select(User).where(
                 *base_filter,
                 User.phone_hash == q_hash,
-            ).first()
+            ).limit(1))
             if doctor:
                 doctors = [doctor]
 
     elif search_by == "name":
-        # Try exact match via hash first
-        q_hash = hash_value(q)
-        if q_hash:
-            exact = db.query(User).filter(
-                *base_filter,
-                User.full_name_hash == q_hash,
-            ).all()
-            if exact:
-                doctors = exact
-
-        # Fallback: decrypt and partial match (for small doctor count)
-        if not doctors:
-            all_verified = db.query(User).filter(*base_filter).limit(500).all()
-            q_lower = q.lower()
-            for doc in all_verified:
-                name = doc.full_name
-                if name and q_lower in name.lower():
-                    doctors.append(doc)
-                    if len(doctors) >= 10:
-                        break
+        # Indexed partial match via the blind n-gram index (exact names rank first)
+        doctors = await db.run_sync(
+            lambda session: find_users_by_name(session, q, *base_filter, limit=10)
+        )
 
     # Build response
     results = []
@@ -1,17 +1,26 @@
 
-from fastapi import APIRouter, HTTPException, Depends, status
-from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from fastapi import APIRouter, HTTPException, Depends, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import desc, func, select
 from ..database import get_db
-from ..models import User, BloodPressureRecord
-from ..schemas import StandardResponse
-from ..utils.security import verify_api_key, get_current_user, check_premium
+from ..models import User, BloodPressureRecord, DoctorPatient, ExportJob
+from ..schemas import StandardResponse, ExportJobInput
+from ..utils.security import verify_api_key, get_current_user, check_premium, require_verified_doctor
 from ..utils.encryption import decrypt_value
+from ..utils.export_store import export_store
 from ..utils.timezone import now_tz, format_datetime
+import csv
+import io
 import logging
+import os
+import time
 import uuid
 import json
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from typing import Optional
 
 router = APIRouter(prefix="/api/v1/export", tags=["export"])
 logger = logging.getLogger(__name__)
@@ -27,6 +36,23 @@ def create_standard_response(status, message, data=None, request_id=None):
         request_id=request_id or generate_request_id()
     )
 
+def _export_profile(user: User) -> dict:
+    return {
+        "id": user.id,
+        "full_name": user.full_name,
+        "email": user.email,
+        "phone_number": user.phone_number,
+        "citizen_id": decrypt_value(user.citizen_id_encrypted),
+        "medical_license": decrypt_value(user.medical_license_encrypted),
+        "gender": user.gender,
+        "blood_type": user.blood_type,
+        "height": user.height,
+        "weight": user.weight,
+        "date_of_birth": str(user.date_of_birth) if user.date_of_birth else None,
+        "created_at": str(user.created_at)
+    }
+
+
 @router.get("/my-data", response_model=StandardResponse)
 async def export_my_data(
     current_user: User = Depends(get_current_user),
@@ -41,20 +67,7 @@ async def export_my_data(
     
     try:
         # 1. Decrypt/Prepare Profile Data
-        user_data = {
-            "id": current_user.id,
-            "full_name": current_user.full_name,
-            "email": current_user.email,
-            "phone_number": current_user.phone_number,
-            "citizen_id": decrypt_value(current_user.citizen_id_encrypted),
-            "medical_license": decrypt_value(current_user.medical_license_encrypted),
-            "gender": current_user.gender,
-            "blood_type": current_user.blood_type,
-            "height": current_user.height,
-            "weight": current_user.weight,
-            "date_of_birth": str(current_user.date_of_birth) if current_user.date_of_birth else None,
-            "created_at": str(current_user.created_at)
-        }
+        user_data = _export_profile(current_user)
         
         # 2. Fetch BP Records with Monetization Logic
         query = db.query(BloodPressureRecord).filter(
@@ -111,3 +124,516 @@ async def export_my_data(
     except Exception as e:
         logger.error(f"Export failed: {e}")
         raise HTTPException(status_code=500, detail="Failed to export data")
+
+
+# ─────────────────────────────────────────────────────────────
+# Streaming export
+# ─────────────────────────────────────────────────────────────
+STREAM_BATCH_SIZE = 500           # rows fetched per round trip (yield_per)
+STREAM_CHUNK_BYTES = 64 * 1024    # bytes buffered before each write to the client
+CSV_COLUMNS = ["id", "date", "time", "systolic", "diastolic", "pulse", "notes", "source"]
+PANEL_CSV_COLUMNS = ["patient_id", "patient_name"] + CSV_COLUMNS
+
+_EXPORT_COLUMNS = (
+    BloodPressureRecord.id,
+    BloodPressureRecord.measurement_date,
+    BloodPressureRecord.measurement_time,
+    BloodPressureRecord.systolic,
+    BloodPressureRecord.diastolic,
+    BloodPressureRecord.pulse,
+    BloodPressureRecord.notes,
+    BloodPressureRecord.ocr_confidence,
+)
+
+
+def _export_row(r) -> dict:
+    return {
+        "id": r.id,
+        "date": str(r.measurement_date.date()) if r.measurement_date else None,
+        "time": r.measurement_time,
+        "systolic": r.systolic,
+        "diastolic": r.diastolic,
+        "pulse": r.pulse,
+        "notes": r.notes,
+        "source": "ocr" if r.ocr_confidence else "manual"
+    }
+
+
+def _export_header(user: User, is_premium: bool) -> dict:
+    user_tz = user.timezone or "Asia/Bangkok"
+    return {
+        "exported_at": format_datetime(now_tz(), user_tz),
+        "timezone": user_tz,
+        "user_profile": _export_profile(user),
+        "system": "BP Monitor API",
+        "note": "Full History (Premium)" if is_premium else "Limited to last 30 records (Free Tier)",
+    }
+
+
+def _iter_export_rows(db: Session, user_id: int, is_premium: bool):
+    """Yield BP rows as export dicts, newest first, `STREAM_BATCH_SIZE` at a time.
+
+    Selects plain columns (no ORM identity map) so memory stays flat however
+    long the history is.
+    """
+    query = db.query(*_EXPORT_COLUMNS).filter(
+        BloodPressureRecord.user_id == user_id
+    ).order_by(desc(BloodPressureRecord.measurement_date), desc(BloodPressureRecord.id))
+
+    if not is_premium:
+        # Free: Limit to last 30 records
+        query = query.limit(30)
+
+    for r in query.yield_per(STREAM_BATCH_SIZE):
+        yield _export_row(r)
+
+
+def _iter_panel_rows(db: Session, doctor_id: int, patient_names: dict):
+    """Like `_iter_export_rows`, for every patient with an active link to `doctor_id`."""
+    patient_ids = select(DoctorPatient.patient_id).where(
+        DoctorPatient.doctor_id == doctor_id,
+        DoctorPatient.is_active == True
+    )
+    query = db.query(
+        BloodPressureRecord.user_id,
+        *_EXPORT_COLUMNS,
+    ).filter(
+        BloodPressureRecord.user_id.in_(patient_ids)
+    ).order_by(
+        BloodPressureRecord.user_id,
+        desc(BloodPressureRecord.measurement_date),
+        desc(BloodPressureRecord.id),
+    )
+
+    for r in query.yield_per(STREAM_BATCH_SIZE):
+        yield {
+            "patient_id": r.user_id,
+            "patient_name": patient_names.get(r.user_id),
+            **_export_row(r),
+        }
+
+
+def _ndjson_lines(rows, header: dict):
+    yield json.dumps({"type": "export_meta", **header}, ensure_ascii=False) + "\n"
+    count = 0
+    for row in rows:
+        count += 1
+        yield json.dumps({"type": "bp_record", **row}, ensure_ascii=False) + "\n"
+    yield json.dumps({"type": "export_end", "record_count": count}) + "\n"
+
+
+def _json_lines(rows, header: dict):
+    """The /my-data payload shape (header, `blood_pressure_history`, `meta`), emitted piecewise.
+
+    `system` and `note` move from the header into `meta`, as in /my-data.
+    """
+    header = dict(header)
+    meta = {key: header.pop(key) for key in ("system", "note") if key in header}
+    head = json.dumps(header, ensure_ascii=False)
+    yield head[:-1] + (", " if header else "") + '"blood_pressure_history": ['
+    count = 0
+    for row in rows:
+        yield ("," if count else "") + json.dumps(row, ensure_ascii=False)
+        count += 1
+    yield '], "meta": ' + json.dumps({"record_count": count, **meta}, ensure_ascii=False) + "}"
+
+
+def _csv_lines(rows, columns=CSV_COLUMNS):
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=columns)
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+        if buf.tell() >= STREAM_CHUNK_BYTES:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue()
+
+
+def _stream_export(bind, lines_factory, use_gzip: bool):
+    """Encode, batch and (optionally) gzip export lines on the fly.
+
+    Opens its own Session: the request-scoped one may be closed before a
+    streaming body finishes, depending on the FastAPI version.
+    """
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS) if use_gzip else None
+    pending = []
+    pending_bytes = 0
+
+    with Session(bind=bind) as db:
+        for line in lines_factory(db):
+            data = line.encode("utf-8")
+            pending.append(data)
+            pending_bytes += len(data)
+            if pending_bytes < STREAM_CHUNK_BYTES:
+                continue
+            chunk = b"".join(pending)
+            pending, pending_bytes = [], 0
+            if compressor is None:
+                yield chunk
+            else:
+                compressed = compressor.compress(chunk)
+                if compressed:
+                    yield compressed
+
+    tail = b"".join(pending)
+    if compressor is None:
+        if tail:
+            yield tail
+    else:
+        yield compressor.compress(tail) + compressor.flush()
+
+
+@router.get("/my-data/stream")
+async def export_my_data_stream(
+    export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    gzip: bool = Query(False, description="Return a .gz file"),
+    current_user: User = Depends(get_current_user),
+    api_key: str = Depends(verify_api_key),
+    db: Session = Depends(get_db)
+):
+    """
+    Streaming export for long histories: rows are read in batches and written
+    as they are encoded, instead of building one JSON document in memory.
+
+    - `format=ndjson`: an `export_meta` line (profile, timezone, tier note), one
+      `bp_record` line per reading, then `export_end` with the record count.
+    - `format=csv`: BP readings only (no profile), one row per reading.
+
+    Same tier rules as /my-data: free users get their last 30 readings.
+    """
+    is_premium = check_premium(current_user)
+    user_id = current_user.id
+
+    if export_format == "csv":
+        def lines_factory(session):
+            return _csv_lines(_iter_export_rows(session, user_id, is_premium))
+        media_type, extension = "text/csv; charset=utf-8", "csv"
+    else:
+        header = _export_header(current_user, is_premium)
+
+        def lines_factory(session):
+            return _ndjson_lines(_iter_export_rows(session, user_id, is_premium), header)
+        media_type, extension = "application/x-ndjson", "ndjson"
+
+    filename = f"bp-export-{now_tz().strftime('%Y%m%d')}.{extension}"
+    if gzip:
+        media_type, filename = "application/gzip", filename + ".gz"
+
+    logger.info(f"User {user_id} started streaming export ({export_format}, gzip={gzip})")
+
+    return StreamingResponse(
+        _stream_export(db.get_bind(), lines_factory, gzip),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+# ─────────────────────────────────────────────────────────────
+# Background export jobs
+# ─────────────────────────────────────────────────────────────
+EXPORT_JOB_WORKERS = int(os.getenv("EXPORT_JOB_WORKERS", "2"))
+EXPORT_JOB_MAX_ACTIVE = int(os.getenv("EXPORT_JOB_MAX_ACTIVE", "2"))    # queued + running per user
+EXPORT_ARTIFACT_TTL_HOURS = int(os.getenv("EXPORT_ARTIFACT_TTL_HOURS", "24"))
+# Jobs run on a process-local pool, so a restart orphans its queued/running jobs;
+# past this age they are failed instead of blocking the user's EXPORT_JOB_MAX_ACTIVE
+EXPORT_JOB_STALE_MINUTES = int(os.getenv("EXPORT_JOB_STALE_MINUTES", "30"))
+EXPORT_CLEANUP_INTERVAL_SECONDS = 600
+
+_EXPORT_MEDIA_TYPES = {
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+_job_executor = ThreadPoolExecutor(max_workers=EXPORT_JOB_WORKERS, thread_name_prefix="export-job")
+_last_cleanup = 0.0
+
+
+def _is_expired(job: ExportJob) -> bool:
+    expires = job.expires_at
+    if not expires:
+        return False
+    # Handle naive datetimes from SQLite (PostgreSQL returns tz-aware)
+    if expires.tzinfo is None:
+        import pytz
+        expires = expires.replace(tzinfo=pytz.UTC)
+    return expires <= now_tz()
+
+
+def _job_payload(job: ExportJob) -> dict:
+    status_value = "expired" if job.status == "completed" and _is_expired(job) else job.status
+    return {
+        "job_id": job.id,
+        "scope": job.scope,
+        "format": job.export_format,
+        "gzip": job.gzip,
+        "status": status_value,
+        "record_count": job.record_count,
+        "size_bytes": job.artifact_size,
+        "error": job.error_message,
+        "created_at": str(job.created_at) if job.created_at else None,
+        "completed_at": str(job.completed_at) if job.completed_at else None,
+        "expires_at": str(job.expires_at) if job.expires_at else None,
+        "download_url": f"/api/v1/export/jobs/{job.id}/download" if status_value == "completed" else None,
+    }
+
+
+def _job_lines_factory(job: ExportJob, user: User, db: Session, counter: dict):
+    """Return `lines_factory(session)` for `_stream_export`, counting rows into `counter`."""
+    if job.scope == "patient_panel":
+        relations = db.query(DoctorPatient).options(
+            joinedload(DoctorPatient.patient)
+        ).filter(
+            DoctorPatient.doctor_id == user.id,
+            DoctorPatient.is_active == True
+        ).all()
+        User.prime_decrypted([r.patient for r in relations], "full_name_encrypted")
+        patient_names = {r.patient_id: r.patient.full_name for r in relations}
+        user_tz = user.timezone or "Asia/Bangkok"
+        header = {
+            "exported_at": format_datetime(now_tz(), user_tz),
+            "timezone": user_tz,
+            "doctor": {"id": user.id, "full_name": user.full_name},
+            "patients": [{"patient_id": pid, "full_name": name} for pid, name in patient_names.items()],
+            "system": "BP Monitor API",
+            "note": "Authorized patient panel (full history)",
+        }
+        columns = PANEL_CSV_COLUMNS
+
+        def rows(session):
+            return _iter_panel_rows(session, user.id, patient_names)
+    else:
+        is_premium = check_premium(user)
+        header = _export_header(user, is_premium)
+        columns = CSV_COLUMNS
+
+        def rows(session):
+            return _iter_export_rows(session, user.id, is_premium)
+
+    def counted(session):
+        for row in rows(session):
+            counter["records"] += 1
+            yield row
+
+    if job.export_format == "csv":
+        return lambda session: _csv_lines(counted(session), columns)
+    if job.export_format == "ndjson":
+        return lambda session: _ndjson_lines(counted(session), header)
+    return lambda session: _json_lines(counted(session), header)
+
+
+def _run_export_job(job_id: str, bind) -> None:
+    """Worker: build the artifact for a queued job and record the outcome."""
+    with Session(bind=bind) as db:
+        job = db.get(ExportJob, job_id)
+        if job is None or job.status != "queued":
+            return
+        job.status = "running"
+        job.started_at = now_tz()
+        db.commit()
+
+        extension = job.export_format + (".gz" if job.gzip else "")
+        key = f"{job.user_id}/{job.id}.{extension}"
+        counter = {"records": 0}
+        started = time.monotonic()
+        try:
+            user = db.get(User, job.user_id)
+            lines_factory = _job_lines_factory(job, user, db, counter)
+            size = export_store.write(key, _stream_export(bind, lines_factory, job.gzip))
+        except Exception as e:
+            logger.exception(f"Export job {job_id} failed: {e}")
+            db.rollback()
+            job.status = "failed"
+            job.error_message = "Failed to export data"
+            job.completed_at = now_tz()
+            db.commit()
+            return
+
+        job.status = "completed"
+        job.artifact_key = key
+        job.artifact_size = size
+        job.record_count = counter["records"]
+        job.completed_at = now_tz()
+        job.expires_at = job.completed_at + timedelta(hours=EXPORT_ARTIFACT_TTL_HOURS)
+        db.commit()
+        logger.info(
+            f"Export job {job_id} completed: {counter['records']} records, "
+            f"{size} bytes in {time.monotonic() - started:.2f}s"
+        )
+
+
+def cleanup_expired_exports(db: Session) -> int:
+    """Delete artifacts past their TTL and fail jobs that never finished.
+
+    Also sweeps store files older than the TTL that no job points to any more
+    (process killed mid-export, job rows removed). Returns jobs expired.
+    """
+    now = now_tz()
+    expired = db.query(ExportJob).filter(
+        ExportJob.status == "completed",
+        ExportJob.expires_at <= now
+    ).all()
+    for job in expired:
+        export_store.delete(job.artifact_key)
+        job.status = "expired"
+        job.artifact_key = None
+
+    fail_stale_export_jobs(db)
+    db.commit()
+
+    export_store.delete_older_than(EXPORT_ARTIFACT_TTL_HOURS * 3600)
+    return len(expired)
+
+
+def fail_stale_export_jobs(db: Session, user_id: Optional[int] = None) -> int:
+    """Fail queued/running jobs older than EXPORT_JOB_STALE_MINUTES (caller commits).
+
+    Age counts from started_at for running jobs, created_at for queued ones.
+    """
+    now = now_tz()
+    query = db.query(ExportJob).filter(
+        ExportJob.status.in_(("queued", "running")),
+        func.coalesce(ExportJob.started_at, ExportJob.created_at) <= now - timedelta(minutes=EXPORT_JOB_STALE_MINUTES)
+    )
+    if user_id is not None:
+        query = query.filter(ExportJob.user_id == user_id)
+    return query.update(
+        {"status": "failed", "error_message": "Export job did not finish", "completed_at": now},
+        synchronize_session=False
+    )
+
+
+def schedule_export_cleanup(bind) -> None:
+    """Run cleanup_expired_exports on the job pool (app startup: fails jobs a previous process left behind)."""
+    global _last_cleanup
+    _last_cleanup = time.monotonic()
+    _job_executor.submit(_cleanup_in_background, bind)
+
+
+def _cleanup_in_background(bind) -> None:
+    with Session(bind=bind) as db:
+        try:
+            cleanup_expired_exports(db)
+        except Exception as e:
+            logger.warning(f"Export cleanup failed: {e}")
+
+
+def _get_own_job(db: Session, job_id: str, user: User) -> ExportJob:
+    job = db.query(ExportJob).filter(
+        ExportJob.id == job_id,
+        ExportJob.user_id == user.id
+    ).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Export job not found")
+    return job
+
+
+@router.post("/jobs", response_model=StandardResponse, status_code=status.HTTP_202_ACCEPTED)
+async def create_export_job(
+    job_input: ExportJobInput,
+    current_user: User = Depends(get_current_user),
+    api_key: str = Depends(verify_api_key),
+    db: Session = Depends(get_db)
+):
+    """
+    Queue an export that is built in the background — for long histories and
+    doctors' patient panels, where a single HTTP response is fragile.
+
+    Poll `GET /jobs/{job_id}` until `status` is `completed`, then fetch
+    `download_url`. Files are kept for EXPORT_ARTIFACT_TTL_HOURS.
+
+    - `scope=my_data`: own profile + BP history (free tier: last 30 readings)
+    - `scope=patient_panel`: full BP history of every authorized patient (verified doctors)
+    """
+    request_id = generate_request_id()
+
+    if job_input.scope == "patient_panel":
+        require_verified_doctor(current_user)
+
+    if fail_stale_export_jobs(db, current_user.id):
+        db.commit()
+    active = db.query(ExportJob).filter(
+        ExportJob.user_id == current_user.id,
+        ExportJob.status.in_(("queued", "running"))
+    ).count()
+    if active >= EXPORT_JOB_MAX_ACTIVE:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many export jobs in progress. Please wait for them to finish."
+        )
+
+    job = ExportJob(
+        id=str(uuid.uuid4()),
+        user_id=current_user.id,
+        scope=job_input.scope,
+        export_format=job_input.format,
+        gzip=job_input.gzip,
+        status="queued",
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+
+    bind = db.get_bind()
+    _job_executor.submit(_run_export_job, job.id, bind)
+    if time.monotonic() - _last_cleanup >= EXPORT_CLEANUP_INTERVAL_SECONDS:
+        schedule_export_cleanup(bind)
+
+    logger.info(f"User {current_user.id} queued export job {job.id} ({job.scope}, {job.export_format})")
+
+    return create_standard_response(
+        status="success",
+        message="Export job queued",
+        data={"job": _job_payload(job)},
+        request_id=request_id
+    )
+
+
+@router.get("/jobs/{job_id}", response_model=StandardResponse)
+async def get_export_job(
+    job_id: str,
+    current_user: User = Depends(get_current_user),
+    api_key: str = Depends(verify_api_key),
+    db: Session = Depends(get_db)
+):
+    """Poll an export job's status."""
+    job = _get_own_job(db, job_id, current_user)
+    return create_standard_response(
+        status="success",
+        message="Export job retrieved",
+        data={"job": _job_payload(job)}
+    )
+
+
+@router.get("/jobs/{job_id}/download")
+async def download_export_job(
+    job_id: str,
+    current_user: User = Depends(get_current_user),
+    api_key: str = Depends(verify_api_key),
+    db: Session = Depends(get_db)
+):
+    """Download a completed export's file."""
+    job = _get_own_job(db, job_id, current_user)
+
+    if job.status in ("queued", "running"):
+        raise HTTPException(status_code=409, detail="Export is not ready yet")
+    if job.status == "failed":
+        raise HTTPException(status_code=409, detail="Export failed; please create a new export job")
+    if job.status == "expired" or _is_expired(job) or not export_store.exists(job.artifact_key):
+        raise HTTPException(status_code=410, detail="Export file has expired")
+
+    extension = job.export_format + (".gz" if job.gzip else "")
+    created = job.created_at.strftime('%Y%m%d') if job.created_at else now_tz().strftime('%Y%m%d')
+    filename = f"bp-export-{created}.{extension}"
+    media_type = "application/gzip" if job.gzip else _EXPORT_MEDIA_TYPES[job.export_format]
+
+    return StreamingResponse(
+        export_store.iter_chunks(job.artifact_key, STREAM_CHUNK_BYTES),
+        media_type=media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "Content-Length": str(job.artifact_size),
+        },
+    )
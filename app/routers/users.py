@@ -5,7 +5,7 @@ from sqlalchemy import or_
 from ..database import get_db
 from ..models import User
 from ..schemas import StandardResponse, UserProfileResponse, UserProfileUpdate
-from ..utils.security import verify_api_key, get_current_user, verify_password
+from ..utils.security import verify_api_key, get_current_user, verify_password_async, client_ip
 from ..utils.timezone import now_tz, get_timezone_choices_dict, is_valid_timezone
 from ..utils.encryption import decrypt_value, encrypt_value, hash_value
 from ..utils.subscription import get_subscription_info
@@ -62,6 +62,7 @@ async def get_current_user_profile(
 
 @router.put("/me", response_model=StandardResponse)
 async def update_user_profile(
+    request: Request,
     user_update: UserProfileUpdate,
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
@@ -77,7 +78,9 @@ async def update_user_profile(
         sensitive_changed = True
         
     if sensitive_changed:
-        if not user_update.current_password or not verify_password(user_update.current_password, current_user.password_hash):
+        if not user_update.current_password or not await verify_password_async(
+            user_update.current_password, current_user.password_hash, client_ip(request)
+        ):
             raise HTTPException(
                 status_code=403, 
                 detail="Security Check Failed: Incorrect current password."
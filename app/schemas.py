@@ -52,6 +52,13 @@ class PaginationMeta(BaseModel):
     total_pages: int
 
 
+class CursorPaginationMeta(BaseModel):
+    mode: Literal["cursor"] = "cursor"
+    per_page: int
+    next_cursor: Optional[str] = None
+    has_more: bool
+
+
 class UserRegister(BaseModel):
     # Either email OR phone_number is required (at least one)
     email: Optional[EmailStr] = None
@@ -316,7 +323,7 @@ class OCRResult(BaseModel):
     image_metadata: Optional[dict] = None
     error: Optional[str] = None
     # Stable error code for callers to map to i18n / HTTP status.
-    # Known values: OCR_RATE_LIMITED, OCR_UNSUPPORTED_FORMAT, OCR_NOT_CONFIGURED,
+    # Known values: OCR_RATE_LIMITED, OCR_QUEUE_FULL, OCR_UNSUPPORTED_FORMAT, OCR_NOT_CONFIGURED,
     # OCR_IMAGE_INVALID, OCR_PARSE_FAILED, OCR_API_ERROR.
     error_code: Optional[str] = None
     raw_response: Optional[str] = None
@@ -340,6 +347,13 @@ class DoctorSearchResult(BaseModel):
     license_year: Optional[int] = None
 
 
+class ExportJobInput(BaseModel):
+    """Background export request. `patient_panel` is for verified doctors only."""
+    scope: Literal["my_data", "patient_panel"] = "my_data"
+    format: Literal["json", "ndjson", "csv"] = "json"
+    gzip: bool = False
+
+
 # ── Admin schemas ──────────────────────────────────────
 
 class AdminUserListItem(BaseModel):
@@ -369,7 +383,7 @@ class AdminActionReasonInput(BaseModel):
 
 class AdminAuditLogResponse(BaseModel):
     id: int
-    admin_user_id: int
+    admin_user_id: Optional[int] = None  # None for system actions
     action: str
     target_user_id: Optional[int] = None
     details: Optional[str] = None
@@ -0,0 +1,595 @@
+"""Per-user BP statistics — shared by /api/v1/stats/summary and the bot /stats.
+
+Summary stats cover a user's latest N readings. When N spans the user's whole
+history (free users with <= 30 readings, premium users with <= `days`), the
+numbers come straight from the incrementally maintained
+``blood_pressure_aggregates`` row in O(1). Otherwise only the window's numeric
+columns are loaded and reduced in Python.
+
+The rollup is kept in sync by mapper events on BloodPressureRecord
+(insert / update / delete). Bulk ``query(...).delete()`` bypasses mapper
+events, so such callers must call ``reset_user_aggregate``. Reads never write:
+a user without a row gets the rollup built in memory, and the row is created
+by the next write to their readings. Backfill or repair:
+
+    python -m app.services.bp_stats_service rebuild [--user-id N]
+"""
+
+import json
+import logging
+import math
+import statistics as stats_module
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import desc, event, inspect, select
+from sqlalchemy.orm import Session, object_session
+
+from app.models import BloodPressureAggregate, BloodPressureRecord
+from app.utils.timezone import now_tz
+
+logger = logging.getLogger(__name__)
+
+_AGG = BloodPressureAggregate.__table__
+_REC = BloodPressureRecord.__table__
+
+_SUM_KEYS = (
+    "record_count",
+    "sum_systolic", "sumsq_systolic",
+    "sum_diastolic", "sumsq_diastolic",
+    "sum_pulse", "sumsq_pulse",
+)
+_REGRESSION_KEYS = ("sum_x", "sum_xx", "sum_x_systolic", "sum_x_diastolic")
+_READING_KEYS = ("systolic", "diastolic", "pulse", "measurement_date")
+_PENDING_KEY = "bp_rollup_pending"
+
+# Below this, the spread of measurement times is float noise (all readings at one instant)
+_MIN_SS_XX = 1e-9
+
+
+def classify_bp(avg_sys: float, avg_dia: float) -> dict:
+    """Classify BP based on AHA/ACC 2017 guidelines using average values."""
+    if avg_sys > 180 or avg_dia > 120:
+        return {"level": "hypertensive_crisis", "label_en": "Hypertensive Crisis", "label_th": "วิกฤตความดันสูง"}
+    elif avg_sys >= 140 or avg_dia >= 90:
+        return {"level": "stage_2", "label_en": "Stage 2 Hypertension", "label_th": "ความดันสูงระยะที่ 2"}
+    elif (130 <= avg_sys <= 139) or (80 <= avg_dia <= 89):
+        return {"level": "stage_1", "label_en": "Stage 1 Hypertension", "label_th": "ความดันสูงระยะที่ 1"}
+    elif 120 <= avg_sys <= 129 and avg_dia < 80:
+        return {"level": "elevated", "label_en": "Elevated", "label_th": "ความดันสูงเล็กน้อย"}
+    else:
+        return {"level": "normal", "label_en": "Normal", "label_th": "ปกติ"}
+
+
+def compute_trend(records) -> dict:
+    """Compute linear regression slope with R-squared for systolic and diastolic over time.
+    
+    R² (coefficient of determination) indicates how well the linear model fits:
+      - R² >= 0.7: strong linear trend
+      - 0.3 <= R² < 0.7: moderate trend
+      - R² < 0.3: weak/no clear linear trend
+    """
+    if len(records) < 3:
+        return {
+            "systolic_slope": 0, "diastolic_slope": 0,
+            "systolic_r_squared": 0, "diastolic_r_squared": 0,
+            "direction": "stable", "confidence": "insufficient_data"
+        }
+
+    # Sort chronologically (oldest first)
+    sorted_records = sorted(records, key=lambda r: r.measurement_date)
+    base_date = sorted_records[0].measurement_date
+    x_days = [(r.measurement_date - base_date).total_seconds() / 86400 for r in sorted_records]
+
+    def linear_regression(x_vals, y_vals):
+        """Returns (slope, r_squared, has_sufficient_variation) using least-squares method."""
+        n = len(x_vals)
+        if n < 2:
+            return 0.0, 0.0, False
+        x_mean = sum(x_vals) / n
+        y_mean = sum(y_vals) / n
+        ss_xy = sum((x - x_mean) * (y - y_mean) for x, y in zip(x_vals, y_vals))
+        ss_xx = sum((x - x_mean) ** 2 for x in x_vals)
+        ss_yy = sum((y - y_mean) ** 2 for y in y_vals)
+
+        if ss_xx == 0:
+            return 0.0, 0.0, False
+
+        slope = ss_xy / ss_xx
+
+        # A perfectly flat series still fits the regression line exactly.
+        if ss_yy == 0:
+            return slope, 1.0, True
+
+        r_squared = (ss_xy ** 2) / (ss_xx * ss_yy)
+        return slope, r_squared, True
+
+    sys_slope, sys_r2, has_trend_data = linear_regression(x_days, [r.systolic for r in sorted_records])
+    dia_slope, dia_r2, _ = linear_regression(x_days, [r.diastolic for r in sorted_records])
+
+    return _describe_trend(sys_slope, dia_slope, sys_r2, dia_r2, has_trend_data)
+
+
+def _describe_trend(sys_slope: float, dia_slope: float, sys_r2: float, dia_r2: float,
+                    has_trend_data: bool) -> dict:
+    """Round regression results and label direction / confidence."""
+    sys_slope = round(sys_slope, 2)
+    dia_slope = round(dia_slope, 2)
+    sys_r2 = round(sys_r2, 3)
+    dia_r2 = round(dia_r2, 3)
+
+    # Direction based on systolic slope significance
+    if sys_slope > 0.5:
+        direction = "increasing"
+    elif sys_slope < -0.5:
+        direction = "decreasing"
+    else:
+        direction = "stable"
+
+    # Confidence based on systolic R² (primary clinical metric)
+    if not has_trend_data:
+        confidence = "insufficient_data"
+    elif sys_r2 >= 0.7:
+        confidence = "strong"
+    elif sys_r2 >= 0.3:
+        confidence = "moderate"
+    else:
+        confidence = "weak"
+
+    return {
+        "systolic_slope": sys_slope,
+        "diastolic_slope": dia_slope,
+        "systolic_r_squared": sys_r2,
+        "diastolic_r_squared": dia_r2,
+        "direction": direction,
+        "confidence": confidence
+    }
+
+
+# ═══════════════════════════════════════════════════════════════════
+# Summary
+# ═══════════════════════════════════════════════════════════════════
+
+def summarize_readings(readings, include_advanced: bool) -> dict:
+    """Compute summary stats from reading rows (ORM objects or column rows).
+
+    `readings` must be non-empty and expose systolic, diastolic, pulse and
+    measurement_date.
+    """
+    systolic_values = [r.systolic for r in readings]
+    diastolic_values = [r.diastolic for r in readings]
+    pulse_values = [r.pulse for r in readings]
+    n = len(readings)
+
+    # --- Basic stats (Free + Premium) ---
+    avg_sys = round(sum(systolic_values) / n, 1)
+    avg_dia = round(sum(diastolic_values) / n, 1)
+    avg_pulse = round(sum(pulse_values) / n, 1)
+
+    bp_stats = {
+        "systolic": {
+            "avg": avg_sys,
+            "min": min(systolic_values),
+            "max": max(systolic_values)
+        },
+        "diastolic": {
+            "avg": avg_dia,
+            "min": min(diastolic_values),
+            "max": max(diastolic_values)
+        },
+        "pulse": {
+            "avg": avg_pulse,
+            "min": min(pulse_values),
+            "max": max(pulse_values)
+        },
+        "classification": classify_bp(avg_sys, avg_dia),
+        "total_records_period": n,
+    }
+
+    # --- Advanced stats (Premium only) ---
+    if include_advanced:
+        has_enough = n >= 2
+
+        # SD, Median, CV for each metric
+        for key, values in [("systolic", systolic_values), ("diastolic", diastolic_values), ("pulse", pulse_values)]:
+            sd = round(stats_module.stdev(values), 1) if has_enough else 0
+            median = round(stats_module.median(values), 1)
+            avg_val = bp_stats[key]["avg"]
+            cv = round((sd / avg_val) * 100, 1) if avg_val > 0 and has_enough else 0
+            bp_stats[key]["sd"] = sd
+            bp_stats[key]["median"] = median
+            bp_stats[key]["cv"] = cv
+
+        # Pulse Pressure (SBP - DBP)
+        pp_values = [s - d for s, d in zip(systolic_values, diastolic_values)]
+        bp_stats["pulse_pressure"] = {
+            "avg": round(sum(pp_values) / n, 1),
+            "min": min(pp_values),
+            "max": max(pp_values)
+        }
+
+        # MAP = (SBP + 2*DBP) / 3
+        map_values = [(s + 2 * d) / 3 for s, d in zip(systolic_values, diastolic_values)]
+        bp_stats["map"] = {
+            "avg": round(sum(s + 2 * d for s, d in zip(systolic_values, diastolic_values)) / (3 * n), 1),
+            "min": round(min(map_values), 1),
+            "max": round(max(map_values), 1)
+        }
+
+        # Trend Analysis
+        bp_stats["trend"] = compute_trend(readings)
+
+    return bp_stats
+
+
+def summarize_latest_readings(db: Session, user_id: int, limit: int, include_advanced: bool):
+    """Summary stats over the user's latest `limit` readings.
+
+    Returns (stats, total_records_all_time); stats is None when the user has
+    no readings. Served from the rollup when the window covers every reading.
+    """
+    state = get_aggregate_state(db, user_id)
+    total = state["record_count"]
+    if total == 0:
+        return None, 0
+
+    if total <= limit:
+        bp_stats = _summarize_state(state, include_advanced)
+    else:
+        readings = db.query(
+            BloodPressureRecord.systolic,
+            BloodPressureRecord.diastolic,
+            BloodPressureRecord.pulse,
+            BloodPressureRecord.measurement_date,
+        ).filter(
+            BloodPressureRecord.user_id == user_id
+        ).order_by(desc(BloodPressureRecord.measurement_date)).limit(limit).all()
+        bp_stats = summarize_readings(readings, include_advanced)
+
+    bp_stats["total_records_all_time"] = total
+    return bp_stats, total
+
+
+def _summarize_state(state: dict, include_advanced: bool) -> dict:
+    """Same output as summarize_readings, computed from a rollup state."""
+    n = state["record_count"]
+    histograms = state["histograms"]
+
+    bp_stats = {}
+    for key in ("systolic", "diastolic", "pulse"):
+        bucket = histograms[key]
+        bp_stats[key] = {
+            "avg": round(state[f"sum_{key}"] / n, 1),
+            "min": _histogram_min(bucket),
+            "max": _histogram_max(bucket),
+        }
+    bp_stats["classification"] = classify_bp(bp_stats["systolic"]["avg"], bp_stats["diastolic"]["avg"])
+    bp_stats["total_records_period"] = n
+
+    if include_advanced:
+        has_enough = n >= 2
+
+        for key in ("systolic", "diastolic", "pulse"):
+            total, total_sq = state[f"sum_{key}"], state[f"sumsq_{key}"]
+            # Sample SD from exact integer sums: var = (n·Σx² − (Σx)²) / (n(n−1))
+            sd = round(math.sqrt((n * total_sq - total * total) / (n * (n - 1))), 1) if has_enough else 0
+            avg_val = bp_stats[key]["avg"]
+            bp_stats[key]["sd"] = sd
+            bp_stats[key]["median"] = round(_histogram_median(histograms[key], n), 1)
+            bp_stats[key]["cv"] = round((sd / avg_val) * 100, 1) if avg_val > 0 and has_enough else 0
+
+        pp = histograms["pulse_pressure"]
+        bp_stats["pulse_pressure"] = {
+            "avg": round((state["sum_systolic"] - state["sum_diastolic"]) / n, 1),
+            "min": _histogram_min(pp),
+            "max": _histogram_max(pp)
+        }
+
+        map_x3 = histograms["map_x3"]
+        bp_stats["map"] = {
+            "avg": round((state["sum_systolic"] + 2 * state["sum_diastolic"]) / (3 * n), 1),
+            "min": round(_histogram_min(map_x3) / 3, 1),
+            "max": round(_histogram_max(map_x3) / 3, 1)
+        }
+
+        bp_stats["trend"] = _trend_from_state(state)
+
+    return bp_stats
+
+
+def _trend_from_state(state: dict) -> dict:
+    """compute_trend() from regression accumulators instead of rows."""
+    n = state["record_count"]
+    if n < 3:
+        return compute_trend([])
+
+    sum_x = state["sum_x"]
+    ss_xx = state["sum_xx"] - sum_x * sum_x / n
+    if ss_xx <= _MIN_SS_XX:
+        return _describe_trend(0.0, 0.0, 0.0, 0.0, has_trend_data=False)
+
+    def fit(key):
+        total, total_sq = state[f"sum_{key}"], state[f"sumsq_{key}"]
+        ss_xy = state[f"sum_x_{key}"] - sum_x * total / n
+        ss_yy = (n * total_sq - total * total) / n
+        slope = ss_xy / ss_xx
+        if ss_yy == 0:
+            return slope, 1.0
+        return slope, (ss_xy ** 2) / (ss_xx * ss_yy)
+
+    sys_slope, sys_r2 = fit("systolic")
+    dia_slope, dia_r2 = fit("diastolic")
+    return _describe_trend(sys_slope, dia_slope, sys_r2, dia_r2, has_trend_data=True)
+
+
+def _histogram_items(bucket: dict) -> list:
+    return sorted((int(value), count) for value, count in bucket.items())
+
+
+def _histogram_min(bucket: dict) -> int:
+    return min(int(value) for value in bucket)
+
+
+def _histogram_max(bucket: dict) -> int:
+    return max(int(value) for value in bucket)
+
+
+def _histogram_median(bucket: dict, n: int) -> float:
+    """Median of the multiset described by a value→count histogram (matches statistics.median)."""
+    low_rank, high_rank = (n - 1) // 2, n // 2
+    low = high = None
+    seen = 0
+    for value, count in _histogram_items(bucket):
+        if low is None and low_rank < seen + count:
+            low = value
+        if high_rank < seen + count:
+            high = value
+            break
+        seen += count
+    return (low + high) / 2 if low != high else float(low)
+
+
+# ═══════════════════════════════════════════════════════════════════
+# Rollup maintenance
+# ═══════════════════════════════════════════════════════════════════
+
+def _naive(value: datetime) -> datetime:
+    # The DB stores wall-clock time; compare on the same basis regardless of tzinfo
+    if value is not None and value.tzinfo is not None:
+        return value.replace(tzinfo=None)
+    return value
+
+
+def _empty_state() -> dict:
+    state = {key: 0 for key in _SUM_KEYS}
+    state.update({key: 0.0 for key in _REGRESSION_KEYS})
+    state["base_date"] = None
+    state["histograms"] = {}
+    return state
+
+
+def _state_from_row(row) -> dict:
+    state = {key: row[key] for key in _SUM_KEYS + _REGRESSION_KEYS}
+    state["base_date"] = row["base_date"]
+    state["histograms"] = json.loads(row["histograms"] or "{}")
+    return state
+
+
+def _apply_reading(state: dict, systolic: int, diastolic: int, pulse: int,
+                   measurement_date: datetime, sign: int) -> None:
+    """Add (sign=1) or remove (sign=-1) one reading from a rollup state in place."""
+    measurement_date = _naive(measurement_date)
+    if state["base_date"] is None:
+        state["base_date"] = measurement_date
+    x = (measurement_date - state["base_date"]).total_seconds() / 86400
+
+    state["record_count"] += sign
+    for key, value in (("systolic", systolic), ("diastolic", diastolic), ("pulse", pulse)):
+        state[f"sum_{key}"] += sign * value
+        state[f"sumsq_{key}"] += sign * value * value
+    state["sum_x"] += sign * x
+    state["sum_xx"] += sign * x * x
+    state["sum_x_systolic"] += sign * x * systolic
+    state["sum_x_diastolic"] += sign * x * diastolic
+
+    for key, value in (
+        ("systolic", systolic),
+        ("diastolic", diastolic),
+        ("pulse", pulse),
+        ("pulse_pressure", systolic - diastolic),
+        ("map_x3", systolic + 2 * diastolic),
+    ):
+        bucket = state["histograms"].setdefault(key, {})
+        count = bucket.get(str(value), 0) + sign
+        if count > 0:
+            bucket[str(value)] = count
+        else:
+            bucket.pop(str(value), None)
+
+    if state["record_count"] <= 0:
+        # Start clean so accumulated float error doesn't outlive the data
+        state.clear()
+        state.update(_empty_state())
+
+
+def _state_columns(state: dict) -> dict:
+    columns = {key: state[key] for key in _SUM_KEYS + _REGRESSION_KEYS}
+    columns["base_date"] = state["base_date"]
+    columns["histograms"] = json.dumps(state["histograms"], sort_keys=True, separators=(",", ":"))
+    columns["updated_at"] = now_tz()
+    return columns
+
+
+def _build_state(connection, user_id: int) -> dict:
+    state = _empty_state()
+    rows = connection.execute(
+        select(_REC.c.systolic, _REC.c.diastolic, _REC.c.pulse, _REC.c.measurement_date)
+        .where(_REC.c.user_id == user_id)
+        .order_by(_REC.c.measurement_date)
+    )
+    for systolic, diastolic, pulse, measurement_date in rows:
+        _apply_reading(state, systolic, diastolic, pulse, measurement_date, sign=1)
+    return state
+
+
+def _select_row(connection, user_id: int):
+    return connection.execute(
+        select(_AGG).where(_AGG.c.user_id == user_id).with_for_update()
+    ).mappings().first()
+
+
+def _insert_if_absent(connection, user_id: int, state: dict) -> bool:
+    """INSERT ... ON CONFLICT DO NOTHING; False if a concurrent writer got there first."""
+    values = {"user_id": user_id, **_state_columns(state)}
+    if connection.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif connection.dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        connection.execute(_AGG.insert().values(**values))
+        return True
+    result = connection.execute(insert(_AGG).values(**values).on_conflict_do_nothing())
+    return result.rowcount == 1
+
+
+def _apply_changes(connection, user_id: int, changes: list) -> None:
+    """Apply queued (sign, reading) deltas for one user; sign None = rebuild."""
+    if any(sign is None for sign, _ in changes):
+        _rebuild(connection, user_id)
+        return
+
+    row = _select_row(connection, user_id)
+    if row is None:
+        # No rollup yet (first reading, or data that predates the table): build it
+        # from the table, which already reflects everything in this flush.
+        if _insert_if_absent(connection, user_id, _build_state(connection, user_id)):
+            return
+        row = _select_row(connection, user_id)
+
+    state = _state_from_row(row)
+    for sign, reading in changes:
+        _apply_reading(state, *reading, sign=sign)
+    connection.execute(_AGG.update().where(_AGG.c.user_id == user_id).values(**_state_columns(state)))
+
+
+def _rebuild(connection, user_id: int) -> dict:
+    state = _build_state(connection, user_id)
+    if _select_row(connection, user_id) is None and _insert_if_absent(connection, user_id, state):
+        return state
+    connection.execute(_AGG.update().where(_AGG.c.user_id == user_id).values(**_state_columns(state)))
+    return state
+
+
+def _reading_of(target) -> tuple:
+    return tuple(getattr(target, key) for key in _READING_KEYS)
+
+
+def _queue(target, user_id: int, sign: Optional[int], reading: Optional[tuple] = None) -> None:
+    # Mapper events fire per row while a flush may batch many rows, so deltas are
+    # queued on the session and applied once per user in after_flush.
+    session = object_session(target)
+    if session is not None and user_id is not None:
+        session.info.setdefault(_PENDING_KEY, {}).setdefault(user_id, []).append((sign, reading))
+
+
+@event.listens_for(BloodPressureRecord, "after_insert")
+def _rollup_after_insert(mapper, connection, target):
+    _queue(target, target.user_id, 1, _reading_of(target))
+
+
+@event.listens_for(BloodPressureRecord, "after_update")
+def _rollup_after_update(mapper, connection, target):
+    attrs = inspect(target).attrs
+    previous = {}
+    for key in ("user_id",) + _READING_KEYS:
+        history = attrs[key].history
+        if history.deleted:
+            previous[key] = history.deleted[0]
+        elif history.added:
+            # Assigned without the old value loaded — can't compute a delta
+            _queue(target, target.user_id, None)
+            return
+        else:
+            previous[key] = getattr(target, key)
+
+    old_reading = tuple(previous[key] for key in _READING_KEYS)
+    new_reading = _reading_of(target)
+    if previous["user_id"] != target.user_id:
+        _queue(target, previous["user_id"], -1, old_reading)
+        _queue(target, target.user_id, 1, new_reading)
+    elif old_reading != new_reading:
+        _queue(target, target.user_id, -1, old_reading)
+        _queue(target, target.user_id, 1, new_reading)
+
+
+@event.listens_for(BloodPressureRecord, "after_delete")
+def _rollup_after_delete(mapper, connection, target):
+    if inspect(target).unloaded.intersection(_READING_KEYS):
+        _queue(target, target.user_id, None)
+        return
+    _queue(target, target.user_id, -1, _reading_of(target))
+
+
+@event.listens_for(Session, "after_flush")
+def _rollup_after_flush(session, flush_context):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+    connection = session.connection()
+    for user_id, changes in pending.items():
+        _apply_changes(connection, user_id, changes)
+
+
+# ═══════════════════════════════════════════════════════════════════
+# Public rollup API
+# ═══════════════════════════════════════════════════════════════════
+
+def get_aggregate_state(db: Session, user_id: int) -> dict:
+    """Load a user's rollup; on a miss, build it in memory from the records.
+
+    Read-only on purpose: the stats endpoints call this on a replica-routed
+    session. The row is persisted by the write path (_apply_changes) or by
+    ``rebuild``.
+    """
+    row = db.execute(select(_AGG).where(_AGG.c.user_id == user_id)).mappings().first()
+    if row is not None:
+        return _state_from_row(row)
+    return _build_state(db.connection(), user_id)
+
+
+def reset_user_aggregate(db: Session, user_id: int) -> None:
+    """Drop a user's rollup (e.g. after a bulk delete); rebuilt lazily on next access."""
+    db.execute(_AGG.delete().where(_AGG.c.user_id == user_id))
+
+
+def rebuild_aggregates(db: Session, user_id: Optional[int] = None) -> int:
+    """Recompute rollups from blood_pressure_records. Commits per user; returns users rebuilt."""
+    if user_id is not None:
+        user_ids = [user_id]
+    else:
+        user_ids = sorted(
+            {row[0] for row in db.execute(select(_REC.c.user_id).distinct())}
+            | {row[0] for row in db.execute(select(_AGG.c.user_id))}
+        )
+
+    for uid in user_ids:
+        _rebuild(db.connection(), uid)
+        db.commit()
+    return len(user_ids)
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    from app.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Maintain blood_pressure_aggregates rollups")
+    parser.add_argument("command", choices=["rebuild"], help="rebuild: recompute rollups from records")
+    parser.add_argument("--user-id", type=int, default=None, help="Only rebuild this user")
+    args = parser.parse_args()
+
+    started = time.monotonic()
+    with SessionLocal() as session:
+        count = rebuild_aggregates(session, user_id=args.user_id)
+    print(f"Rebuilt BP aggregates for {count} user(s) in {time.monotonic() - started:.1f}s")
@@ -0,0 +1,222 @@
+"""Re-encrypt stored PII under the primary ENCRYPTION_KEY (key rotation).
+
+Rotation procedure:
+
+  0. If SEARCH_INDEX_KEY is unset, pin the name index key first (same key,
+     no rebuild): SEARCH_INDEX_KEY=$(python -m app.services.name_search show-key)
+  1. Generate a new key and prepend it: ENCRYPTION_KEY=<new>,<old>
+     (deploy — new writes use <new>, reads accept both)
+  2. python -m app.services.key_rotation rotate
+  3. Once it reports 0 failed, drop <old>: ENCRYPTION_KEY=<new>
+
+Every ``*_encrypted`` column of ``users`` and ``payments`` is walked in
+primary-key order, ``--batch-size`` rows at a time. Each batch is re-encrypted
+in a worker-process pool and committed on its own, so no long transaction
+holds locks on the table. Updates are conditional on the ciphertext still
+being the one that was read: a value the app rewrote meanwhile (already under
+the new key) is left alone.
+
+Progress is checkpointed to a JSON file after every commit; re-running the
+command resumes where it stopped (``--reset`` starts over). A clean run ends
+by rebuilding the blind name index, so it matches the stored names under the
+configured SEARCH_INDEX_KEY.
+"""
+
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from sqlalchemy import and_, bindparam, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.models import Payment, User
+from app.services.name_search import rebuild_name_index
+from app.utils.encryption import rotate_value
+
+logger = logging.getLogger(__name__)
+
+ROTATION_MODELS = (User, Payment)
+DEFAULT_CHECKPOINT = ".key_rotation_checkpoint.json"
+
+
+def _encrypted_columns(table):
+    return [c for c in table.columns if c.name.endswith("_encrypted")]
+
+
+def _rotate_chunk(values: list) -> list:
+    return [rotate_value(v) for v in values]
+
+
+def _load_checkpoint(path: str) -> dict:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def _save_checkpoint(path: str, state: dict) -> None:
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, path)
+
+
+def _rotate_values(values: list, executor, workers: int) -> list:
+    if executor is None or len(values) < 2 * workers:
+        return _rotate_chunk(values)
+    size = -(-len(values) // workers)
+    chunks = [values[i:i + size] for i in range(0, len(values), size)]
+    rotated = []
+    for part in executor.map(_rotate_chunk, chunks):
+        rotated.extend(part)
+    return rotated
+
+
+def rotate_table(
+    engine: Engine,
+    table,
+    state: dict,
+    checkpoint_path: Optional[str],
+    batch_size: int = 500,
+    executor=None,
+    workers: int = 1,
+) -> dict:
+    """Rotate one table's encrypted columns from its checkpointed id onward."""
+    columns = _encrypted_columns(table)
+    pk = table.c.id
+    progress = state.setdefault(table.name, {"last_id": 0, "rows": 0, "values": 0,
+                                             "skipped": 0, "failed": 0, "done": False})
+    if progress["done"]:
+        logger.info(f"{table.name}: already rotated (checkpoint)")
+        return progress
+
+    # Leave columns with onupdate (users.updated_at) untouched: SET col = col
+    keep = {c.name: c for c in table.columns if c.onupdate is not None}
+    updates = {
+        column.name: table.update().where(and_(
+            pk == bindparam("row_id"), column == bindparam("old_value")
+        )).values({column.name: bindparam("new_value"), **keep})
+        for column in columns
+    }
+
+    while True:
+        batch_started = time.perf_counter()
+        with engine.connect() as conn:
+            rows = conn.execute(
+                select(pk, *columns).where(pk > progress["last_id"]).order_by(pk).limit(batch_size)
+            ).all()
+            if not rows:
+                break
+
+            cells = [(row.id, column.name, getattr(row, column.name))
+                     for row in rows for column in columns if getattr(row, column.name)]
+            rotated = _rotate_values([cell[2] for cell in cells], executor, workers)
+
+            params = {name: [] for name in updates}
+            for (row_id, name, old_value), new_value in zip(cells, rotated):
+                if new_value is None:
+                    progress["failed"] += 1
+                    logger.warning(f"{table.name}.{name} id={row_id}: no configured key can decrypt it")
+                    continue
+                params[name].append({"row_id": row_id, "old_value": old_value, "new_value": new_value})
+
+            for name, batch in params.items():
+                if batch:
+                    result = conn.execute(updates[name], batch)
+                    # Unmatched rows = value changed since it was read (already re-encrypted)
+                    if conn.dialect.supports_sane_multi_rowcount:
+                        progress["skipped"] += len(batch) - result.rowcount
+                    progress["values"] += len(batch)
+            conn.commit()
+
+        progress["last_id"] = rows[-1].id
+        progress["rows"] += len(rows)
+        if checkpoint_path:
+            _save_checkpoint(checkpoint_path, state)
+
+        elapsed = time.perf_counter() - batch_started
+        logger.info(
+            f"{table.name}: rotated {len(rows)} rows / {len(cells)} values up to id={progress['last_id']} "
+            f"({len(rows) / elapsed:.0f} rows/s)"
+        )
+
+    progress["done"] = True
+    if checkpoint_path:
+        _save_checkpoint(checkpoint_path, state)
+    return progress
+
+
+def rotate_all(
+    engine: Engine,
+    batch_size: int = 500,
+    workers: int = os.cpu_count() or 1,
+    checkpoint_path: Optional[str] = DEFAULT_CHECKPOINT,
+    reset: bool = False,
+    rebuild_index: bool = True,
+) -> dict:
+    """Rotate every encrypted column of ROTATION_MODELS, then rebuild the name index.
+
+    The index is only rebuilt when every value was re-encrypted. Returns a
+    throughput report.
+    """
+    state = {} if reset or not checkpoint_path else _load_checkpoint(checkpoint_path)
+    started = time.perf_counter()
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        for model in ROTATION_MODELS:
+            rotate_table(engine, model.__table__, state, checkpoint_path,
+                         batch_size=batch_size, executor=executor, workers=workers)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    elapsed = time.perf_counter() - started
+    tables = {model.__tablename__: state[model.__tablename__] for model in ROTATION_MODELS}
+    rows = sum(t["rows"] for t in tables.values())
+    values = sum(t["values"] for t in tables.values())
+    failed = sum(t["failed"] for t in tables.values())
+
+    name_index_users = None
+    if rebuild_index and not failed:
+        with Session(bind=engine) as session:
+            name_index_users = rebuild_name_index(session, batch_size=batch_size)
+    return {
+        "tables": tables,
+        "rows": rows,
+        "values": values,
+        "failed": failed,
+        "name_index_users": name_index_users,
+        "elapsed_seconds": round(elapsed, 2),
+        "rows_per_second": round(rows / elapsed, 1) if elapsed else None,
+        "values_per_second": round(values / elapsed, 1) if elapsed else None,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from app.database import engine
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    parser = argparse.ArgumentParser(description="Re-encrypt stored PII under the primary ENCRYPTION_KEY")
+    parser.add_argument("command", choices=["rotate"])
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="re-encryption processes (1 = in-process)")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT)
+    parser.add_argument("--reset", action="store_true", help="ignore an existing checkpoint")
+    args = parser.parse_args()
+
+    report = rotate_all(engine, batch_size=args.batch_size, workers=args.workers,
+                        checkpoint_path=args.checkpoint, reset=args.reset)
+    print(json.dumps(report, indent=2))
+
+    if report["failed"]:
+        print(f"WARNING: {report['failed']} value(s) could not be decrypted — keep the old key")
+    elif os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
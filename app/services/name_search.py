@@ -0,0 +1,120 @@
+"""Partial name search over encrypted names via the blind n-gram index.
+
+`User.full_name` is Fernet-encrypted, so SQL can't LIKE it. The `full_name`
+setter also writes keyed-HMAC tokens of every bigram/trigram of the name to
+``user_name_tokens``. A query is tokenized the same way; users holding *all*
+of the query's tokens are the candidates, and only those are decrypted (in
+batches) to confirm the match and rank it. Every candidate is ranked before the
+result limit is applied:
+
+    exact name > name prefix > word prefix > substring, then shorter names
+
+Backfill (existing users) or re-key after changing SEARCH_INDEX_KEY:
+
+    python -m app.services.name_search rebuild
+
+Print the current index key as a SEARCH_INDEX_KEY value (pin it before
+adding a second ENCRYPTION_KEY, so rotation doesn't re-key the index):
+
+    python -m app.services.name_search show-key
+"""
+
+import logging
+from typing import List
+
+from sqlalchemy import distinct, func
+from sqlalchemy.orm import Session
+
+from app.models import User, UserNameToken
+from app.utils.encryption import ngram_tokens, normalize_search_text
+
+logger = logging.getLogger(__name__)
+
+# Candidates loaded and decrypted per round trip while ranking
+CANDIDATE_BATCH_SIZE = 200
+
+
+def _rank(name: str, query: str):
+    if name == query:
+        return 0
+    if name.startswith(query):
+        return 1
+    if any(word.startswith(query) for word in name.split()):
+        return 2
+    if query in name:
+        return 3
+    return None  # all grams present but not contiguous
+
+
+def find_users_by_name(db: Session, q: str, *filters, limit: int = 10) -> List[User]:
+    """Users (matching `filters`) whose name contains `q`, best match first."""
+    query = normalize_search_text(q)
+    if len(query) < 2:
+        return []
+    tokens = ngram_tokens(query, 3) if len(query) >= 3 else ngram_tokens(query, 2)
+
+    matching_ids = db.query(UserNameToken.user_id).filter(
+        UserNameToken.token.in_(tokens)
+    ).group_by(UserNameToken.user_id).having(
+        func.count(distinct(UserNameToken.token)) == len(tokens)
+    )
+    candidate_ids = [row[0] for row in db.query(User.id).filter(
+        User.id.in_(matching_ids), *filters
+    ).order_by(User.id)]
+
+    # Rank all candidates; only the best `limit` users are held between batches
+    ranked = []
+    for start in range(0, len(candidate_ids), CANDIDATE_BATCH_SIZE):
+        batch = db.query(User).filter(
+            User.id.in_(candidate_ids[start:start + CANDIDATE_BATCH_SIZE])
+        ).all()
+        User.prime_decrypted(batch, "full_name_encrypted")
+        for user in batch:
+            name = normalize_search_text(user.full_name)
+            rank = _rank(name, query)
+            if rank is not None:
+                ranked.append((rank, len(name), user.id, user))
+        ranked.sort(key=lambda item: item[:3])
+        del ranked[limit:]
+    return [item[3] for item in ranked]
+
+
+def rebuild_name_index(db: Session, batch_size: int = 500) -> int:
+    """Recompute every user's name tokens. Returns users processed."""
+    processed = 0
+    last_id = 0
+    while True:
+        users = db.query(User).filter(User.id > last_id).order_by(User.id).limit(batch_size).all()
+        if not users:
+            break
+        User.prime_decrypted(users, "full_name_encrypted")
+        for user in users:
+            user.set_name_tokens(user.full_name)
+        db.commit()
+        processed += len(users)
+        last_id = users[-1].id
+        db.expunge_all()
+    logger.info(f"Name search index rebuilt for {processed} user(s)")
+    return processed
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    from app.database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Maintain the blind name-search index")
+    parser.add_argument("command", choices=["rebuild", "show-key"])
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    if args.command == "show-key":
+        from app.utils import encryption
+
+        print(f"hex:{encryption._search_index_key.hex()}")
+    else:
+        started = time.perf_counter()
+        with SessionLocal() as session:
+            count = rebuild_name_index(session, batch_size=args.batch_size)
+        print(f"Indexed {count} user(s) in {time.perf_counter() - started:.1f}s")
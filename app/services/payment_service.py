@@ -18,6 +18,7 @@ from app.services.slipok import slipok_service
 from app.config.pricing import get_plan, is_valid_amount
 from app.utils.timezone import now_tz
 from app.utils.encryption import encrypt_value, hash_value
+from app.utils.slip_rate_limiter import slip_verify_limiter
 from app.utils.subscription import get_renewal_base_datetime
 
 logger = logging.getLogger(__name__)
@@ -25,35 +26,23 @@ logger = logging.getLogger(__name__)
 # ── Per-user verify-slip rate limiting (shared by Web and Bot) ────
 # The web route ALSO has @limiter.limit("3/minute") on the HTTP layer,
 # but this in-service check ensures the Bot path gets the same policy.
-import time
-import threading
-
-_verify_lock = threading.Lock()
-_verify_timestamps: dict[int, list[float]] = {}  # user_id → [timestamps]
-VERIFY_RATE_LIMIT = 3        # max attempts
-VERIFY_RATE_WINDOW = 60.0    # per 60 seconds
+# Counted in Redis when REDIS_URL is set, so every API worker and the
+# bot container share one window per user (see app/utils/slip_rate_limiter.py).
 
 
 def _check_rate_limit(user_id: int, lang: str = "th") -> None:
     """Enforce per-user rate limit for slip verification.
 
-    Raises PaymentError if the user has exceeded VERIFY_RATE_LIMIT
-    attempts in the last VERIFY_RATE_WINDOW seconds.
+    Raises PaymentError if the user has exceeded SLIP_VERIFY_RATE_LIMIT
+    attempts in the last SLIP_VERIFY_RATE_WINDOW_SECONDS seconds.
     """
-    now = time.monotonic()
-    with _verify_lock:
-        timestamps = _verify_timestamps.get(user_id, [])
-        # Remove entries outside the window
-        timestamps = [t for t in timestamps if now - t < VERIFY_RATE_WINDOW]
-        if len(timestamps) >= VERIFY_RATE_LIMIT:
-            msg = (
-                "Too many verification attempts. Please wait a moment."
-                if lang == "en"
-                else "คุณลองบ่อยเกินไป กรุณารอสักครู่"
-            )
-            raise PaymentError(msg, 429)
-        timestamps.append(now)
-        _verify_timestamps[user_id] = timestamps
+    if not slip_verify_limiter.hit(user_id):
+        msg = (
+            "Too many verification attempts. Please wait a moment."
+            if lang == "en"
+            else "คุณลองบ่อยเกินไป กรุณารอสักครู่"
+        )
+        raise PaymentError(msg, 429)
 
 
 # Image validation constants — shared by Web and Bot
@@ -135,7 +124,7 @@ def verify_and_upgrade(
     """
     now = now_tz()
 
-    # Rate limit: 3 attempts per minute per user (parity with web @limiter)
+    # Rate limit: SLIP_VERIFY_RATE_LIMIT per window per user (parity with web @limiter)
     _check_rate_limit(user.id, lang)
 
     # 0. Validate image
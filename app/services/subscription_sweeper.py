@@ -0,0 +1,170 @@
+"""Downgrade expired premium subscriptions on a schedule.
+
+The request path never writes subscription state: ``check_premium`` compares
+the stored tier and ``subscription_expires_at`` in memory, so an expired
+premium user is already treated as free. This sweeper makes the stored tier
+catch up, for reporting and admin listings:
+
+  * one set-based ``UPDATE users SET subscription_tier = 'free'`` for every
+    premium row whose expiry has passed (or is missing), excluding
+    PREMIUM_BYPASS_USERS (the same user-ID set check_premium uses);
+  * one bulk INSERT of ``admin_audit_logs`` rows (action
+    ``subscription_expired``; no human actor, so admin_user_id is NULL and
+    details carry ``"actor": "system"``);
+  * principal-cache invalidation for the downgraded users.
+
+Runs every SUBSCRIPTION_SWEEP_INTERVAL_SECONDS in the API process (started
+from the app's startup hook), or once by hand:
+
+    python -m app.services.subscription_sweeper sweep
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+
+from pytz import UTC
+from sqlalchemy import insert, or_, update
+from sqlalchemy.orm import Session
+
+from app.models import AdminAuditLog, User
+from app.utils.principal_cache import principal_cache
+from app.utils.security import refresh_premium_bypass
+from app.utils.timezone import now_tz
+
+logger = logging.getLogger(__name__)
+
+SUBSCRIPTION_SWEEP_INTERVAL_SECONDS = float(os.getenv("SUBSCRIPTION_SWEEP_INTERVAL_SECONDS", "300"))
+
+
+def sweep_expired_subscriptions(db: Session, now: Optional[datetime] = None) -> dict:
+    """Downgrade every expired premium user in one UPDATE and audit them in bulk; commits."""
+    started = time.perf_counter()
+    now = now or now_tz()
+    # Naive datetimes are stored/read as UTC (see check_premium)
+    cutoff = now.astimezone(UTC).replace(tzinfo=None)
+
+    stmt = (
+        update(User)
+        .where(User.subscription_tier == "premium")
+        .where(or_(User.subscription_expires_at.is_(None), User.subscription_expires_at <= cutoff))
+    )
+    # Also refreshes check_premium's bypass set (picks up newly registered bypass users)
+    bypass_ids = refresh_premium_bypass(db)
+    if bypass_ids:
+        stmt = stmt.where(User.id.not_in(bypass_ids))
+    stmt = (
+        stmt.values(subscription_tier="free")
+        .returning(User.id, User.subscription_expires_at)
+        .execution_options(synchronize_session=False)
+    )
+
+    downgraded = db.execute(stmt).all()
+    if downgraded:
+        db.execute(insert(AdminAuditLog), [
+            {
+                "admin_user_id": None,
+                "action": "subscription_expired",
+                "target_user_id": user_id,
+                "details": json.dumps({
+                    "actor": "system",
+                    "source": "subscription_sweeper",
+                    "expired_at": str(expires_at) if expires_at else None,
+                }),
+                "created_at": now,
+            }
+            for user_id, expires_at in downgraded
+        ])
+    db.commit()
+
+    for user_id, _ in downgraded:
+        principal_cache.invalidate(user_id)
+    if downgraded:
+        logger.info("Subscription sweep: downgraded %s expired premium user(s)", len(downgraded))
+    return {
+        "downgraded": len(downgraded),
+        "user_ids": [user_id for user_id, _ in downgraded],
+        "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+class SubscriptionSweeper:
+    """Daemon thread running sweep_expired_subscriptions every `interval` seconds."""
+
+    def __init__(self, interval: float = SUBSCRIPTION_SWEEP_INTERVAL_SECONDS):
+        self.interval = interval
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._stats = {"runs": 0, "failed": 0, "downgraded_total": 0, "last_downgraded": None,
+                       "last_duration_ms": None, "last_run_at": None}
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.interval <= 0 or self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="subscription-sweeper", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._thread = None
+
+    def run_once(self) -> dict:
+        from app.database import SessionLocal
+
+        with SessionLocal() as db:
+            try:
+                result = sweep_expired_subscriptions(db)
+            except Exception:
+                with self._lock:
+                    self._stats["runs"] += 1
+                    self._stats["failed"] += 1
+                raise
+        with self._lock:
+            self._stats["runs"] += 1
+            self._stats["downgraded_total"] += result["downgraded"]
+            self._stats["last_downgraded"] = result["downgraded"]
+            self._stats["last_duration_ms"] = result["duration_ms"]
+            self._stats["last_run_at"] = now_tz().isoformat()
+        return result
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as exc:
+                logger.warning("Subscription sweep failed: %s", exc)
+            self._stop.wait(self.interval)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"interval_seconds": self.interval, "running": self.running, **self._stats}
+
+
+# Global Instance
+subscription_sweeper = SubscriptionSweeper()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from app.database import SessionLocal
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    parser = argparse.ArgumentParser(description="Downgrade expired premium subscriptions")
+    parser.add_argument("command", choices=["sweep"])
+    parser.parse_args()
+
+    with SessionLocal() as session:
+        print(json.dumps(sweep_expired_subscriptions(session), indent=2))
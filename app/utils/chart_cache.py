@@ -0,0 +1,126 @@
+"""
+Chart Cache — content-addressed PNG cache for BP trend charts
+
+Key = SHA-256 ของ chart input (labels, systolic, diastolic, pulse, lang, width, height)
+ข้อมูลเดิม → key เดิม → PNG เดิม จึงไม่ต้อง invalidate เมื่อมี record ใหม่ (key จะเปลี่ยนเอง)
+
+Tiers:
+  - memory: LRU ใน process (CHART_CACHE_MAX_ENTRIES, 0 = ปิด)
+  - redis:  ใช้ร่วมกันระหว่าง API workers + bot เมื่อมี REDIS_URL (CHART_CACHE_TTL_SECONDS)
+"""
+
+import os
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+REDIS_URL = os.getenv("REDIS_URL")
+CHART_CACHE_MAX_ENTRIES = int(os.getenv("CHART_CACHE_MAX_ENTRIES", "256"))
+CHART_CACHE_TTL_SECONDS = int(os.getenv("CHART_CACHE_TTL_SECONDS", "86400"))
+# A hung Redis must degrade to a miss quickly, not stall the chart request
+CHART_CACHE_REDIS_TIMEOUT_SECONDS = float(os.getenv("CHART_CACHE_REDIS_TIMEOUT_SECONDS", "0.25"))
+
+
+class MemoryChartCache:
+    """Bounded in-process LRU of PNG bytes."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            png = self._entries.get(key)
+            if png is not None:
+                self._entries.move_to_end(key)
+            return png
+
+    def set(self, key: str, png: bytes) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = png
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RedisChartCache:
+    """Redis-backed PNG cache shared across processes."""
+
+    def __init__(self, redis_url: str, ttl_seconds: int, timeout_seconds: float = CHART_CACHE_REDIS_TIMEOUT_SECONDS):
+        import redis
+        self.client = redis.from_url(
+            redis_url, socket_timeout=timeout_seconds, socket_connect_timeout=timeout_seconds,
+        )
+        self.prefix = "chart_png:"
+        self.ttl_seconds = ttl_seconds
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.client.get(f"{self.prefix}{key}")
+
+    def set(self, key: str, png: bytes) -> None:
+        self.client.setex(f"{self.prefix}{key}", self.ttl_seconds, png)
+
+
+class ChartCache:
+    """Two-tier chart cache: memory LRU first, then Redis (if configured).
+
+    Cache failures never fail a chart request — a Redis error is logged and
+    treated as a miss.
+    """
+
+    def __init__(self, max_entries: int = CHART_CACHE_MAX_ENTRIES, redis_url: Optional[str] = REDIS_URL):
+        self.memory = MemoryChartCache(max_entries)
+        self.redis = None
+        if redis_url:
+            try:
+                self.redis = RedisChartCache(redis_url, CHART_CACHE_TTL_SECONDS)
+                logger.info("Chart cache: Using memory + Redis tiers")
+            except Exception as e:
+                logger.warning(f"Chart cache: Redis failed ({e}), using memory tier only")
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        png = self.memory.get(key)
+        if png is None and self.redis is not None:
+            try:
+                png = self.redis.get(key)
+            except Exception as e:
+                logger.warning(f"Chart cache: Redis get failed ({e})")
+                png = None
+            if png is not None:
+                self.memory.set(key, png)
+
+        if png is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return png
+
+    def set(self, key: str, png: bytes) -> None:
+        self.memory.set(key, png)
+        if self.redis is not None:
+            try:
+                self.redis.set(key, png)
+            except Exception as e:
+                logger.warning(f"Chart cache: Redis set failed ({e})")
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "memory_entries": len(self.memory),
+            "redis": self.redis is not None,
+        }
+
+
+# Global Instance
+chart_cache = ChartCache()
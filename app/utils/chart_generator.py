@@ -6,12 +6,21 @@ BP Chart Generator — สร้างกราฟ Blood Pressure เป็น
 
 ควบคุมด้วย ENV: CHART_RENDERER = auto | nodejs | quickchart
   - auto (default): ใช้ Node.js ถ้าพร้อม, ไม่งั้นใช้ QuickChart.io
+
+Node.js renderer ใช้ worker pool แบบ long-lived (chart_render_pool.py)
+  - CHART_WORKER_POOL_SIZE (default 2; 0 = spawn ใหม่ทุก request แบบเดิม)
+
+PNG ที่ render แล้วถูก cache แบบ content-addressed (chart_cache.py) — key เดียวกัน
+ใช้เป็น ETag ของ /api/v1/stats/chart
 """
 
+import atexit
+import hashlib
 import json
 import os
 import shutil
 import subprocess
+import threading
 from io import BytesIO
 from datetime import datetime
 from typing import List, Any
@@ -19,6 +28,9 @@ import logging
 
 import httpx
 
+from .chart_cache import chart_cache
+from .chart_render_pool import ChartRenderPool
+
 logger = logging.getLogger(__name__)
 
 # ═══════════════════════════════════════════════════════════════════
@@ -39,6 +51,16 @@ _NODE_READY = bool(
     and os.path.isdir(_NODE_MODULES)
 )
 
+# Persistent worker pool (POSIX only — the pool relies on select() over pipes)
+CHART_WORKER_POOL_SIZE = int(os.getenv("CHART_WORKER_POOL_SIZE", "2"))
+CHART_WORKER_TIMEOUT_SECONDS = float(os.getenv("CHART_WORKER_TIMEOUT_SECONDS", "15"))
+CHART_WORKER_HEALTHCHECK_SECONDS = float(os.getenv("CHART_WORKER_HEALTHCHECK_SECONDS", "60"))
+CHART_WORKER_MAX_JOBS = int(os.getenv("CHART_WORKER_MAX_JOBS", "500"))
+_USE_WORKER_POOL = CHART_WORKER_POOL_SIZE > 0 and os.name == "posix"
+
+_render_pool = None
+_render_pool_lock = threading.Lock()
+
 # QuickChart.io
 QUICKCHART_URL = os.getenv("QUICKCHART_URL", "https://quickchart.io/chart")
 
@@ -74,6 +96,9 @@ _COLORS = {
 BP_SYS_MAX = 140
 BP_DIA_MAX = 90
 
+CHART_WIDTH = 1200
+CHART_HEIGHT = 600
+
 
 # ═══════════════════════════════════════════════════════════════════
 # Public API
@@ -94,51 +119,112 @@ def generate_bp_chart(records: List[Any], lang: str = "en") -> BytesIO:
     Raises:
         RuntimeError: If no renderer is available or rendering fails
     """
-    # Sort records old → new
-    sorted_records = sorted(records, key=lambda r: _get_datetime(r))
+    return BytesIO(render_chart_png(build_chart_payload(records, lang)))
 
-    # Extract data
-    dates = [_get_datetime(r) for r in sorted_records]
-    sys_vals = [_get_attr(r, 'systolic') for r in sorted_records]
-    dia_vals = [_get_attr(r, 'diastolic') for r in sorted_records]
-    pulse_vals = [_get_attr(r, 'pulse') for r in sorted_records]
+
+def build_chart_payload(records: List[Any], lang: str = "en") -> dict:
+    """Extract the exact renderer input for a set of records (sorted old → new)."""
+    sorted_records = sorted(records, key=lambda r: _get_datetime(r))
 
     # Format date labels (DD/MM)
-    labels = [d.strftime('%d/%m') for d in dates]
+    labels = [_get_datetime(r).strftime('%d/%m') for r in sorted_records]
+
+    return {
+        "labels": labels,
+        "systolic": [_get_attr(r, 'systolic') for r in sorted_records],
+        "diastolic": [_get_attr(r, 'diastolic') for r in sorted_records],
+        "pulse": [_get_attr(r, 'pulse') for r in sorted_records],
+        "lang": lang,
+        "width": CHART_WIDTH,
+        "height": CHART_HEIGHT,
+    }
+
+
+def chart_cache_key(payload: dict) -> str:
+    """Content hash of a chart payload — identical input always renders the identical PNG."""
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def render_chart_png(payload: dict) -> bytes:
+    """Return PNG bytes for a chart payload, rendering only on a cache miss."""
+    key = chart_cache_key(payload)
+    png = chart_cache.get(key)
+    if png is not None:
+        return png
+
+    png = _render_chart(payload).getvalue()
+    chart_cache.set(key, png)
+    return png
+
+
+def _render_chart(payload: dict) -> BytesIO:
+    """Dispatch to the configured renderer."""
+    args = (payload["labels"], payload["systolic"], payload["diastolic"], payload["pulse"], payload["lang"])
 
     # Choose renderer
     if CHART_RENDERER == "nodejs":
         if not _NODE_READY:
             raise RuntimeError("CHART_RENDERER=nodejs but Node.js is not available")
-        return _render_chart_nodejs(labels, sys_vals, dia_vals, pulse_vals, lang)
+        return _render_chart_nodejs(*args)
 
     elif CHART_RENDERER == "quickchart":
-        return _render_chart_quickchart(labels, sys_vals, dia_vals, pulse_vals, lang)
+        return _render_chart_quickchart(*args)
 
     else:  # auto
         if _NODE_READY:
-            return _render_chart_nodejs(labels, sys_vals, dia_vals, pulse_vals, lang)
-        return _render_chart_quickchart(labels, sys_vals, dia_vals, pulse_vals, lang)
+            return _render_chart_nodejs(*args)
+        return _render_chart_quickchart(*args)
 
 
 # ═══════════════════════════════════════════════════════════════════
 # Node.js renderer (existing)
 # ═══════════════════════════════════════════════════════════════════
 
+def get_render_pool() -> ChartRenderPool:
+    """Return the process-wide Node.js render pool, creating it on first use."""
+    global _render_pool
+    if _render_pool is None:
+        with _render_pool_lock:
+            if _render_pool is None:
+                _render_pool = ChartRenderPool(
+                    [_NODE_BIN, _RENDER_SCRIPT, "--worker"],
+                    cwd=_CHART_RENDERER_DIR,
+                    size=CHART_WORKER_POOL_SIZE,
+                    job_timeout=CHART_WORKER_TIMEOUT_SECONDS,
+                    healthcheck_interval=CHART_WORKER_HEALTHCHECK_SECONDS,
+                    max_jobs_per_worker=CHART_WORKER_MAX_JOBS,
+                )
+                atexit.register(_render_pool.shutdown)
+    return _render_pool
+
+
 def _render_chart_nodejs(
     labels: list, sys_vals: list, dia_vals: list, pulse_vals: list, lang: str
 ) -> BytesIO:
-    """Render chart via Node.js Chart.js subprocess."""
-    payload = json.dumps({
+    """Render chart via Node.js Chart.js (pooled worker, or one-shot subprocess)."""
+    payload = {
         "labels": labels,
         "systolic": sys_vals,
         "diastolic": dia_vals,
         "pulse": pulse_vals,
         "lang": lang,
-        "width": 1200,
-        "height": 600,
-    })
+        "width": CHART_WIDTH,
+        "height": CHART_HEIGHT,
+    }
+
+    if _USE_WORKER_POOL:
+        # ChartRenderError / ChartWorkerError are RuntimeErrors, same contract as below
+        png = get_render_pool().render(payload)
+        if len(png) < 100:
+            raise RuntimeError("Chart render returned too little data (likely not a valid PNG)")
+        return BytesIO(png)
+
+    return _render_chart_nodejs_oneshot(json.dumps(payload))
+
 
+def _render_chart_nodejs_oneshot(payload: str) -> BytesIO:
+    """Render chart by spawning a fresh `node render.js` for this request."""
     result = subprocess.run(
         [_NODE_BIN, _RENDER_SCRIPT],
         input=payload.encode('utf-8'),
@@ -376,8 +462,8 @@ def _render_chart_quickchart(
     # QuickChart.io request — send chart as string so JS functions are evaluated
     request_body = json.dumps({
         "version": "2",
-        "width": 1200,
-        "height": 600,
+        "width": CHART_WIDTH,
+        "height": CHART_HEIGHT,
         "backgroundColor": "white",
         "chart": chart_json,
     })
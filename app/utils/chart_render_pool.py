@@ -0,0 +1,322 @@
+"""
+Chart Render Pool — long-lived Node.js render workers (render.js --worker)
+
+แทนการ spawn `node render.js` ใหม่ทุก request: worker แต่ละตัวโหลด Chart.js/canvas
+ครั้งเดียว แล้วรับงานผ่าน stdin/stdout แบบ framed protocol
+
+Protocol (ดู render.js):
+  request:  [uint32 BE length][JSON payload]      ({"type": "ping"} = health check)
+  response: [uint8 status][uint32 BE length][body] (0 = PNG / "pong", 1 = error message)
+
+Worker ที่ crash, timeout หรือตอบ frame ผิดรูปแบบจะถูก kill ทิ้ง และ pool จะ spawn
+ตัวใหม่ให้ request ถัดไปโดยอัตโนมัติ  worker ที่ว่างอยู่จะถูก ping ทุก healthcheck_interval
+โดย thread พื้นหลัง (เริ่มเมื่อ spawn worker ตัวแรก)
+"""
+
+import json
+import logging
+import os
+import select
+import struct
+import subprocess
+import threading
+import time
+from collections import deque
+from typing import Deque, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_REQUEST_HEADER = struct.Struct(">I")
+_RESPONSE_HEADER = struct.Struct(">BI")
+_PING_PAYLOAD = json.dumps({"type": "ping"}).encode("utf-8")
+_PING_TIMEOUT_SECONDS = 2.0
+
+
+class ChartRenderError(RuntimeError):
+    """The worker rejected the job (bad input, render exception). Worker stays healthy."""
+
+
+class ChartWorkerError(RuntimeError):
+    """The worker crashed, timed out or broke protocol. Worker is discarded."""
+
+
+class _RenderWorker:
+    """One `node render.js --worker` process."""
+
+    def __init__(self, command: List[str], cwd: Optional[str]):
+        self.process = subprocess.Popen(
+            command,
+            cwd=cwd,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=None,  # inherit: render.js warnings go to the service log
+            bufsize=0,
+        )
+        self.jobs_done = 0
+        self.last_used = time.monotonic()
+
+    @property
+    def pid(self) -> int:
+        return self.process.pid
+
+    def is_alive(self) -> bool:
+        return self.process.poll() is None
+
+    def request(self, payload: bytes, timeout: float) -> bytes:
+        deadline = time.monotonic() + timeout
+        try:
+            self.process.stdin.write(_REQUEST_HEADER.pack(len(payload)) + payload)
+            self.process.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            raise ChartWorkerError(f"Chart worker {self.pid} stdin closed: {e}")
+
+        status, length = _RESPONSE_HEADER.unpack(self._read_exact(_RESPONSE_HEADER.size, deadline))
+        body = self._read_exact(length, deadline)
+        self.last_used = time.monotonic()
+
+        if status != 0:
+            raise ChartRenderError(body.decode("utf-8", errors="replace"))
+        return body
+
+    def _read_exact(self, size: int, deadline: float) -> bytes:
+        fd = self.process.stdout.fileno()
+        chunks = []
+        remaining = size
+        while remaining:
+            wait = deadline - time.monotonic()
+            if wait <= 0:
+                raise ChartWorkerError(f"Chart worker {self.pid} timed out")
+            ready, _, _ = select.select([fd], [], [], wait)
+            if not ready:
+                continue
+            chunk = os.read(fd, min(remaining, 65536))
+            if not chunk:
+                raise ChartWorkerError(
+                    f"Chart worker {self.pid} exited (code {self.process.poll()})"
+                )
+            chunks.append(chunk)
+            remaining -= len(chunk)
+        return b"".join(chunks)
+
+    def stop(self, grace_seconds: float = 2.0) -> None:
+        """Close stdin so the worker finishes and exits; kill it if it lingers."""
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+        try:
+            self.process.wait(timeout=grace_seconds)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        self.process.stdout.close()
+
+    def kill(self) -> None:
+        if self.is_alive():
+            self.process.kill()
+        self.process.wait()
+        for pipe in (self.process.stdin, self.process.stdout):
+            try:
+                pipe.close()
+            except OSError:
+                pass
+
+
+class ChartRenderPool:
+    """Bounded pool of render workers, spawned lazily on demand.
+
+    Thread-safe: the API (sync routes run in the threadpool) and the bot
+    share a single pool per process. Callers waiting for a worker sleep on a
+    condition that is notified whenever a worker is released or a spawn slot
+    frees up (discard / retire), so they never miss freed capacity.
+    """
+
+    def __init__(
+        self,
+        command: List[str],
+        cwd: Optional[str] = None,
+        size: int = 2,
+        job_timeout: float = 15.0,
+        healthcheck_interval: float = 60.0,
+        max_jobs_per_worker: int = 500,
+    ):
+        self.command = command
+        self.cwd = cwd
+        self.size = max(1, size)
+        self.job_timeout = job_timeout
+        self.healthcheck_interval = healthcheck_interval
+        self.max_jobs_per_worker = max_jobs_per_worker
+
+        self._idle: Deque[_RenderWorker] = deque()
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+        self._spawned = 0
+        self._closed = False
+        self._health_thread: Optional[threading.Thread] = None
+        self._stop_health = threading.Event()
+        self._counters = {"jobs": 0, "render_errors": 0, "worker_failures": 0, "restarts": 0}
+
+    # ── Public API ───────────────────────────────────────────────
+
+    def render(self, payload: dict) -> bytes:
+        """Render one chart; returns PNG bytes.
+
+        Raises ChartRenderError for rejected jobs and ChartWorkerError when
+        the worker failed (crash/timeout) or no worker became free in time.
+        """
+        data = json.dumps(payload).encode("utf-8")
+        worker = self._acquire()
+        try:
+            png = worker.request(data, self.job_timeout)
+        except ChartRenderError:
+            self._bump("render_errors")
+            self._release(worker)
+            raise
+        except ChartWorkerError as e:
+            self._bump("worker_failures")
+            logger.warning(f"Chart render pool: discarding worker — {e}")
+            self._discard(worker)
+            raise
+        except BaseException:
+            self._discard(worker)
+            raise
+
+        worker.jobs_done += 1
+        self._bump("jobs")
+        self._release(worker)
+        return png
+
+    def health_check(self) -> dict:
+        """Ping every idle worker, replace dead ones, and return pool stats."""
+        with self._lock:
+            checked = list(self._idle)
+            self._idle.clear()
+        for worker in checked:
+            if self._ping(worker):
+                self._put_idle(worker)
+            else:
+                self._discard(worker)
+        return self.stats()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": self.size,
+                "spawned": self._spawned,
+                "idle": len(self._idle),
+                **self._counters,
+            }
+
+    def shutdown(self) -> None:
+        self._stop_health.set()
+        with self._lock:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            # Wake waiters so they fail fast instead of sitting out job_timeout
+            self._available.notify_all()
+        for worker in idle:
+            self._retire(worker)
+        if self._health_thread is not None and self._health_thread is not threading.current_thread():
+            self._health_thread.join(timeout=_PING_TIMEOUT_SECONDS + 1)
+
+    # ── Internals ────────────────────────────────────────────────
+
+    def _acquire(self) -> _RenderWorker:
+        deadline = time.monotonic() + self.job_timeout
+        while True:
+            worker = None
+            with self._available:
+                while True:
+                    if self._closed:
+                        raise ChartWorkerError("Chart render pool is shut down")
+                    if self._idle:
+                        worker = self._idle.popleft()
+                        break
+                    if self._spawned < self.size:
+                        self._spawned += 1  # reserve the slot; spawn outside the lock
+                        break
+                    wait = deadline - time.monotonic()
+                    if wait <= 0 or not self._available.wait(wait):
+                        raise ChartWorkerError("Chart render pool exhausted (all workers busy)")
+            if worker is None:
+                return self._spawn_reserved()
+
+            if not worker.is_alive():
+                self._discard(worker)
+                continue
+            if time.monotonic() - worker.last_used > self.healthcheck_interval and not self._ping(worker):
+                self._discard(worker)
+                continue
+            return worker
+
+    def _spawn_reserved(self) -> _RenderWorker:
+        """Start a worker for a slot already counted in _spawned by _acquire."""
+        try:
+            worker = _RenderWorker(self.command, self.cwd)
+        except OSError as e:
+            self._free_slot()
+            raise ChartWorkerError(f"Failed to start chart worker: {e}")
+        logger.info(f"Chart render pool: started worker pid={worker.pid}")
+        self._start_health_thread()
+        return worker
+
+    def _start_health_thread(self) -> None:
+        if self.healthcheck_interval <= 0:
+            return
+        with self._lock:
+            if self._health_thread is not None or self._closed:
+                return
+            self._health_thread = threading.Thread(
+                target=self._health_loop, name="chart-render-health", daemon=True
+            )
+        self._health_thread.start()
+
+    def _health_loop(self) -> None:
+        while not self._stop_health.wait(self.healthcheck_interval):
+            try:
+                self.health_check()
+            except Exception as e:
+                logger.warning(f"Chart render pool: health check failed — {e}")
+
+    def _ping(self, worker: _RenderWorker) -> bool:
+        try:
+            return worker.request(_PING_PAYLOAD, _PING_TIMEOUT_SECONDS) == b"pong"
+        except (ChartRenderError, ChartWorkerError):
+            return False
+
+    def _release(self, worker: _RenderWorker) -> None:
+        with self._lock:
+            closed = self._closed
+        if closed or worker.jobs_done >= self.max_jobs_per_worker:
+            # Recycle periodically so a slow leak in Node can't grow forever
+            self._retire(worker)
+            return
+        self._put_idle(worker)
+
+    def _put_idle(self, worker: _RenderWorker) -> None:
+        with self._available:
+            if not self._closed:
+                self._idle.append(worker)
+                self._available.notify()
+                return
+        self._retire(worker)
+
+    def _retire(self, worker: _RenderWorker) -> None:
+        worker.stop()
+        self._free_slot()
+
+    def _discard(self, worker: _RenderWorker) -> None:
+        worker.kill()
+        self._free_slot(restart=True)
+
+    def _free_slot(self, restart: bool = False) -> None:
+        with self._available:
+            self._spawned -= 1
+            if restart:
+                self._counters["restarts"] += 1
+            self._available.notify()
+
+    def _bump(self, counter: str) -> None:
+        with self._lock:
+            self._counters[counter] += 1
@@ -1,8 +1,13 @@
 
-from cryptography.fernet import Fernet
+from cryptography.fernet import Fernet, InvalidToken, MultiFernet
 import os
 import logging
 import hashlib
+import hmac
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Optional
 
 logger = logging.getLogger(__name__)
 
@@ -17,15 +22,111 @@ if not ENCRYPTION_KEY:
         "python -c 'from cryptography.fernet import Fernet; print(Fernet.generate_key().decode())'"
     )
 
-cipher_suite = Fernet(ENCRYPTION_KEY.encode())
+# Key rotation: ENCRYPTION_KEY may list several comma-separated keys.
+# The first encrypts; every key is tried for decryption (MultiFernet).
+# After prepending a new key, re-encrypt stored data with
+# `python -m app.services.key_rotation rotate`, then drop the old key.
+ENCRYPTION_KEYS = [k.strip() for k in ENCRYPTION_KEY.split(",") if k.strip()]
+cipher_suite = MultiFernet([Fernet(k.encode()) for k in ENCRYPTION_KEYS])
+
+# Key for the blind n-gram name index (user_name_tokens). It must stay fixed
+# across key rotation: deriving it from the primary key would change it the
+# moment a new key is prepended and empty every name search until a rebuild.
+# Unset, it is derived from the (single) ENCRYPTION_KEY; once several keys are
+# configured SEARCH_INDEX_KEY is required. Pin the current derived key before
+# rotating with `python -m app.services.name_search show-key` ("hex:..." =
+# raw key bytes). Changing it requires `python -m app.services.name_search rebuild`.
+SEARCH_INDEX_KEY = os.getenv("SEARCH_INDEX_KEY")
+if SEARCH_INDEX_KEY:
+    _search_index_key = (
+        bytes.fromhex(SEARCH_INDEX_KEY[4:]) if SEARCH_INDEX_KEY.startswith("hex:")
+        else SEARCH_INDEX_KEY.encode()
+    )
+elif len(ENCRYPTION_KEYS) > 1:
+    raise RuntimeError(
+        "SEARCH_INDEX_KEY is required when ENCRYPTION_KEY lists several keys. "
+        "Pin the current name index key before prepending a new one: "
+        "SEARCH_INDEX_KEY=$(python -m app.services.name_search show-key)"
+    )
+else:
+    _search_index_key = hmac.new(ENCRYPTION_KEYS[0].encode(), b"bp-name-search-index", hashlib.sha256).digest()
+
+# Optional process-wide cache of decrypted values, keyed on ciphertext.
+# Off by default: it keeps plaintext PII in memory for the life of the process.
+DECRYPT_CACHE_MAX_ENTRIES = int(os.getenv("DECRYPT_CACHE_MAX_ENTRIES", "0"))
+
+# decrypt_many/encrypt_many: batches at least this large are split across a thread pool
+CRYPTO_BATCH_POOL_THRESHOLD = int(os.getenv("CRYPTO_BATCH_POOL_THRESHOLD", "512"))
+CRYPTO_BATCH_WORKERS = int(os.getenv("CRYPTO_BATCH_WORKERS", "4"))
+
+
+class DecryptCache:
+    """Bounded LRU of ciphertext -> plaintext with hit/miss counters.
+
+    Fernet tokens carry a random IV, so a ciphertext maps to exactly one
+    plaintext and entries never go stale; re-encrypting a value simply
+    produces a new key.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.memo_hits = 0  # served by a per-instance memo (see decrypt_memoized)
+
+    def get(self, ciphertext: str):
+        if self.max_entries <= 0:
+            return None
+        with self._lock:
+            plaintext = self._entries.get(ciphertext)
+            if plaintext is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(ciphertext)
+            self.hits += 1
+            return plaintext
+
+    def set(self, ciphertext: str, plaintext: str) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[ciphertext] = plaintext
+            self._entries.move_to_end(ciphertext)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def record_memo_hit(self) -> None:
+        with self._lock:
+            self.memo_hits += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.max_entries > 0,
+                "max_entries": self.max_entries,
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "memo_hits": self.memo_hits,
+            }
+
+
+decrypt_cache = DecryptCache(DECRYPT_CACHE_MAX_ENTRIES)
 
 def encrypt_value(value: str) -> str:
     """Encrypt a string value."""
     if not value:
         return None
     try:
-        encrypted_text = cipher_suite.encrypt(value.encode())
-        return encrypted_text.decode()
+        encrypted_text = cipher_suite.encrypt(value.encode()).decode()
+        decrypt_cache.set(encrypted_text, value)
+        return encrypted_text
     except Exception as e:
         logger.error(f"Encryption failed: {e}")
         return None
@@ -34,12 +135,83 @@ def decrypt_value(value: str) -> str:
     """Decrypt a string value."""
     if not value:
         return None
+    cached = decrypt_cache.get(value)
+    if cached is not None:
+        return cached
     try:
-        decrypted_text = cipher_suite.decrypt(value.encode())
-        return decrypted_text.decode()
+        decrypted_text = cipher_suite.decrypt(value.encode()).decode()
     except Exception as e:
         logger.error(f"Decryption failed of value: {e}") # Don't log the val
         return None
+    decrypt_cache.set(value, decrypted_text)
+    return decrypted_text
+
+def decrypt_memoized(memo: dict, key: str, value: str) -> str:
+    """decrypt_value() through a caller-owned memo, e.g. one per ORM instance.
+
+    Entries are (ciphertext, plaintext) and only reused while the ciphertext
+    is unchanged, so a reloaded or reassigned column is never served stale.
+    """
+    entry = memo.get(key)
+    if entry is not None and entry[0] == value:
+        decrypt_cache.record_memo_hit()
+        return entry[1]
+    plaintext = decrypt_value(value)
+    memo[key] = (value, plaintext)
+    return plaintext
+
+_batch_executor = None
+_batch_executor_lock = threading.Lock()
+
+
+def _map_batch(func, values: list) -> list:
+    """`[func(v) for v in values]`, chunked over a thread pool for large batches."""
+    if len(values) < CRYPTO_BATCH_POOL_THRESHOLD or CRYPTO_BATCH_WORKERS <= 1:
+        return [func(v) for v in values]
+
+    global _batch_executor
+    with _batch_executor_lock:
+        if _batch_executor is None:
+            _batch_executor = ThreadPoolExecutor(
+                max_workers=CRYPTO_BATCH_WORKERS, thread_name_prefix="crypto-batch"
+            )
+    chunk_size = -(-len(values) // CRYPTO_BATCH_WORKERS)
+    chunks = [values[i:i + chunk_size] for i in range(0, len(values), chunk_size)]
+    results = []
+    for part in _batch_executor.map(lambda chunk: [func(v) for v in chunk], chunks):
+        results.extend(part)
+    return results
+
+
+def decrypt_many(values: Iterable[Optional[str]]) -> List[Optional[str]]:
+    """decrypt_value() over a column of ciphertexts, preserving order.
+
+    Empty values map to None without touching Fernet, and each distinct
+    ciphertext is decrypted once.
+    """
+    values = list(values)
+    unique = list({v for v in values if v})
+    plaintexts = dict(zip(unique, _map_batch(decrypt_value, unique)))
+    return [plaintexts.get(v) if v else None for v in values]
+
+
+def encrypt_many(values: Iterable[Optional[str]]) -> List[Optional[str]]:
+    """encrypt_value() over a list of plaintexts, preserving order.
+
+    Each value gets its own token (fresh IV), so duplicates are not collapsed.
+    """
+    return _map_batch(encrypt_value, list(values))
+
+
+def rotate_value(value: str) -> Optional[str]:
+    """Re-encrypt a token under the primary key. None if no configured key can read it."""
+    if not value:
+        return None
+    try:
+        return cipher_suite.rotate(value.encode()).decode()
+    except InvalidToken:
+        return None
+
 
 def hash_value(value: str) -> str:
     """Hash a value using SHA-256 for exact match search/indexing."""
@@ -52,3 +224,24 @@ def hash_value(value: str) -> str:
     except Exception as e:
         logger.error(f"Hashing failed: {e}")
         return None
+
+def normalize_search_text(value: str) -> str:
+    """Lowercase and collapse whitespace — the form both indexing and queries use."""
+    return " ".join(value.lower().split()) if value else ""
+
+def ngram_tokens(value: str, n: int) -> set:
+    """Keyed-HMAC tokens of every n-character gram of `value` (normalized).
+
+    Tokens are truncated to 64 bits: a collision only adds a candidate that
+    the caller's plaintext check then drops.
+    """
+    text = normalize_search_text(value)
+    grams = {text[i:i + n] for i in range(len(text) - n + 1)}
+    return {
+        hmac.new(_search_index_key, gram.encode(), hashlib.sha256).hexdigest()[:16]
+        for gram in grams
+    }
+
+def name_search_tokens(value: str) -> set:
+    """Index tokens for a name: bigrams (2-char queries) and trigrams."""
+    return ngram_tokens(value, 2) | ngram_tokens(value, 3)
@@ -0,0 +1,93 @@
+"""
+Export Artifact Store — ไฟล์ผลลัพธ์ของ background export jobs
+
+เก็บบน local filesystem ใต้ EXPORT_ARTIFACT_DIR (key = "<user_id>/<job_id>.<ext>")
+API แคบโดยตั้งใจ (write / iter_chunks / delete / delete_older_than) เพื่อให้เปลี่ยนเป็น
+object store (S3, GCS, R2) ได้ภายหลังโดยไม่ต้องแก้ router
+
+- write() เขียนลงไฟล์ ".part" ก่อนแล้ว os.replace — ไม่มีใครดาวน์โหลดไฟล์ที่เขียนไม่เสร็จ
+- delete_older_than() ใช้ mtime เก็บกวาดไฟล์ที่ไม่มี job อ้างถึงแล้ว (เช่น process ตายกลางทาง)
+"""
+
+import os
+import logging
+import tempfile
+import time
+from typing import Iterable, Iterator
+
+logger = logging.getLogger(__name__)
+EXPORT_ARTIFACT_DIR = os.getenv(
+    "EXPORT_ARTIFACT_DIR", os.path.join(tempfile.gettempdir(), "bp_exports")
+)
+
+
+class LocalExportStore:
+    """Artifact store backed by a local (or mounted) directory."""
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+
+    def _path(self, key: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, key))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError(f"Invalid artifact key: {key!r}")
+        return path
+
+    def write(self, key: str, chunks: Iterable[bytes]) -> int:
+        """Store `chunks` under `key`; returns the artifact size in bytes."""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        partial = path + ".part"
+        size = 0
+        try:
+            with open(partial, "wb") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    size += len(chunk)
+            os.replace(partial, path)
+        except BaseException:
+            if os.path.exists(partial):
+                os.remove(partial)
+            raise
+        return size
+
+    def exists(self, key: str) -> bool:
+        return os.path.isfile(self._path(key))
+
+    def iter_chunks(self, key: str, chunk_size: int = 64 * 1024) -> Iterator[bytes]:
+        with open(self._path(key), "rb") as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+
+    def delete(self, key: str) -> bool:
+        try:
+            os.remove(self._path(key))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def delete_older_than(self, max_age_seconds: int) -> int:
+        """Remove artifacts (and stale .part files) not modified for `max_age_seconds`."""
+        if not os.path.isdir(self.root):
+            return 0
+        cutoff = time.time() - max_age_seconds
+        removed = 0
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                try:
+                    if os.path.getmtime(path) < cutoff:
+                        os.remove(path)
+                        removed += 1
+                except FileNotFoundError:
+                    continue
+        if removed:
+            logger.info(f"Export store: removed {removed} expired artifact(s)")
+        return removed
+
+
+# Global Instance
+export_store = LocalExportStore(EXPORT_ARTIFACT_DIR)
@@ -0,0 +1,143 @@
+"""
+OCR Result Cache — skip Gemini for photos we've already read
+
+Key = GEMINI_MODEL + user id + sha256 ของไฟล์ที่อัปโหลด (ตรงทุก byte เท่านั้น)
+ใช้กับการส่งรูปเดิมซ้ำ (retry หลัง timeout, กดส่งซ้ำ) ของผู้ใช้คนเดิม
+
+ไม่ใช้ perceptual hash: hash ของ layout รูปไม่เห็นตัวเลขบนจอ — รูปเครื่องเดิมคนละค่าความดัน
+ได้ hash เดียวกัน แล้วจะได้ค่าเก่า (หรือค่าของผู้ใช้อื่น) กลับไป
+และ scope ตาม user เสมอ: ไม่มี user id = ไม่ใช้ cache
+
+เก็บเฉพาะคำตอบดิบของ Gemini (JSON text) — ไม่เก็บ OCRResult ทั้งก้อน เพราะวันที่/เวลา
+fallback (EXIF / upload_time) ต้องคำนวณใหม่ตามการส่งแต่ละครั้ง
+
+Tiers:
+  - memory: LRU + TTL ใน process (OCR_CACHE_MAX_ENTRIES, 0 = ปิด)
+  - redis:  ใช้ร่วมกันระหว่าง API workers + bot เมื่อมี REDIS_URL
+"""
+
+import os
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+REDIS_URL = os.getenv("REDIS_URL")
+OCR_CACHE_MAX_ENTRIES = int(os.getenv("OCR_CACHE_MAX_ENTRIES", "512"))
+OCR_CACHE_TTL_SECONDS = int(os.getenv("OCR_CACHE_TTL_SECONDS", "3600"))
+
+
+class MemoryOCRCache:
+    """Bounded in-process LRU of Gemini responses, keyed by (model, user id, image sha256)."""
+
+    def __init__(self, max_entries: int, ttl_seconds: int):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # (model, user_id, digest) -> (expires_at, response_text)
+        self._lock = threading.Lock()
+
+    def get(self, model: str, user_id: int, image_digest: str) -> Optional[str]:
+        now = time.monotonic()
+        key = (model, user_id, image_digest)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= now:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, model: str, user_id: int, image_digest: str, response_text: str) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            key = (model, user_id, image_digest)
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, response_text)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RedisOCRCache:
+    """Redis-backed response cache shared across processes."""
+
+    def __init__(self, redis_url: str, ttl_seconds: int):
+        import redis
+        self.client = redis.from_url(redis_url, decode_responses=True)
+        self.prefix = "ocr_result:"
+        self.ttl_seconds = ttl_seconds
+
+    def get(self, model: str, user_id: int, image_digest: str) -> Optional[str]:
+        return self.client.get(f"{self.prefix}{model}:{user_id}:{image_digest}")
+
+    def set(self, model: str, user_id: int, image_digest: str, response_text: str) -> None:
+        self.client.setex(f"{self.prefix}{model}:{user_id}:{image_digest}", self.ttl_seconds, response_text)
+
+
+class OCRResultCache:
+    """Two-tier OCR response cache: memory LRU first, then Redis (if configured).
+
+    Cache failures never fail an OCR request — a Redis error is logged and
+    treated as a miss.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = OCR_CACHE_MAX_ENTRIES,
+        ttl_seconds: int = OCR_CACHE_TTL_SECONDS,
+        redis_url: Optional[str] = REDIS_URL,
+    ):
+        self.memory = MemoryOCRCache(max_entries, ttl_seconds)
+        self.redis = None
+        if redis_url and ttl_seconds > 0:
+            try:
+                self.redis = RedisOCRCache(redis_url, ttl_seconds)
+                logger.info("OCR cache: Using memory + Redis tiers")
+            except Exception as e:
+                logger.warning(f"OCR cache: Redis failed ({e}), using memory tier only")
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, model: str, user_id: int, image_digest: str) -> Optional[str]:
+        response_text = self.memory.get(model, user_id, image_digest)
+        if response_text is None and self.redis is not None:
+            try:
+                response_text = self.redis.get(model, user_id, image_digest)
+            except Exception as e:
+                logger.warning(f"OCR cache: Redis get failed ({e})")
+                response_text = None
+            if response_text is not None:
+                self.memory.set(model, user_id, image_digest, response_text)
+
+        if response_text is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return response_text
+
+    def set(self, model: str, user_id: int, image_digest: str, response_text: str) -> None:
+        self.memory.set(model, user_id, image_digest, response_text)
+        if self.redis is not None:
+            try:
+                self.redis.set(model, user_id, image_digest, response_text)
+            except Exception as e:
+                logger.warning(f"OCR cache: Redis set failed ({e})")
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "memory_entries": len(self.memory),
+            "redis": self.redis is not None,
+        }
+
+
+# Global Instance
+ocr_result_cache = OCRResultCache()
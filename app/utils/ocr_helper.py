@@ -2,7 +2,11 @@
 import os
 import io
 import json
+import hashlib
+import asyncio
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import google.generativeai as genai
 from google.api_core import exceptions as gax_exc
 import PIL.Image
@@ -12,6 +16,8 @@ from ..schemas import OCRResult
 from datetime import datetime, timedelta
 from typing import Optional, Tuple
 from .timezone import now_tz
+from .ocr_cache import ocr_result_cache
+from .ocr_queue import OCRQueueFull, ocr_queue
 
 # OCR date sanity check: discard OCR-read date if it's this many days away from upload time.
 # BP monitors with un-set internal clocks often report defaults like 2024-01-01 — this catches them.
@@ -23,23 +29,33 @@ logger = logging.getLogger(__name__)
 GOOGLE_AI_API_KEY = os.getenv("GOOGLE_AI_API_KEY")
 GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
 
+try:
+    import pillow_heif
+    pillow_heif.register_heif_opener()
+    HEIF_SUPPORTED = True
+except ImportError:
+    HEIF_SUPPORTED = False
+
 if GOOGLE_AI_API_KEY:
     genai.configure(api_key=GOOGLE_AI_API_KEY)
 else:
     logger.warning("GOOGLE_AI_API_KEY not set, OCR features will not work")
 
+def _exif_metadata(img: PIL.Image.Image) -> dict:
+    """EXIF tags of an already-opened image as {tag_name: str(value)}."""
+    exif = img.getexif()
+    if not exif:
+        return {}
+    tags = dict(exif.items())
+    tags.update(exif.get_ifd(0x8769))  # Exif sub-IFD: DateTimeOriginal lives here
+    return {TAGS.get(tag, tag): str(value) for tag, value in tags.items()}  # str for safety
+
+
 def get_image_metadata(image_path: str) -> dict:
     """Extract metadata from image"""
     try:
-        img = PIL.Image.open(image_path)
-        exif_data = img._getexif()
-        if exif_data:
-            metadata = {}
-            for tag, value in exif_data.items():
-                tag_name = TAGS.get(tag, tag)
-                metadata[tag_name] = str(value) # Convert to string for safety
-            return metadata
-        return {}
+        with PIL.Image.open(image_path) as img:
+            return _exif_metadata(img)
     except Exception as e:
         logger.error(f"Error reading image metadata: {e}")
         return {}
@@ -70,72 +86,151 @@ def extract_exif_datetime(metadata: dict):
     return None
 
 
-# Image formats that some Gemini models reject (e.g., gemini-2.5-flash rejects MPO).
-# We re-encode these to JPEG before sending. Camera/phone burst shots are commonly MPO.
-_REENCODE_FORMATS = {"MPO"}
-
-
-def _prepare_image_for_gemini(image_path: str) -> Tuple[PIL.Image.Image, dict]:
-    """Open image, validate, and re-encode unsupported formats (e.g. MPO) to JPEG.
-
-    Returns the PIL.Image to send to Gemini and the EXIF metadata read from the
-    *original* file (re-encoding strips EXIF — we capture it before flattening).
+# Formats sent to Gemini as the original upload bytes when no resize/crop is needed.
+# Everything else is re-encoded in memory — e.g. gemini-2.5-flash rejects MPO
+# (camera/phone burst shots), and HEIC/HEIF (iPhone) is decoded via pillow-heif.
+_PASSTHROUGH_MIME_TYPES = {"JPEG": "image/jpeg", "PNG": "image/png", "WEBP": "image/webp"}
+_OUTPUT_MIME_TYPES = {"JPEG": "image/jpeg", "WEBP": "image/webp"}
+
+# Preprocessing before upload: phone photos are 3-12 MB, but a BP monitor LCD reads
+# fine at ~1.5k px, and Gemini bills images by size.
+OCR_IMAGE_MAX_EDGE = int(os.getenv("OCR_IMAGE_MAX_EDGE", "1536"))  # 0 = keep original size
+OCR_IMAGE_FORMAT = os.getenv("OCR_IMAGE_FORMAT", "JPEG").upper()
+OCR_IMAGE_QUALITY = int(os.getenv("OCR_IMAGE_QUALITY", "85"))
+OCR_IMAGE_CROP_LCD = os.getenv("OCR_IMAGE_CROP_LCD", "false").lower() == "true"
+if OCR_IMAGE_FORMAT not in _OUTPUT_MIME_TYPES:
+    logger.warning(f"OCR_IMAGE_FORMAT={OCR_IMAGE_FORMAT} not supported, using JPEG")
+    OCR_IMAGE_FORMAT = "JPEG"
+# Decode + downscale + re-encode is CPU-bound (~0.6 s for a 12 MP JPEG): the async path
+# runs it on its own small pool so a photo burst can't take over the default executor
+OCR_PREPROCESS_WORKERS = max(1, int(os.getenv("OCR_PREPROCESS_WORKERS", "2")))
+_preprocess_executor = ThreadPoolExecutor(max_workers=OCR_PREPROCESS_WORKERS, thread_name_prefix="ocr-prep")
+
+# LCD crop heuristic: analysed on a small grayscale copy
+_LCD_PROBE_SIZE = 256
+_LCD_EDGE_THRESHOLD = 48
+_LCD_DENSITY_RATIO = 0.35
+_LCD_PADDING_RATIO = 0.08
+_LCD_MIN_AREA_RATIO = 0.08
+
+_preprocess_lock = threading.Lock()
+_preprocess_counters = {"images": 0, "passthrough": 0, "resized": 0, "cropped": 0, "bytes_in": 0, "bytes_out": 0}
+
+
+def _find_lcd_box(img: PIL.Image.Image) -> Optional[Tuple[int, int, int, int]]:
+    """Guess the display region: the band of rows/columns densest in edges (the digits).
+
+    Returns a padded (left, upper, right, lower) box in `img` coordinates, or
+    None when the guess is implausible (too small, or basically the whole photo).
     """
-    metadata = get_image_metadata(image_path)
+    from PIL import ImageFilter
+
+    probe = img.convert("L")
+    probe.thumbnail((_LCD_PROBE_SIZE, _LCD_PROBE_SIZE))
+    edges = probe.filter(ImageFilter.FIND_EDGES).point(lambda v: 255 if v > _LCD_EDGE_THRESHOLD else 0)
+    # FIND_EDGES marks the image border itself as an edge — drop a 1 px frame
+    edges = edges.crop((1, 1, edges.width - 1, edges.height - 1))
+    width, height = edges.size
+
+    def dense_span(profile: list) -> Optional[Tuple[int, int]]:
+        peak = max(profile)
+        if peak == 0:
+            return None
+        dense = [i for i, v in enumerate(profile) if v >= peak * _LCD_DENSITY_RATIO]
+        return dense[0], dense[-1] + 1
+
+    # BOX-resizing to a single row/column averages edge density per column/row
+    cols = dense_span(list(edges.resize((width, 1), PIL.Image.BOX).tobytes()))
+    rows = dense_span(list(edges.resize((1, height), PIL.Image.BOX).tobytes()))
+    if cols is None or rows is None:
+        return None
 
-    img = PIL.Image.open(image_path)
-    img.verify()
-    img = PIL.Image.open(image_path)
+    pad_x, pad_y = width * _LCD_PADDING_RATIO, height * _LCD_PADDING_RATIO
+    left, right = max(0, cols[0] - pad_x), min(width, cols[1] + pad_x)
+    upper, lower = max(0, rows[0] - pad_y), min(height, rows[1] + pad_y)
+    area_ratio = (right - left) * (lower - upper) / (width * height)
+    if not _LCD_MIN_AREA_RATIO <= area_ratio <= 0.9:
+        return None
 
-    if img.format in _REENCODE_FORMATS:
-        # MPO is multi-frame; PIL gives us the first (primary) frame only when seek(0).
-        img.seek(0)
-        if img.mode not in ("RGB", "L"):
-            img = img.convert("RGB")
-        buf = io.BytesIO()
-        img.save(buf, format="JPEG", quality=92)
-        buf.seek(0)
-        img = PIL.Image.open(buf)
-        logger.info(f"Re-encoded {image_path} from MPO to JPEG for Gemini")
+    scale_x, scale_y = img.width / probe.width, img.height / probe.height
+    return (
+        round((left + 1) * scale_x), round((upper + 1) * scale_y),
+        round((right + 1) * scale_x), round((lower + 1) * scale_y),
+    )
 
-    return img, metadata
 
+def _prepare_image_for_gemini(image_data: bytes) -> Tuple[dict, dict, str]:
+    """Decode and validate the upload once, then downscale/crop/recompress it for Gemini.
 
-def read_blood_pressure_with_gemini(
-    image_path: str,
-    upload_time: Optional[datetime] = None,
-) -> OCRResult:
-    """Read blood pressure values from image using Gemini API with priority timestamp logic.
+    CPU-bound and blocking: async callers go through _preprocess_executor.
 
-    Timestamp fallback order: OCR (image) → EXIF → upload_time (caller-provided) → now_tz().
-    OCR date/time is discarded if it falls outside ±OCR_DATE_SANITY_WINDOW_DAYS of the
-    reference time (upload_time or now) to guard against BP monitors with unset clocks.
+    Returns the inline blob ({"mime_type", "data"}) to send to Gemini, the
+    EXIF metadata read from the *original* image (re-encoding strips EXIF),
+    and the sha256 of the uploaded bytes (OCR result cache key).
+    Passing a blob rather than a PIL.Image stops the SDK re-encoding it again.
     """
-    if not GOOGLE_AI_API_KEY:
-        return OCRResult(
-            error="Google AI API key not configured",
-            error_code="OCR_NOT_CONFIGURED",
-        )
-
-    model = genai.GenerativeModel(GEMINI_MODEL)
-
-    try:
-        img, metadata = _prepare_image_for_gemini(image_path)
-    except FileNotFoundError:
-        return OCRResult(error="Image not found", error_code="OCR_IMAGE_INVALID")
-    except PIL.Image.UnidentifiedImageError:
-        return OCRResult(
-            error="Unsupported image format. Please send as JPEG or PNG.",
-            error_code="OCR_UNSUPPORTED_FORMAT",
-        )
-    except Exception as e:
-        logger.error(f"Error opening image {image_path}: {e}")
-        return OCRResult(
-            error="Cannot read image. Please try JPEG or PNG format.",
-            error_code="OCR_IMAGE_INVALID",
-        )
-
-    prompt = """
+    img = PIL.Image.open(io.BytesIO(image_data))
+    metadata = _exif_metadata(img)
+    img.load()  # full decode — raises on truncated/corrupt data; MPO stays on the primary frame
+    image_digest = hashlib.sha256(image_data).hexdigest()
+
+    from PIL import ImageOps
+
+    source_format = img.format
+    needs_resize = OCR_IMAGE_MAX_EDGE > 0 and max(img.size) > OCR_IMAGE_MAX_EDGE
+    passthrough_mime = _PASSTHROUGH_MIME_TYPES.get(source_format)
+
+    crop_box = None
+    if OCR_IMAGE_CROP_LCD:
+        # Re-encoding drops EXIF, so orientation is baked into the pixels (before cropping)
+        img = ImageOps.exif_transpose(img)
+        crop_box = _find_lcd_box(img)
+
+    if passthrough_mime and not needs_resize and crop_box is None:
+        _record_preprocess(len(image_data), len(image_data), passthrough=True)
+        return {"mime_type": passthrough_mime, "data": bytes(image_data)}, metadata, image_digest
+
+    if not OCR_IMAGE_CROP_LCD:
+        img = ImageOps.exif_transpose(img)
+    if crop_box is not None:
+        img = img.crop(crop_box)
+    if OCR_IMAGE_MAX_EDGE > 0 and max(img.size) > OCR_IMAGE_MAX_EDGE:
+        img.thumbnail((OCR_IMAGE_MAX_EDGE, OCR_IMAGE_MAX_EDGE), PIL.Image.LANCZOS)
+    if img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+
+    buf = io.BytesIO()
+    img.save(buf, format=OCR_IMAGE_FORMAT, quality=OCR_IMAGE_QUALITY)
+    encoded = buf.getvalue()
+
+    _record_preprocess(len(image_data), len(encoded), resized=needs_resize, cropped=crop_box is not None)
+    logger.info(
+        f"OCR image {source_format} {len(image_data)} B -> {OCR_IMAGE_FORMAT} {img.width}x{img.height} "
+        f"{len(encoded)} B" + (" (LCD crop)" if crop_box is not None else "")
+    )
+    return {"mime_type": _OUTPUT_MIME_TYPES[OCR_IMAGE_FORMAT], "data": encoded}, metadata, image_digest
+
+
+def _record_preprocess(bytes_in: int, bytes_out: int, passthrough: bool = False,
+                       resized: bool = False, cropped: bool = False) -> None:
+    with _preprocess_lock:
+        _preprocess_counters["images"] += 1
+        _preprocess_counters["passthrough"] += int(passthrough)
+        _preprocess_counters["resized"] += int(resized)
+        _preprocess_counters["cropped"] += int(cropped)
+        _preprocess_counters["bytes_in"] += bytes_in
+        _preprocess_counters["bytes_out"] += bytes_out
+
+
+def get_preprocess_stats() -> dict:
+    """Before/after upload sizes for images prepared in this process."""
+    with _preprocess_lock:
+        stats = dict(_preprocess_counters)
+    stats["bytes_saved"] = stats["bytes_in"] - stats["bytes_out"]
+    return stats
+
+
+_OCR_PROMPT = """
     Analyze this blood pressure monitor screen image:
     1. Extract Systolic, Diastolic, and Pulse values.
        - Note: Standard vertical layout is usually Systolic (Top), Diastolic (Middle), Pulse (Bottom).
@@ -153,126 +248,252 @@ def read_blood_pressure_with_gemini(
     4. If any value is completely illegible or missing, use null.
     """
 
+
+def _open_image_or_error(image_data: bytes) -> Tuple[Optional[dict], dict, Optional[str], Optional[OCRResult]]:
+    """Returns (blob, metadata, image_digest, None), or (None, {}, None, error_result) if unusable."""
+    if not image_data:
+        return None, {}, None, OCRResult(error="Image is empty", error_code="OCR_IMAGE_INVALID")
     try:
-        # Generate content
-        response = model.generate_content([prompt, img])
-        
-        # Clean response
-        raw_text = response.text.replace("```json\n", "").replace(
-            "\n```", "").replace("```json", "").replace("```", "").strip()
-
-        try:
-            result_data = json.loads(raw_text)
-            # metadata already captured by _prepare_image_for_gemini before any re-encode
-
-            # --- Timestamp Logic Priority ---
-            # OCR → EXIF → upload_time (caller) → now_tz() (defensive)
-            final_date = None
-            final_time = None
-            date_source = "Unknown"
-            time_source = "Unknown"
-
-            # Reference time for sanity checks and final fallback.
-            # Prefer caller-provided upload_time (e.g. Telegram message.date or request start time);
-            # fall back to now_tz() if caller didn't pass one.
-            reference_time = upload_time or now_tz()
-            # Normalize to naive (compare against naive datetimes built from OCR/EXIF strings).
-            if reference_time.tzinfo is not None:
-                reference_time = reference_time.replace(tzinfo=None)
-
-            # 1. OCR (with sanity check to reject BP-monitor default-clock dates)
-            ocr_date = result_data.get("date")
-            ocr_time = result_data.get("time")
-            ocr_date_rejected = False
-
-            if ocr_date:
-                try:
-                    parsed_ocr_date = datetime.strptime(ocr_date, "%Y-%m-%d")
-                    delta_days = abs((parsed_ocr_date.date() - reference_time.date()).days)
-                    if delta_days <= OCR_DATE_SANITY_WINDOW_DAYS:
-                        final_date = ocr_date
-                        date_source = "OCR"
-                    else:
-                        ocr_date_rejected = True
-                        logger.warning(
-                            f"OCR date {ocr_date} rejected: {delta_days} days from reference "
-                            f"{reference_time.date()} (window: {OCR_DATE_SANITY_WINDOW_DAYS})"
-                        )
-                except ValueError:
-                    pass
-
-            if ocr_time:
-                try:
-                    datetime.strptime(ocr_time, "%H:%M")  # Validate format
-                    final_time = ocr_time
-                    time_source = "OCR"
-                except ValueError:
-                    pass
-
-            # 2. EXIF Data (fill gaps)
-            exif_dt = None
-            if not final_date or not final_time:
-                exif_dt = extract_exif_datetime(metadata)
-
-            if exif_dt:
-                if not final_date:
-                    final_date = exif_dt.strftime("%Y-%m-%d")
-                    date_source = "EXIF"
-                if not final_time:
-                    final_time = exif_dt.strftime("%H:%M")
-                    time_source = "EXIF"
-
-            # 3. Upload time (caller-provided) — represents when the server received the file.
-            # Preferred over now_tz() because the Gemini call may add several seconds of delay.
+        blob, metadata, image_digest = _prepare_image_for_gemini(image_data)
+        return blob, metadata, image_digest, None
+    except PIL.Image.UnidentifiedImageError:
+        return None, {}, None, OCRResult(
+            error="Unsupported image format. Please send as JPEG or PNG.",
+            error_code="OCR_UNSUPPORTED_FORMAT",
+        )
+    except Exception as e:
+        logger.error(f"Error opening image ({len(image_data)} bytes): {e}")
+        return None, {}, None, OCRResult(
+            error="Cannot read image. Please try JPEG or PNG format.",
+            error_code="OCR_IMAGE_INVALID",
+        )
+
+
+def _parse_gemini_response(text: str, metadata: dict, upload_time: Optional[datetime]) -> OCRResult:
+    """Turn Gemini's JSON answer into an OCRResult, applying the timestamp priority logic."""
+    # Clean response
+    raw_text = text.replace("```json\n", "").replace(
+        "\n```", "").replace("```json", "").replace("```", "").strip()
+
+    try:
+        result_data = json.loads(raw_text)
+        # metadata already captured by _prepare_image_for_gemini before any re-encode
+
+        # --- Timestamp Logic Priority ---
+        # OCR → EXIF → upload_time (caller) → now_tz() (defensive)
+        final_date = None
+        final_time = None
+        date_source = "Unknown"
+        time_source = "Unknown"
+
+        # Reference time for sanity checks and final fallback.
+        # Prefer caller-provided upload_time (e.g. Telegram message.date or request start time);
+        # fall back to now_tz() if caller didn't pass one.
+        reference_time = upload_time or now_tz()
+        # Normalize to naive (compare against naive datetimes built from OCR/EXIF strings).
+        if reference_time.tzinfo is not None:
+            reference_time = reference_time.replace(tzinfo=None)
+
+        # 1. OCR (with sanity check to reject BP-monitor default-clock dates)
+        ocr_date = result_data.get("date")
+        ocr_time = result_data.get("time")
+        ocr_date_rejected = False
+
+        if ocr_date:
+            try:
+                parsed_ocr_date = datetime.strptime(ocr_date, "%Y-%m-%d")
+                delta_days = abs((parsed_ocr_date.date() - reference_time.date()).days)
+                if delta_days <= OCR_DATE_SANITY_WINDOW_DAYS:
+                    final_date = ocr_date
+                    date_source = "OCR"
+                else:
+                    ocr_date_rejected = True
+                    logger.warning(
+                        f"OCR date {ocr_date} rejected: {delta_days} days from reference "
+                        f"{reference_time.date()} (window: {OCR_DATE_SANITY_WINDOW_DAYS})"
+                    )
+            except ValueError:
+                pass
+
+        if ocr_time:
+            try:
+                datetime.strptime(ocr_time, "%H:%M")  # Validate format
+                final_time = ocr_time
+                time_source = "OCR"
+            except ValueError:
+                pass
+
+        # 2. EXIF Data (fill gaps)
+        exif_dt = None
+        if not final_date or not final_time:
+            exif_dt = extract_exif_datetime(metadata)
+
+        if exif_dt:
             if not final_date:
-                final_date = reference_time.strftime("%Y-%m-%d")
-                date_source = "Upload" if upload_time else "Fallback"
+                final_date = exif_dt.strftime("%Y-%m-%d")
+                date_source = "EXIF"
             if not final_time:
-                final_time = reference_time.strftime("%H:%M")
-                time_source = "Upload" if upload_time else "Fallback"
-
-            source_notes = [f"Date: {date_source}", f"Time: {time_source}"]
-            if ocr_date_rejected:
-                source_notes.append(f"OCR-date-rejected: {ocr_date}")
-
-            return OCRResult(
-                systolic=result_data.get("systolic"),
-                diastolic=result_data.get("diastolic"),
-                pulse=result_data.get("pulse"),
-                measurement_date=final_date,
-                measurement_time=final_time,
-                confidence=0.95,
-                image_metadata=metadata,
-                raw_response=f"Source: {', '.join(source_notes)}"
-            )
+                final_time = exif_dt.strftime("%H:%M")
+                time_source = "EXIF"
+
+        # 3. Upload time (caller-provided) — represents when the server received the file.
+        # Preferred over now_tz() because the Gemini call may add several seconds of delay.
+        if not final_date:
+            final_date = reference_time.strftime("%Y-%m-%d")
+            date_source = "Upload" if upload_time else "Fallback"
+        if not final_time:
+            final_time = reference_time.strftime("%H:%M")
+            time_source = "Upload" if upload_time else "Fallback"
+
+        source_notes = [f"Date: {date_source}", f"Time: {time_source}"]
+        if ocr_date_rejected:
+            source_notes.append(f"OCR-date-rejected: {ocr_date}")
 
-        except json.JSONDecodeError:
-            return OCRResult(
-                error="Could not parse response as JSON",
-                error_code="OCR_PARSE_FAILED",
-                raw_response=raw_text,
-                image_metadata=metadata,
-            )
+        return OCRResult(
+            systolic=result_data.get("systolic"),
+            diastolic=result_data.get("diastolic"),
+            pulse=result_data.get("pulse"),
+            measurement_date=final_date,
+            measurement_time=final_time,
+            confidence=0.95,
+            image_metadata=metadata,
+            raw_response=f"Source: {', '.join(source_notes)}"
+        )
+
+    except json.JSONDecodeError:
+        return OCRResult(
+            error="Could not parse response as JSON",
+            error_code="OCR_PARSE_FAILED",
+            raw_response=raw_text,
+            image_metadata=metadata,
+        )
+
+
+def _cached_result(user_id: Optional[int], image_digest: Optional[str], metadata: dict,
+                   upload_time: Optional[datetime]) -> Optional[OCRResult]:
+    """Rebuild an OCRResult from a cached Gemini answer for this user's byte-identical upload."""
+    if user_id is None or not image_digest:
+        return None
+    response_text = ocr_result_cache.get(GEMINI_MODEL, user_id, image_digest)
+    if response_text is None:
+        return None
+    logger.info(f"OCR cache hit for user {user_id} image {image_digest[:12]} — skipping Gemini")
+    # Timestamp fallbacks depend on this submission's EXIF/upload_time, so re-parse
+    return _parse_gemini_response(response_text, metadata, upload_time)
 
-    except gax_exc.ResourceExhausted as e:
+
+def _remember_result(user_id: Optional[int], image_digest: Optional[str], response_text: str,
+                     result: OCRResult) -> None:
+    # Only cache complete readings — a retry of an unreadable photo should hit Gemini again
+    if user_id is None or not image_digest:
+        return
+    if not result.error and result.systolic and result.diastolic and result.pulse:
+        ocr_result_cache.set(GEMINI_MODEL, user_id, image_digest, response_text)
+
+
+def _gemini_error_result(exc: Exception, metadata: dict) -> OCRResult:
+    """Map a Gemini SDK exception to an OCRResult with a stable error_code."""
+    if isinstance(exc, gax_exc.ResourceExhausted):
         # 429 from Gemini — quota / per-model rate limit / regional throttle.
         # Caller should map OCR_RATE_LIMITED to HTTP 429 (web) or i18n message (bot).
-        logger.warning(f"Gemini ResourceExhausted (model={GEMINI_MODEL}): {e}")
+        logger.warning(f"Gemini ResourceExhausted (model={GEMINI_MODEL}): {exc}")
         return OCRResult(
             error="Gemini API rate-limited or quota exhausted",
             error_code="OCR_RATE_LIMITED",
             image_metadata=metadata,
         )
-    except gax_exc.InvalidArgument as e:
+    if isinstance(exc, gax_exc.InvalidArgument):
         # 400 — usually unsupported MIME, image too large, or bad request shape.
-        msg = str(e)
+        msg = str(exc)
         logger.warning(f"Gemini InvalidArgument (model={GEMINI_MODEL}): {msg}")
         code = "OCR_UNSUPPORTED_FORMAT" if "MIME" in msg or "mime" in msg else "OCR_API_ERROR"
         return OCRResult(error=f"Gemini rejected the image: {msg}", error_code=code, image_metadata=metadata)
+
+    logger.error(f"Gemini call failed (model={GEMINI_MODEL}): {type(exc).__name__}: {exc}")
+    return OCRResult(
+        error=f"Error calling Gemini API: {str(exc)}",
+        error_code="OCR_API_ERROR",
+        image_metadata=metadata,
+    )
+
+
+def read_blood_pressure_with_gemini(
+    image_data: bytes,
+    upload_time: Optional[datetime] = None,
+    user_id: Optional[int] = None,
+) -> OCRResult:
+    """Read blood pressure values from image using Gemini API with priority timestamp logic.
+
+    Timestamp fallback order: OCR (image) → EXIF → upload_time (caller-provided) → now_tz().
+    OCR date/time is discarded if it falls outside ±OCR_DATE_SANITY_WINDOW_DAYS of the
+    reference time (upload_time or now) to guard against BP monitors with unset clocks.
+
+    `image_data` is the raw upload; it is decoded once in memory, never written to disk.
+    With `user_id`, a byte-identical resend by the same user reuses the cached answer.
+    Blocking; async callers should use read_blood_pressure_with_gemini_async.
+    """
+    if not GOOGLE_AI_API_KEY:
+        return OCRResult(
+            error="Google AI API key not configured",
+            error_code="OCR_NOT_CONFIGURED",
+        )
+
+    blob, metadata, image_digest, error = _open_image_or_error(image_data)
+    if error:
+        return error
+    cached = _cached_result(user_id, image_digest, metadata, upload_time)
+    if cached:
+        return cached
+
+    model = genai.GenerativeModel(GEMINI_MODEL)
+    try:
+        response = model.generate_content([_OCR_PROMPT, blob])
+        result = _parse_gemini_response(response.text, metadata, upload_time)
+        _remember_result(user_id, image_digest, response.text, result)
+        return result
     except Exception as e:
-        logger.error(f"Gemini call failed (model={GEMINI_MODEL}): {type(e).__name__}: {e}")
+        return _gemini_error_result(e, metadata)
+
+
+async def read_blood_pressure_with_gemini_async(
+    image_data: bytes,
+    upload_time: Optional[datetime] = None,
+    user_id: Optional[int] = None,
+) -> OCRResult:
+    """Async variant of read_blood_pressure_with_gemini, shared by the API and the bot.
+
+    Calls are admitted through the process-wide `ocr_queue` before any work is
+    done: at most OCR_MAX_CONCURRENCY decode + call Gemini at once, the rest wait
+    in FIFO order. When the queue is full the call fails fast with error_code
+    OCR_QUEUE_FULL, without decoding the upload.
+    A user's byte-identical resend (see `user_id`) skips Gemini.
+    Decoding/preprocessing runs on the OCR_PREPROCESS_WORKERS pool, off the event loop.
+    """
+    if not GOOGLE_AI_API_KEY:
         return OCRResult(
-            error=f"Error calling Gemini API: {str(e)}",
-            error_code="OCR_API_ERROR",
-            image_metadata=metadata,
+            error="Google AI API key not configured",
+            error_code="OCR_NOT_CONFIGURED",
         )
+
+    try:
+        async with ocr_queue.slot():
+            blob, metadata, image_digest, error = await asyncio.get_running_loop().run_in_executor(
+                _preprocess_executor, _open_image_or_error, image_data
+            )
+            if error:
+                return error
+            cached = _cached_result(user_id, image_digest, metadata, upload_time)
+            if cached:
+                return cached
+
+            model = genai.GenerativeModel(GEMINI_MODEL)
+            try:
+                response = await model.generate_content_async([_OCR_PROMPT, blob])
+                result = _parse_gemini_response(response.text, metadata, upload_time)
+                _remember_result(user_id, image_digest, response.text, result)
+                return result
+            except Exception as e:
+                return _gemini_error_result(e, metadata)
+    except OCRQueueFull as e:
+        logger.warning(f"OCR request rejected: {e}")
+        return OCRResult(error="OCR service is busy", error_code="OCR_QUEUE_FULL")
@@ -0,0 +1,136 @@
+"""
+OCR Queue — process-wide admission control for Gemini OCR calls
+
+ทั้ง /api/v1/ocr/process-image และ bot (handle_photo_entry) ใช้ queue เดียวกัน:
+  - OCR_MAX_CONCURRENCY:  จำนวน Gemini call ที่ทำพร้อมกันได้
+  - OCR_MAX_QUEUE_DEPTH:  จำนวน request ที่รอคิวได้ (FIFO) — เกินนี้ถูกปฏิเสธทันที (OCRQueueFull → 429)
+
+Waiter เป็น asyncio future ของ event loop ตัวเอง และถูกปลุกผ่าน call_soon_threadsafe
+จึงใช้ร่วมกันได้แม้ API กับ bot จะรันคนละ loop ใน process เดียวกัน
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+logger = logging.getLogger(__name__)
+OCR_MAX_CONCURRENCY = int(os.getenv("OCR_MAX_CONCURRENCY", "4"))
+OCR_MAX_QUEUE_DEPTH = int(os.getenv("OCR_MAX_QUEUE_DEPTH", "20"))
+
+# Log a warning when a request waited at least this long for a slot
+_SLOW_QUEUE_WARNING_SECONDS = 5.0
+
+
+class OCRQueueFull(RuntimeError):
+    """All slots busy and the wait queue is at max depth."""
+
+
+class OCRAdmissionQueue:
+    """Counting semaphore with a bounded FIFO wait queue and queue-time metrics."""
+
+    def __init__(self, max_concurrency: int = OCR_MAX_CONCURRENCY, max_queue_depth: int = OCR_MAX_QUEUE_DEPTH):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue_depth = max(0, max_queue_depth)
+
+        self._lock = threading.Lock()
+        self._active = 0
+        self._waiters = deque()  # (loop, future), oldest first
+        self._counters = {"admitted": 0, "queued": 0, "rejected": 0}
+        self._queue_waits = 0
+        self._queue_seconds_total = 0.0
+        self._queue_seconds_max = 0.0
+
+    # ── Public API ───────────────────────────────────────────────
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one OCR slot for the duration of the block.
+
+        Raises OCRQueueFull immediately when the queue is at max depth.
+        """
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def acquire(self) -> float:
+        """Wait for a slot in FIFO order; returns seconds spent queued."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._active < self.max_concurrency and not self._waiters:
+                self._active += 1
+                self._counters["admitted"] += 1
+                return 0.0
+            if len(self._waiters) >= self.max_queue_depth:
+                self._counters["rejected"] += 1
+                raise OCRQueueFull(
+                    f"OCR queue full ({self._active} in flight, {len(self._waiters)} waiting)"
+                )
+            waiter = (loop, loop.create_future())
+            self._waiters.append(waiter)
+            self._counters["queued"] += 1
+
+        started = time.monotonic()
+        try:
+            await waiter[1]
+        except asyncio.CancelledError:
+            with self._lock:
+                try:
+                    self._waiters.remove(waiter)
+                    handed_over = False
+                except ValueError:
+                    handed_over = True
+            if handed_over:
+                # release() already passed us the slot — pass it on
+                self.release()
+            raise
+
+        waited = time.monotonic() - started
+        with self._lock:
+            self._counters["admitted"] += 1
+            self._queue_waits += 1
+            self._queue_seconds_total += waited
+            self._queue_seconds_max = max(self._queue_seconds_max, waited)
+        if waited >= _SLOW_QUEUE_WARNING_SECONDS:
+            logger.warning(f"OCR queue: request waited {waited:.1f}s for a slot")
+        return waited
+
+    def release(self) -> None:
+        """Free a slot, handing it directly to the oldest waiter if any."""
+        with self._lock:
+            while self._waiters:
+                loop, future = self._waiters.popleft()
+                try:
+                    loop.call_soon_threadsafe(_wake, future)
+                    return
+                except RuntimeError:
+                    continue  # waiter's loop is closed
+            self._active -= 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            waits = self._queue_waits
+            return {
+                "max_concurrency": self.max_concurrency,
+                "max_queue_depth": self.max_queue_depth,
+                "in_flight": self._active,
+                "waiting": len(self._waiters),
+                **self._counters,
+                "avg_queue_seconds": round(self._queue_seconds_total / waits, 3) if waits else 0.0,
+                "max_queue_seconds": round(self._queue_seconds_max, 3),
+            }
+
+
+def _wake(future: asyncio.Future) -> None:
+    # A cancelled waiter hands the slot back itself (see acquire)
+    if not future.done():
+        future.set_result(None)
+
+
+# Global Instance
+ocr_queue = OCRAdmissionQueue()
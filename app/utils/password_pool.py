@@ -0,0 +1,148 @@
+"""
+Password Pool — bcrypt hash/verify ใน worker pool แยก ไม่บล็อก event loop
+
+bcrypt ใช้เวลา ~250 ms ต่อครั้ง; ถ้ารันใน async endpoint ตรง ๆ ทุก request อื่นของ worker ต้องรอ
+งาน password ทั้งหมด (API: login / register / change-password / reset-password, bot: link account /
+change password) จึงถูกส่งเข้า ThreadPoolExecutor เดียวกัน — bcrypt ปล่อย GIL ระหว่าง hash
+thread จึงรันพร้อมกันได้จริงโดยไม่ต้องใช้ process pool
+
+Admission control (ปฏิเสธทันทีด้วย PasswordPoolBusy → 429):
+  - PASSWORD_HASH_WORKERS:        จำนวน bcrypt ที่ทำพร้อมกัน
+  - PASSWORD_MAX_QUEUE_DEPTH:     จำนวนงานที่รอ worker ได้ทั้ง process
+  - PASSWORD_MAX_PENDING_PER_IP:  จำนวนงานค้าง (รัน + รอ) ต่อ client (IP / telegram chat)
+    login storm จาก IP เดียวจึงไม่กินคิวของคนอื่น
+
+ดูค่าได้ที่ GET /api/v1/admin/system/password-pool
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "4"))
+PASSWORD_MAX_QUEUE_DEPTH = int(os.getenv("PASSWORD_MAX_QUEUE_DEPTH", "64"))
+PASSWORD_MAX_PENDING_PER_IP = int(os.getenv("PASSWORD_MAX_PENDING_PER_IP", "4"))
+
+
+class PasswordPoolBusy(RuntimeError):
+    """The pool's wait queue, or this client's share of it, is full."""
+
+    def __init__(self, message: str, reason: str):
+        super().__init__(message)
+        self.reason = reason  # "queue_full" | "client_limit"
+
+
+class PasswordWorkerPool:
+    """Bounded thread pool for bcrypt work with per-client admission and queue metrics."""
+
+    def __init__(
+        self,
+        workers: int = PASSWORD_HASH_WORKERS,
+        max_queue_depth: int = PASSWORD_MAX_QUEUE_DEPTH,
+        max_pending_per_client: int = PASSWORD_MAX_PENDING_PER_IP,
+    ):
+        self.workers = max(1, workers)
+        self.max_queue_depth = max(0, max_queue_depth)
+        self.max_pending_per_client = max(1, max_pending_per_client)
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="password")
+
+        self._lock = threading.Lock()
+        self._pending = 0      # running + queued
+        self._running = 0
+        self._per_client = {}  # client_key -> pending jobs
+        self._pending_high_water = 0
+        self._counters = {"submitted": 0, "completed": 0, "rejected_queue_full": 0, "rejected_client_limit": 0}
+        self._queue_seconds_total = 0.0
+        self._queue_seconds_max = 0.0
+        self._run_seconds_total = 0.0
+
+    # ── Public API ───────────────────────────────────────────────
+
+    async def run(self, fn, *args, client_key: Optional[str] = None):
+        """Run fn(*args) on the pool without blocking the event loop."""
+        return await asyncio.wrap_future(self.submit(fn, *args, client_key=client_key))
+
+    def call(self, fn, *args, client_key: Optional[str] = None):
+        """Blocking variant for sync code (bot services); same admission rules."""
+        return self.submit(fn, *args, client_key=client_key).result()
+
+    def submit(self, fn, *args, client_key: Optional[str] = None) -> Future:
+        """Admit and queue fn(*args); raises PasswordPoolBusy when over capacity."""
+        with self._lock:
+            if self._pending >= self.workers + self.max_queue_depth:
+                self._counters["rejected_queue_full"] += 1
+                raise PasswordPoolBusy(
+                    f"Password pool full ({self._running} running, {self._pending - self._running} waiting)",
+                    "queue_full",
+                )
+            if client_key is not None:
+                if self._per_client.get(client_key, 0) >= self.max_pending_per_client:
+                    self._counters["rejected_client_limit"] += 1
+                    raise PasswordPoolBusy(f"Too many password requests from {client_key}", "client_limit")
+                self._per_client[client_key] = self._per_client.get(client_key, 0) + 1
+            self._pending += 1
+            self._pending_high_water = max(self._pending_high_water, self._pending)
+            self._counters["submitted"] += 1
+
+        try:
+            future = self._executor.submit(self._work, fn, args, client_key, time.monotonic())
+        except RuntimeError:
+            self._done(client_key)
+            raise
+        # A caller cancelled while still queued (e.g. client disconnected): _work never runs
+        future.add_done_callback(lambda f: self._done(client_key) if f.cancelled() else None)
+        return future
+
+    def stats(self) -> dict:
+        with self._lock:
+            completed = self._counters["completed"]
+            return {
+                "workers": self.workers,
+                "max_queue_depth": self.max_queue_depth,
+                "max_pending_per_client": self.max_pending_per_client,
+                "running": self._running,
+                "queue_depth": self._pending - self._running,
+                "pending_high_water": self._pending_high_water,
+                "clients_pending": len(self._per_client),
+                **self._counters,
+                "avg_queue_ms": round(self._queue_seconds_total / completed * 1000, 1) if completed else 0.0,
+                "max_queue_ms": round(self._queue_seconds_max * 1000, 1),
+                "avg_run_ms": round(self._run_seconds_total / completed * 1000, 1) if completed else 0.0,
+            }
+
+    # ── Internals ────────────────────────────────────────────────
+
+    def _work(self, fn, args, client_key, queued_at: float):
+        started = time.monotonic()
+        with self._lock:
+            self._running += 1
+        try:
+            return fn(*args)
+        finally:
+            finished = time.monotonic()
+            with self._lock:
+                self._running -= 1
+                self._counters["completed"] += 1
+                self._queue_seconds_total += started - queued_at
+                self._queue_seconds_max = max(self._queue_seconds_max, started - queued_at)
+                self._run_seconds_total += finished - started
+            self._done(client_key)
+
+    def _done(self, client_key) -> None:
+        with self._lock:
+            self._pending -= 1
+            if client_key is not None:
+                remaining = self._per_client.get(client_key, 1) - 1
+                if remaining > 0:
+                    self._per_client[client_key] = remaining
+                else:
+                    self._per_client.pop(client_key, None)
+
+
+# Global Instance
+password_pool = PasswordWorkerPool()
@@ -0,0 +1,164 @@
+"""
+DB Pool Metrics — checkout latency / in-use / overflow / timeout ของ connection pool
+
+ทุก engine ใน app/database.py (primary, replica, async) ถูก attach ผ่าน pool_metrics.attach(name, engine):
+  - pool events (connect / checkout / checkin / invalidate): นับการยืม connection และ high-water ของ in-use
+  - pool ที่สร้างด้วย InstrumentedQueuePool / InstrumentedAsyncQueuePool จับเวลารอ connection ว่าง
+    (checkout latency) และนับ pool timeout
+
+ดูค่าได้ที่ GET /api/v1/admin/system/db-pool (ค่าของ process นั้น ๆ — API กับ bot แยกกัน)
+ใช้ประกอบการตั้ง DB_POOL_SIZE / DB_MAX_OVERFLOW ต่อ process type
+"""
+
+import logging
+import os
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+logger = logging.getLogger(__name__)
+
+# Log a warning when a checkout waited at least this long for a free connection
+DB_POOL_SLOW_CHECKOUT_SECONDS = float(os.getenv("DB_POOL_SLOW_CHECKOUT_SECONDS", "1.0"))
+
+# Checkout wait histogram bucket upper bounds (seconds)
+_WAIT_BUCKETS = (0.001, 0.01, 0.1, 1.0)
+
+
+class PoolMetrics:
+    """Counters for one engine's pool. Thread-safe; shared by every pool the engine recreates."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.engine = None
+        self._lock = threading.Lock()
+        self._counters = {"connects": 0, "checkouts": 0, "checkins": 0, "invalidations": 0, "timeouts": 0}
+        self._in_use = 0
+        self._in_use_high_water = 0
+        self._waits = 0
+        self._wait_seconds_total = 0.0
+        self._wait_seconds_max = 0.0
+        self._wait_buckets = [0] * (len(_WAIT_BUCKETS) + 1)
+
+    def attach(self, engine) -> "PoolMetrics":
+        self.engine = engine
+        engine.pool._metrics = self
+        event.listen(engine, "connect", self._on_connect)
+        event.listen(engine, "checkout", self._on_checkout)
+        event.listen(engine, "checkin", self._on_checkin)
+        event.listen(engine, "invalidate", self._on_invalidate)
+        return self
+
+    # ── Pool events ──────────────────────────────────────────────
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        with self._lock:
+            self._counters["connects"] += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        with self._lock:
+            self._counters["checkouts"] += 1
+            self._in_use += 1
+            self._in_use_high_water = max(self._in_use_high_water, self._in_use)
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        with self._lock:
+            self._counters["checkins"] += 1
+            self._in_use = max(0, self._in_use - 1)
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        with self._lock:
+            self._counters["invalidations"] += 1
+
+    # ── Checkout timing (InstrumentedQueuePool) ──────────────────
+
+    def record_wait(self, seconds: float) -> None:
+        bucket = next((i for i, bound in enumerate(_WAIT_BUCKETS) if seconds < bound), len(_WAIT_BUCKETS))
+        with self._lock:
+            self._waits += 1
+            self._wait_seconds_total += seconds
+            self._wait_seconds_max = max(self._wait_seconds_max, seconds)
+            self._wait_buckets[bucket] += 1
+        if seconds >= DB_POOL_SLOW_CHECKOUT_SECONDS:
+            logger.warning(f"DB pool '{self.name}': checkout waited {seconds:.2f}s for a connection")
+
+    def record_timeout(self, seconds: float) -> None:
+        with self._lock:
+            self._counters["timeouts"] += 1
+        logger.warning(f"DB pool '{self.name}': checkout timed out after {seconds:.2f}s (pool exhausted)")
+
+    def stats(self) -> dict:
+        pool = self.engine.pool if self.engine is not None else None
+        with self._lock:
+            waits = self._waits
+            labels = [f"<{bound * 1000:g}ms" for bound in _WAIT_BUCKETS] + [f">={_WAIT_BUCKETS[-1] * 1000:g}ms"]
+            data = {
+                "pool_class": type(pool).__name__ if pool is not None else None,
+                **self._counters,
+                "in_use_high_water": self._in_use_high_water,
+                "avg_checkout_wait_ms": round(self._wait_seconds_total / waits * 1000, 3) if waits else 0.0,
+                "max_checkout_wait_ms": round(self._wait_seconds_max * 1000, 3),
+                "checkout_wait_histogram": dict(zip(labels, self._wait_buckets)),
+            }
+        if isinstance(pool, QueuePool):
+            data.update({
+                "pool_size": pool.size(),
+                "max_overflow": pool._max_overflow,
+                "checked_out": pool.checkedout(),
+                "checked_in": pool.checkedin(),
+                "overflow": max(0, pool.overflow()),
+            })
+        return data
+
+
+class _TimedCheckoutMixin:
+    """Times the wait for a free connection; the pool's metrics survive recreate() (engine.dispose)."""
+
+    _metrics = None
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            if self._metrics is not None:
+                self._metrics.record_timeout(time.perf_counter() - started)
+            raise
+        if self._metrics is not None:
+            self._metrics.record_wait(time.perf_counter() - started)
+        return connection
+
+    def recreate(self):
+        pool = super().recreate()
+        pool._metrics = self._metrics
+        return pool
+
+
+class InstrumentedQueuePool(_TimedCheckoutMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+class PoolMetricsRegistry:
+    """Per-engine PoolMetrics of this process, keyed by a short engine name."""
+
+    def __init__(self):
+        self._metrics = {}
+
+    def attach(self, name: str, engine) -> PoolMetrics:
+        metrics = PoolMetrics(name).attach(engine)
+        self._metrics[name] = metrics
+        return metrics
+
+    def stats(self) -> dict:
+        return {name: metrics.stats() for name, metrics in self._metrics.items()}
+
+
+# Global Instance
+pool_metrics = PoolMetricsRegistry()
@@ -0,0 +1,157 @@
+"""
+Principal Cache — แคช users row ของผู้ใช้ที่ login อยู่ สำหรับ get_current_user
+
+ทุก request ที่ต้อง login เคยอ่าน users table 1 ครั้ง. Cache นี้เก็บค่า column ของ User
+(ค่าดิบใน DB — PII ยังเป็น ciphertext) ต่อ (user_id, iat ของ token) เป็นเวลา USER_CACHE_TTL_SECONDS
+แล้วตอน hit ประกอบ User กลับเข้า session ของ request ด้วย merge(load=False) — ไม่ SELECT
+เช็ค is_active / account lock / subscription ยังทำทุก request จากค่าในแคช
+
+Invalidation:
+  - อัตโนมัติ: User ที่ถูก flush (แก้ profile / role / lock / subscription / ลบ) ผ่าน ORM session ใด ๆ
+    ใน process นี้ ถูกลบออกจากแคชตอน commit
+  - explicit: principal_cache.invalidate(user_id) สำหรับ Core UPDATE ที่ไม่ผ่าน ORM
+  - process อื่น (bot, API worker อื่น) ไม่ได้รับ invalidation — TTL สั้นคือขอบเขตความ stale
+
+USER_CACHE_TTL_SECONDS=0 ปิด cache
+"""
+
+import itertools
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.session import make_transient_to_detached
+
+from ..models import User
+
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "15"))
+USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", "10000"))
+
+
+class PrincipalCache:
+    """Bounded TTL/LRU of users-row snapshots keyed by (user_id, token iat)."""
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # (user_id, iat) -> (expires_at, column values)
+        self._keys_by_user = {}        # user_id -> {(user_id, iat), ...}
+        self._versions = {}            # user_id -> version of its last invalidation
+        self._epoch = 0                # bumped when _versions is pruned
+        self._counter = itertools.count(1)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._columns = [attr.key for attr in inspect(User).column_attrs]
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_entries > 0
+
+    def version(self, user_id: int) -> tuple:
+        """Capture before reading the row; put() drops the snapshot if the user was invalidated meanwhile."""
+        with self._lock:
+            return self._epoch, self._versions.get(user_id, 0)
+
+    def get(self, db: Session, user_id: int, iat) -> Optional[User]:
+        """The cached User attached to `db` (no SELECT), or None on a miss."""
+        if not self.enabled:
+            return None
+        key = (user_id, iat)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            values = entry[1]
+
+        user = inspect(User).class_manager.new_instance()
+        for column, value in zip(self._columns, values):
+            set_committed_value(user, column, value)
+        make_transient_to_detached(user)
+        return db.merge(user, load=False)
+
+    def put(self, user_id: int, iat, user: User, version: tuple) -> None:
+        if not self.enabled:
+            return
+        values = tuple(getattr(user, column) for column in self._columns)
+        key = (user_id, iat)
+        with self._lock:
+            if (self._epoch, self._versions.get(user_id, 0)) != version:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, values)
+            self._entries.move_to_end(key)
+            self._keys_by_user.setdefault(user_id, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+
+    def invalidate(self, user_id: int) -> None:
+        """Drop every cached token snapshot of `user_id` (call after Core UPDATEs on users)."""
+        with self._lock:
+            self.invalidations += 1
+            for key in self._keys_by_user.pop(user_id, ()):
+                self._entries.pop(key, None)
+            self._versions[user_id] = next(self._counter)
+            if len(self._versions) > self.max_entries:
+                # Bound the version map; the new epoch voids every version captured so far
+                self._versions.clear()
+                self._epoch += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_user.clear()
+            self._versions.clear()
+            self._epoch += 1
+
+    def _drop(self, key) -> None:
+        self._entries.pop(key, None)
+        keys = self._keys_by_user.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[key[0]]
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "ttl_seconds": self.ttl_seconds,
+            "max_entries": self.max_entries,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+        }
+
+
+# Global Instance
+principal_cache = PrincipalCache(USER_CACHE_TTL_SECONDS, USER_CACHE_MAX_ENTRIES)
+
+
+# ORM writes to users: invalidate once the change is committed
+@event.listens_for(Session, "after_flush")
+def _collect_user_writes(session, flush_context):
+    user_ids = {obj.id for obj in (*session.dirty, *session.deleted) if isinstance(obj, User)}
+    if user_ids:
+        session.info.setdefault("principal_cache_users", set()).update(user_ids)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed_users(session):
+    for user_id in session.info.pop("principal_cache_users", ()):
+        principal_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_user_writes(session):
+    session.info.pop("principal_cache_users", None)
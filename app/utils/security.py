@@ -1,5 +1,7 @@
 
 import os
+import threading
+import time
 import bcrypt
 import jwt
 from datetime import timedelta
@@ -7,11 +9,15 @@ from typing import Optional
 from pytz import UTC
 from fastapi import HTTPException, Depends, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials, APIKeyHeader
+from sqlalchemy import or_, select
 from sqlalchemy.orm import Session
-from ..database import get_db
+from ..database import SessionLocal, get_db
 from ..models import User
+from .encryption import hash_value
 from .timezone import now_tz
-from .staff_sync import ensure_staff_sync_for_request, is_staff_access_allowed
+from .password_pool import password_pool
+from .principal_cache import principal_cache
+from .staff_sync import check_staff_sync_signature, is_staff_access_allowed
 import logging
 
 load_from_dotenv = True # Assumed loaded in main
@@ -36,42 +42,77 @@ logger = logging.getLogger(__name__)
 
 # Premium bypass — comma-separated: user IDs, Telegram chat IDs, or phone numbers
 # e.g. PREMIUM_BYPASS_USERS=+66645293605,123456789
-# Read lazily because dotenv loads AFTER module imports in main.py
-_premium_bypass_cache = None
+# Resolved into a set of user IDs through the hash columns, so check_premium never
+# decrypts. Read lazily because dotenv loads AFTER module imports in main.py; the
+# set is rebuilt when the env value changes and every PREMIUM_BYPASS_REFRESH_SECONDS
+# (users who register later with a listed phone / Telegram ID).
+PREMIUM_BYPASS_REFRESH_SECONDS = float(os.getenv("PREMIUM_BYPASS_REFRESH_SECONDS", "300"))
+# Retry sooner when the DB lookup failed (only numeric user IDs are honoured meanwhile)
+_PREMIUM_BYPASS_RETRY_SECONDS = 30.0
+_premium_bypass_cache = None   # frozenset of user IDs
+_premium_bypass_raw = None     # env value the cache was built from
+_premium_bypass_expires = 0.0
+_premium_bypass_lock = threading.Lock()
+
+
+def resolve_premium_bypass_ids(db: Session, raw: str) -> set:
+    """User IDs matching PREMIUM_BYPASS_USERS entries via indexed hash lookups."""
+    tokens = {x.strip() for x in raw.split(",") if x.strip()}
+    if not tokens:
+        return set()
+    ids = {int(token) for token in tokens if token.isdigit()}
+    # Phones match with or without the '+' prefix
+    hashes = {hash_value(variant) for token in tokens
+              for variant in (token, token.lstrip("+"), "+" + token.lstrip("+"))}
+    ids.update(db.scalars(select(User.id).where(or_(
+        User.telegram_id_hash.in_(hashes), User.phone_number_hash.in_(hashes)
+    ))))
+    return ids
+
+
+def refresh_premium_bypass(db: Optional[Session] = None) -> frozenset:
+    """Rebuild the bypass ID set now (the subscription sweeper calls this every run)."""
+    global _premium_bypass_cache, _premium_bypass_raw, _premium_bypass_expires
+    raw = os.getenv("PREMIUM_BYPASS_USERS", "")
+    ttl = PREMIUM_BYPASS_REFRESH_SECONDS
+    try:
+        if db is not None:
+            ids = resolve_premium_bypass_ids(db, raw)
+        else:
+            with SessionLocal() as session:
+                ids = resolve_premium_bypass_ids(session, raw)
+    except Exception as exc:
+        logger.warning(f"Premium bypass lookup failed, honouring user IDs only: {exc}")
+        ids = {int(x.strip()) for x in raw.split(",") if x.strip().isdigit()}
+        ttl = _PREMIUM_BYPASS_RETRY_SECONDS
+    _premium_bypass_cache = frozenset(ids)
+    _premium_bypass_raw = raw
+    _premium_bypass_expires = time.monotonic() + ttl
+    return _premium_bypass_cache
 
 
-def _get_bypass_ids() -> set:
-    global _premium_bypass_cache
-    if _premium_bypass_cache is None:
-        raw = os.getenv("PREMIUM_BYPASS_USERS", "")
-        _premium_bypass_cache = {x.strip() for x in raw.split(",") if x.strip()}
-    return _premium_bypass_cache
+def get_premium_bypass_ids() -> frozenset:
+    raw = os.getenv("PREMIUM_BYPASS_USERS", "")
+    if not raw.strip():
+        return frozenset()
+    cache = _premium_bypass_cache
+    if cache is not None and raw == _premium_bypass_raw and time.monotonic() < _premium_bypass_expires:
+        return cache
+    with _premium_bypass_lock:
+        if _premium_bypass_cache is not None and raw == _premium_bypass_raw and time.monotonic() < _premium_bypass_expires:
+            return _premium_bypass_cache
+        return refresh_premium_bypass()
 
 
 def check_premium(user) -> bool:
     """Check if user has active premium subscription or is in bypass list.
 
-    Bypass matches against user.id, user.telegram_id, or user.phone_number.
+    Bypass matches against user.id, user.telegram_id, or user.phone_number,
+    precomputed into a set of user IDs (see get_premium_bypass_ids).
     Useful for testing and promotions.
     """
-    bypass_ids = _get_bypass_ids()
-    if bypass_ids:
-        if str(user.id) in bypass_ids:
-            return True
-        try:
-            tg_id = user.telegram_id
-            if tg_id and str(tg_id) in bypass_ids:
-                return True
-        except Exception:
-            pass
-        try:
-            phone = user.phone_number
-            if phone:
-                # Match with or without '+' prefix
-                if phone in bypass_ids or f"+{phone}" in bypass_ids or phone.lstrip("+") in bypass_ids:
-                    return True
-        except Exception:
-            pass
+    if user.id is not None and user.id in get_premium_bypass_ids():
+        return True
     if user.subscription_tier == "premium":
         expires = user.subscription_expires_at
         if expires:
@@ -104,6 +145,21 @@ def verify_password(password: str, hashed: str) -> bool:
     return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
 
 
+# Async facade: bcrypt runs on the password worker pool, not the event loop.
+# Raises PasswordPoolBusy (→ 429) when the pool or this client's share is full.
+async def hash_password_async(password: str, client_key: Optional[str] = None) -> str:
+    return await password_pool.run(hash_password, password, client_key=client_key)
+
+
+async def verify_password_async(password: str, hashed: str, client_key: Optional[str] = None) -> bool:
+    return await password_pool.run(verify_password, password, hashed, client_key=client_key)
+
+
+def client_ip(request: Request) -> Optional[str]:
+    """Admission key for per-IP limits on password work."""
+    return request.client.host if request.client else None
+
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -112,7 +168,8 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
         expire = now_tz() + \
             timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
 
-    to_encode.update({"exp": expire, "type": "access_token"})
+    # iat keys the principal cache (get_current_user)
+    to_encode.update({"exp": expire, "iat": now_tz(), "type": "access_token"})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
@@ -121,7 +178,7 @@ def create_refresh_token(data: dict):
     to_encode = data.copy()
     # Refresh token expires in 30 days
     expire = now_tz() + timedelta(days=30)
-    to_encode.update({"exp": expire, "type": "refresh_token"})
+    to_encode.update({"exp": expire, "iat": now_tz(), "type": "refresh_token"})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
@@ -167,15 +224,19 @@ def get_current_user(
         logger.warning(f"JWT Error: {str(e)}")
         raise HTTPException(status_code=401, detail="Invalid authentication")
 
-    try:
-        ensure_staff_sync_for_request(db)
-    except Exception as exc:
-        logger.warning("[staff-sync] Unexpected sync failure on %s: %s", request.url.path, exc)
+    # In-memory only: a changed allowlist wakes the background staff sync worker
+    check_staff_sync_signature()
 
-    user = db.query(User).filter(User.id == user_id).first()
+    # Cached users row (short TTL, invalidated on commit); the checks below still run every request
+    iat = payload.get("iat")
+    user = principal_cache.get(db, user_id, iat)
     if user is None:
-        logger.warning(f"User not found: {user_id}")
-        raise HTTPException(status_code=401, detail="User not found")
+        version = principal_cache.version(user_id)
+        user = db.query(User).filter(User.id == user_id).first()
+        if user is None:
+            logger.warning(f"User not found: {user_id}")
+            raise HTTPException(status_code=401, detail="User not found")
+        principal_cache.put(user_id, iat, user, version)
 
     if not user.is_active:
         logger.warning(f"User deactivated: {user_id}")
@@ -193,10 +254,11 @@ def get_current_user(
             raise HTTPException(
                 status_code=423, detail="Account temporarily locked")
 
-    # Self-heal: downgrade expired premium in DB so stale state doesn't persist
-    from .subscription import normalize_subscription_state
-    normalize_subscription_state(user, db=db)
+    # No subscription write here: check_premium compares the stored tier and expiry
+    # in memory; the subscription sweeper persists downgrades in bulk
 
+    # Read-replica routing (get_read_db) keys read-your-writes on this
+    request.state.user_id = user.id
     return user
 
 
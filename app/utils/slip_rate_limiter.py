@@ -0,0 +1,181 @@
+"""
+Slip Rate Limiter — จำกัดจำนวนครั้งที่ผู้ใช้ส่งสลิปตรวจสอบ (sliding window ต่อ user)
+
+verify_and_upgrade() ถูกเรียกทั้งจาก Web API และ Bot จึงต้องนับร่วมกันทุก process:
+  - redis:  sorted set ต่อ user (score = เวลาที่ส่ง) — ตัดของเก่า / นับ / เพิ่ม ใน Lua script เดียว
+            ใช้ร่วมกันระหว่าง uvicorn workers + bot container เมื่อมี REDIS_URL
+  - memory: LRU ของ deque timestamps ใน process (SLIP_VERIFY_RATE_MAX_KEYS user ล่าสุด)
+            ใช้เมื่อไม่มี Redis หรือ Redis ล่ม (fail-open เป็นรายโปรเซส ไม่ปิดการชำระเงิน)
+
+Config:
+  - SLIP_VERIFY_RATE_LIMIT:           จำนวนครั้งสูงสุดต่อ window (default 3)
+  - SLIP_VERIFY_RATE_WINDOW_SECONDS:  ขนาด window (default 60)
+  - SLIP_VERIFY_RATE_MAX_KEYS:        จำนวน user สูงสุดใน memory tier (default 10000)
+
+ดูค่าได้ที่ GET /api/v1/admin/system/slip-rate-limit
+"""
+
+import os
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+REDIS_URL = os.getenv("REDIS_URL")
+SLIP_VERIFY_RATE_LIMIT = int(os.getenv("SLIP_VERIFY_RATE_LIMIT", "3"))
+SLIP_VERIFY_RATE_WINDOW_SECONDS = float(os.getenv("SLIP_VERIFY_RATE_WINDOW_SECONDS", "60"))
+SLIP_VERIFY_RATE_MAX_KEYS = int(os.getenv("SLIP_VERIFY_RATE_MAX_KEYS", "10000"))
+
+
+class MemorySlidingWindowLimiter:
+    """In-process sliding window per key; least recently seen keys are evicted past max_keys."""
+
+    def __init__(self, limit: int, window_seconds: float, max_keys: int):
+        self.limit = limit
+        self.window_seconds = window_seconds
+        self.max_keys = max(1, max_keys)
+        self._hits: "OrderedDict[str, deque]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def hit(self, key: str, now: Optional[float] = None) -> bool:
+        """Record an attempt for key; False (nothing recorded) when the window is already full."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            timestamps = self._hits.get(key)
+            if timestamps is None:
+                timestamps = self._hits[key] = deque()
+                while len(self._hits) > self.max_keys:
+                    self._hits.popitem(last=False)
+                    self.evictions += 1
+            else:
+                self._hits.move_to_end(key)
+            while timestamps and now - timestamps[0] >= self.window_seconds:
+                timestamps.popleft()
+            if len(timestamps) >= self.limit:
+                return False
+            timestamps.append(now)
+            return True
+
+    def reset(self, key: str) -> None:
+        with self._lock:
+            self._hits.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._hits.clear()
+
+    def __len__(self) -> int:
+        return len(self._hits)
+
+
+# Trim → count → add must be atomic, otherwise two workers can both see count < limit
+_SLIDING_WINDOW_SCRIPT = """
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[3]) then
+    return 0
+end
+redis.call('ZADD', KEYS[1], now, ARGV[4])
+redis.call('PEXPIRE', KEYS[1], math.ceil(window * 1000))
+return 1
+"""
+
+
+class RedisSlidingWindowLimiter:
+    """Redis sorted-set sliding window shared across processes (API workers + bot)."""
+
+    def __init__(self, redis_url: str, limit: int, window_seconds: float):
+        import redis
+        self.client = redis.from_url(redis_url, decode_responses=True)
+        self.prefix = "slip_verify_rate:"
+        self.limit = limit
+        self.window_seconds = window_seconds
+        self._script = self.client.register_script(_SLIDING_WINDOW_SCRIPT)
+
+    def hit(self, key: str) -> bool:
+        # Wall clock, not monotonic: scores are compared across hosts
+        now = time.time()
+        allowed = self._script(
+            keys=[f"{self.prefix}{key}"],
+            args=[now, self.window_seconds, self.limit, f"{now:.6f}:{uuid.uuid4().hex[:8]}"],
+        )
+        return bool(allowed)
+
+    def reset(self, key: str) -> None:
+        self.client.delete(f"{self.prefix}{key}")
+
+
+class SlipVerifyRateLimiter:
+    """Per-user slip-verify limiter: Redis when configured, memory otherwise.
+
+    A Redis error falls back to the memory tier for that call, so an outage
+    loosens the limit to per-process rather than blocking payments.
+    """
+
+    def __init__(
+        self,
+        limit: int = SLIP_VERIFY_RATE_LIMIT,
+        window_seconds: float = SLIP_VERIFY_RATE_WINDOW_SECONDS,
+        max_keys: int = SLIP_VERIFY_RATE_MAX_KEYS,
+        redis_url: Optional[str] = REDIS_URL,
+    ):
+        self.limit = limit
+        self.window_seconds = window_seconds
+        self.memory = MemorySlidingWindowLimiter(limit, window_seconds, max_keys)
+        self.redis = None
+        if redis_url:
+            try:
+                self.redis = RedisSlidingWindowLimiter(redis_url, limit, window_seconds)
+                logger.info("Slip rate limiter: Using Redis")
+            except Exception as e:
+                logger.warning(f"Slip rate limiter: Redis failed ({e}), using memory")
+        self._lock = threading.Lock()
+        self._counters = {"allowed": 0, "rejected": 0, "redis_errors": 0}
+
+    def hit(self, user_id) -> bool:
+        """Record a verification attempt; False when the user is over the limit."""
+        key = str(user_id)
+        allowed = None
+        if self.redis is not None:
+            try:
+                allowed = self.redis.hit(key)
+            except Exception as e:
+                logger.warning(f"Slip rate limiter: Redis hit failed ({e}), using memory")
+                with self._lock:
+                    self._counters["redis_errors"] += 1
+        if allowed is None:
+            allowed = self.memory.hit(key)
+        with self._lock:
+            self._counters["allowed" if allowed else "rejected"] += 1
+        return allowed
+
+    def reset(self, user_id) -> None:
+        key = str(user_id)
+        self.memory.reset(key)
+        if self.redis is not None:
+            try:
+                self.redis.reset(key)
+            except Exception as e:
+                logger.warning(f"Slip rate limiter: Redis reset failed ({e})")
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+        return {
+            "backend": "redis" if self.redis is not None else "memory",
+            "limit": self.limit,
+            "window_seconds": self.window_seconds,
+            **counters,
+            "memory_keys": len(self.memory),
+            "memory_max_keys": self.memory.max_keys,
+            "memory_evictions": self.memory.evictions,
+        }
+
+
+# Global Instance
+slip_verify_limiter = SlipVerifyRateLimiter()
@@ -0,0 +1,160 @@
+"""
+SQLite Profile — pragmas สำหรับ deployment แบบ single-node / edge ที่ใช้ SQLite
+
+Default (rollback journal, ไม่มี pragma) ทำให้ API process กับ bot process แย่ง write lock กัน
+และ reader บล็อก writer. Profile "tuned" ตั้งค่าทุก connection (sync และ aiosqlite) ผ่าน "connect" event:
+  - journal_mode=WAL        reader กับ writer ทำงานพร้อมกันได้ (writer ยังทีละตัว)
+  - synchronous=NORMAL      fsync ตอน checkpoint แทนทุก commit (ปลอดภัยกับ WAL)
+  - busy_timeout            รอ lock แทนที่จะ error "database is locked" ทันที
+  - cache_size / mmap_size  page cache ต่อ connection และ memory-mapped read
+  - foreign_keys=ON         บังคับ ForeignKey ตาม models
+
+SQLITE_PROFILE=off กลับไปใช้ค่า default ของ SQLite
+
+Benchmark (write throughput ของ writer หลาย process + reader พร้อมกัน, off vs tuned):
+    python -m app.utils.sqlite_profile bench --writers 2 --rows 2000
+"""
+
+import os
+
+from sqlalchemy import event
+
+SQLITE_PROFILE = os.getenv("SQLITE_PROFILE", "tuned").lower()
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "20000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(128 * 1024 * 1024)))
+
+
+def sqlite_pragmas(profile: str = SQLITE_PROFILE) -> list:
+    """(name, value) pragmas applied to every new connection for `profile`."""
+    if profile == "off":
+        return []
+    if profile != "tuned":
+        raise ValueError(f"Unknown SQLITE_PROFILE: {profile!r} (expected 'tuned' or 'off')")
+    return [
+        ("journal_mode", "WAL"),
+        ("synchronous", "NORMAL"),
+        ("busy_timeout", SQLITE_BUSY_TIMEOUT_MS),
+        ("cache_size", -SQLITE_CACHE_SIZE_KB),  # negative = KiB
+        ("mmap_size", SQLITE_MMAP_SIZE),
+        ("foreign_keys", "ON"),
+    ]
+
+
+def install_sqlite_profile(engine, profile: str = SQLITE_PROFILE) -> None:
+    """Apply the profile's pragmas on every connection `engine` opens (sync engine or AsyncEngine.sync_engine)."""
+    pragmas = sqlite_pragmas(profile)
+    if not pragmas:
+        return
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas:
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+
+# ==========================
+# Benchmark
+# ==========================
+
+def _bench_writer(url: str, profile: str, rows: int, writer_id: int) -> dict:
+    import time
+
+    from sqlalchemy import create_engine, text
+    from sqlalchemy.exc import OperationalError
+
+    engine = create_engine(url)
+    install_sqlite_profile(engine, profile)
+    written = locked = 0
+    insert = text(
+        "INSERT INTO bench_writes (user_id, systolic, diastolic, pulse) VALUES (:u, :s, :d, :p)"
+    )
+    started = time.perf_counter()
+    # One reading per transaction, like the API and bot write paths
+    for i in range(rows):
+        try:
+            with engine.begin() as conn:
+                conn.execute(insert, {"u": writer_id, "s": 110 + i % 40, "d": 70 + i % 20, "p": 60 + i % 30})
+            written += 1
+        except OperationalError:
+            locked += 1
+    elapsed = time.perf_counter() - started
+    engine.dispose()
+    return {"written": written, "locked": locked, "elapsed": elapsed}
+
+
+def _bench_reader(url: str, profile: str, stop) -> int:
+    from sqlalchemy import create_engine, text
+
+    engine = create_engine(url)
+    install_sqlite_profile(engine, profile)
+    reads = 0
+    while not stop.is_set():
+        with engine.connect() as conn:
+            conn.execute(text("SELECT COUNT(*), AVG(systolic) FROM bench_writes")).scalar()
+        reads += 1
+    engine.dispose()
+    return reads
+
+
+def run_benchmark(rows: int = 2000, writers: int = 2, readers: int = 1, profiles=("off", "tuned")) -> dict:
+    """Write throughput per profile: `writers` processes insert `rows` each while `readers` poll."""
+    import multiprocessing
+    import tempfile
+    from concurrent.futures import ProcessPoolExecutor
+
+    from sqlalchemy import create_engine, text
+
+    results = {}
+    ctx = multiprocessing.get_context("spawn")
+    for profile in profiles:
+        with tempfile.TemporaryDirectory() as tmp:
+            url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+            engine = create_engine(url)
+            install_sqlite_profile(engine, profile)
+            with engine.begin() as conn:
+                conn.execute(text(
+                    "CREATE TABLE bench_writes (id INTEGER PRIMARY KEY, user_id INTEGER, "
+                    "systolic INTEGER, diastolic INTEGER, pulse INTEGER)"
+                ))
+            engine.dispose()
+
+            with ctx.Manager() as manager, ProcessPoolExecutor(writers + readers, mp_context=ctx) as pool:
+                stop = manager.Event()
+                reader_futures = [pool.submit(_bench_reader, url, profile, stop) for _ in range(readers)]
+                writer_futures = [pool.submit(_bench_writer, url, profile, rows, i) for i in range(writers)]
+                outcomes = [f.result() for f in writer_futures]
+                stop.set()
+                reads = sum(f.result() for f in reader_futures)
+
+            written = sum(o["written"] for o in outcomes)
+            # Timed inside the writers, so process start-up isn't counted
+            elapsed = max(o["elapsed"] for o in outcomes)
+            results[profile] = {
+                "rows_written": written,
+                "locked_errors": sum(o["locked"] for o in outcomes),
+                "elapsed_seconds": round(elapsed, 2),
+                "writes_per_second": round(written / elapsed, 1) if elapsed else None,
+                "reads_completed": reads,
+            }
+    if "off" in results and "tuned" in results and results["off"]["writes_per_second"]:
+        results["speedup"] = round(results["tuned"]["writes_per_second"] / results["off"]["writes_per_second"], 2)
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="SQLite profile benchmark (off vs tuned)")
+    parser.add_argument("command", choices=["bench"])
+    parser.add_argument("--rows", type=int, default=2000, help="rows per writer process")
+    parser.add_argument("--writers", type=int, default=2, help="writer processes (e.g. API + bot)")
+    parser.add_argument("--readers", type=int, default=1, help="concurrent reader processes")
+    args = parser.parse_args()
+
+    print(json.dumps(run_benchmark(rows=args.rows, writers=args.writers, readers=args.readers), indent=2))
@@ -52,18 +52,18 @@ def _normalize_sync_mode(raw_mode: Optional[str] = None) -> str:
 
 def _get_timeout_seconds() -> float:
     try:
-        timeout_ms = int(os.getenv("STAFF_SYNC_TIMEOUT_MS", "800"))
+        timeout_ms = int(os.getenv("STAFF_SYNC_TIMEOUT_MS", "5000"))
     except ValueError:
-        timeout_ms = 800
+        timeout_ms = 5000
     return max(timeout_ms, 50) / 1000.0
 
 
-def _get_lock_timeout_seconds() -> float:
+def _get_interval_seconds() -> float:
     try:
-        timeout_ms = int(os.getenv("STAFF_SYNC_LOCK_TIMEOUT_MS", "50"))
+        interval = float(os.getenv("STAFF_SYNC_INTERVAL_SECONDS", "300"))
     except ValueError:
-        timeout_ms = 50
-    return max(timeout_ms, 0) / 1000.0
+        interval = 300.0
+    return max(interval, 0.0)
 
 
 def get_staff_allowlist_config(raw_value: Optional[str] = None) -> StaffAllowlistConfig:
@@ -197,30 +197,44 @@ def is_staff_access_allowed(user: User) -> bool:
     return False
 
 
-def ensure_staff_sync_for_request(db: Session) -> None:
-    global _SYNC_SIGNATURE
+def _current_signature() -> Tuple[Optional[str], str]:
+    return os.getenv("STAFF_ALLOWLIST"), _normalize_sync_mode()
 
-    raw_allowlist = os.getenv("STAFF_ALLOWLIST")
-    mode = _normalize_sync_mode()
-    signature = (raw_allowlist, mode)
-    if signature == _SYNC_SIGNATURE:
-        return
 
-    if not _SYNC_LOCK.acquire(timeout=_get_lock_timeout_seconds()):
-        logger.warning("[staff-sync] Another request is already running sync; skipping this request.")
-        return
+def check_staff_sync_signature() -> bool:
+    """Request-path check: True when the last sync matches the current config.
+
+    No DB access and no lock; a changed STAFF_ALLOWLIST / STAFF_SYNC_MODE just
+    wakes the background worker, which runs the sync off the request path.
+    """
+    if _current_signature() == _SYNC_SIGNATURE:
+        return True
+    staff_sync_worker.wake()
+    return False
 
-    try:
-        if signature == _SYNC_SIGNATURE:
-            return
 
+def sync_staff_allowlist(db: Session, force: bool = False) -> Optional[dict]:
+    """Run the allowlist sync now (startup, background worker, ops scripts).
+
+    Skips when the config signature was already synced unless `force` (the
+    scheduled re-sync, which picks up users who registered since). Returns the
+    _run_sync summary, or None when nothing ran.
+    """
+    global _SYNC_SIGNATURE
+
+    with _SYNC_LOCK:
+        signature = _current_signature()
+        if signature == _SYNC_SIGNATURE and not force:
+            return None
+
+        raw_allowlist, mode = signature
         config = get_staff_allowlist_config(raw_allowlist)
         for warning in config.warnings:
             logger.warning(warning)
 
         if not config.should_sync:
             _SYNC_SIGNATURE = signature
-            return
+            return None
 
         if not _metadata_table_exists(db):
             logger.warning(
@@ -228,14 +242,18 @@ def ensure_staff_sync_for_request(db: Session) -> None:
                 StaffManagementState.__tablename__,
             )
             _SYNC_SIGNATURE = signature
-            return
-
-        deadline = time.monotonic() + _get_timeout_seconds()
-        result = _run_sync(db, config, mode, deadline)
+            return None
+
+        started = time.monotonic()
+        try:
+            result = _run_sync(db, config, mode, started + _get_timeout_seconds())
+        except Exception:
+            staff_sync_metrics.record(time.monotonic() - started, None)
+            raise
+        staff_sync_metrics.record(time.monotonic() - started, result)
         if result["completed"]:
             _SYNC_SIGNATURE = signature
-    finally:
-        _SYNC_LOCK.release()
+        return result
 
 
 def _metadata_table_exists(db: Session) -> bool:
@@ -420,4 +438,114 @@ def _run_sync(db: Session, config: StaffAllowlistConfig, mode: str, deadline: fl
         summary["timed_out"],
     )
     summary["completed"] = not summary["timed_out"]
-    return summary
\ No newline at end of file
+    return summary
+
+class StaffSyncMetrics:
+    """Duration and outcome counters of allowlist sync runs in this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.runs = 0
+        self.completed = 0
+        self.timed_out = 0
+        self.failed = 0
+        self.last_duration_seconds: Optional[float] = None
+        self.max_duration_seconds = 0.0
+        self.total_duration_seconds = 0.0
+        self.last_run_at = None
+        self.last_summary: Optional[dict] = None
+
+    def record(self, seconds: float, summary: Optional[dict]) -> None:
+        with self._lock:
+            self.runs += 1
+            if summary is None:
+                self.failed += 1
+            elif summary["completed"]:
+                self.completed += 1
+            else:
+                self.timed_out += 1
+            self.last_duration_seconds = seconds
+            self.max_duration_seconds = max(self.max_duration_seconds, seconds)
+            self.total_duration_seconds += seconds
+            self.last_run_at = now_tz()
+            self.last_summary = summary
+
+    def stats(self) -> dict:
+        with self._lock:
+            runs = self.runs
+            return {
+                "runs": runs,
+                "completed": self.completed,
+                "timed_out": self.timed_out,
+                "failed": self.failed,
+                "last_duration_ms": round(self.last_duration_seconds * 1000, 1) if self.last_duration_seconds is not None else None,
+                "avg_duration_ms": round(self.total_duration_seconds / runs * 1000, 1) if runs else None,
+                "max_duration_ms": round(self.max_duration_seconds * 1000, 1),
+                "last_run_at": self.last_run_at.isoformat() if self.last_run_at else None,
+                "last_summary": self.last_summary,
+            }
+
+
+class StaffSyncWorker:
+    """Daemon thread that runs the sync at startup, every STAFF_SYNC_INTERVAL_SECONDS,
+    and whenever check_staff_sync_signature() sees a config change."""
+
+    # Pause before retrying a sync that timed out or failed
+    RETRY_SECONDS = 5.0
+
+    def __init__(self):
+        self._thread: Optional[threading.Thread] = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="staff-sync", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._thread = None
+
+    def wake(self) -> None:
+        """Config-change signal: run a sync soon (no-op until start())."""
+        self._wake.set()
+
+    def run_once(self, force: bool = False) -> Optional[dict]:
+        from ..database import SessionLocal
+
+        db = SessionLocal()
+        try:
+            return sync_staff_allowlist(db, force=force)
+        finally:
+            db.close()
+
+    def _loop(self) -> None:
+        force = True  # startup
+        while not self._stop.is_set():
+            try:
+                result = self.run_once(force=force)
+                retry = result is not None and not result["completed"]
+            except Exception as exc:
+                logger.warning("[staff-sync] Background sync failed: %s", exc)
+                retry = True
+            if retry and self._stop.wait(self.RETRY_SECONDS):
+                return
+
+            interval = _get_interval_seconds()
+            # Scheduled tick → forced re-sync; wake() → sync only if the signature changed
+            force = not self._wake.wait(interval or None)
+            self._wake.clear()
+
+
+staff_sync_metrics = StaffSyncMetrics()
+staff_sync_worker = StaffSyncWorker()
@@ -68,6 +68,10 @@ def normalize_subscription_state(user, db=None) -> bool:
     ``subscription_tier = "free"`` back to the database so that the stale
     state does not persist across requests.
 
+    Request paths don't call this any more — the scheduled sweeper
+    (app/services/subscription_sweeper.py) downgrades all expired users in
+    one UPDATE. Kept for one-off fixes of a single loaded user.
+
     Returns True if the user was downgraded, False otherwise.
 
     If *db* is provided the caller is responsible for committing.
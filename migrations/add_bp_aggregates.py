@@ -0,0 +1,129 @@
+"""Migration: Create blood_pressure_aggregates table (per-user BP rollup).
+
+Backs O(1) /api/v1/stats/summary. Rows are built lazily on first access or
+first write per user; to backfill everything up front run:
+
+    python -m app.services.bp_stats_service rebuild
+
+Usage:
+    python -m migrations.add_bp_aggregates
+    # or with custom DB:
+    DATABASE_URL=postgresql://... python -m migrations.add_bp_aggregates
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+def _sqlite_db_path(database_url: str) -> str:
+    if database_url.startswith("sqlite:///"):
+        return database_url.replace("sqlite:///", "", 1)
+    return "blood_pressure.db"
+
+
+def migrate_sqlite(db_path: str = "blood_pressure.db"):
+    import sqlite3
+
+    if not os.path.exists(db_path):
+        print(f"Database not found at {db_path}")
+        return
+
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name='blood_pressure_aggregates'"
+        )
+        if cursor.fetchone():
+            print("'blood_pressure_aggregates' table already exists.")
+            return
+
+        print("Creating 'blood_pressure_aggregates' table...")
+        cursor.execute(
+            """
+            CREATE TABLE blood_pressure_aggregates (
+                user_id INTEGER PRIMARY KEY REFERENCES users(id),
+                record_count INTEGER NOT NULL DEFAULT 0,
+                sum_systolic BIGINT NOT NULL DEFAULT 0,
+                sumsq_systolic BIGINT NOT NULL DEFAULT 0,
+                sum_diastolic BIGINT NOT NULL DEFAULT 0,
+                sumsq_diastolic BIGINT NOT NULL DEFAULT 0,
+                sum_pulse BIGINT NOT NULL DEFAULT 0,
+                sumsq_pulse BIGINT NOT NULL DEFAULT 0,
+                base_date DATETIME,
+                sum_x FLOAT NOT NULL DEFAULT 0,
+                sum_xx FLOAT NOT NULL DEFAULT 0,
+                sum_x_systolic FLOAT NOT NULL DEFAULT 0,
+                sum_x_diastolic FLOAT NOT NULL DEFAULT 0,
+                histograms TEXT NOT NULL DEFAULT '{}',
+                updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+            """
+        )
+        conn.commit()
+        print("Migration successful: Created 'blood_pressure_aggregates' table.")
+    except sqlite3.Error as exc:
+        print(f"Migration error: {exc}")
+    finally:
+        conn.close()
+
+
+def migrate_postgres(database_url: str):
+    from sqlalchemy import create_engine, text
+    from sqlalchemy.exc import SQLAlchemyError
+
+    engine = create_engine(database_url)
+    with engine.connect() as conn:
+        try:
+            result = conn.execute(
+                text(
+                    "SELECT EXISTS (SELECT 1 FROM information_schema.tables WHERE table_name='blood_pressure_aggregates')"
+                )
+            )
+            if result.scalar():
+                print("'blood_pressure_aggregates' table already exists.")
+                return
+
+            print("Creating 'blood_pressure_aggregates' table...")
+            conn.execute(
+                text(
+                    """
+                    CREATE TABLE blood_pressure_aggregates (
+                        user_id INTEGER PRIMARY KEY REFERENCES users(id),
+                        record_count INTEGER NOT NULL DEFAULT 0,
+                        sum_systolic BIGINT NOT NULL DEFAULT 0,
+                        sumsq_systolic BIGINT NOT NULL DEFAULT 0,
+                        sum_diastolic BIGINT NOT NULL DEFAULT 0,
+                        sumsq_diastolic BIGINT NOT NULL DEFAULT 0,
+                        sum_pulse BIGINT NOT NULL DEFAULT 0,
+                        sumsq_pulse BIGINT NOT NULL DEFAULT 0,
+                        base_date TIMESTAMP,
+                        sum_x DOUBLE PRECISION NOT NULL DEFAULT 0,
+                        sum_xx DOUBLE PRECISION NOT NULL DEFAULT 0,
+                        sum_x_systolic DOUBLE PRECISION NOT NULL DEFAULT 0,
+                        sum_x_diastolic DOUBLE PRECISION NOT NULL DEFAULT 0,
+                        histograms TEXT NOT NULL DEFAULT '{}',
+                        updated_at TIMESTAMP DEFAULT NOW()
+                    )
+                    """
+                )
+            )
+            conn.commit()
+            print("Migration successful: Created 'blood_pressure_aggregates' table.")
+        except SQLAlchemyError as exc:
+            print(f"Migration error: {exc}")
+
+
+def migrate():
+    database_url = os.getenv("DATABASE_URL", "sqlite:///./blood_pressure.db")
+    if database_url.startswith("postgresql"):
+        migrate_postgres(database_url)
+        return
+    migrate_sqlite(_sqlite_db_path(database_url))
+
+
+if __name__ == "__main__":
+    migrate()
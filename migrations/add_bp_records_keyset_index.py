@@ -0,0 +1,87 @@
+"""Migration: Add composite (user_id, measurement_date DESC, id) index to blood_pressure_records.
+
+Backs cursor-mode pagination on GET /api/v1/bp-records, which seeks on
+(measurement_date, id) per user instead of COUNT + OFFSET.
+
+Usage:
+    python -m migrations.add_bp_records_keyset_index
+    # or with custom DB:
+    DATABASE_URL=postgresql://... python -m migrations.add_bp_records_keyset_index
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+INDEX_NAME = "ix_blood_pressure_records_user_date_id"
+INDEX_COLUMNS = "(user_id, measurement_date DESC, id)"
+
+
+def _sqlite_db_path(database_url: str) -> str:
+    if database_url.startswith("sqlite:///"):
+        return database_url.replace("sqlite:///", "", 1)
+    return "blood_pressure.db"
+
+
+def migrate_sqlite(db_path: str = "blood_pressure.db"):
+    import sqlite3
+
+    if not os.path.exists(db_path):
+        print(f"Database not found at {db_path}")
+        return
+
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='index' AND name=?", (INDEX_NAME,))
+        if cursor.fetchone():
+            print(f"Index '{INDEX_NAME}' already exists. Nothing to do.")
+            return
+
+        print(f"Creating index '{INDEX_NAME}' on blood_pressure_records...")
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {INDEX_NAME} ON blood_pressure_records {INDEX_COLUMNS}")
+        conn.commit()
+        print(f"Migration successful: Created '{INDEX_NAME}'.")
+    except sqlite3.Error as exc:
+        print(f"Migration error: {exc}")
+    finally:
+        conn.close()
+
+
+def migrate_postgres(database_url: str):
+    from sqlalchemy import create_engine, text
+    from sqlalchemy.exc import SQLAlchemyError
+
+    engine = create_engine(database_url)
+    # CONCURRENTLY avoids blocking writes on large tables but cannot run inside a transaction.
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        try:
+            result = conn.execute(
+                text("SELECT EXISTS (SELECT 1 FROM pg_indexes WHERE indexname = :name)"),
+                {"name": INDEX_NAME}
+            )
+            if result.scalar():
+                print(f"Index '{INDEX_NAME}' already exists. Nothing to do.")
+                return
+
+            print(f"Creating index '{INDEX_NAME}' on blood_pressure_records...")
+            conn.execute(text(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {INDEX_NAME} ON blood_pressure_records {INDEX_COLUMNS}"
+            ))
+            print(f"Migration successful: Created '{INDEX_NAME}'.")
+        except SQLAlchemyError as exc:
+            print(f"Migration error: {exc}")
+
+
+def migrate():
+    database_url = os.getenv("DATABASE_URL", "sqlite:///./blood_pressure.db")
+    if database_url.startswith("postgres"):
+        migrate_postgres(database_url.replace("postgres://", "postgresql://", 1))
+        return
+    migrate_sqlite(_sqlite_db_path(database_url))
+
+
+if __name__ == "__main__":
+    migrate()
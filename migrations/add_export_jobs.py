@@ -0,0 +1,129 @@
+"""Migration: Create export_jobs table (background data exports).
+
+Job rows track status and point at the built file in the export artifact
+store (EXPORT_ARTIFACT_DIR).
+
+Usage:
+    python -m migrations.add_export_jobs
+    # or with custom DB:
+    DATABASE_URL=postgresql://... python -m migrations.add_export_jobs
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+def _sqlite_db_path(database_url: str) -> str:
+    if database_url.startswith("sqlite:///"):
+        return database_url.replace("sqlite:///", "", 1)
+    return "blood_pressure.db"
+
+
+def migrate_sqlite(db_path: str = "blood_pressure.db"):
+    import sqlite3
+
+    if not os.path.exists(db_path):
+        print(f"Database not found at {db_path}")
+        return
+
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name='export_jobs'"
+        )
+        if cursor.fetchone():
+            print("'export_jobs' table already exists.")
+            return
+
+        print("Creating 'export_jobs' table...")
+        cursor.execute(
+            """
+            CREATE TABLE export_jobs (
+                id VARCHAR(36) PRIMARY KEY,
+                user_id INTEGER NOT NULL REFERENCES users(id),
+                scope VARCHAR NOT NULL DEFAULT 'my_data',
+                export_format VARCHAR NOT NULL DEFAULT 'json',
+                gzip BOOLEAN NOT NULL DEFAULT 0,
+                status VARCHAR NOT NULL DEFAULT 'queued',
+                record_count INTEGER,
+                artifact_key VARCHAR,
+                artifact_size BIGINT,
+                error_message VARCHAR,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                started_at DATETIME,
+                completed_at DATETIME,
+                expires_at DATETIME
+            )
+            """
+        )
+        cursor.execute("CREATE INDEX ix_export_jobs_user_id ON export_jobs (user_id)")
+        cursor.execute("CREATE INDEX ix_export_jobs_status ON export_jobs (status)")
+        conn.commit()
+        print("Migration successful: Created 'export_jobs' table.")
+    except sqlite3.Error as exc:
+        print(f"Migration error: {exc}")
+    finally:
+        conn.close()
+
+
+def migrate_postgres(database_url: str):
+    from sqlalchemy import create_engine, text
+    from sqlalchemy.exc import SQLAlchemyError
+
+    engine = create_engine(database_url)
+    with engine.connect() as conn:
+        try:
+            result = conn.execute(
+                text(
+                    "SELECT EXISTS (SELECT 1 FROM information_schema.tables WHERE table_name='export_jobs')"
+                )
+            )
+            if result.scalar():
+                print("'export_jobs' table already exists.")
+                return
+
+            print("Creating 'export_jobs' table...")
+            conn.execute(
+                text(
+                    """
+                    CREATE TABLE export_jobs (
+                        id VARCHAR(36) PRIMARY KEY,
+                        user_id INTEGER NOT NULL REFERENCES users(id),
+                        scope VARCHAR NOT NULL DEFAULT 'my_data',
+                        export_format VARCHAR NOT NULL DEFAULT 'json',
+                        gzip BOOLEAN NOT NULL DEFAULT FALSE,
+                        status VARCHAR NOT NULL DEFAULT 'queued',
+                        record_count INTEGER,
+                        artifact_key VARCHAR,
+                        artifact_size BIGINT,
+                        error_message VARCHAR,
+                        created_at TIMESTAMP DEFAULT NOW(),
+                        started_at TIMESTAMP,
+                        completed_at TIMESTAMP,
+                        expires_at TIMESTAMP
+                    )
+                    """
+                )
+            )
+            conn.execute(text("CREATE INDEX ix_export_jobs_user_id ON export_jobs (user_id)"))
+            conn.execute(text("CREATE INDEX ix_export_jobs_status ON export_jobs (status)"))
+            conn.commit()
+            print("Migration successful: Created 'export_jobs' table.")
+        except SQLAlchemyError as exc:
+            print(f"Migration error: {exc}")
+
+
+def migrate():
+    database_url = os.getenv("DATABASE_URL", "sqlite:///./blood_pressure.db")
+    if database_url.startswith("postgresql"):
+        migrate_postgres(database_url)
+        return
+    migrate_sqlite(_sqlite_db_path(database_url))
+
+
+if __name__ == "__main__":
+    migrate()
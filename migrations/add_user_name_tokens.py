@@ -0,0 +1,100 @@
+"""Migration: Create user_name_tokens table (blind n-gram index for name search).
+
+Partial doctor-name search reads only this index. After creating the table,
+backfill tokens for existing users:
+
+    python -m app.services.name_search rebuild
+
+Usage:
+    python -m migrations.add_user_name_tokens
+    # or with custom DB:
+    DATABASE_URL=postgresql://... python -m migrations.add_user_name_tokens
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+CREATE_TABLE = """
+    CREATE TABLE user_name_tokens (
+        token VARCHAR(16) NOT NULL,
+        user_id INTEGER NOT NULL REFERENCES users(id),
+        PRIMARY KEY (token, user_id)
+    )
+"""
+CREATE_INDEX = "CREATE INDEX ix_user_name_tokens_user_id ON user_name_tokens (user_id)"
+
+
+def _sqlite_db_path(database_url: str) -> str:
+    if database_url.startswith("sqlite:///"):
+        return database_url.replace("sqlite:///", "", 1)
+    return "blood_pressure.db"
+
+
+def migrate_sqlite(db_path: str = "blood_pressure.db"):
+    import sqlite3
+
+    if not os.path.exists(db_path):
+        print(f"Database not found at {db_path}")
+        return
+
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name='user_name_tokens'"
+        )
+        if cursor.fetchone():
+            print("'user_name_tokens' table already exists.")
+            return
+
+        print("Creating 'user_name_tokens' table...")
+        cursor.execute(CREATE_TABLE)
+        cursor.execute(CREATE_INDEX)
+        conn.commit()
+        print("Migration successful: Created 'user_name_tokens' table.")
+        print("Run `python -m app.services.name_search rebuild` to index existing users.")
+    except sqlite3.Error as exc:
+        print(f"Migration error: {exc}")
+    finally:
+        conn.close()
+
+
+def migrate_postgres(database_url: str):
+    from sqlalchemy import create_engine, text
+    from sqlalchemy.exc import SQLAlchemyError
+
+    engine = create_engine(database_url)
+    with engine.connect() as conn:
+        try:
+            result = conn.execute(
+                text(
+                    "SELECT EXISTS (SELECT 1 FROM information_schema.tables WHERE table_name='user_name_tokens')"
+                )
+            )
+            if result.scalar():
+                print("'user_name_tokens' table already exists.")
+                return
+
+            print("Creating 'user_name_tokens' table...")
+            conn.execute(text(CREATE_TABLE))
+            conn.execute(text(CREATE_INDEX))
+            conn.commit()
+            print("Migration successful: Created 'user_name_tokens' table.")
+            print("Run `python -m app.services.name_search rebuild` to index existing users.")
+        except SQLAlchemyError as exc:
+            print(f"Migration error: {exc}")
+
+
+def migrate():
+    database_url = os.getenv("DATABASE_URL", "sqlite:///./blood_pressure.db")
+    if database_url.startswith("postgresql"):
+        migrate_postgres(database_url)
+        return
+    migrate_sqlite(_sqlite_db_path(database_url))
+
+
+if __name__ == "__main__":
+    migrate()
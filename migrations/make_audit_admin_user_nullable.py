@@ -0,0 +1,108 @@
+"""Migration: Allow NULL admin_user_id in admin_audit_logs.
+
+System actions (e.g. the subscription sweeper's ``subscription_expired``
+rows) have no human actor; they are written with admin_user_id NULL and
+``"actor": "system"`` in details. Existing rows are kept as they are.
+
+Usage:
+    python -m migrations.make_audit_admin_user_nullable
+    # or with custom DB:
+    DATABASE_URL=postgresql://... python -m migrations.make_audit_admin_user_nullable
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+def _sqlite_db_path(database_url: str) -> str:
+    if database_url.startswith("sqlite:///"):
+        return database_url.replace("sqlite:///", "", 1)
+    return "blood_pressure.db"
+
+
+def migrate_sqlite(db_path: str = "blood_pressure.db"):
+    import sqlite3
+
+    if not os.path.exists(db_path):
+        print(f"Database not found at {db_path}")
+        return
+
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    try:
+        columns = {row[1]: row for row in cursor.execute("PRAGMA table_info(admin_audit_logs)")}
+        if not columns:
+            print("'admin_audit_logs' table not found. Run migrations.add_admin_audit_log first.")
+            return
+        if not columns["admin_user_id"][3]:  # notnull flag
+            print("'admin_audit_logs.admin_user_id' is already nullable. Nothing to do.")
+            return
+
+        # SQLite can't drop NOT NULL in place: rebuild the table
+        print("Rebuilding 'admin_audit_logs' with nullable admin_user_id...")
+        cursor.execute("BEGIN")
+        cursor.execute("""
+            CREATE TABLE admin_audit_logs_new (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                admin_user_id INTEGER REFERENCES users(id),
+                action VARCHAR NOT NULL,
+                target_user_id INTEGER REFERENCES users(id),
+                details TEXT,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        cursor.execute("""
+            INSERT INTO admin_audit_logs_new (id, admin_user_id, action, target_user_id, details, created_at)
+            SELECT id, admin_user_id, action, target_user_id, details, created_at FROM admin_audit_logs
+        """)
+        cursor.execute("DROP TABLE admin_audit_logs")
+        cursor.execute("ALTER TABLE admin_audit_logs_new RENAME TO admin_audit_logs")
+        cursor.execute("CREATE INDEX IF NOT EXISTS ix_admin_audit_logs_id ON admin_audit_logs (id)")
+        conn.commit()
+        print("Migration successful: admin_audit_logs.admin_user_id is nullable.")
+    except sqlite3.Error as exc:
+        conn.rollback()
+        print(f"Migration error: {exc}")
+    finally:
+        conn.close()
+
+
+def migrate_postgres(database_url: str):
+    from sqlalchemy import create_engine, text
+    from sqlalchemy.exc import SQLAlchemyError
+
+    engine = create_engine(database_url)
+    with engine.connect() as conn:
+        try:
+            nullable = conn.execute(text(
+                "SELECT is_nullable FROM information_schema.columns "
+                "WHERE table_name = 'admin_audit_logs' AND column_name = 'admin_user_id'"
+            )).scalar()
+            if nullable is None:
+                print("'admin_audit_logs' table not found. Run migrations.add_admin_audit_log first.")
+                return
+            if nullable == "YES":
+                print("'admin_audit_logs.admin_user_id' is already nullable. Nothing to do.")
+                return
+
+            print("Dropping NOT NULL on admin_audit_logs.admin_user_id...")
+            conn.execute(text("ALTER TABLE admin_audit_logs ALTER COLUMN admin_user_id DROP NOT NULL"))
+            conn.commit()
+            print("Migration successful: admin_audit_logs.admin_user_id is nullable.")
+        except SQLAlchemyError as exc:
+            print(f"Migration error: {exc}")
+
+
+def migrate():
+    database_url = os.getenv("DATABASE_URL", "sqlite:///./blood_pressure.db")
+    if database_url.startswith("postgres"):
+        migrate_postgres(database_url.replace("postgres://", "postgresql://", 1))
+        return
+    migrate_sqlite(_sqlite_db_path(database_url))
+
+
+if __name__ == "__main__":
+    migrate()
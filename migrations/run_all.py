@@ -4,7 +4,18 @@ Use this as the single entrypoint from task runners and deployment workflows.
 Every step is idempotent and safe to re-run.
 """
 
-from migrations import add_admin_audit_log, add_payment_fields, add_staff_management_state, add_timezone_column, migrate_schema
+from migrations import (
+    add_admin_audit_log,
+    add_bp_aggregates,
+    add_bp_records_keyset_index,
+    add_export_jobs,
+    add_payment_fields,
+    add_staff_management_state,
+    add_timezone_column,
+    add_user_name_tokens,
+    make_audit_admin_user_nullable,
+    migrate_schema,
+)
 
 
 MIGRATIONS = [
@@ -13,6 +24,11 @@ MIGRATIONS = [
     ("admin_audit_logs", add_admin_audit_log.migrate),
     ("staff_management_states", add_staff_management_state.migrate),
     ("payments current schema", add_payment_fields.migrate),
+    ("blood_pressure_records keyset index", add_bp_records_keyset_index.migrate),
+    ("blood_pressure_aggregates", add_bp_aggregates.migrate),
+    ("export_jobs", add_export_jobs.migrate),
+    ("user_name_tokens", add_user_name_tokens.migrate),
+    ("admin_audit_logs nullable admin_user_id", make_audit_admin_user_nullable.migrate),
 ]
 
 
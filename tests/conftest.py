@@ -75,11 +75,20 @@ def test_engine():
     Base.metadata.create_all(bind=engine)
     yield engine
     Base.metadata.drop_all(bind=engine)
-    # Clean up test db file
-    try:
-        os.unlink("./test_bp.db")
-    except FileNotFoundError:
-        pass
+    # Clean up test db file (and the WAL/shm files of the app's SQLite profile)
+    for path in ("./test_bp.db", "./test_bp.db-wal", "./test_bp.db-shm"):
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+
+@pytest.fixture(autouse=True)
+def _clear_principal_cache():
+    """User ids repeat across the tests' databases; don't serve one test's cached user to the next."""
+    from app.utils.principal_cache import principal_cache
+    principal_cache.clear()
+    yield
 
 
 @pytest.fixture(scope="function")
@@ -97,7 +106,9 @@ def test_client(test_engine):
     """Create a FastAPI TestClient."""
     from fastapi.testclient import TestClient
     from app.main import app
-    from app.database import get_db
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    from sqlalchemy.pool import NullPool
+    from app.database import get_async_db, get_async_read_db, get_db, get_read_db
     from app.utils.rate_limiter import limiter
 
     # Disable rate limiting for tests
@@ -112,7 +123,18 @@ def test_client(test_engine):
         finally:
             db.close()
 
+    # Same file via aiosqlite; NullPool because TestClient may run each request on a new event loop
+    async_engine = create_async_engine("sqlite+aiosqlite:///./test_bp.db", poolclass=NullPool)
+    AsyncTestSession = async_sessionmaker(bind=async_engine, expire_on_commit=False)
+
+    async def override_get_async_db():
+        async with AsyncTestSession() as db:
+            yield db
+
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    app.dependency_overrides[get_read_db] = override_get_db
+    app.dependency_overrides[get_async_read_db] = override_get_async_db
     client = TestClient(app)
     yield client
     app.dependency_overrides.clear()
@@ -0,0 +1,115 @@
+"""Tests for cursor (keyset) pagination on GET /api/v1/bp-records."""
+
+from datetime import datetime, timedelta
+
+from app.models import User, BloodPressureRecord
+from app.routers.bp_records import encode_records_cursor, decode_records_cursor
+from app.utils.security import create_access_token
+from app.utils.timezone import now_tz
+
+
+def _make_user(db, tier="free"):
+    user = User(
+        role="patient",
+        is_active=True,
+        subscription_tier=tier,
+        subscription_expires_at=now_tz() + timedelta(days=30) if tier == "premium" else None,
+    )
+    user.full_name = "Cursor User"
+    user.password_hash = "fakehash"
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    return user
+
+
+def _add_records(db, user_id: int, count: int):
+    base = datetime(2025, 1, 1, 8, 0)
+    for i in range(count):
+        db.add(BloodPressureRecord(
+            user_id=user_id,
+            systolic=110 + (i % 40),
+            diastolic=70 + (i % 20),
+            pulse=60 + (i % 30),
+            # Pairs of records share a timestamp so the id tiebreaker is exercised.
+            measurement_date=base + timedelta(hours=i // 2),
+        ))
+    db.commit()
+
+
+def _headers(user_id: int) -> dict:
+    token = create_access_token({"user_id": user_id})
+    return {"Authorization": f"Bearer {token}", "X-API-Key": "test-api-key"}
+
+
+def _walk(test_client, user_id: int, per_page: int) -> list:
+    ids = []
+    params = {"pagination": "cursor", "per_page": per_page}
+    while True:
+        resp = test_client.get("/api/v1/bp-records", params=params, headers=_headers(user_id))
+        assert resp.status_code == 200
+        body = resp.json()
+        meta = body["meta"]["pagination"]
+        assert meta["mode"] == "cursor"
+        assert "total" not in meta
+        ids.extend(r["id"] for r in body["data"]["records"])
+        if not meta["has_more"]:
+            assert meta["next_cursor"] is None
+            return ids
+        params = {"cursor": meta["next_cursor"], "per_page": per_page}
+
+
+class TestCursorCodec:
+
+    def test_round_trip(self):
+        record = BloodPressureRecord(id=42, measurement_date=datetime(2025, 3, 4, 5, 6, 7, 890))
+        assert decode_records_cursor(encode_records_cursor(record)) == (record.measurement_date, 42)
+
+    def test_garbage_cursor_rejected(self, test_client, db_session):
+        user = _make_user(db_session)
+        resp = test_client.get(
+            "/api/v1/bp-records", params={"cursor": "not-a-cursor"}, headers=_headers(user.id)
+        )
+        assert resp.status_code == 400
+
+
+class TestCursorPagination:
+
+    def test_premium_walk_matches_full_ordering(self, test_client, db_session):
+        user = _make_user(db_session, tier="premium")
+        _add_records(db_session, user.id, 45)
+
+        ids = _walk(test_client, user.id, per_page=7)
+
+        expected = [
+            r.id for r in db_session.query(BloodPressureRecord)
+            .filter(BloodPressureRecord.user_id == user.id)
+            .order_by(BloodPressureRecord.measurement_date.desc(), BloodPressureRecord.id.desc())
+        ]
+        assert ids == expected
+        assert len(set(ids)) == 45
+
+    def test_free_user_capped_at_latest_30(self, test_client, db_session):
+        user = _make_user(db_session, tier="free")
+        _add_records(db_session, user.id, 45)
+
+        ids = _walk(test_client, user.id, per_page=8)
+
+        assert len(ids) == 30
+        latest = [
+            r.id for r in db_session.query(BloodPressureRecord)
+            .filter(BloodPressureRecord.user_id == user.id)
+            .order_by(BloodPressureRecord.measurement_date.desc(), BloodPressureRecord.id.desc())
+            .limit(30)
+        ]
+        assert ids == latest
+
+    def test_offset_mode_unchanged(self, test_client, db_session):
+        user = _make_user(db_session, tier="premium")
+        _add_records(db_session, user.id, 5)
+
+        resp = test_client.get("/api/v1/bp-records", headers=_headers(user.id))
+        assert resp.status_code == 200
+        meta = resp.json()["meta"]["pagination"]
+        assert meta["total"] == 5
+        assert meta["current_page"] == 1
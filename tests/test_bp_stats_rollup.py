@@ -0,0 +1,148 @@
+"""Tests for the incremental per-user BP rollup behind /api/v1/stats/summary."""
+
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models import User, BloodPressureRecord, BloodPressureAggregate
+from app.services.bp_stats_service import (
+    get_aggregate_state,
+    rebuild_aggregates,
+    summarize_latest_readings,
+    summarize_readings,
+    _summarize_state,
+)
+
+
+def _make_user(db):
+    user = User(role="patient", is_active=True)
+    user.full_name = "Rollup User"
+    user.password_hash = "fakehash"
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    return user
+
+
+def _add_random_records(db, user_id: int, count: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    base = datetime(2025, 6, 1, 7, 30)
+    records = []
+    for _ in range(count):
+        systolic = rng.randint(95, 175)
+        record = BloodPressureRecord(
+            user_id=user_id,
+            systolic=systolic,
+            diastolic=rng.randint(60, min(systolic - 10, 110)),
+            pulse=rng.randint(50, 110),
+            measurement_date=base + timedelta(minutes=rng.randint(0, 60 * 24 * 120)),
+        )
+        db.add(record)
+        records.append(record)
+    db.commit()
+    return records
+
+
+def _records(db, user_id: int) -> list:
+    return db.query(BloodPressureRecord).filter(BloodPressureRecord.user_id == user_id).all()
+
+
+def _stored_state(db, user_id: int) -> dict:
+    db.expire_all()
+    return get_aggregate_state(db, user_id)
+
+
+def _assert_close(actual, expected):
+    """Rollup math uses one-pass sums; allow a last-digit rounding difference."""
+    if isinstance(expected, dict):
+        assert actual.keys() == expected.keys()
+        for key in expected:
+            _assert_close(actual[key], expected[key])
+    elif isinstance(expected, float) or isinstance(actual, float):
+        assert actual == pytest.approx(expected, abs=0.011)
+    else:
+        assert actual == expected
+
+
+class TestRollupMatchesScan:
+
+    def test_summary_from_rollup_matches_row_scan(self, db_session):
+        user = _make_user(db_session)
+        _add_random_records(db_session, user.id, 40)
+
+        from_rollup = _summarize_state(_stored_state(db_session, user.id), include_advanced=True)
+        from_rows = summarize_readings(_records(db_session, user.id), include_advanced=True)
+
+        _assert_close(from_rollup, from_rows)
+
+    def test_update_and_delete_keep_rollup_consistent(self, db_session):
+        user = _make_user(db_session)
+        records = _add_random_records(db_session, user.id, 12, seed=11)
+
+        records[0].systolic = 199
+        records[1].measurement_date = datetime(2024, 1, 1, 6, 0)
+        db_session.commit()
+        db_session.delete(records[2])
+        db_session.commit()
+
+        incremental = _stored_state(db_session, user.id)
+        rebuild_aggregates(db_session, user_id=user.id)
+        rebuilt = _stored_state(db_session, user.id)
+
+        assert incremental["record_count"] == rebuilt["record_count"] == 11
+        assert incremental["histograms"] == rebuilt["histograms"]
+        _assert_close(
+            _summarize_state(incremental, include_advanced=True),
+            _summarize_state(rebuilt, include_advanced=True),
+        )
+        assert _summarize_state(incremental, include_advanced=True)["systolic"]["max"] == 199
+
+    def test_deleting_every_record_empties_rollup(self, db_session):
+        user = _make_user(db_session)
+        for record in _add_random_records(db_session, user.id, 3):
+            db_session.delete(record)
+        db_session.commit()
+
+        state = _stored_state(db_session, user.id)
+        assert state["record_count"] == 0
+        assert state["histograms"] == {}
+        assert summarize_latest_readings(db_session, user.id, 30, include_advanced=True) == (None, 0)
+
+
+class TestSummarizeLatestReadings:
+
+    def test_missing_rollup_is_built_in_memory_on_read(self, db_session):
+        user = _make_user(db_session)
+        _add_random_records(db_session, user.id, 5)
+        db_session.query(BloodPressureAggregate).filter(
+            BloodPressureAggregate.user_id == user.id
+        ).delete()
+        db_session.commit()
+
+        stats, total = summarize_latest_readings(db_session, user.id, 30, include_advanced=False)
+
+        assert total == 5
+        assert stats["total_records_period"] == 5
+        # Reads may run on a replica: nothing is written
+        assert db_session.get(BloodPressureAggregate, user.id) is None
+
+        # The next write to the user's readings persists the full rollup
+        _add_random_records(db_session, user.id, 1, seed=3)
+        db_session.expire_all()
+        assert db_session.get(BloodPressureAggregate, user.id).record_count == 6
+
+    def test_window_smaller_than_history_scans_latest_rows(self, db_session):
+        user = _make_user(db_session)
+        _add_random_records(db_session, user.id, 25)
+
+        stats, total = summarize_latest_readings(db_session, user.id, 10, include_advanced=True)
+
+        latest = db_session.query(BloodPressureRecord)\
+            .filter(BloodPressureRecord.user_id == user.id)\
+            .order_by(BloodPressureRecord.measurement_date.desc())\
+            .limit(10).all()
+        expected = summarize_readings(latest, include_advanced=True)
+        expected["total_records_all_time"] = 25
+        assert total == 25
+        assert stats == expected
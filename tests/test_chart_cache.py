@@ -0,0 +1,154 @@
+"""Tests for the content-addressed chart cache and ETag handling on /stats/chart."""
+
+from datetime import datetime, timedelta
+from io import BytesIO
+
+import pytest
+
+from app.models import User, BloodPressureRecord
+from app.utils import chart_generator
+from app.utils.chart_cache import ChartCache, MemoryChartCache
+from app.utils.chart_generator import build_chart_payload, chart_cache_key, generate_bp_chart
+from app.utils.security import create_access_token
+
+
+FAKE_PNG = b"\x89PNG" + b"\x00" * 200
+
+
+def _record(day: int, systolic: int = 120) -> dict:
+    return {
+        "measurement_date": f"2026-01-{day:02d}",
+        "measurement_time": "08:00",
+        "systolic": systolic,
+        "diastolic": 80,
+        "pulse": 70,
+    }
+
+
+@pytest.fixture
+def render_calls(monkeypatch):
+    calls = []
+
+    def fake_render(payload):
+        calls.append(payload)
+        return BytesIO(FAKE_PNG)
+
+    monkeypatch.setattr(chart_generator, "_render_chart", fake_render)
+    monkeypatch.setattr(chart_generator, "chart_cache", ChartCache(max_entries=8, redis_url=None))
+    return calls
+
+
+class TestMemoryChartCache:
+
+    def test_lru_evicts_least_recently_used(self):
+        cache = MemoryChartCache(max_entries=2)
+        cache.set("a", b"A")
+        cache.set("b", b"B")
+        assert cache.get("a") == b"A"  # "a" is now most recent
+        cache.set("c", b"C")
+
+        assert cache.get("b") is None
+        assert cache.get("a") == b"A"
+        assert cache.get("c") == b"C"
+
+    def test_zero_entries_disables_memory_tier(self):
+        cache = MemoryChartCache(max_entries=0)
+        cache.set("a", b"A")
+        assert cache.get("a") is None
+
+
+class TestRedisTierTimeout:
+
+    def test_unresponsive_redis_is_a_fast_miss(self):
+        import socket
+        import time
+
+        # Accepts connections (kernel backlog) but never answers
+        server = socket.socket()
+        server.bind(("127.0.0.1", 0))
+        server.listen(1)
+        try:
+            port = server.getsockname()[1]
+            cache = ChartCache(max_entries=8, redis_url=f"redis://127.0.0.1:{port}/0")
+            cache.redis.client.connection_pool.connection_kwargs["socket_timeout"] = 0.1
+
+            started = time.monotonic()
+            assert cache.get("missing") is None
+            assert time.monotonic() - started < 2
+            assert cache.misses == 1
+        finally:
+            server.close()
+
+
+class TestChartCacheKey:
+
+    def test_key_ignores_record_order(self):
+        forward = build_chart_payload([_record(1), _record(2)], lang="en")
+        backward = build_chart_payload([_record(2), _record(1)], lang="en")
+        assert chart_cache_key(forward) == chart_cache_key(backward)
+
+    def test_key_changes_with_values_and_lang(self):
+        base = chart_cache_key(build_chart_payload([_record(1)], lang="en"))
+        assert chart_cache_key(build_chart_payload([_record(1, systolic=121)], lang="en")) != base
+        assert chart_cache_key(build_chart_payload([_record(1)], lang="th")) != base
+
+
+class TestGenerateBpChartCaching:
+
+    def test_identical_input_renders_once(self, render_calls):
+        first = generate_bp_chart([_record(1), _record(2)], lang="en")
+        second = generate_bp_chart([_record(2), _record(1)], lang="en")
+
+        assert first.getvalue() == second.getvalue() == FAKE_PNG
+        assert len(render_calls) == 1
+        assert chart_generator.chart_cache.stats()["hits"] == 1
+
+    def test_new_reading_renders_again(self, render_calls):
+        generate_bp_chart([_record(1)], lang="en")
+        generate_bp_chart([_record(1), _record(2)], lang="en")
+        assert len(render_calls) == 2
+
+
+class TestChartEndpointETag:
+
+    def _user_with_records(self, db):
+        user = User(role="patient", is_active=True)
+        user.full_name = "Chart User"
+        user.password_hash = "fakehash"
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+        for i in range(3):
+            db.add(BloodPressureRecord(
+                user_id=user.id, systolic=120 + i, diastolic=80, pulse=70,
+                measurement_date=datetime(2026, 2, 1) + timedelta(days=i),
+            ))
+        db.commit()
+        return user
+
+    def test_if_none_match_returns_304(self, test_client, db_session, render_calls):
+        user = self._user_with_records(db_session)
+        headers = {
+            "Authorization": f"Bearer {create_access_token({'user_id': user.id})}",
+            "X-API-Key": "test-api-key",
+        }
+
+        first = test_client.get("/api/v1/stats/chart", headers=headers)
+        assert first.status_code == 200
+        assert first.content == FAKE_PNG
+        etag = first.headers["etag"]
+
+        second = test_client.get("/api/v1/stats/chart", headers={**headers, "If-None-Match": etag})
+        assert second.status_code == 304
+        assert second.headers["etag"] == etag
+        assert len(render_calls) == 1
+
+        # A new reading changes the content hash
+        db_session.add(BloodPressureRecord(
+            user_id=user.id, systolic=150, diastolic=95, pulse=80,
+            measurement_date=datetime(2026, 2, 10),
+        ))
+        db_session.commit()
+        third = test_client.get("/api/v1/stats/chart", headers={**headers, "If-None-Match": etag})
+        assert third.status_code == 200
+        assert third.headers["etag"] != etag
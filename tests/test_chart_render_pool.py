@@ -0,0 +1,147 @@
+"""Tests for the persistent chart render worker pool.
+
+A small Python script speaks the same framed protocol as `render.js --worker`
+so the pool can be exercised without Node.js or Chart.js installed.
+"""
+
+import sys
+import textwrap
+
+import pytest
+
+from app.utils.chart_render_pool import ChartRenderPool, ChartRenderError, ChartWorkerError
+
+
+FAKE_WORKER = textwrap.dedent('''
+    import json, os, struct, sys, time
+
+    stdin, stdout = sys.stdin.buffer, sys.stdout.buffer
+    while True:
+        header = stdin.read(4)
+        if len(header) < 4:
+            break
+        (length,) = struct.unpack(">I", header)
+        data = json.loads(stdin.read(length))
+        kind = data.get("type")
+        if kind == "ping":
+            status, body = 0, b"pong"
+        elif kind == "crash":
+            os._exit(3)
+        elif kind == "hang":
+            time.sleep(30)
+            continue
+        elif kind == "fail":
+            status, body = 1, b"Chart render error: bad data"
+        else:
+            status, body = 0, ("PNG:%d:%s" % (os.getpid(), data.get("labels"))).encode()
+        stdout.write(struct.pack(">BI", status, len(body)) + body)
+        stdout.flush()
+''')
+
+
+@pytest.fixture
+def pool(tmp_path):
+    script = tmp_path / "fake_worker.py"
+    script.write_text(FAKE_WORKER)
+    render_pool = ChartRenderPool([sys.executable, str(script)], size=2, job_timeout=2.0)
+    yield render_pool
+    render_pool.shutdown()
+
+
+def _pid(png: bytes) -> str:
+    return png.decode().split(":")[1]
+
+
+class TestChartRenderPool:
+
+    def test_worker_is_reused_across_jobs(self, pool):
+        first = pool.render({"labels": ["01/01"]})
+        second = pool.render({"labels": ["02/01"]})
+
+        assert first.endswith(b"['01/01']")
+        assert _pid(first) == _pid(second)
+        assert pool.stats()["spawned"] == 1
+        assert pool.stats()["jobs"] == 2
+
+    def test_render_error_keeps_worker(self, pool):
+        before = _pid(pool.render({"labels": []}))
+        with pytest.raises(ChartRenderError):
+            pool.render({"type": "fail"})
+        assert _pid(pool.render({"labels": []})) == before
+        assert pool.stats()["restarts"] == 0
+
+    def test_crashed_worker_is_replaced(self, pool):
+        before = _pid(pool.render({"labels": []}))
+        with pytest.raises(ChartWorkerError):
+            pool.render({"type": "crash"})
+        after = _pid(pool.render({"labels": []}))
+
+        assert before != after
+        stats = pool.stats()
+        assert stats["restarts"] == 1
+        assert stats["spawned"] == 1
+
+    def test_job_timeout_kills_worker(self, pool):
+        pool.job_timeout = 0.3
+        with pytest.raises(ChartWorkerError, match="timed out"):
+            pool.render({"type": "hang"})
+        assert pool.stats()["spawned"] == 0
+        assert pool.render({"labels": []}).startswith(b"PNG:")
+
+    def test_health_check_discards_dead_workers(self, pool):
+        pool.render({"labels": []})
+        worker = pool._idle[0]
+        worker.process.kill()
+        worker.process.wait()
+
+        stats = pool.health_check()
+        assert stats["idle"] == 0
+        assert stats["restarts"] == 1
+
+    def test_workers_recycled_after_max_jobs(self, pool):
+        pool.max_jobs_per_worker = 2
+        pids = {_pid(pool.render({"labels": []})) for _ in range(4)}
+        assert len(pids) == 2
+        assert pool.stats()["restarts"] == 0
+
+    def test_waiter_wakes_when_busy_worker_is_discarded(self, pool):
+        import threading
+        import time
+
+        pool.size = 1
+        busy = pool._acquire()
+        result = {}
+
+        def waiter():
+            started = time.monotonic()
+            result["png"] = pool.render({"labels": []})
+            result["elapsed"] = time.monotonic() - started
+
+        thread = threading.Thread(target=waiter)
+        thread.start()
+        time.sleep(0.2)
+        pool._discard(busy)
+        thread.join(timeout=5)
+
+        assert result["png"].startswith(b"PNG:")
+        assert result["elapsed"] < pool.job_timeout
+
+    def test_idle_workers_are_pinged_in_background(self, tmp_path):
+        import time
+
+        script = tmp_path / "fake_worker.py"
+        script.write_text(FAKE_WORKER)
+        render_pool = ChartRenderPool([sys.executable, str(script)], size=1, healthcheck_interval=0.1)
+        try:
+            render_pool.render({"labels": []})
+            worker = render_pool._idle[0]
+            worker.process.kill()
+            worker.process.wait()
+
+            deadline = time.monotonic() + 3
+            while render_pool.stats()["restarts"] == 0 and time.monotonic() < deadline:
+                time.sleep(0.05)
+            assert render_pool.stats()["restarts"] == 1
+            assert render_pool.stats()["idle"] == 0
+        finally:
+            render_pool.shutdown()
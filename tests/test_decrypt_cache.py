@@ -0,0 +1,141 @@
+"""Tests for decrypted-PII memoization on User and the process-wide decrypt cache."""
+
+import pytest
+
+from app.models import User
+from app.utils import encryption
+from app.utils.encryption import DecryptCache, encrypt_value
+
+
+@pytest.fixture
+def count_decrypts(monkeypatch):
+    calls = {"n": 0}
+    real = encryption.cipher_suite
+
+    class CountingCipher:
+        def encrypt(self, data):
+            return real.encrypt(data)
+
+        def decrypt(self, token):
+            calls["n"] += 1
+            return real.decrypt(token)
+
+    monkeypatch.setattr(encryption, "cipher_suite", CountingCipher())
+    monkeypatch.setattr(encryption, "decrypt_cache", DecryptCache(max_entries=0))
+    return calls
+
+
+class TestUserPIIMemo:
+
+    def test_repeated_reads_decrypt_once(self, count_decrypts):
+        user = User(role="patient")
+        user.email_encrypted = encrypt_value("memo@example.com")
+
+        assert [user.email for _ in range(5)] == ["memo@example.com"] * 5
+        assert count_decrypts["n"] == 1
+        assert encryption.decrypt_cache.memo_hits == 4
+
+    def test_memo_hit_counter_is_thread_safe(self, count_decrypts):
+        from concurrent.futures import ThreadPoolExecutor
+
+        token = encrypt_value("threaded")
+
+        def read_many(_):
+            memo = {}
+            for _ in range(2000):
+                encryption.decrypt_memoized(memo, "name", token)
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(read_many, range(8)))
+        assert encryption.decrypt_cache.stats()["memo_hits"] == 8 * 1999
+
+    def test_setter_seeds_memo_with_new_value(self, count_decrypts):
+        user = User(role="patient")
+        user.full_name = "First Name"
+        assert user.full_name == "First Name"
+        user.full_name = "Second Name"
+        assert user.full_name == "Second Name"
+        assert count_decrypts["n"] == 0
+
+    def test_memo_follows_column_changes(self, count_decrypts):
+        user = User(role="patient")
+        user.phone_number = "66811111111"
+        assert user.phone_number == "66811111111"
+
+        # e.g. a refresh from the DB or a direct column assignment
+        user.phone_number_encrypted = encrypt_value("66822222222")
+        assert user.phone_number == "66822222222"
+        user.phone_number_encrypted = None
+        assert user.phone_number is None
+
+    def test_typed_properties_still_convert(self, db_session):
+        user = User(role="patient", password_hash="fakehash")
+        user.telegram_id = 123456789
+        user.date_of_birth = "1990-05-01"
+        db_session.add(user)
+        db_session.commit()
+        db_session.expire(user)
+
+        assert user.telegram_id == 123456789
+        assert user.date_of_birth.year == 1990
+
+
+class TestProcessDecryptCache:
+
+    def test_shared_cache_serves_other_instances(self, count_decrypts, monkeypatch):
+        monkeypatch.setattr(encryption, "decrypt_cache", DecryptCache(max_entries=16))
+        # Encrypted elsewhere (another process), so not pre-seeded by encrypt_value
+        token = encryption.cipher_suite.encrypt(b"Shared Name").decode()
+
+        first, second = User(role="patient"), User(role="patient")
+        first.full_name_encrypted = token
+        second.full_name_encrypted = token
+
+        assert first.full_name == second.full_name == "Shared Name"
+        assert count_decrypts["n"] == 1
+        stats = encryption.decrypt_cache.stats()
+        assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+
+    def test_lru_bound(self):
+        cache = DecryptCache(max_entries=2)
+        for token in ("a", "b", "c"):
+            cache.set(token, token.upper())
+        assert cache.stats()["entries"] == 2
+        assert cache.get("a") is None
+        assert cache.get("c") == "C"
+
+    def test_disabled_by_default(self):
+        cache = DecryptCache(max_entries=0)
+        cache.set("token", "plain")
+        assert cache.get("token") is None
+        assert cache.stats()["enabled"] is False
+
+
+class TestBatchCrypto:
+
+    def test_decrypt_many_preserves_order_and_dedupes(self, count_decrypts):
+        a, b = encrypt_value("alpha"), encrypt_value("beta")
+
+        assert encryption.decrypt_many([a, None, b, a, "", a]) == ["alpha", None, "beta", "alpha", None, "alpha"]
+        assert count_decrypts["n"] == 2
+
+    def test_thread_pool_path_matches_serial(self, monkeypatch):
+        monkeypatch.setattr(encryption, "CRYPTO_BATCH_POOL_THRESHOLD", 8)
+        plaintexts = [f"patient-{i}" for i in range(50)]
+
+        tokens = encryption.encrypt_many(plaintexts)
+        assert len(set(tokens)) == 50
+        assert encryption.decrypt_many(tokens) == plaintexts
+
+    def test_prime_decrypted_seeds_user_memos(self, count_decrypts):
+        users = []
+        for i in range(3):
+            user = User(role="patient")
+            user.full_name_encrypted = encrypt_value(f"Name {i}")
+            users.append(user)
+
+        User.prime_decrypted(users + [None], "full_name_encrypted")
+        calls_after_prime = count_decrypts["n"]
+
+        assert [u.full_name for u in users] == ["Name 0", "Name 1", "Name 2"]
+        assert count_decrypts["n"] == calls_after_prime == 3
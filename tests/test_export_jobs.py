@@ -0,0 +1,231 @@
+"""Tests for background export jobs (/api/v1/export/jobs)."""
+
+import csv
+import gzip
+import io
+import json
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models import User, BloodPressureRecord, DoctorPatient, ExportJob
+from app.routers import export as export_router
+from app.utils.export_store import LocalExportStore
+from app.utils.security import create_access_token
+from app.utils.timezone import now_tz
+
+
+class _NeverRuns:
+    """Job pool stand-in: jobs stay queued, as if their process went away."""
+
+    def submit(self, fn, *args):
+        pass
+
+
+class _InlineExecutor:
+    """Runs submitted work immediately so tests can assert on the finished job."""
+
+    def submit(self, fn, *args):
+        fn(*args)
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = LocalExportStore(str(tmp_path / "exports"))
+    monkeypatch.setattr(export_router, "export_store", store)
+    monkeypatch.setattr(export_router, "_job_executor", _InlineExecutor())
+    return store
+
+
+def _make_user(db, role="patient", premium=True, name="Export User") -> User:
+    user = User(
+        role=role,
+        is_active=True,
+        verification_status="verified" if role == "doctor" else None,
+        subscription_tier="premium" if premium else "free",
+        subscription_expires_at=now_tz() + timedelta(days=30) if premium else None,
+    )
+    user.full_name = name
+    user.password_hash = "fakehash"
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    return user
+
+
+def _add_records(db, user_id: int, count: int) -> None:
+    base = datetime(2025, 1, 1, 7, 0)
+    db.add_all([
+        BloodPressureRecord(
+            user_id=user_id, systolic=110 + i % 40, diastolic=70 + i % 20, pulse=60 + i % 30,
+            measurement_date=base + timedelta(hours=i), measurement_time="07:00",
+        )
+        for i in range(count)
+    ])
+    db.commit()
+
+
+def _headers(user: User) -> dict:
+    return {
+        "Authorization": f"Bearer {create_access_token({'user_id': user.id})}",
+        "X-API-Key": "test-api-key",
+    }
+
+
+def _finished_job(client, user: User, body: dict) -> dict:
+    resp = client.post("/api/v1/export/jobs", json=body, headers=_headers(user))
+    assert resp.status_code == 202
+    job_id = resp.json()["data"]["job"]["job_id"]
+    return client.get(f"/api/v1/export/jobs/{job_id}", headers=_headers(user)).json()["data"]["job"]
+
+
+class TestExportJobs:
+
+    def test_json_job_builds_downloadable_artifact(self, test_client, db_session, store):
+        user = _make_user(db_session)
+        _add_records(db_session, user.id, 75)
+
+        resp = test_client.post("/api/v1/export/jobs", json={"format": "json"}, headers=_headers(user))
+        assert resp.status_code == 202
+        job_id = resp.json()["data"]["job"]["job_id"]
+
+        job = test_client.get(f"/api/v1/export/jobs/{job_id}", headers=_headers(user)).json()["data"]["job"]
+        assert job["status"] == "completed"
+        assert job["record_count"] == 75
+
+        download = test_client.get(job["download_url"], headers=_headers(user))
+        assert download.status_code == 200
+        assert download.headers["content-type"].startswith("application/json")
+        payload = json.loads(download.content)
+        assert payload["user_profile"]["full_name"] == "Export User"
+        assert len(payload["blood_pressure_history"]) == 75
+        assert payload["meta"]["record_count"] == 75
+        assert payload["meta"]["note"] == "Full History (Premium)"
+
+    def test_gzip_csv_and_free_tier_limit(self, test_client, db_session, store):
+        user = _make_user(db_session, premium=False)
+        _add_records(db_session, user.id, 40)
+
+        job = _finished_job(test_client, user, {"format": "csv", "gzip": True})
+        download = test_client.get(job["download_url"], headers=_headers(user))
+
+        assert download.headers["content-type"] == "application/gzip"
+        assert download.headers["content-disposition"].endswith('.csv.gz"')
+        rows = list(csv.DictReader(io.StringIO(gzip.decompress(download.content).decode("utf-8"))))
+        assert len(rows) == 30
+
+    def test_doctor_patient_panel(self, test_client, db_session, store):
+        doctor = _make_user(db_session, role="doctor", premium=False, name="Dr. Panel")
+        linked = _make_user(db_session, name="Linked Patient")
+        unlinked = _make_user(db_session, name="Other Patient")
+        db_session.add(DoctorPatient(doctor_id=doctor.id, patient_id=linked.id, is_active=True))
+        db_session.commit()
+        _add_records(db_session, linked.id, 5)
+        _add_records(db_session, unlinked.id, 5)
+
+        job = _finished_job(test_client, doctor, {"scope": "patient_panel", "format": "ndjson"})
+        lines = [json.loads(l) for l in test_client.get(job["download_url"], headers=_headers(doctor)).text.splitlines()]
+
+        records = [l for l in lines if l["type"] == "bp_record"]
+        assert len(records) == 5
+        assert {r["patient_id"] for r in records} == {linked.id}
+        assert records[0]["patient_name"] == "Linked Patient"
+        assert lines[0]["patients"] == [{"patient_id": linked.id, "full_name": "Linked Patient"}]
+
+    def test_patient_panel_requires_doctor(self, test_client, db_session, store):
+        user = _make_user(db_session)
+        resp = test_client.post(
+            "/api/v1/export/jobs", json={"scope": "patient_panel"}, headers=_headers(user)
+        )
+        assert resp.status_code == 403
+
+    def test_jobs_are_private_to_their_owner(self, test_client, db_session, store):
+        owner = _make_user(db_session)
+        other = _make_user(db_session, name="Someone Else")
+        job_id = test_client.post("/api/v1/export/jobs", json={}, headers=_headers(owner)).json()["data"]["job"]["job_id"]
+
+        assert test_client.get(f"/api/v1/export/jobs/{job_id}", headers=_headers(other)).status_code == 404
+        assert test_client.get(f"/api/v1/export/jobs/{job_id}/download", headers=_headers(other)).status_code == 404
+
+    def test_active_job_limit(self, test_client, db_session, store, monkeypatch):
+        monkeypatch.setattr(export_router, "_job_executor", _NeverRuns())
+        monkeypatch.setattr(export_router, "EXPORT_JOB_MAX_ACTIVE", 1)
+        user = _make_user(db_session)
+
+        first = test_client.post("/api/v1/export/jobs", json={}, headers=_headers(user))
+        second = test_client.post("/api/v1/export/jobs", json={}, headers=_headers(user))
+        assert first.json()["data"]["job"]["status"] == "queued"
+        assert second.status_code == 429
+
+        job_id = first.json()["data"]["job"]["job_id"]
+        assert test_client.get(f"/api/v1/export/jobs/{job_id}/download", headers=_headers(user)).status_code == 409
+
+
+class TestExportCleanup:
+
+    def test_expired_artifacts_are_removed(self, test_client, db_session, store):
+        user = _make_user(db_session)
+        _add_records(db_session, user.id, 3)
+        job_id = test_client.post("/api/v1/export/jobs", json={}, headers=_headers(user)).json()["data"]["job"]["job_id"]
+
+        job = db_session.get(ExportJob, job_id)
+        db_session.refresh(job)
+        key = job.artifact_key
+        assert store.exists(key)
+
+        job.expires_at = now_tz() - timedelta(minutes=1)
+        db_session.commit()
+        assert test_client.get(f"/api/v1/export/jobs/{job_id}/download", headers=_headers(user)).status_code == 410
+
+        assert export_router.cleanup_expired_exports(db_session) == 1
+        db_session.refresh(job)
+        assert job.status == "expired"
+        assert not store.exists(key)
+
+    def test_orphaned_jobs_stop_counting_against_the_limit(self, test_client, db_session, monkeypatch):
+        # Jobs left queued/running by a process that restarted never finish
+        monkeypatch.setattr(export_router, "_job_executor", _NeverRuns())
+        monkeypatch.setattr(export_router, "EXPORT_JOB_MAX_ACTIVE", 1)
+        user = _make_user(db_session)
+        stale = now_tz() - timedelta(minutes=export_router.EXPORT_JOB_STALE_MINUTES + 1)
+        orphan = ExportJob(id=str(uuid.uuid4()), user_id=user.id, status="running",
+                           created_at=stale, started_at=stale)
+        db_session.add(orphan)
+        db_session.commit()
+
+        resp = test_client.post("/api/v1/export/jobs", json={}, headers=_headers(user))
+        assert resp.status_code == 202
+        db_session.refresh(orphan)
+        assert orphan.status == "failed"
+
+    def test_cleanup_fails_only_stale_jobs(self, db_session):
+        user = _make_user(db_session)
+        stale = now_tz() - timedelta(minutes=export_router.EXPORT_JOB_STALE_MINUTES + 1)
+        old_queued = ExportJob(id=str(uuid.uuid4()), user_id=user.id, status="queued", created_at=stale)
+        # Queued long ago but started recently: still running in a live process
+        live = ExportJob(id=str(uuid.uuid4()), user_id=user.id, status="running",
+                         created_at=stale, started_at=now_tz())
+        db_session.add_all([old_queued, live])
+        db_session.commit()
+
+        export_router.cleanup_expired_exports(db_session)
+        db_session.refresh(old_queued)
+        db_session.refresh(live)
+        assert (old_queued.status, live.status) == ("failed", "running")
+
+    def test_store_sweeps_old_orphaned_files(self, store):
+        store.write("1/orphan.json", [b"{}"])
+        store.write("1/fresh.json", [b"{}"])
+        old = time.time() - 7200
+        os.utime(store._path("1/orphan.json"), (old, old))
+
+        assert store.delete_older_than(3600) == 1
+        assert store.exists("1/fresh.json")
+        assert not store.exists("1/orphan.json")
+
+    def test_store_rejects_keys_outside_root(self, store):
+        with pytest.raises(ValueError):
+            store.write("../escape.json", [b"{}"])
@@ -0,0 +1,96 @@
+"""Tests for the streaming NDJSON/CSV export (/api/v1/export/my-data/stream)."""
+
+import csv
+import gzip
+import io
+import json
+from datetime import datetime, timedelta
+
+from app.models import User, BloodPressureRecord
+from app.routers import export as export_router
+from app.utils.security import create_access_token
+from app.utils.timezone import now_tz
+
+
+def _make_user(db, premium: bool) -> User:
+    user = User(
+        role="patient",
+        is_active=True,
+        subscription_tier="premium" if premium else "free",
+        subscription_expires_at=now_tz() + timedelta(days=30) if premium else None,
+    )
+    user.full_name = "Export User"
+    user.password_hash = "fakehash"
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    return user
+
+
+def _add_records(db, user_id: int, count: int) -> None:
+    base = datetime(2025, 1, 1, 7, 0)
+    db.add_all([
+        BloodPressureRecord(
+            user_id=user_id, systolic=110 + i % 40, diastolic=70 + i % 20, pulse=60 + i % 30,
+            measurement_date=base + timedelta(hours=i), measurement_time="07:00",
+            notes=f"note {i}" if i % 7 == 0 else None,
+        )
+        for i in range(count)
+    ])
+    db.commit()
+
+
+def _headers(user: User) -> dict:
+    return {
+        "Authorization": f"Bearer {create_access_token({'user_id': user.id})}",
+        "X-API-Key": "test-api-key",
+    }
+
+
+class TestStreamingExport:
+
+    def test_ndjson_streams_full_history_for_premium(self, test_client, db_session, monkeypatch):
+        monkeypatch.setattr(export_router, "STREAM_BATCH_SIZE", 16)
+        monkeypatch.setattr(export_router, "STREAM_CHUNK_BYTES", 512)
+        user = _make_user(db_session, premium=True)
+        _add_records(db_session, user.id, 120)
+
+        resp = test_client.get("/api/v1/export/my-data/stream", headers=_headers(user))
+
+        assert resp.status_code == 200
+        assert resp.headers["content-type"].startswith("application/x-ndjson")
+        lines = [json.loads(line) for line in resp.text.splitlines()]
+        assert lines[0]["type"] == "export_meta"
+        assert lines[0]["user_profile"]["full_name"] == "Export User"
+        records = [line for line in lines if line["type"] == "bp_record"]
+        assert len(records) == 120
+        assert records[0]["date"] >= records[-1]["date"]  # newest first
+        assert lines[-1] == {"type": "export_end", "record_count": 120}
+
+    def test_csv_is_limited_to_last_30_for_free_users(self, test_client, db_session):
+        user = _make_user(db_session, premium=False)
+        _add_records(db_session, user.id, 45)
+
+        resp = test_client.get("/api/v1/export/my-data/stream?format=csv", headers=_headers(user))
+
+        assert resp.status_code == 200
+        assert 'filename="bp-export-' in resp.headers["content-disposition"]
+        rows = list(csv.DictReader(io.StringIO(resp.text)))
+        assert len(rows) == 30
+        assert list(rows[0].keys()) == export_router.CSV_COLUMNS
+
+    def test_gzip_matches_plain_output(self, test_client, db_session):
+        user = _make_user(db_session, premium=True)
+        _add_records(db_session, user.id, 50)
+
+        plain = test_client.get("/api/v1/export/my-data/stream?format=csv", headers=_headers(user))
+        packed = test_client.get("/api/v1/export/my-data/stream?format=csv&gzip=true", headers=_headers(user))
+
+        assert packed.headers["content-type"] == "application/gzip"
+        assert packed.headers["content-disposition"].endswith('.csv.gz"')
+        assert gzip.decompress(packed.content).decode("utf-8") == plain.text
+
+    def test_rejects_unknown_format(self, test_client, db_session):
+        user = _make_user(db_session, premium=True)
+        resp = test_client.get("/api/v1/export/my-data/stream?format=xml", headers=_headers(user))
+        assert resp.status_code == 422
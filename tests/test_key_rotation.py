@@ -0,0 +1,143 @@
+"""Tests for MultiFernet key rotation (app/services/key_rotation.py)."""
+
+import json
+
+import pytest
+from cryptography.fernet import Fernet, MultiFernet
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.database import Base
+from app.models import Payment, User, UserNameToken
+from app.services import key_rotation
+from app.utils import encryption
+
+
+@pytest.fixture
+def rotated_keys(monkeypatch):
+    """Prepend a new primary key, as an operator would before rotating."""
+    new_key = Fernet.generate_key()
+    old = encryption.cipher_suite
+    monkeypatch.setattr(encryption, "cipher_suite", MultiFernet([Fernet(new_key)] + old._fernets))
+    return Fernet(new_key)
+
+
+@pytest.fixture
+def test_engine(tmp_path):
+    """Own database: rotation walks whole tables, and must not re-key the shared test DB."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'rotation.db'}")
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db_session(test_engine):
+    with Session(bind=test_engine) as session:
+        yield session
+
+
+@pytest.fixture
+def users(db_session):
+    created = []
+    for i in range(7):
+        user = User(role="patient", is_active=True, password_hash="fakehash")
+        user.full_name = f"Rotate Me {i}"
+        user.email = f"rotate{i}@example.com"
+        db_session.add(user)
+        created.append(user)
+    db_session.commit()
+    db_session.add(Payment(user_id=created[0].id, sender_name_encrypted=encryption.encrypt_value("Sender")))
+    db_session.commit()
+    return created
+
+
+def _readable_by(fernet: Fernet, token: str) -> bool:
+    try:
+        fernet.decrypt(token.encode())
+        return True
+    except Exception:
+        return False
+
+
+class TestKeyRotation:
+
+    def test_rotates_users_and_payments(self, test_engine, db_session, users, rotated_keys, tmp_path):
+        checkpoint = str(tmp_path / "rotation.json")
+        updated_at_before = {u.id: u.updated_at for u in users}
+
+        report = key_rotation.rotate_all(test_engine, batch_size=3, workers=1, checkpoint_path=checkpoint)
+
+        db_session.expire_all()
+        for user in users:
+            assert _readable_by(rotated_keys, user.full_name_encrypted)
+            assert _readable_by(rotated_keys, user.email_encrypted)
+            assert user.full_name.startswith("Rotate Me")
+            assert user.updated_at == updated_at_before[user.id]
+        payment = db_session.query(Payment).filter_by(user_id=users[0].id).one()
+        assert _readable_by(rotated_keys, payment.sender_name_encrypted)
+
+        assert report["failed"] == 0
+        assert report["tables"]["users"]["done"] is True
+        assert report["rows_per_second"] > 0
+        assert json.load(open(checkpoint))["payments"]["done"] is True
+
+    def test_resumes_from_checkpoint(self, test_engine, db_session, users, rotated_keys, tmp_path):
+        checkpoint = tmp_path / "rotation.json"
+        resume_after = users[3].id
+        checkpoint.write_text(json.dumps({"users": {
+            "last_id": resume_after, "rows": 0, "values": 0, "skipped": 0, "failed": 0, "done": False,
+        }}))
+
+        key_rotation.rotate_all(test_engine, batch_size=2, workers=1, checkpoint_path=str(checkpoint))
+
+        db_session.expire_all()
+        for user in users:
+            assert _readable_by(rotated_keys, user.email_encrypted) == (user.id > resume_after)
+
+    def test_concurrent_rewrite_is_not_overwritten(self, test_engine, db_session, users, rotated_keys, monkeypatch):
+        target = users[0]
+        real_rotate = key_rotation._rotate_values
+
+        def rotate_then_user_edits(values, executor, workers):
+            rotated = real_rotate(values, executor, workers)
+            # App rewrites the name between the rotation read and write
+            with test_engine.begin() as conn:
+                conn.execute(User.__table__.update().where(User.__table__.c.id == target.id).values(
+                    full_name_encrypted=encryption.encrypt_value("Edited Meanwhile")))
+            return rotated
+
+        monkeypatch.setattr(key_rotation, "_rotate_values", rotate_then_user_edits)
+        report = key_rotation.rotate_all(test_engine, batch_size=100, workers=1, checkpoint_path=None)
+
+        db_session.expire_all()
+        assert target.full_name == "Edited Meanwhile"
+        assert report["tables"]["users"]["skipped"] == 1
+
+    def test_undecryptable_values_are_counted_not_wiped(self, test_engine, db_session, users, rotated_keys):
+        foreign = Fernet(Fernet.generate_key()).encrypt(b"unknown key").decode()
+        users[1].email_encrypted = foreign
+        db_session.commit()
+
+        report = key_rotation.rotate_all(test_engine, batch_size=100, workers=1, checkpoint_path=None)
+
+        db_session.expire_all()
+        assert report["failed"] >= 1
+        assert users[1].email_encrypted == foreign
+        assert report["name_index_users"] is None  # index left alone until the rotation is clean
+
+    def test_clean_rotation_rebuilds_name_index(self, test_engine, db_session, users, rotated_keys):
+        db_session.query(UserNameToken).delete()
+        db_session.commit()
+
+        report = key_rotation.rotate_all(test_engine, batch_size=3, workers=1, checkpoint_path=None)
+
+        assert report["name_index_users"] == len(users)
+        stored = {t.token for t in db_session.query(UserNameToken).filter_by(user_id=users[2].id)}
+        assert stored == encryption.name_search_tokens("Rotate Me 2")
+
+    def test_worker_pool_matches_in_process(self, rotated_keys):
+        tokens = [encryption.encrypt_value(f"v{i}") for i in range(20)]
+        with key_rotation.ProcessPoolExecutor(max_workers=2) as pool:
+            rotated = key_rotation._rotate_values(tokens, pool, 2)
+        assert [rotated_keys.decrypt(t.encode()).decode() for t in rotated] == [f"v{i}" for i in range(20)]
@@ -0,0 +1,154 @@
+"""Tests for the blind n-gram name index and partial doctor name search."""
+
+import os
+import subprocess
+import sys
+
+from cryptography.fernet import Fernet
+
+from app.models import User, UserNameToken
+from app.services import name_search
+from app.utils import encryption
+from app.utils.encryption import name_search_tokens
+from app.utils.security import create_access_token
+
+
+def _make_doctor(db, name: str, verified: bool = True) -> User:
+    user = User(role="doctor", is_active=True, verification_status="verified" if verified else "pending")
+    user.full_name = name
+    user.password_hash = "fakehash"
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    return user
+
+
+def _search(client, db, q: str) -> list:
+    patient = User(role="patient", is_active=True)
+    patient.full_name = "Searching Patient"
+    patient.password_hash = "fakehash"
+    db.add(patient)
+    db.commit()
+    resp = client.get(
+        "/api/v1/patient/search-doctors",
+        params={"q": q},
+        headers={
+            "Authorization": f"Bearer {create_access_token({'user_id': patient.id})}",
+            "X-API-Key": "test-api-key",
+        },
+    )
+    assert resp.status_code == 200
+    return [d["full_name"] for d in resp.json()["data"]["doctors"]]
+
+
+class TestNameTokens:
+
+    def test_setter_maintains_index_rows(self, db_session):
+        doctor = _make_doctor(db_session, "Somchai Jaidee")
+        stored = {t.token for t in db_session.query(UserNameToken).filter_by(user_id=doctor.id)}
+        assert stored == name_search_tokens("Somchai Jaidee")
+
+        doctor.full_name = "Somchai Rakdee"
+        db_session.commit()
+        stored = {t.token for t in db_session.query(UserNameToken).filter_by(user_id=doctor.id)}
+        assert stored == name_search_tokens("Somchai Rakdee")
+
+    def test_tokens_are_keyed_not_plain_hashes(self, monkeypatch):
+        tokens = name_search_tokens("Anan")
+        monkeypatch.setattr(encryption, "_search_index_key", b"another-key")
+        assert name_search_tokens("Anan").isdisjoint(tokens)
+
+    def test_normalization(self):
+        assert name_search_tokens("  Dr.  SOMCHAI ") == name_search_tokens("dr. somchai")
+
+
+class TestSearchDoctorsByName:
+
+    def test_partial_match_ranked(self, test_client, db_session):
+        _make_doctor(db_session, "Wichai Nakorn")
+        _make_doctor(db_session, "Pranee Wichaidit")
+        _make_doctor(db_session, "Wichai")
+
+        assert _search(test_client, db_session, "wichai") == ["Wichai", "Wichai Nakorn", "Pranee Wichaidit"]
+
+    def test_finds_doctors_beyond_first_500_rows(self, test_client, db_session):
+        db_session.add_all([User(role="doctor", is_active=True, verification_status="verified",
+                                 password_hash="fakehash") for _ in range(520)])
+        db_session.commit()
+        _make_doctor(db_session, "Kittisak Lastrow")
+
+        assert _search(test_client, db_session, "lastro") == ["Kittisak Lastrow"]
+
+    def test_only_candidates_are_decrypted(self, db_session, monkeypatch):
+        _make_doctor(db_session, "Boonmee Sriwan")
+        _make_doctor(db_session, "Thongchai Meesuk")
+        decrypted = []
+        real_decrypt_many = encryption.decrypt_many
+
+        def spy(values):
+            values = list(values)
+            decrypted.extend(values)
+            return real_decrypt_many(values)
+
+        monkeypatch.setattr("app.models.decrypt_many", spy)
+        found = name_search.find_users_by_name(db_session, "riwa", User.role == "doctor")
+
+        assert [u.full_name for u in found] == ["Boonmee Sriwan"]
+        assert len(decrypted) == 1
+
+    def test_best_match_beyond_first_batch_is_ranked(self, db_session, monkeypatch):
+        # More weak matches than one batch (and than the old fixed 50-row cut), exact match last
+        monkeypatch.setattr(name_search, "CANDIDATE_BATCH_SIZE", 20)
+        weak = []
+        for i in range(60):
+            doctor = User(role="doctor", is_active=True, verification_status="verified", password_hash="fakehash")
+            doctor.full_name = f"Prasert Ruangsri{i}"
+            weak.append(doctor)
+        db_session.add_all(weak)
+        db_session.commit()
+        exact = _make_doctor(db_session, "Ruangsri")
+
+        found = name_search.find_users_by_name(db_session, "ruangsri", User.role == "doctor", limit=2)
+
+        assert found[0].id == exact.id
+        assert len(found) == 2
+
+    def test_scattered_grams_are_not_a_match(self, db_session):
+        # every trigram of "abcda" occurs in the name, just not contiguously
+        _make_doctor(db_session, "abcd xbcda")
+        assert name_search.find_users_by_name(db_session, "abcda", User.role == "doctor") == []
+
+    def test_unverified_doctors_excluded(self, test_client, db_session):
+        _make_doctor(db_session, "Pending Mongkol", verified=False)
+        assert _search(test_client, db_session, "mongkol") == []
+
+
+class TestSearchIndexKey:
+
+    def _import_encryption(self, **env):
+        code = "from app.utils import encryption; print(encryption._search_index_key.hex())"
+        return subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True,
+            env={**os.environ, **env}, cwd=os.path.dirname(os.path.dirname(__file__)),
+        )
+
+    def test_several_keys_require_a_pinned_index_key(self):
+        env = {"ENCRYPTION_KEY": f"{Fernet.generate_key().decode()},{Fernet.generate_key().decode()}"}
+        env_without = {k: v for k, v in os.environ.items() if k != "SEARCH_INDEX_KEY"}
+        result = subprocess.run(
+            [sys.executable, "-c", "import app.utils.encryption"], capture_output=True, text=True,
+            env={**env_without, **env}, cwd=os.path.dirname(os.path.dirname(__file__)),
+        )
+        assert result.returncode != 0
+        assert "SEARCH_INDEX_KEY is required" in result.stderr
+
+    def test_pinned_key_survives_prepending_a_new_key(self):
+        old = Fernet.generate_key().decode()
+        single = self._import_encryption(ENCRYPTION_KEY=old, SEARCH_INDEX_KEY="")
+        derived = single.stdout.strip()
+
+        rotated = self._import_encryption(
+            ENCRYPTION_KEY=f"{Fernet.generate_key().decode()},{old}", SEARCH_INDEX_KEY=f"hex:{derived}",
+        )
+        assert rotated.returncode == 0, rotated.stderr
+        assert rotated.stdout.strip() == derived
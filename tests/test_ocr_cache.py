@@ -0,0 +1,134 @@
+"""Tests for the per-user, exact-digest OCR result cache."""
+
+import asyncio
+import io
+from datetime import datetime
+from types import SimpleNamespace
+
+import PIL.Image
+import pytest
+
+from app.utils import ocr_helper
+from app.utils.ocr_cache import MemoryOCRCache, OCRResultCache
+
+
+requires_pillow = pytest.mark.skipif(
+    not getattr(PIL.Image, "__file__", None), reason="Pillow is stubbed in this test run"
+)
+
+
+def _answer(systolic, diastolic, pulse) -> str:
+    return f'{{"systolic": {systolic}, "diastolic": {diastolic}, "pulse": {pulse}, "date": null, "time": null}}'
+
+
+def _monitor_photo(reading=(128, 82, 71), quality=90) -> bytes:
+    """Same monitor, same framing; only the LCD digits differ."""
+    from PIL import ImageDraw
+
+    img = PIL.Image.new("RGB", (640, 480), (90, 90, 100))
+    img.paste((200, 215, 190), (180, 100, 460, 400))  # LCD panel
+    draw = ImageDraw.Draw(img)
+    for row, value in enumerate(reading):
+        draw.text((280, 140 + row * 80), str(value), fill=(20, 20, 20))
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=quality)
+    return buf.getvalue()
+
+
+class TestMemoryOCRCache:
+
+    def test_exact_key_only(self):
+        cache = MemoryOCRCache(max_entries=8, ttl_seconds=60)
+        cache.set("model", 1, "00000000000000ff", "answer")
+
+        assert cache.get("model", 1, "00000000000000ff") == "answer"
+        assert cache.get("model", 1, "00000000000000fe") is None  # no near matches
+        assert cache.get("model", 2, "00000000000000ff") is None  # other user
+        assert cache.get("other-model", 1, "00000000000000ff") is None
+
+    def test_expired_entries_miss(self):
+        cache = MemoryOCRCache(max_entries=8, ttl_seconds=0)
+        cache.set("model", 1, "abc", "answer")
+        assert cache.get("model", 1, "abc") is None
+
+    def test_lru_bound(self):
+        cache = MemoryOCRCache(max_entries=2, ttl_seconds=60)
+        for key in ("01", "02", "03"):
+            cache.set("model", 1, key, key)
+        assert len(cache) == 2
+        assert cache.get("model", 1, "01") is None
+
+
+@requires_pillow
+class TestGeminiSkippedForDuplicates:
+
+    @pytest.fixture
+    def gemini(self, monkeypatch):
+        state = {"calls": 0, "answers": []}
+
+        class FakeModel:
+            def __init__(self, name):
+                pass
+
+            async def generate_content_async(self, parts):
+                state["calls"] += 1
+                return SimpleNamespace(text=state["answers"].pop(0))
+
+        monkeypatch.setattr(ocr_helper, "GOOGLE_AI_API_KEY", "test-key")
+        monkeypatch.setattr(ocr_helper.genai, "GenerativeModel", FakeModel, raising=False)
+        monkeypatch.setattr(ocr_helper, "ocr_result_cache", OCRResultCache(max_entries=8, redis_url=None))
+        return state
+
+    def _read(self, data, user_id, upload_time=None):
+        return asyncio.run(ocr_helper.read_blood_pressure_with_gemini_async(
+            data, upload_time=upload_time, user_id=user_id))
+
+    def test_resent_photo_reuses_answer_with_fresh_timestamp(self, gemini):
+        gemini["answers"] = [_answer(128, 82, 71)]
+        photo = _monitor_photo()
+        first = self._read(photo, 1, datetime(2026, 5, 1, 8, 0))
+        resent = self._read(photo, 1, datetime(2026, 5, 1, 8, 3))
+
+        assert gemini["calls"] == 1
+        assert (resent.systolic, resent.diastolic, resent.pulse) == (128, 82, 71)
+        assert first.measurement_time == "08:00"
+        assert resent.measurement_time == "08:03"
+        assert ocr_helper.ocr_result_cache.stats()["hits"] == 1
+
+    def test_different_readings_on_same_monitor_never_share_an_entry(self, gemini):
+        readings = [(128, 82, 71), (141, 93, 66), (119, 77, 80)]
+        gemini["answers"] = [_answer(*r) for r in readings]
+
+        results = [self._read(_monitor_photo(r), 1) for r in readings]
+
+        assert gemini["calls"] == 3
+        assert [(r.systolic, r.diastolic, r.pulse) for r in results] == readings
+        assert ocr_helper.ocr_result_cache.stats()["hits"] == 0
+
+    def test_recompressed_copy_is_not_a_hit(self, gemini):
+        gemini["answers"] = [_answer(128, 82, 71), _answer(128, 82, 71)]
+        self._read(_monitor_photo(quality=90), 1)
+        self._read(_monitor_photo(quality=60), 1)
+        assert gemini["calls"] == 2
+
+    def test_cache_is_scoped_per_user(self, gemini):
+        gemini["answers"] = [_answer(128, 82, 71), _answer(141, 93, 66)]
+        photo = _monitor_photo()
+        self._read(photo, 1)
+        other = self._read(photo, 2)
+        assert gemini["calls"] == 2
+        assert other.systolic == 141
+
+    def test_no_user_means_no_cache(self, gemini):
+        gemini["answers"] = [_answer(128, 82, 71), _answer(128, 82, 71)]
+        photo = _monitor_photo()
+        self._read(photo, None)
+        self._read(photo, None)
+        assert gemini["calls"] == 2
+        assert ocr_helper.ocr_result_cache.stats()["memory_entries"] == 0
+
+    def test_incomplete_answers_are_not_cached(self, gemini, monkeypatch):
+        monkeypatch.setattr(ocr_helper, "GEMINI_MODEL", "test-model")
+        unreadable = '{"systolic": null, "diastolic": null, "pulse": null}'
+        ocr_helper._remember_result(1, "ffff", unreadable, ocr_helper._parse_gemini_response(unreadable, {}, None))
+        assert ocr_helper.ocr_result_cache.get("test-model", 1, "ffff") is None
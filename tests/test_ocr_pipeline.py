@@ -0,0 +1,152 @@
+"""Tests for the in-memory OCR image pipeline (no temp files, single decode)."""
+
+import io
+import tempfile
+
+import PIL.Image
+import pytest
+
+from app.routers import ocr as ocr_router
+from app.schemas import OCRResult
+from app.utils import ocr_helper
+
+
+# conftest replaces Pillow with a stub unless the real package was imported first
+requires_pillow = pytest.mark.skipif(
+    not getattr(PIL.Image, "__file__", None), reason="Pillow is stubbed in this test run"
+)
+
+
+def _encode(fmt: str, exif: bool = False, size=(32, 24), **save_kwargs) -> bytes:
+    img = PIL.Image.new("RGB", size, (200, 30, 30))
+    buf = io.BytesIO()
+    if exif:
+        tags = PIL.Image.Exif()
+        tags.get_ifd(0x8769)[0x9003] = "2026:03:04 07:15:00"  # DateTimeOriginal
+        save_kwargs["exif"] = tags
+    img.save(buf, format=fmt, **save_kwargs)
+    return buf.getvalue()
+
+
+@requires_pillow
+class TestPrepareImageForGemini:
+
+    def test_jpeg_is_passed_through_unchanged(self):
+        data = _encode("JPEG")
+        blob, metadata, _ = ocr_helper._prepare_image_for_gemini(data)
+        assert blob == {"mime_type": "image/jpeg", "data": data}
+        assert metadata == {}
+
+    def test_exif_read_from_memory(self):
+        blob, metadata, _ = ocr_helper._prepare_image_for_gemini(_encode("JPEG", exif=True))
+        assert metadata["DateTimeOriginal"] == "2026:03:04 07:15:00"
+        assert ocr_helper.extract_exif_datetime(metadata).hour == 7
+
+    def test_unsupported_format_is_reencoded_to_jpeg(self):
+        blob, _, _ = ocr_helper._prepare_image_for_gemini(_encode("BMP"))
+        assert blob["mime_type"] == "image/jpeg"
+        assert PIL.Image.open(io.BytesIO(blob["data"])).format == "JPEG"
+
+    def test_truncated_image_is_rejected(self):
+        data = _encode("PNG")
+        _, _, _, error = ocr_helper._open_image_or_error(data[: len(data) // 2])
+        assert error.error_code == "OCR_IMAGE_INVALID"
+
+    def test_garbage_is_unsupported_format(self):
+        _, _, _, error = ocr_helper._open_image_or_error(b"not an image at all")
+        assert error.error_code == "OCR_UNSUPPORTED_FORMAT"
+
+
+def _photo_of_display(size=(1200, 900), box=(420, 300, 780, 560)) -> bytes:
+    """Uniform 'device body' with a busy, high-contrast 'LCD' in `box`."""
+    from PIL import ImageDraw
+
+    img = PIL.Image.new("RGB", size, (90, 90, 95))
+    draw = ImageDraw.Draw(img)
+    draw.rectangle(box, fill=(190, 200, 180))
+    for x in range(box[0] + 10, box[2] - 10, 24):
+        draw.rectangle((x, box[1] + 20, x + 10, box[3] - 20), fill=(20, 20, 20))
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=90)
+    return buf.getvalue()
+
+
+@requires_pillow
+class TestImagePreprocessing:
+
+    def test_large_photo_is_downscaled_to_max_edge(self, monkeypatch):
+        monkeypatch.setattr(ocr_helper, "OCR_IMAGE_MAX_EDGE", 800)
+        data = _encode("PNG", size=(3000, 2000))
+        before = ocr_helper.get_preprocess_stats()
+
+        blob, _, _ = ocr_helper._prepare_image_for_gemini(data)
+
+        out = PIL.Image.open(io.BytesIO(blob["data"]))
+        assert blob["mime_type"] == "image/jpeg"
+        assert out.size == (800, 533)
+        after = ocr_helper.get_preprocess_stats()
+        assert after["resized"] == before["resized"] + 1
+        assert after["bytes_in"] - before["bytes_in"] == len(data)
+        assert after["bytes_out"] - before["bytes_out"] == len(blob["data"])
+
+    def test_webp_output_format(self, monkeypatch):
+        monkeypatch.setattr(ocr_helper, "OCR_IMAGE_MAX_EDGE", 100)
+        monkeypatch.setattr(ocr_helper, "OCR_IMAGE_FORMAT", "WEBP")
+        blob, _, _ = ocr_helper._prepare_image_for_gemini(_encode("JPEG", size=(400, 300)))
+        assert blob["mime_type"] == "image/webp"
+        assert PIL.Image.open(io.BytesIO(blob["data"])).format == "WEBP"
+
+    def test_exif_orientation_applied_before_reencode(self, monkeypatch):
+        monkeypatch.setattr(ocr_helper, "OCR_IMAGE_MAX_EDGE", 100)
+        tags = PIL.Image.Exif()
+        tags[0x0112] = 6  # Orientation: rotate 90° CW on display
+
+        buf = io.BytesIO()
+        PIL.Image.new("RGB", (400, 200)).save(buf, format="JPEG", exif=tags)
+
+        blob, _, _ = ocr_helper._prepare_image_for_gemini(buf.getvalue())
+        assert PIL.Image.open(io.BytesIO(blob["data"])).size == (50, 100)
+
+    def test_lcd_crop_keeps_display_region(self, monkeypatch):
+        monkeypatch.setattr(ocr_helper, "OCR_IMAGE_CROP_LCD", True)
+        monkeypatch.setattr(ocr_helper, "OCR_IMAGE_MAX_EDGE", 0)
+
+        blob, _, _ = ocr_helper._prepare_image_for_gemini(_photo_of_display())
+
+        out = PIL.Image.open(io.BytesIO(blob["data"]))
+        assert out.width < 600 and out.height < 450
+        # padded crop still contains the whole display
+        assert out.width >= 360 and out.height >= 260
+
+    def test_lcd_crop_skipped_when_nothing_stands_out(self, monkeypatch):
+        monkeypatch.setattr(ocr_helper, "OCR_IMAGE_CROP_LCD", True)
+        data = _encode("JPEG", size=(200, 150))
+        blob, _, _ = ocr_helper._prepare_image_for_gemini(data)
+        assert blob["data"] == data
+
+
+class TestOCREndpointInMemory:
+
+    def test_upload_bytes_reach_ocr_without_temp_file(self, test_client, monkeypatch):
+        received = {}
+
+        async def fake_ocr(image_data, upload_time=None):
+            received["data"] = image_data
+            return OCRResult(systolic=120, diastolic=80, pulse=70,
+                             measurement_date="2026-03-04", measurement_time="07:15")
+
+        def no_temp_files(*args, **kwargs):
+            raise AssertionError("OCR upload must not touch disk")
+
+        monkeypatch.setattr(ocr_router, "read_blood_pressure_with_gemini_async", fake_ocr)
+        monkeypatch.setattr(tempfile, "NamedTemporaryFile", no_temp_files)
+        payload = b"\xff\xd8\xff" + bytes(range(256)) * 8
+
+        response = test_client.post(
+            "/api/v1/ocr/process-image",
+            files={"file": ("bp.jpg", payload, "image/jpeg")},
+            headers={"X-API-Key": "test-api-key"},
+        )
+
+        assert response.status_code == 200
+        assert received["data"] == payload
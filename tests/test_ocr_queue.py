@@ -0,0 +1,225 @@
+"""Tests for the shared OCR admission queue and the async Gemini OCR client."""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+from app.schemas import OCRResult
+from app.routers import ocr as ocr_router
+from app.utils import ocr_helper
+from app.utils.ocr_queue import OCRAdmissionQueue, OCRQueueFull
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+class TestOCRAdmissionQueue:
+
+    def test_waiters_are_admitted_in_fifo_order(self):
+        queue = OCRAdmissionQueue(max_concurrency=1, max_queue_depth=5)
+        order = []
+
+        async def job(name):
+            async with queue.slot():
+                order.append(name)
+                await asyncio.sleep(0.01)
+
+        async def main():
+            await asyncio.gather(*(job(i) for i in range(4)))
+
+        _run(main())
+        assert order == [0, 1, 2, 3]
+        stats = queue.stats()
+        assert stats["admitted"] == 4
+        assert stats["queued"] == 3
+        assert stats["in_flight"] == 0
+        assert stats["max_queue_seconds"] > 0
+
+    def test_rejects_fast_when_queue_is_full(self):
+        queue = OCRAdmissionQueue(max_concurrency=1, max_queue_depth=1)
+
+        async def main():
+            gate = asyncio.Event()
+
+            async def hold():
+                async with queue.slot():
+                    await gate.wait()
+
+            holder = asyncio.create_task(hold())
+            waiter = asyncio.create_task(hold())
+            await asyncio.sleep(0)
+            with pytest.raises(OCRQueueFull):
+                await queue.acquire()
+            gate.set()
+            await asyncio.gather(holder, waiter)
+
+        _run(main())
+        assert queue.stats()["rejected"] == 1
+        assert queue.stats()["in_flight"] == 0
+
+    def test_cancelled_waiter_does_not_leak_slot(self):
+        queue = OCRAdmissionQueue(max_concurrency=1, max_queue_depth=5)
+
+        async def main():
+            await queue.acquire()
+            waiter = asyncio.create_task(queue.acquire())
+            await asyncio.sleep(0)
+            waiter.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await waiter
+            queue.release()
+            # Slot must be free again
+            await asyncio.wait_for(queue.acquire(), timeout=1)
+            queue.release()
+
+        _run(main())
+        stats = queue.stats()
+        assert stats["in_flight"] == 0
+        assert stats["waiting"] == 0
+
+
+class TestAsyncGeminiClient:
+
+    @pytest.fixture
+    def fake_gemini(self, monkeypatch):
+        calls = {"active": 0, "peak": 0}
+
+        class FakeModel:
+            def __init__(self, name):
+                pass
+
+            async def generate_content_async(self, parts):
+                calls["active"] += 1
+                calls["peak"] = max(calls["peak"], calls["active"])
+                await asyncio.sleep(0.02)
+                calls["active"] -= 1
+                return SimpleNamespace(text='{"systolic": 121, "diastolic": 79, "pulse": 66, "date": null, "time": null}')
+
+        monkeypatch.setattr(ocr_helper, "GOOGLE_AI_API_KEY", "test-key")
+        monkeypatch.setattr(ocr_helper.genai, "GenerativeModel", FakeModel, raising=False)
+        monkeypatch.setattr(
+            ocr_helper, "_open_image_or_error",
+            lambda image_data: ({"mime_type": "image/jpeg", "data": image_data}, {}, None, None),
+        )
+        return calls
+
+    def test_concurrency_is_bounded_by_queue(self, fake_gemini, monkeypatch):
+        monkeypatch.setattr(ocr_helper, "ocr_queue", OCRAdmissionQueue(max_concurrency=2, max_queue_depth=10))
+
+        async def main():
+            return await asyncio.gather(
+                *(ocr_helper.read_blood_pressure_with_gemini_async(b"jpeg") for _ in range(6))
+            )
+
+        results = _run(main())
+        assert all(r.systolic == 121 and r.error is None for r in results)
+        assert fake_gemini["peak"] == 2
+
+    def test_queue_full_returns_error_code(self, fake_gemini, monkeypatch):
+        monkeypatch.setattr(ocr_helper, "ocr_queue", OCRAdmissionQueue(max_concurrency=1, max_queue_depth=0))
+
+        async def main():
+            return await asyncio.gather(
+                *(ocr_helper.read_blood_pressure_with_gemini_async(b"jpeg") for _ in range(2))
+            )
+
+        first, second = _run(main())
+        assert first.error is None
+        assert second.error_code == "OCR_QUEUE_FULL"
+
+    def test_rejected_requests_are_never_decoded(self, fake_gemini, monkeypatch):
+        monkeypatch.setattr(ocr_helper, "ocr_queue", OCRAdmissionQueue(max_concurrency=1, max_queue_depth=0))
+        decoded = []
+
+        def counting_prep(image_data):
+            decoded.append(image_data)
+            return {"mime_type": "image/jpeg", "data": image_data}, {}, None, None
+
+        monkeypatch.setattr(ocr_helper, "_open_image_or_error", counting_prep)
+
+        async def main():
+            return await asyncio.gather(
+                *(ocr_helper.read_blood_pressure_with_gemini_async(b"jpeg") for _ in range(3))
+            )
+
+        results = _run(main())
+        assert sum(r.error_code == "OCR_QUEUE_FULL" for r in results) == 2
+        assert len(decoded) == 1
+
+
+    def test_image_prep_runs_off_the_event_loop(self, fake_gemini, monkeypatch):
+        monkeypatch.setattr(ocr_helper, "ocr_queue", OCRAdmissionQueue(max_concurrency=2, max_queue_depth=10))
+        prep_threads = []
+
+        def slow_prep(image_data):
+            prep_threads.append(threading.get_ident())
+            time.sleep(0.2)  # stands in for decode + resize + re-encode of a large photo
+            return {"mime_type": "image/jpeg", "data": image_data}, {}, None, None
+
+        monkeypatch.setattr(ocr_helper, "_open_image_or_error", slow_prep)
+
+        async def main():
+            ticks = 0
+
+            async def ticker():
+                nonlocal ticks
+                while True:
+                    ticks += 1
+                    await asyncio.sleep(0.01)
+
+            task = asyncio.create_task(ticker())
+            result = await ocr_helper.read_blood_pressure_with_gemini_async(b"jpeg")
+            task.cancel()
+            return result, ticks, threading.get_ident()
+
+        result, ticks, loop_thread = _run(main())
+        assert result.systolic == 121
+        assert ticks > 5
+        assert prep_threads and prep_threads[0] != loop_thread
+
+    def test_image_prep_pool_is_bounded(self, fake_gemini, monkeypatch):
+        monkeypatch.setattr(ocr_helper, "ocr_queue", OCRAdmissionQueue(max_concurrency=8, max_queue_depth=10))
+        monkeypatch.setattr(ocr_helper, "_preprocess_executor", ThreadPoolExecutor(max_workers=2))
+        lock = threading.Lock()
+        prep = {"active": 0, "peak": 0}
+
+        def slow_prep(image_data):
+            with lock:
+                prep["active"] += 1
+                prep["peak"] = max(prep["peak"], prep["active"])
+            time.sleep(0.05)
+            with lock:
+                prep["active"] -= 1
+            return {"mime_type": "image/jpeg", "data": image_data}, {}, None, None
+
+        monkeypatch.setattr(ocr_helper, "_open_image_or_error", slow_prep)
+
+        async def main():
+            return await asyncio.gather(
+                *(ocr_helper.read_blood_pressure_with_gemini_async(b"jpeg") for _ in range(6))
+            )
+
+        assert all(r.systolic == 121 for r in _run(main()))
+        assert prep["peak"] == 2
+
+
+class TestOCREndpointQueueFull:
+
+    def test_queue_full_maps_to_429(self, test_client, monkeypatch):
+        async def busy(image_data, upload_time=None):
+            return OCRResult(error="OCR service is busy", error_code="OCR_QUEUE_FULL")
+
+        monkeypatch.setattr(ocr_router, "read_blood_pressure_with_gemini_async", busy)
+        response = test_client.post(
+            "/api/v1/ocr/process-image",
+            files={"file": ("bp.jpg", b"\xff\xd8\xff" + b"\x00" * 100, "image/jpeg")},
+            headers={"X-API-Key": "test-api-key"},
+        )
+
+        assert response.status_code == 429
+        assert response.headers["retry-after"] == "5"
@@ -0,0 +1,66 @@
+"""Tests for the heap-expiring in-memory OTP backend (app/otp_service.py)."""
+
+import time
+
+from app.otp_service import MemoryOTPBackend, run_benchmark
+
+
+def _otp(created_at, expiration=300):
+    return {'base32_key': "A" * 52, 'interval': expiration, 'created_at': created_at, 'expiration': expiration}
+
+
+class TestMemoryOTPBackend:
+
+    def test_expired_otp_purged_on_write(self):
+        backend = MemoryOTPBackend()
+        backend.store("old@example.com", _otp(time.time() - 400))  # past expiration + 60 s
+        backend.store("new@example.com", _otp(time.time()))
+        assert backend.get("old@example.com") is None
+        assert backend.get("new@example.com") is not None
+        stats = backend.stats()
+        assert (stats["otps"], stats["expired"]) == (1, 1)
+
+    def test_verified_marker_expires(self):
+        backend = MemoryOTPBackend(verified_ttl=0.05)
+        backend.mark_verified("a@example.com")
+        assert backend.is_verified("a@example.com")
+        time.sleep(0.1)
+        assert backend.is_verified("a@example.com") is False
+        assert backend.stats()["verified"] == 0
+
+    def test_restore_extends_expiry(self):
+        backend = MemoryOTPBackend()
+        backend.store("a@example.com", _otp(time.time() - 350))  # expires in ~10 s
+        backend.store("a@example.com", _otp(time.time()))
+        with backend._lock:
+            backend._purge(time.time() + 30)  # first entry's heap item is stale
+        assert backend.get("a@example.com") is not None
+
+    def test_deleted_key_not_counted_as_expired(self):
+        backend = MemoryOTPBackend()
+        backend.store("a@example.com", _otp(time.time() - 350))
+        backend.delete("a@example.com")
+        with backend._lock:
+            backend._purge(time.time() + 30)
+        assert backend.stats()["expired"] == 0
+
+    def test_size_cap_drops_soonest_expiring(self):
+        backend = MemoryOTPBackend(max_entries=3)
+        now = time.time()
+        for i in range(5):
+            backend.store(f"u{i}@example.com", _otp(now + i))
+        assert sorted(backend.storage) == ["u2@example.com", "u3@example.com", "u4@example.com"]
+        assert backend.stats()["evicted"] == 2
+
+    def test_stale_heap_items_compacted(self):
+        backend = MemoryOTPBackend()
+        now = time.time()
+        for i in range(3000):
+            backend.store("same@example.com", _otp(now + i))
+        assert backend.stats()["heap_size"] <= 1024 + 3
+        assert backend.get("same@example.com")["created_at"] == now + 2999
+
+    def test_benchmark_smoke(self):
+        result = run_benchmark(otps=2000)
+        assert result["heap_purged"] > 0
+        assert result["verified_after_ttl"] == 0
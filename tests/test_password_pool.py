@@ -0,0 +1,146 @@
+"""Tests for the bcrypt worker pool (app/utils/password_pool.py) and its API/bot callers."""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.models import User
+from app.utils.password_pool import PasswordPoolBusy, PasswordWorkerPool, password_pool
+from app.utils.security import hash_password, hash_password_async, verify_password, verify_password_async
+
+API_HEADERS = {"X-API-Key": "test-api-key"}
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+def _blocked(gate: threading.Event):
+    gate.wait(5)
+    return "done"
+
+
+class TestPasswordWorkerPool:
+
+    def test_async_facade_round_trip(self):
+        async def main():
+            hashed = await hash_password_async("s3cret-pass", client_key="1.2.3.4")
+            return hashed, await verify_password_async("s3cret-pass", hashed, client_key="1.2.3.4")
+
+        hashed, ok = _run(main())
+        assert ok is True
+        assert verify_password("s3cret-pass", hashed)
+        assert password_pool.stats()["clients_pending"] == 0
+
+    def test_event_loop_stays_responsive(self):
+        pool = PasswordWorkerPool(workers=2, max_queue_depth=8, max_pending_per_client=8)
+        hashed = hash_password("pw")
+
+        async def main():
+            ticks = 0
+
+            async def ticker():
+                nonlocal ticks
+                while True:
+                    ticks += 1
+                    await asyncio.sleep(0.005)
+
+            task = asyncio.create_task(ticker())
+            await asyncio.gather(*(pool.run(verify_password, "pw", hashed) for _ in range(4)))
+            task.cancel()
+            return ticks
+
+        assert _run(main()) > 5
+
+    def test_per_client_limit(self):
+        pool = PasswordWorkerPool(workers=1, max_queue_depth=10, max_pending_per_client=2)
+        gate = threading.Event()
+        first = pool.submit(_blocked, gate, client_key="10.0.0.1")
+        second = pool.submit(_blocked, gate, client_key="10.0.0.1")
+        with pytest.raises(PasswordPoolBusy) as exc:
+            pool.submit(_blocked, gate, client_key="10.0.0.1")
+        assert exc.value.reason == "client_limit"
+
+        other = pool.submit(_blocked, gate, client_key="10.0.0.2")  # other clients still admitted
+        gate.set()
+        assert [f.result() for f in (first, second, other)] == ["done"] * 3
+        stats = pool.stats()
+        assert stats["rejected_client_limit"] == 1
+        assert stats["queue_depth"] == 0
+        assert stats["clients_pending"] == 0
+
+    def test_queue_full(self):
+        pool = PasswordWorkerPool(workers=1, max_queue_depth=1, max_pending_per_client=10)
+        gate = threading.Event()
+        futures = [pool.submit(_blocked, gate), pool.submit(_blocked, gate)]
+        with pytest.raises(PasswordPoolBusy) as exc:
+            pool.submit(_blocked, gate)
+        assert exc.value.reason == "queue_full"
+        assert pool.stats()["queue_depth"] == 1
+        gate.set()
+        for future in futures:
+            future.result()
+        assert pool.stats()["pending_high_water"] == 2
+
+    def test_cancelled_waiter_frees_its_slot(self):
+        pool = PasswordWorkerPool(workers=1, max_queue_depth=5, max_pending_per_client=1)
+        gate = threading.Event()
+        running = pool.submit(_blocked, gate)
+        queued = pool.submit(_blocked, gate, client_key="10.0.0.3")
+        assert queued.cancel()
+        pool.submit(_blocked, gate, client_key="10.0.0.3")  # not rejected
+        gate.set()
+        running.result()
+        time.sleep(0.05)
+        assert pool.stats()["clients_pending"] == 0
+
+
+class TestLoginAdmission:
+
+    def test_busy_pool_returns_429(self, test_client, db_session, monkeypatch):
+        user = User(role="patient", is_active=True, password_hash=hash_password("validpass123"))
+        user.full_name = "Pool Busy"
+        user.email = "pool-busy@example.com"
+        db_session.add(user)
+        db_session.commit()
+
+        def reject(*args, **kwargs):
+            raise PasswordPoolBusy("full", "queue_full")
+
+        monkeypatch.setattr(password_pool, "submit", reject)
+        resp = test_client.post(
+            "/api/v1/auth/login",
+            json={"email": "pool-busy@example.com", "password": "validpass123"},
+            headers=API_HEADERS,
+        )
+        assert resp.status_code == 429
+        assert resp.headers["Retry-After"] == "1"
+
+        db_session.refresh(user)
+        assert user.failed_login_attempts == 0  # not counted as a wrong password
+
+
+class TestBotRegistrationAdmission:
+
+    @pytest.fixture
+    def busy_pool(self, monkeypatch):
+        def reject(*args, **kwargs):
+            raise PasswordPoolBusy("full", "queue_full")
+
+        monkeypatch.setattr(password_pool, "submit", reject)
+
+    def test_register_new_user_propagates_busy(self, busy_pool, monkeypatch):
+        from unittest.mock import MagicMock
+        from app.bot import services
+
+        session = MagicMock()
+        monkeypatch.setattr(services, "SessionLocal", lambda: session)
+        user_data = {"phone_number": "0812345678", "full_name": "Busy Patient", "role": "patient",
+                     "password": "validpass123"}
+
+        with pytest.raises(PasswordPoolBusy):
+            _run(services.BotService.register_new_user(user_data, telegram_id=555))
+        session.__enter__.return_value.rollback.assert_called_once()
+
@@ -137,13 +137,14 @@ class TestDoctorCancelRequestVariable:
 
 
 class TestDuplicatePulseValues:
-    """1.9 - No duplicate pulse_values in bp_records.py."""
+    """1.9 - No duplicate pulse_values in the stats summary (moved to bp_stats_service.py)."""
 
     def test_single_pulse_values_declaration(self):
-        with open("app/routers/bp_records.py") as f:
+        with open("app/services/bp_stats_service.py") as f:
             content = f.read()
         # Find the stats function area
-        stats_start = content.find("def get_bp_stats")
-        stats_body = content[stats_start:]
-        count = stats_body.count("pulse_values = [r.pulse for r in records]")
+        stats_start = content.find("def summarize_readings")
+        stats_end = content.find("\ndef ", stats_start + 1)
+        stats_body = content[stats_start:stats_end]
+        count = stats_body.count("pulse_values = [r.pulse for r in readings]")
         assert count == 1, f"Expected 1 pulse_values line, found {count}"
@@ -0,0 +1,69 @@
+"""Tests for DB connection pool metrics (app/utils/pool_metrics.py) and per-process pool sizing."""
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from app import database
+from app.utils.pool_metrics import InstrumentedQueuePool, PoolMetricsRegistry
+
+
+@pytest.fixture
+def tiny_pool(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}", poolclass=InstrumentedQueuePool,
+        pool_size=1, max_overflow=0, pool_timeout=0.05,
+    )
+    metrics = PoolMetricsRegistry().attach("test", engine)
+    yield engine, metrics
+    engine.dispose()
+
+
+class TestPoolMetrics:
+
+    def test_checkouts_and_in_use(self, tiny_pool):
+        engine, metrics = tiny_pool
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            stats = metrics.stats()
+            assert stats["checked_out"] == 1
+            assert stats["in_use_high_water"] == 1
+        with engine.connect():
+            pass
+
+        stats = metrics.stats()
+        assert (stats["checkouts"], stats["checkins"], stats["connects"]) == (2, 2, 1)
+        assert stats["checked_out"] == 0
+        assert sum(stats["checkout_wait_histogram"].values()) == 2
+
+    def test_exhausted_pool_counts_timeout(self, tiny_pool):
+        engine, metrics = tiny_pool
+        with engine.connect():
+            with pytest.raises(PoolTimeoutError):
+                engine.connect()
+        assert metrics.stats()["timeouts"] == 1
+
+    def test_metrics_survive_dispose(self, tiny_pool):
+        engine, metrics = tiny_pool
+        engine.dispose()
+        with engine.connect():
+            pass
+        assert metrics.stats()["checkouts"] == 1
+        assert metrics.stats()["avg_checkout_wait_ms"] >= 0
+        assert engine.pool._metrics is metrics
+
+
+class TestPoolSizing:
+
+    def test_process_type_override(self, monkeypatch):
+        monkeypatch.setenv("DB_POOL_SIZE", "8")
+        monkeypatch.setenv("DB_POOL_SIZE_BOT", "2")
+        monkeypatch.setattr(database, "DB_PROCESS_TYPE", "bot")
+        assert database._pool_setting("DB_POOL_SIZE", 5) == 2
+        monkeypatch.setattr(database, "DB_PROCESS_TYPE", "api")
+        assert database._pool_setting("DB_POOL_SIZE", 5) == 8
+        assert database._pool_setting("DB_MAX_OVERFLOW", 10) == 10
+
+    def test_app_engine_is_instrumented(self):
+        assert isinstance(database.engine.pool, InstrumentedQueuePool)
+        assert "primary" in database.pool_metrics.stats()
@@ -0,0 +1,146 @@
+"""Tests for the authenticated-user cache used by get_current_user (app/utils/principal_cache.py)."""
+
+import time
+from datetime import timedelta
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+
+from app.database import Base
+from app.models import User
+from app.utils.principal_cache import PrincipalCache, principal_cache
+from app.utils.security import create_access_token, get_current_user
+from app.utils.timezone import now_tz
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'principal.db'}")
+    Base.metadata.create_all(bind=engine)
+    engine.user_selects = 0
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and "FROM users" in statement:
+            engine.user_selects += 1
+
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def user_id(engine):
+    with Session(bind=engine) as session:
+        user = User(role="patient", is_active=True, password_hash="fakehash")
+        user.full_name = "Cached Principal"
+        session.add(user)
+        session.commit()
+        return user.id
+
+
+def _authenticate(engine, token):
+    request = SimpleNamespace(state=SimpleNamespace(), url=SimpleNamespace(path="/test"))
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+    session = Session(bind=engine)
+    return get_current_user(request, credentials, session), session
+
+
+class TestGetCurrentUserCache:
+
+    def test_second_request_skips_users_read(self, engine, user_id):
+        token = create_access_token({"user_id": user_id})
+        first, session = _authenticate(engine, token)
+        session.close()
+        selects, hits = engine.user_selects, principal_cache.stats()["hits"]
+
+        user, session = _authenticate(engine, token)
+        assert engine.user_selects == selects
+        assert user in session
+        assert user.id == user_id
+        assert user.full_name == "Cached Principal"
+        assert principal_cache.stats()["hits"] == hits + 1
+        session.close()
+
+    def test_commit_through_request_session_invalidates(self, engine, user_id):
+        token = create_access_token({"user_id": user_id})
+        user, session = _authenticate(engine, token)
+        user.language = "en"
+        session.commit()
+        session.close()
+
+        user, session = _authenticate(engine, token)
+        assert user.language == "en"
+        session.close()
+
+    def test_lock_from_another_session_applies(self, engine, user_id):
+        token = create_access_token({"user_id": user_id})
+        _authenticate(engine, token)[1].close()
+
+        with Session(bind=engine) as admin:
+            admin.get(User, user_id).account_locked_until = now_tz() + timedelta(minutes=30)
+            admin.commit()
+
+        with pytest.raises(HTTPException) as exc:
+            _authenticate(engine, token)
+        assert exc.value.status_code == 423
+
+    def test_cached_lock_still_expires(self, engine, user_id):
+        with Session(bind=engine) as admin:
+            admin.get(User, user_id).account_locked_until = now_tz() - timedelta(minutes=1)
+            admin.commit()
+        token = create_access_token({"user_id": user_id})
+        _authenticate(engine, token)[1].close()
+        user, session = _authenticate(engine, token)
+        assert user.id == user_id
+        session.close()
+
+
+class TestPrincipalCache:
+
+    def _snapshot(self, engine, user_id):
+        with Session(bind=engine, expire_on_commit=False) as session:
+            return session.get(User, user_id)
+
+    def test_keyed_on_token_iat(self, engine, user_id):
+        cache = PrincipalCache(ttl_seconds=60, max_entries=10)
+        cache.put(user_id, 100, self._snapshot(engine, user_id), cache.version(user_id))
+        with Session(bind=engine) as session:
+            assert cache.get(session, user_id, 100) is not None
+            assert cache.get(session, user_id, 200) is None
+
+    def test_invalidate_drops_every_token(self, engine, user_id):
+        cache = PrincipalCache(ttl_seconds=60, max_entries=10)
+        user = self._snapshot(engine, user_id)
+        for iat in (100, 200):
+            cache.put(user_id, iat, user, cache.version(user_id))
+        cache.invalidate(user_id)
+        with Session(bind=engine) as session:
+            assert cache.get(session, user_id, 100) is None
+            assert cache.get(session, user_id, 200) is None
+
+    def test_read_racing_an_invalidation_is_not_cached(self, engine, user_id):
+        cache = PrincipalCache(ttl_seconds=60, max_entries=10)
+        version = cache.version(user_id)
+        user = self._snapshot(engine, user_id)
+        cache.invalidate(user_id)  # committed write lands after the read
+        cache.put(user_id, 100, user, version)
+        assert cache.stats()["entries"] == 0
+
+    def test_ttl_and_size_bounds(self, engine, user_id):
+        cache = PrincipalCache(ttl_seconds=0.05, max_entries=2)
+        user = self._snapshot(engine, user_id)
+        for iat in (1, 2, 3):
+            cache.put(user_id, iat, user, cache.version(user_id))
+        assert cache.stats()["entries"] == 2
+        time.sleep(0.1)
+        with Session(bind=engine) as session:
+            assert cache.get(session, user_id, 3) is None
+
+    def test_disabled(self, engine, user_id):
+        cache = PrincipalCache(ttl_seconds=0, max_entries=10)
+        cache.put(user_id, 1, self._snapshot(engine, user_id), cache.version(user_id))
+        assert cache.stats()["entries"] == 0
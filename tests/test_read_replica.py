@@ -0,0 +1,109 @@
+"""Tests for read-replica routing (RoutingSession / get_read_db) in app/database.py."""
+
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import Session
+
+from app import database
+from app.database import Base, ReplicaLagMonitor, RoutingSession
+from app.models import BloodPressureRecord, User
+
+
+@pytest.fixture
+def primary(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'primary.db'}")
+    Base.metadata.create_all(bind=engine)
+    with Session(bind=engine) as session:
+        user = User(role="patient", is_active=True, password_hash="fakehash")
+        user.full_name = "Only On Primary"
+        session.add(user)
+        session.commit()
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def replica(tmp_path, monkeypatch):
+    """An (empty) replica that is up to date, so reads route to it."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    Base.metadata.create_all(bind=engine)
+    monitor = ReplicaLagMonitor(engine, max_lag=5, check_interval=3600)
+    monitor.check()
+    monkeypatch.setattr(database, "read_engine", engine)
+    monkeypatch.setattr(database, "replica_monitor", monitor)
+    monkeypatch.setattr(database, "_recent_writers", database.OrderedDict())
+    yield engine
+    engine.dispose()
+
+
+def _user_count(session) -> int:
+    return session.scalar(select(func.count()).select_from(User))
+
+
+def _routing_session(primary, replica, user_id=None) -> RoutingSession:
+    request = SimpleNamespace(state=SimpleNamespace(user_id=user_id))
+    return RoutingSession(bind=primary, replica_bind=replica, info={"request": request})
+
+
+class TestRoutingSession:
+
+    def test_reads_go_to_fresh_replica(self, primary, replica):
+        with _routing_session(primary, replica) as session:
+            assert _user_count(session) == 0
+
+    def test_lagging_replica_falls_back_to_primary(self, primary, replica):
+        database.replica_monitor.lag = 30.0
+        with _routing_session(primary, replica) as session:
+            assert _user_count(session) == 1
+
+    def test_unreachable_replica_falls_back_to_primary(self):
+        unreachable = create_engine("postgresql+psycopg2://replica@127.0.0.1:1/bp", connect_args={"connect_timeout": 1})
+        monitor = ReplicaLagMonitor(unreachable, max_lag=5, check_interval=3600)
+        assert monitor.check() is None
+        assert monitor.is_usable() is False
+
+    def test_session_sticks_to_primary_after_writing(self, primary, replica):
+        with _routing_session(primary, replica) as session:
+            user = User(role="patient", is_active=True, password_hash="fakehash")
+            session.add(user)
+            session.commit()
+            assert _user_count(session) == 2
+
+    def test_raw_connection_uses_primary(self, primary, replica):
+        with _routing_session(primary, replica) as session:
+            assert session.connection().engine is primary
+
+    def test_user_reads_own_writes_from_primary(self, primary, replica):
+        user_id = 1
+        with Session(bind=primary) as writer:
+            writer.add(BloodPressureRecord(user_id=user_id, systolic=120, diastolic=80, pulse=70,
+                                           measurement_date=datetime(2026, 1, 1)))
+            writer.commit()
+
+        assert database.wrote_recently(user_id)
+        with _routing_session(primary, replica, user_id=user_id) as session:
+            assert _user_count(session) == 1
+        with _routing_session(primary, replica, user_id=999) as session:
+            assert _user_count(session) == 0
+
+    def test_async_routing(self, tmp_path, primary, replica):
+        async def counts():
+            async_primary = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'primary.db'}")
+            async_replica = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}")
+            try:
+                async with AsyncSession(bind=async_primary, sync_session_class=RoutingSession,
+                                        replica_bind=async_replica.sync_engine) as db:
+                    from_replica = await db.scalar(select(func.count()).select_from(User))
+                    database.replica_monitor.lag = 30.0
+                    from_primary = await db.scalar(select(func.count()).select_from(User))
+                return from_replica, from_primary
+            finally:
+                await async_primary.dispose()
+                await async_replica.dispose()
+
+        assert asyncio.run(counts()) == (0, 1)
@@ -0,0 +1,95 @@
+"""Tests for the shared slip-verify rate limiter (app/utils/slip_rate_limiter.py)."""
+
+import pytest
+
+from app.services.payment_service import PaymentError, _check_rate_limit
+from app.utils.slip_rate_limiter import MemorySlidingWindowLimiter, SlipVerifyRateLimiter
+
+
+class _BrokenRedis:
+    def hit(self, key):
+        raise ConnectionError("redis down")
+
+    def reset(self, key):
+        raise ConnectionError("redis down")
+
+
+class _CountingRedis:
+    """Stands in for the shared Redis window: one dict seen by every limiter instance."""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.counts = {}
+
+    def hit(self, key):
+        if self.counts.get(key, 0) >= self.limit:
+            return False
+        self.counts[key] = self.counts.get(key, 0) + 1
+        return True
+
+    def reset(self, key):
+        self.counts.pop(key, None)
+
+
+class TestMemorySlidingWindowLimiter:
+
+    def test_window_slides(self):
+        limiter = MemorySlidingWindowLimiter(limit=2, window_seconds=60, max_keys=10)
+        assert limiter.hit("1", now=0) and limiter.hit("1", now=10)
+        assert limiter.hit("1", now=59) is False
+        assert limiter.hit("1", now=60) is True  # first attempt left the window
+        assert limiter.hit("1", now=61) is False
+
+    def test_rejected_attempts_are_not_recorded(self):
+        limiter = MemorySlidingWindowLimiter(limit=1, window_seconds=60, max_keys=10)
+        assert limiter.hit("1", now=0)
+        for t in range(1, 50):
+            assert limiter.hit("1", now=t) is False
+        assert limiter.hit("1", now=60) is True
+
+    def test_key_count_bounded_lru(self):
+        limiter = MemorySlidingWindowLimiter(limit=1, window_seconds=60, max_keys=2)
+        limiter.hit("a", now=0)
+        limiter.hit("b", now=0)
+        limiter.hit("a", now=1)  # refreshes "a"
+        limiter.hit("c", now=2)  # evicts "b", the least recently seen
+        assert len(limiter) == 2
+        assert limiter.evictions == 1
+        assert limiter.hit("a", now=3) is False  # still tracked
+
+
+class TestSlipVerifyRateLimiter:
+
+    def test_per_user(self):
+        limiter = SlipVerifyRateLimiter(limit=1, window_seconds=60, max_keys=10, redis_url=None)
+        assert limiter.hit(1) and limiter.hit(2)
+        assert limiter.hit(1) is False
+        stats = limiter.stats()
+        assert (stats["backend"], stats["allowed"], stats["rejected"]) == ("memory", 2, 1)
+
+    def test_redis_window_shared_across_processes(self):
+        shared = _CountingRedis(limit=3)
+        web, bot = (SlipVerifyRateLimiter(limit=3, max_keys=10, redis_url=None) for _ in range(2))
+        web.redis = bot.redis = shared
+        assert [web.hit(7), bot.hit(7), web.hit(7), bot.hit(7)] == [True, True, True, False]
+        assert len(web.memory) == 0
+
+    def test_redis_error_falls_back_to_memory(self):
+        limiter = SlipVerifyRateLimiter(limit=2, window_seconds=60, max_keys=10, redis_url=None)
+        limiter.redis = _BrokenRedis()
+        assert [limiter.hit(5) for _ in range(3)] == [True, True, False]
+        assert limiter.stats()["redis_errors"] == 3
+        limiter.reset(5)  # does not raise
+        assert limiter.hit(5) is True
+
+
+class TestCheckRateLimit:
+
+    def test_uses_shared_limiter(self, monkeypatch):
+        limiter = SlipVerifyRateLimiter(limit=1, window_seconds=60, max_keys=10, redis_url=None)
+        monkeypatch.setattr("app.services.payment_service.slip_verify_limiter", limiter)
+        _check_rate_limit(42, "en")
+        with pytest.raises(PaymentError) as exc:
+            _check_rate_limit(42, "th")
+        assert exc.value.status_code == 429
+        assert limiter.stats()["rejected"] == 1
@@ -0,0 +1,77 @@
+"""Tests for the SQLite pragma profile (app/utils/sqlite_profile.py)."""
+
+import asyncio
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app import database
+from app.database import Base
+from app.models import BloodPressureRecord
+from app.utils.sqlite_profile import install_sqlite_profile, run_benchmark, sqlite_pragmas
+
+
+def _pragmas(conn) -> dict:
+    return {name: conn.execute(text(f"PRAGMA {name}")).scalar()
+            for name in ("journal_mode", "synchronous", "foreign_keys", "busy_timeout")}
+
+
+class TestSQLiteProfile:
+
+    def test_tuned_profile_on_every_connection(self, tmp_path):
+        engine = create_engine(f"sqlite:///{tmp_path / 'tuned.db'}")
+        install_sqlite_profile(engine, "tuned")
+        with engine.connect() as first, engine.connect() as second:
+            for conn in (first, second):
+                assert _pragmas(conn) == {"journal_mode": "wal", "synchronous": 1,
+                                          "foreign_keys": 1, "busy_timeout": 5000}
+        engine.dispose()
+
+    def test_off_keeps_sqlite_defaults(self, tmp_path):
+        engine = create_engine(f"sqlite:///{tmp_path / 'off.db'}")
+        install_sqlite_profile(engine, "off")
+        with engine.connect() as conn:
+            assert _pragmas(conn)["journal_mode"] == "delete"
+            assert _pragmas(conn)["foreign_keys"] == 0
+        engine.dispose()
+
+    def test_async_engine(self, tmp_path):
+        async def journal_mode():
+            engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'async.db'}")
+            install_sqlite_profile(engine.sync_engine, "tuned")
+            try:
+                async with engine.connect() as conn:
+                    return (await conn.execute(text("PRAGMA journal_mode"))).scalar()
+            finally:
+                await engine.dispose()
+
+        assert asyncio.run(journal_mode()) == "wal"
+
+    def test_foreign_keys_enforced(self, tmp_path):
+        engine = create_engine(f"sqlite:///{tmp_path / 'fk.db'}")
+        install_sqlite_profile(engine, "tuned")
+        Base.metadata.create_all(bind=engine)
+        with pytest.raises(IntegrityError):
+            with engine.begin() as conn:
+                conn.execute(BloodPressureRecord.__table__.insert().values(
+                    user_id=424242, systolic=120, diastolic=80, pulse=70, measurement_date=datetime(2026, 1, 1)
+                ))
+        engine.dispose()
+
+    def test_unknown_profile_rejected(self):
+        with pytest.raises(ValueError):
+            sqlite_pragmas("fast")
+
+    def test_app_engine_uses_profile(self):
+        with database.engine.connect() as conn:
+            assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+
+    def test_benchmark_reports_both_profiles(self):
+        report = run_benchmark(rows=20, writers=2, readers=1)
+        for profile in ("off", "tuned"):
+            assert report[profile]["rows_written"] == 40
+            assert report[profile]["writes_per_second"] > 0
+        assert "speedup" in report
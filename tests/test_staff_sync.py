@@ -1,10 +1,17 @@
 import logging
+import time
 
 from sqlalchemy import text
 
 from app.models import StaffManagementState, User
 from app.utils.security import hash_password
-from app.utils.staff_sync import ensure_staff_sync_for_request, reset_staff_sync_state
+from app.utils.staff_sync import (
+    check_staff_sync_signature,
+    reset_staff_sync_state,
+    staff_sync_metrics,
+    staff_sync_worker,
+    sync_staff_allowlist,
+)
 
 
 def _make_user(db, role="patient", full_name="Test User", email=None, phone_number=None, telegram_id=None):
@@ -54,7 +61,7 @@ def test_missing_allowlist_skips_sync(db_session, monkeypatch):
     _reset(monkeypatch)
     user = _make_user(db_session, role="patient", full_name="Missing Env")
 
-    ensure_staff_sync_for_request(db_session)
+    sync_staff_allowlist(db_session)
     db_session.refresh(user)
 
     assert user.role == "patient"
@@ -67,7 +74,7 @@ def test_empty_allowlist_skips_sync_and_warns(db_session, monkeypatch, caplog):
     monkeypatch.setenv("STAFF_SYNC_MODE", "apply")
     user = _make_user(db_session, role="patient", full_name="Empty Env")
 
-    ensure_staff_sync_for_request(db_session)
+    sync_staff_allowlist(db_session)
     db_session.refresh(user)
 
     assert user.role == "patient"
@@ -83,7 +90,7 @@ def test_none_sentinel_demotes_only_env_managed_staff(db_session, monkeypatch):
     manual_staff = _make_user(db_session, role="staff", full_name="Manual Staff")
     _add_env_state(db_session, env_staff, original_role="doctor")
 
-    ensure_staff_sync_for_request(db_session)
+    sync_staff_allowlist(db_session)
     db_session.refresh(env_staff)
     db_session.refresh(manual_staff)
 
@@ -105,7 +112,7 @@ def test_dry_run_logs_without_writes(db_session, monkeypatch, caplog):
     phone_user = _make_user(db_session, role="doctor", full_name="Phone User", phone_number="+66811111111")
     telegram_user = _make_user(db_session, role="patient", full_name="Telegram User", telegram_id=32971348)
 
-    ensure_staff_sync_for_request(db_session)
+    sync_staff_allowlist(db_session)
     db_session.refresh(email_user)
     db_session.refresh(phone_user)
     db_session.refresh(telegram_user)
@@ -124,7 +131,7 @@ def test_apply_promotes_and_creates_state(db_session, monkeypatch):
     monkeypatch.setenv("STAFF_SYNC_MODE", "apply")
     user = _make_user(db_session, role="doctor", full_name="Beta", email="beta@example.com")
 
-    ensure_staff_sync_for_request(db_session)
+    sync_staff_allowlist(db_session)
     db_session.refresh(user)
     state = db_session.query(StaffManagementState).filter(StaffManagementState.user_id == user.id).first()
 
@@ -139,11 +146,11 @@ def test_sync_runs_once_per_process_for_same_signature(db_session, monkeypatch,
     monkeypatch.setenv("STAFF_ALLOWLIST", "user:1")
     monkeypatch.setenv("STAFF_SYNC_MODE", "dry-run")
 
-    ensure_staff_sync_for_request(db_session)
+    sync_staff_allowlist(db_session)
     first_logs = caplog.text
     caplog.clear()
 
-    ensure_staff_sync_for_request(db_session)
+    sync_staff_allowlist(db_session)
 
     assert "[staff-sync] mode=dry-run" in first_logs
     assert "[staff-sync] mode=dry-run" not in caplog.text
@@ -158,9 +165,65 @@ def test_missing_metadata_table_skips_without_crashing(db_session, monkeypatch):
     db_session.execute(text("DROP TABLE staff_management_states"))
     db_session.commit()
 
-    ensure_staff_sync_for_request(db_session)
+    sync_staff_allowlist(db_session)
     db_session.refresh(user)
 
     assert user.role == "patient"
 
-    StaffManagementState.__table__.create(bind=db_session.bind, checkfirst=True)
\ No newline at end of file
+    StaffManagementState.__table__.create(bind=db_session.bind, checkfirst=True)
+
+
+def test_forced_resync_picks_up_new_users(db_session, monkeypatch):
+    _reset(monkeypatch)
+    monkeypatch.setenv("STAFF_ALLOWLIST", "email:late@example.com")
+    monkeypatch.setenv("STAFF_SYNC_MODE", "apply")
+
+    sync_staff_allowlist(db_session)
+    user = _make_user(db_session, role="patient", full_name="Late", email="late@example.com")
+
+    assert sync_staff_allowlist(db_session) is None
+    assert sync_staff_allowlist(db_session, force=True)["promoted"] == 1
+    db_session.refresh(user)
+    assert user.role == "staff"
+
+
+def test_request_check_is_in_memory_and_records_duration(db_session, monkeypatch):
+    _reset(monkeypatch)
+    monkeypatch.setenv("STAFF_ALLOWLIST", "user:1")
+    monkeypatch.setenv("STAFF_SYNC_MODE", "dry-run")
+    runs = staff_sync_metrics.stats()["runs"]
+
+    assert check_staff_sync_signature() is False  # stale: only signals the worker
+    assert staff_sync_metrics.stats()["runs"] == runs
+
+    sync_staff_allowlist(db_session)
+    stats = staff_sync_metrics.stats()
+    assert stats["runs"] == runs + 1
+    assert stats["last_duration_ms"] >= 0
+    assert stats["last_summary"]["mode"] == "dry-run"
+    assert check_staff_sync_signature() is True
+
+
+def test_background_worker_syncs_on_start_and_config_change(db_session, monkeypatch):
+    _reset(monkeypatch)
+    monkeypatch.setenv("STAFF_ALLOWLIST", "email:worker@example.com")
+    monkeypatch.setenv("STAFF_SYNC_MODE", "apply")
+    monkeypatch.setenv("STAFF_SYNC_INTERVAL_SECONDS", "0")
+    user = _make_user(db_session, role="patient", full_name="Worker", email="worker@example.com")
+
+    def wait_for(role):
+        for _ in range(100):
+            db_session.expire_all()
+            if db_session.get(User, user.id).role == role:
+                return True
+            time.sleep(0.05)
+        return False
+
+    staff_sync_worker.start()
+    try:
+        assert wait_for("staff")
+        monkeypatch.setenv("STAFF_ALLOWLIST", "NONE")
+        check_staff_sync_signature()
+        assert wait_for("patient")
+    finally:
+        staff_sync_worker.stop()
@@ -128,16 +128,33 @@ class TestBypassUsers:
 
     def test_bypass_user_always_premium(self, db_session):
         user = _make_user(db_session, tier="free")
-        # Patch bypass list to include this user's ID
-        with patch("app.utils.security._premium_bypass_cache", {str(user.id)}):
+        # Bypass list includes this user's ID
+        with patch.dict(os.environ, {"PREMIUM_BYPASS_USERS": str(user.id)}):
             assert is_premium_active(user) is True
             info = get_subscription_info(user)
             assert info["subscription_tier"] == "premium"
             assert info["is_premium_active"] is True
 
+    def test_bypass_by_phone_and_telegram_never_decrypts(self, db_session):
+        by_phone = _make_user(db_session, tier="free", phone_number="+66891230001")
+        by_telegram = _make_user(db_session, tier="free", telegram_id=55501234)
+        other = _make_user(db_session, tier="free")
+        with patch.dict(os.environ, {"PREMIUM_BYPASS_USERS": "66891230001,55501234"}), \
+                patch.object(User, "_decrypt", side_effect=AssertionError("decrypted")):
+            assert is_premium_active(by_phone) is True
+            assert is_premium_active(by_telegram) is True
+            assert is_premium_active(other) is False
+
+    def test_bypass_set_follows_config_change(self, db_session):
+        user = _make_user(db_session, tier="free")
+        with patch.dict(os.environ, {"PREMIUM_BYPASS_USERS": str(user.id)}):
+            assert is_premium_active(user) is True
+        with patch.dict(os.environ, {"PREMIUM_BYPASS_USERS": "999999"}):
+            assert is_premium_active(user) is False
+
     def test_bypass_user_not_normalized_down(self, db_session):
         user = _make_user(db_session, tier="premium", expires_delta=timedelta(days=-10))
-        with patch("app.utils.security._premium_bypass_cache", {str(user.id)}):
+        with patch.dict(os.environ, {"PREMIUM_BYPASS_USERS": str(user.id)}):
             info = get_subscription_info(user)
             assert info["subscription_tier"] == "premium"
             assert info["is_premium_active"] is True
@@ -406,7 +423,7 @@ class TestSelfHeal:
 
     def test_normalize_bypass_user_not_downgraded(self, db_session):
         user = _make_user(db_session, tier="premium", expires_delta=timedelta(days=-10))
-        with patch("app.utils.security._premium_bypass_cache", {str(user.id)}):
+        with patch.dict(os.environ, {"PREMIUM_BYPASS_USERS": str(user.id)}):
             changed = normalize_subscription_state(user, db=db_session)
             assert changed is False
             assert user.subscription_tier == "premium"
@@ -455,11 +472,12 @@ class TestRateLimit:
 
     def test_rate_limit_enforced(self, db_session):
         """After 3 rapid calls, the 4th should be rejected."""
-        from app.services.payment_service import _check_rate_limit, _verify_timestamps
+        from app.services.payment_service import _check_rate_limit
+        from app.utils.slip_rate_limiter import slip_verify_limiter
 
         fake_user_id = 999999
         # Clear any existing entries
-        _verify_timestamps.pop(fake_user_id, None)
+        slip_verify_limiter.reset(fake_user_id)
 
         for _ in range(3):
             _check_rate_limit(fake_user_id, "en")  # should pass
@@ -469,7 +487,7 @@ class TestRateLimit:
         assert exc_info.value.status_code == 429
 
         # Cleanup
-        _verify_timestamps.pop(fake_user_id, None)
+        slip_verify_limiter.reset(fake_user_id)
 
 
 # ══════════════════════════════════════════════════════════════════
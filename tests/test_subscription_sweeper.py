@@ -0,0 +1,151 @@
+"""Tests for the scheduled expired-subscription sweeper (app/services/subscription_sweeper.py)."""
+
+import json
+from datetime import timedelta
+from types import SimpleNamespace
+
+import pytest
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.database import Base
+from app.models import AdminAuditLog, User
+from app.services.subscription_sweeper import SubscriptionSweeper, sweep_expired_subscriptions
+from app.utils.principal_cache import principal_cache
+from app.utils.security import create_access_token, get_current_user
+from app.utils.subscription import get_subscription_info
+from app.utils.timezone import now_tz
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    monkeypatch.delenv("PREMIUM_BYPASS_USERS", raising=False)
+    engine = create_engine(f"sqlite:///{tmp_path / 'sweep.db'}")
+    Base.metadata.create_all(bind=engine)
+    with Session(bind=engine) as session:
+        yield session
+    engine.dispose()
+
+
+def _user(db, tier="premium", expires_delta=timedelta(days=-1), phone=None, telegram_id=None):
+    user = User(
+        role="patient", is_active=True, password_hash="fakehash", subscription_tier=tier,
+        subscription_expires_at=(now_tz() + expires_delta) if expires_delta is not None else None,
+    )
+    user.full_name = "Sweep User"
+    if phone:
+        user.phone_number = phone
+    if telegram_id:
+        user.telegram_id = telegram_id
+    db.add(user)
+    db.commit()
+    return user.id
+
+
+def _tier(db, user_id):
+    db.expire_all()
+    return db.get(User, user_id).subscription_tier
+
+
+class TestSweepExpiredSubscriptions:
+
+    def test_downgrades_only_expired_premium(self, db):
+        expired = _user(db)
+        no_expiry = _user(db, expires_delta=None)
+        active = _user(db, expires_delta=timedelta(days=10))
+        free = _user(db, tier="free")
+
+        result = sweep_expired_subscriptions(db)
+
+        assert sorted(result["user_ids"]) == sorted([expired, no_expiry])
+        assert [_tier(db, uid) for uid in (expired, no_expiry, active, free)] == ["free", "free", "premium", "free"]
+
+    def test_audit_rows_written_in_bulk(self, db):
+        ids = [_user(db) for _ in range(3)]
+        sweep_expired_subscriptions(db)
+
+        logs = db.query(AdminAuditLog).filter(AdminAuditLog.action == "subscription_expired").all()
+        assert sorted(log.target_user_id for log in logs) == sorted(ids)
+        assert all(log.admin_user_id is None for log in logs)  # no admin performed this
+        assert json.loads(logs[0].details)["actor"] == "system"
+
+    def test_second_sweep_is_a_noop(self, db):
+        _user(db)
+        assert sweep_expired_subscriptions(db)["downgraded"] == 1
+        assert sweep_expired_subscriptions(db)["downgraded"] == 0
+        assert db.query(AdminAuditLog).count() == 1
+
+    def test_bypass_users_kept(self, db, monkeypatch):
+        by_id = _user(db)
+        by_phone = _user(db, phone="+66891234567")
+        by_telegram = _user(db, telegram_id=32971348)
+        other = _user(db)
+        monkeypatch.setenv("PREMIUM_BYPASS_USERS", f"{by_id},66891234567,32971348")
+
+        assert sweep_expired_subscriptions(db)["user_ids"] == [other]
+        assert _tier(db, by_phone) == "premium"
+        assert _tier(db, by_telegram) == "premium"
+
+    def test_invalidates_cached_principal(self, db):
+        user_id = _user(db)
+        token = create_access_token({"user_id": user_id})
+        request = SimpleNamespace(state=SimpleNamespace(), url=SimpleNamespace(path="/"))
+        credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+        user = get_current_user(request, credentials, db)
+        assert user.subscription_tier == "premium"  # request path doesn't write
+        assert get_subscription_info(user)["subscription_tier"] == "free"
+        db.close()
+        assert principal_cache.stats()["entries"] == 1
+
+        sweep_expired_subscriptions(db)
+        assert principal_cache.stats()["entries"] == 0
+        assert get_current_user(request, credentials, db).subscription_tier == "free"
+
+    def test_sweeper_stats(self, monkeypatch):
+        sweeper = SubscriptionSweeper(interval=0)
+        sweeper.start()
+        assert sweeper.running is False  # interval 0 disables the schedule
+        monkeypatch.setattr(
+            "app.services.subscription_sweeper.sweep_expired_subscriptions",
+            lambda db: {"downgraded": 2, "user_ids": [1, 2], "duration_ms": 1.0},
+        )
+        sweeper.run_once()
+        stats = sweeper.stats()
+        assert (stats["runs"], stats["downgraded_total"], stats["last_downgraded"]) == (1, 2, 2)
+
+
+class TestAuditAdminNullableMigration:
+
+    def test_sqlite_rebuild_keeps_rows(self, tmp_path):
+        import sqlite3
+
+        from migrations import make_audit_admin_user_nullable
+
+        path = str(tmp_path / "legacy.db")
+        conn = sqlite3.connect(path)
+        conn.execute("""
+            CREATE TABLE admin_audit_logs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                admin_user_id INTEGER NOT NULL REFERENCES users(id),
+                action VARCHAR NOT NULL,
+                target_user_id INTEGER REFERENCES users(id),
+                details TEXT,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        conn.execute("INSERT INTO admin_audit_logs (admin_user_id, action) VALUES (7, 'verify_doctor')")
+        conn.commit()
+        conn.close()
+
+        make_audit_admin_user_nullable.migrate_sqlite(path)
+        make_audit_admin_user_nullable.migrate_sqlite(path)  # idempotent
+
+        conn = sqlite3.connect(path)
+        notnull = {row[1]: row[3] for row in conn.execute("PRAGMA table_info(admin_audit_logs)")}
+        conn.execute("INSERT INTO admin_audit_logs (admin_user_id, action) VALUES (NULL, 'subscription_expired')")
+        rows = conn.execute("SELECT admin_user_id, action FROM admin_audit_logs ORDER BY id").fetchall()
+        conn.close()
+        assert notnull["admin_user_id"] == 0
+        assert rows == [(7, "verify_doctor"), (None, "subscription_expired")]